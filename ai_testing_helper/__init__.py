@@ -0,0 +1,35 @@
+"""Núcleo do AI Testing Helper (sem dependência da interface Streamlit)."""
+
+from ai_testing_helper.context_window import (
+    DEFAULT_TOKEN_BUDGET,
+    ContextWindow,
+    estimate_tokens,
+    model_summarizer,
+    model_token_counter,
+    truncating_summarizer,
+)
+from ai_testing_helper.generation import (
+    GEMINI_MODEL_NAME,
+    GENERATION_CONFIG,
+    SYSTEM_INSTRUCTIONS,
+    build_prompt,
+    generate_response,
+    init_gemini,
+    stream_response,
+)
+
+__all__ = [
+    "DEFAULT_TOKEN_BUDGET",
+    "GEMINI_MODEL_NAME",
+    "GENERATION_CONFIG",
+    "SYSTEM_INSTRUCTIONS",
+    "ContextWindow",
+    "build_prompt",
+    "estimate_tokens",
+    "generate_response",
+    "init_gemini",
+    "model_summarizer",
+    "model_token_counter",
+    "stream_response",
+    "truncating_summarizer",
+]
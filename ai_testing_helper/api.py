@@ -0,0 +1,444 @@
+"""API HTTP sem interface para a geração de testes, ao lado da página do Streamlit.
+
+Para CI e plugins de IDE, que não conseguem usar a página de chat. A geração é
+a mesma da página, com os recursos do processo (``ai_testing_helper.resources``):
+modelo, cache de respostas, limitador de taxa e pool de geração. A aplicação
+é ASGI, em Starlette (instalado junto com o Streamlit).
+
+No servidor da página (``ai_testing_helper.server:create_app``, também usado
+pelos workers do deploy), as rotas ``/v1`` ficam montadas no mesmo processo
+da página e dividem com ela esses recursos. Servida sozinha, a API é outro
+processo::
+
+    python -m ai_testing_helper.api --port 8502
+    uvicorn --factory ai_testing_helper.api:create_app --port 8502
+
+Nesse caso só o cache de respostas é dividido, e apenas com
+``SHARED_STORE_URL``. O pool, o agrupamento de pedidos e os limites de
+``GEMINI_RPM``/``GEMINI_TPM`` são do processo: somados aos da página,
+passam dos configurados.
+
+Rotas:
+
+- ``POST /v1/generate``: ``{"prompt": ..., "history": [...]}`` devolve
+  ``{"answer": ...}``. Com ``"stream": true`` (ou ``Accept: text/event-stream``),
+  a resposta vem em server-sent events: um evento ``chunk`` por pedaço e um
+  ``done`` ao final.
+- ``POST /v1/jobs``: ``{"items": [{"prompt": ...}, ...]}`` devolve
+  ``202 {"job_id": ...}``.
+- ``GET /v1/jobs/{job_id}``: situação do lote e as respostas já prontas.
+- ``/healthz`` e ``/readyz``: como nos workers da página.
+
+Pedidos iguais em andamento no mesmo processo (mesma chave do cache de
+respostas) são agrupados (``ai_testing_helper.singleflight``). Uma só geração
+atende a todos, e quem chega depois recebe os pedaços já gerados e os
+seguintes. As gerações passam pelo pool do processo
+(``GEMINI_MAX_CONCURRENCY``). Com ``API_MAX_PENDING`` pedidos já na fila,
+pedidos novos recebem 429. Os itens de um lote rodam no máximo
+``API_JOB_CONCURRENCY`` por vez.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+
+from ai_testing_helper.cache import make_cache_key
+from ai_testing_helper.context_window import DEFAULT_TOKEN_BUDGET, ContextWindow
+from ai_testing_helper.generation import SYSTEM_INSTRUCTIONS, is_error_response, stream_response
+from ai_testing_helper.routing import DEFAULT_ROUTE
+from ai_testing_helper.singleflight import SingleFlight
+
+DEFAULT_PORT = 8502
+DEFAULT_MAX_PENDING = 64
+DEFAULT_JOB_CONCURRENCY = 4
+DEFAULT_MAX_BATCH = 100
+DEFAULT_MAX_JOBS = 1000
+DEFAULT_KEEP_ALIVE_SECONDS = 30
+
+ROLES = ("user", "assistant")
+
+
+class RequestError(ValueError):
+    """Corpo da requisição inválido (resposta 400)."""
+
+
+class Overloaded(RuntimeError):
+    """Fila do pool de geração cheia (resposta 429)."""
+
+
+def parse_item(data):
+    """``(prompt, history)`` de um pedido: ``{"prompt": str, "history": [{"role", "content"}]}``."""
+    if not isinstance(data, dict):
+        raise RequestError("o pedido deve ser um objeto JSON")
+    prompt = data.get("prompt")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise RequestError("'prompt' deve ser um texto não vazio")
+    history = data.get("history") or []
+    if not isinstance(history, list):
+        raise RequestError("'history' deve ser uma lista de mensagens")
+    for message in history:
+        if (not isinstance(message, dict) or message.get("role") not in ROLES
+                or not isinstance(message.get("content"), str)):
+            raise RequestError("cada mensagem de 'history' precisa de 'role' (user/assistant) e 'content'")
+    return prompt, [{"role": message["role"], "content": message["content"]} for message in history]
+
+
+class Reply:
+    """Resposta de um pedido: do cache (texto pronto) ou de uma geração em andamento."""
+
+    def __init__(self, route, text=None, call=None, coalesced=False):
+        self.route = route
+        self.cached = call is None
+        self.coalesced = coalesced
+        self._text = text
+        self._call = call
+
+    async def stream(self):
+        if self._call is None:
+            yield self._text
+            return
+        async for chunk in self._call.achunks():
+            yield chunk
+
+    async def text(self):
+        if self._text is None:
+            self._text = "".join([chunk async for chunk in self.stream()])
+        return self._text
+
+    def info(self, text=None):
+        info = {"route": self.route, "cached": self.cached, "coalesced": self.coalesced}
+        if text is not None:
+            info["answer"] = text
+            info["error"] = is_error_response(text)
+        return info
+
+
+class Job:
+    """Lote de pedidos: as respostas ficam em ``results`` na ordem dos itens."""
+
+    def __init__(self, items):
+        self.id = uuid.uuid4().hex
+        self.items = items
+        self.results = [None] * len(items)
+        self.created_at = time.time()
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def status(self):
+        if self.finished_at is not None:
+            return "done"
+        return "running" if any(result is not None for result in self.results) else "queued"
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.items),
+            "completed": sum(result is not None for result in self.results),
+            "results": self.results,
+        }
+
+
+class GenerationService:
+    """Geração da API: rota, janela de contexto, cache, agrupamento de pedidos iguais e pool."""
+
+    def __init__(self, cache, pool, get_model, router=None, max_pending=DEFAULT_MAX_PENDING,
+                 job_concurrency=DEFAULT_JOB_CONCURRENCY, max_batch=DEFAULT_MAX_BATCH,
+                 max_jobs=DEFAULT_MAX_JOBS, token_budget=DEFAULT_TOKEN_BUDGET, single_flight=None):
+        self.cache = cache
+        self.pool = pool
+        self.single_flight = single_flight if single_flight is not None else SingleFlight(pool)
+        self.get_model = get_model
+        self.router = router
+        self.max_pending = max_pending
+        self.job_concurrency = job_concurrency
+        self.max_batch = max_batch
+        self.max_jobs = max_jobs
+        self.token_budget = token_budget
+        self.jobs = OrderedDict()
+
+    def plan(self, prompt, history=()):
+        """Rota e chave do cache (a mesma da página)."""
+        route = self.router.classify(prompt, history[-2:]) if self.router is not None else DEFAULT_ROUTE
+        key = make_cache_key(prompt, history, route.model_name, route.generation_config, SYSTEM_INSTRUCTIONS)
+        return route, key
+
+    def lookup(self, prompt, history=()):
+        """Rota, histórico ajustado ao orçamento, chave e resposta já em cache (ou ``None``).
+
+        Bloqueia, então roda fora do event loop. O histórico só é ajustado
+        (e resumido) quando a resposta não está no cache.
+        """
+        route, key = self.plan(prompt, history)
+        text = self.cache.get(key)
+        if text is None:
+            # Sem sessão: cada pedido resume por conta própria o que não cabe no orçamento
+            history = ContextWindow(token_budget=self.token_budget).fit(history)
+        return route, history, key, text
+
+    async def start(self, prompt, history=(), bounded=True):
+        """Devolve a ``Reply`` do pedido; a geração (quando precisa) já está no pool.
+
+        Com ``bounded``, recusa com ``Overloaded`` quando a fila do pool tem
+        ``max_pending`` pedidos. O resumo do histórico e a consulta ao cache
+        (SQLite ou armazenamento compartilhado) rodam em uma thread.
+        """
+        route, history, key, text = await asyncio.to_thread(self.lookup, prompt, list(history))
+        if text is not None:
+            return Reply(route.name, text=text)
+        if (bounded and not self.single_flight.in_flight_for(key)
+                and self.pool.stats()["queued"] >= self.max_pending):
+            raise Overloaded(f"{self.max_pending} pedidos já aguardam na fila")
+
+        model = self.get_model(route.model_name, route.generation_config)
+        call, joined = self.single_flight.submit(
+            key, stream_response, model, history, prompt, on_result=lambda text: self._store(key, text)
+        )
+        return Reply(route.name, call=call, coalesced=joined)
+
+    def _store(self, key, text):
+        # Roda na thread do pool, antes de liberar quem espera: o próximo pedido igual já acha no cache
+        if not is_error_response(text):
+            self.cache.set(key, text)
+
+    def submit_job(self, items):
+        """Cria o lote e começa a gerar os itens em segundo plano; devolve o ``Job``."""
+        if not isinstance(items, list) or not items:
+            raise RequestError("'items' deve ser uma lista não vazia de pedidos")
+        if len(items) > self.max_batch:
+            raise RequestError(f"no máximo {self.max_batch} itens por lote")
+        parsed = [parse_item(item) for item in items]
+        if self.pool.stats()["queued"] >= self.max_pending:
+            raise Overloaded(f"{self.max_pending} pedidos já aguardam na fila")
+        job = Job(parsed)
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        job.task = asyncio.ensure_future(self._run_job(job))
+        return job
+
+    async def _run_job(self, job):
+        # Os itens de um lote não passam na frente dos pedidos interativos: poucos por vez
+        semaphore = asyncio.Semaphore(self.job_concurrency)
+
+        async def run_item(index, prompt, history):
+            reply = None
+            async with semaphore:
+                try:
+                    # Erros de um item (circuito aberto, pool cheio, falha do modelo) ficam só nele
+                    reply = await self.start(prompt, history, bounded=False)
+                    job.results[index] = reply.info(await reply.text())
+                except Exception as error:
+                    route = reply.route if reply is not None else None
+                    job.results[index] = {"route": route, "error": True, "detail": str(error)}
+
+        try:
+            await asyncio.gather(*(run_item(index, *item) for index, item in enumerate(job.items)))
+        finally:
+            # Mesmo cancelado, o lote termina: quem consulta não fica esperando para sempre
+            for index, result in enumerate(job.results):
+                if result is None:
+                    job.results[index] = {"route": None, "error": True, "detail": "lote interrompido"}
+            job.finished_at = time.time()
+
+    def _forget_old_jobs(self):
+        """Mantém no máximo ``max_jobs`` lotes, descartando os mais antigos já concluídos."""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].finished_at is not None:
+                del self.jobs[job_id]
+
+    def stats(self):
+        return {"single_flight": self.single_flight.stats(), "jobs": len(self.jobs), "pool": self.pool.stats()}
+
+
+def service_from_env():
+    """Serviço com os recursos compartilhados do processo (os mesmos da página)."""
+    from ai_testing_helper.resources import (
+        configure_gemini,
+        configure_metrics,
+        get_gemini_model,
+        get_generation_pool,
+        get_response_cache,
+        get_router,
+        get_single_flight,
+        load_environment,
+    )
+
+    load_environment()
+    configure_metrics()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if api_key:
+        configure_gemini(api_key)
+    routing = os.getenv("MODEL_ROUTING", "1").lower() not in ("0", "false", "no", "off")
+    return GenerationService(
+        get_response_cache(),
+        get_generation_pool(),
+        get_gemini_model,
+        router=get_router() if routing else None,
+        max_pending=int(os.getenv("API_MAX_PENDING", DEFAULT_MAX_PENDING)),
+        job_concurrency=int(os.getenv("API_JOB_CONCURRENCY", DEFAULT_JOB_CONCURRENCY)),
+        max_batch=int(os.getenv("API_MAX_BATCH", DEFAULT_MAX_BATCH)),
+        token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)),
+        single_flight=get_single_flight(),
+    )
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_stream(reply):
+    """Eventos ``chunk`` com cada pedaço e ``done`` ao final (``error`` se a geração falhar)."""
+    pieces = []
+    try:
+        async for chunk in reply.stream():
+            pieces.append(chunk)
+            yield sse_event("chunk", {"text": chunk})
+    except Exception as error:
+        yield sse_event("error", {"detail": str(error)})
+        return
+    info = reply.info()
+    info["error"] = is_error_response("".join(pieces))
+    yield sse_event("done", info)
+
+
+def _error(status, detail, headers=None):
+    from starlette.responses import JSONResponse
+
+    return JSONResponse({"error": detail}, status_code=status, headers=headers)
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise RequestError("corpo da requisição não é um JSON válido")
+
+
+async def generate(request):
+    from starlette.responses import JSONResponse, StreamingResponse
+
+    service = request.app.state.service
+    try:
+        data = await _json_body(request)
+        prompt, history = parse_item(data)
+        reply = await service.start(prompt, history)
+    except RequestError as error:
+        return _error(400, str(error))
+    except Overloaded as error:
+        return _error(429, str(error), headers={"Retry-After": "1"})
+
+    stream = data.get("stream", "text/event-stream" in request.headers.get("accept", ""))
+    if stream:
+        return StreamingResponse(
+            sse_stream(reply), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    try:
+        text = await reply.text()
+    except Exception as error:
+        return _error(502, str(error))
+    return JSONResponse(reply.info(text))
+
+
+async def create_job(request):
+    from starlette.responses import JSONResponse
+
+    service = request.app.state.service
+    try:
+        data = await _json_body(request)
+        job = service.submit_job(data.get("items") if isinstance(data, dict) else None)
+    except RequestError as error:
+        return _error(400, str(error))
+    except Overloaded as error:
+        return _error(429, str(error), headers={"Retry-After": "1"})
+    body = job.as_dict()
+    body["status_url"] = f"/v1/jobs/{job.id}"
+    return JSONResponse(body, status_code=202, headers={"Location": body["status_url"]})
+
+
+async def get_job(request):
+    from starlette.responses import JSONResponse
+
+    job = request.app.state.service.jobs.get(request.path_params["job_id"])
+    if job is None:
+        return _error(404, "lote não encontrado")
+    return JSONResponse(job.as_dict())
+
+
+async def stats(request):
+    from starlette.responses import JSONResponse
+
+    return JSONResponse(request.app.state.service.stats())
+
+
+async def ready(request):
+    from starlette.concurrency import run_in_threadpool
+
+    from ai_testing_helper.server import readiness_checks, readiness_response
+
+    return readiness_response(await run_in_threadpool(readiness_checks))
+
+
+def create_api(service=None):
+    """Rotas da API (montadas em ``/v1``); sem ``service``, usa os recursos do processo."""
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    api = Starlette(routes=[
+        Route("/generate", generate, methods=["POST"]),
+        Route("/jobs", create_job, methods=["POST"]),
+        Route("/jobs/{job_id}", get_job, methods=["GET"]),
+        Route("/stats", stats, methods=["GET"]),
+    ])
+    api.state.service = service if service is not None else service_from_env()
+    return api
+
+
+def create_app(service=None):
+    """Aplicação ASGI só da API, em um processo próprio (``uvicorn --factory``)."""
+    from starlette.applications import Starlette
+    from starlette.routing import Mount, Route
+
+    from ai_testing_helper.server import health
+
+    return Starlette(routes=[
+        Mount("/v1", app=create_api(service)),
+        Route("/healthz", health),
+        Route("/readyz", ready),
+    ])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ai_testing_helper.api",
+        description="API HTTP para gerar testes unitários (geração única com SSE e lotes).",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="endereço da API")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="porta da API")
+    parser.add_argument("--keep-alive", type=int,
+                        default=int(os.getenv("API_KEEP_ALIVE", DEFAULT_KEEP_ALIVE_SECONDS)),
+                        help="segundos que uma conexão ociosa fica aberta para o próximo pedido")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import uvicorn
+
+    args = parse_args(argv)
+    # Processo próprio: o pool, o cache em memória, o agrupamento de pedidos e os limites
+    # de taxa não são os da página (para dividi-los, use ai_testing_helper.server:create_app)
+    uvicorn.run(create_app(), host=args.host, port=args.port, timeout_keep_alive=args.keep_alive,
+                log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+"""Geração de testes em lote, pela linha de comando.
+
+Percorre arquivos Python, extrai cada função com ``ast`` e gera os testes de
+todas elas em paralelo (com limite de concorrência), gravando um
+``test_<modulo>.py`` por módulo. O progresso fica salvo no índice de funções
+(``ai_testing_helper.incremental``) na pasta de saída: uma execução
+interrompida continua de onde parou e só funções novas ou alteradas (no código
+ou nas dependências) vão ao modelo. Com ``--since``, apenas os arquivos
+alterados desde uma referência do git são analisados de novo.
+
+Uso:
+    python -m ai_testing_helper.batch src/ --output-dir tests_gerados --concurrency 4
+    python -m ai_testing_helper.batch src/ --since origin/main
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+import textwrap
+import time
+from collections import namedtuple
+from concurrent.futures import as_completed
+
+from ai_testing_helper.concurrency import DEFAULT_MAX_CONCURRENCY, GenerationPool
+from ai_testing_helper.context_window import estimate_tokens
+from ai_testing_helper.generation import (
+    GEMINI_MODEL_NAME,
+    GENERATION_CONFIG,
+    build_prompt,
+    complete_response,
+    is_error_response,
+)
+from ai_testing_helper.incremental import (
+    FunctionIndex,
+    class_members,
+    content_hash,
+    dependency_fingerprint,
+    function_id,
+    git_changed_files,
+    module_definitions,
+    normalized_ast_hash,
+)
+
+PROGRESS_FILE = ".ai_testing_helper_batch.json"
+
+EXCLUDED_DIRS = {".git", ".venv", "venv", "__pycache__", "node_modules", ".tox", ".nox", "htmlcov"}
+
+UNIT_PROMPT = """Gere testes unitários em pytest para a função `{qualname}` do módulo `{module}`.
+Importe o que for necessário com `from {module} import ...`.
+Responda apenas com um bloco de código Python, sem explicações.
+
+```python
+{source}
+```"""
+
+_CODE_BLOCK = re.compile(r"```[ \t]*(?:python|py|python3)?[ \t]*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+
+FunctionUnit = namedtuple(
+    "FunctionUnit", "path module qualname lineno source ast_hash deps_hash file_hash", defaults=(None,)
+)
+
+
+def is_test_file(filename):
+    return filename.startswith("test_") or filename.endswith("_test.py") or filename == "conftest.py"
+
+
+def iter_source_files(paths):
+    """Devolve ``(raiz, arquivo)`` para cada arquivo Python (sem arquivos de teste)."""
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isfile(path):
+            yield os.path.dirname(path), path
+            continue
+        for directory, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(
+                name for name in dirnames if name not in EXCLUDED_DIRS and not name.startswith(".")
+            )
+            for filename in sorted(filenames):
+                if filename.endswith(".py") and not is_test_file(filename):
+                    yield path, os.path.join(directory, filename)
+
+
+def module_name(root, path):
+    """Nome pontuado do módulo relativo à raiz (``pkg/sub/mod.py`` -> ``pkg.sub.mod``)."""
+    relative = os.path.splitext(os.path.relpath(path, root))[0]
+    parts = relative.split(os.sep)
+    if parts[-1] == "__init__" and len(parts) > 1:
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def extract_functions(source, module, path=""):
+    """Funções e métodos de primeiro nível do código (dunders, exceto ``__init__``, ficam de fora)."""
+    tree = ast.parse(source)
+    definitions = module_definitions(tree)
+    units = []
+
+    def add(node, qualname, members=None):
+        segment = ast.get_source_segment(source, node, padded=True)
+        if segment is None:
+            return
+        # Inclui os decorators, que fazem parte do comportamento da função
+        if node.decorator_list:
+            lines = source.splitlines()
+            start = node.decorator_list[0].lineno - 1
+            segment = "\n".join(lines[start:node.end_lineno])
+        units.append(FunctionUnit(
+            path, module, qualname, node.lineno, textwrap.dedent(segment),
+            normalized_ast_hash(node), dependency_fingerprint(node, definitions, members)
+        ))
+
+    def wanted(name):
+        return name == "__init__" or not (name.startswith("__") and name.endswith("__"))
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and wanted(node.name):
+            add(node, node.name)
+        elif isinstance(node, ast.ClassDef):
+            members = class_members(node)
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and wanted(child.name):
+                    add(child, f"{node.name}.{child.name}", members)
+    return units
+
+
+def collect_units(paths, index=None, changed_files=None):
+    """Extrai as funções de todos os arquivos; arquivos com erro de sintaxe ou fora do UTF-8 são ignorados.
+
+    Com ``changed_files`` (conjunto vindo do git), arquivos fora dele cujas
+    funções já estão completas no ``index`` não são analisados de novo: as
+    funções vêm do próprio índice. O conteúdo ainda é lido e comparado pelo
+    hash, então um arquivo alterado fora do que o git informa (commit novo,
+    checkout, índice de outra árvore) nunca reaproveita resultados antigos.
+    Devolve ``(units, keys, ignorados, reaproveitados)``; ``keys`` é ``None``
+    para funções que precisam ter a chave calculada.
+    """
+    units = []
+    keys = []
+    skipped = []
+    reused = 0
+    for root, path in iter_source_files(paths):
+        try:
+            with open(path, encoding="utf-8") as file:
+                source = file.read()
+        except UnicodeDecodeError:
+            skipped.append(path)
+            continue
+        file_hash = content_hash(source)
+        if changed_files is not None and index is not None and path not in changed_files \
+                and index.is_complete(path, file_hash):
+            for entry in index.entries_for(path):
+                units.append(FunctionUnit(
+                    path, entry["module"], entry["qualname"], entry["lineno"], None, None, None, file_hash
+                ))
+                keys.append(entry["key"])
+            reused += 1
+            continue
+        try:
+            found = extract_functions(source, module_name(root, path), path)
+        except (SyntaxError, ValueError):
+            # ValueError: bytes nulos no código (SyntaxError a partir do Python 3.12)
+            skipped.append(path)
+            continue
+        found = [unit._replace(file_hash=file_hash) for unit in found]
+        units.extend(found)
+        keys.extend([None] * len(found))
+    return units, keys, skipped, reused
+
+
+def unit_hash(unit, model_name=GEMINI_MODEL_NAME, generation_config=None):
+    """Chave do pedido de uma função: AST normalizado, dependências, módulo, modelo e configuração."""
+    payload = json.dumps(
+        {
+            "module": unit.module,
+            "qualname": unit.qualname,
+            "ast": unit.ast_hash,
+            "deps": unit.deps_hash,
+            "model": model_name,
+            "config": generation_config or GENERATION_CONFIG,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_unit_prompt(unit):
+    return UNIT_PROMPT.format(qualname=unit.qualname, module=unit.module, source=unit.source.rstrip())
+
+
+def extract_code_blocks(text):
+    """Blocos de código Python da resposta; sem blocos, devolve o texto inteiro."""
+    blocks = [block.strip() for block in _CODE_BLOCK.findall(text or "")]
+    blocks = [block for block in blocks if block]
+    if blocks:
+        return blocks
+    return [text.strip()] if text and text.strip() else []
+
+
+def _usage(response, prompt, text):
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    output_tokens = getattr(usage, "candidates_token_count", None)
+    if not isinstance(prompt_tokens, int):
+        prompt_tokens = estimate_tokens(prompt)
+    if not isinstance(output_tokens, int):
+        output_tokens = estimate_tokens(text)
+    return prompt_tokens, output_tokens
+
+
+def generate_unit(model, unit, max_continuations=None):
+    """Gera os testes de uma função. Erros são relançados para quem chamou.
+
+    Respostas cortadas por ``max_output_tokens`` são continuadas como na
+    página (até ``GEMINI_MAX_CONTINUATIONS`` pedidos).
+    """
+    prompt = build_prompt([], build_unit_prompt(unit))
+    start = time.perf_counter()
+    response = model.generate_content(prompt)
+    first = response.text
+    text = complete_response(model, first, response, max_continuations)
+    if is_error_response(text):
+        # Continuação que falhou: a resposta parcial não vai para o índice
+        raise RuntimeError(text)
+    prompt_tokens, output_tokens = _usage(response, prompt, first)
+    # Tokens das continuações (o ``usage_metadata`` é só da primeira resposta)
+    output_tokens += estimate_tokens(text[len(first):])
+    return {
+        "module": unit.module,
+        "qualname": unit.qualname,
+        "code": "\n\n".join(extract_code_blocks(text)),
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class BatchStats:
+    """Estatísticas de vazão de uma execução em lote."""
+
+    def __init__(self):
+        self.total = 0
+        self.generated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.removed = 0
+        self.reused_files = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.elapsed = 0.0
+
+    @property
+    def functions_per_minute(self):
+        return self.generated / self.elapsed * 60 if self.elapsed else 0.0
+
+    @property
+    def tokens_per_function(self):
+        if not self.generated:
+            return 0.0
+        return (self.prompt_tokens + self.output_tokens) / self.generated
+
+    def summary(self):
+        return (
+            f"Funções: {self.total} | geradas: {self.generated} | puladas (sem mudança): {self.skipped}"
+            f" | removidas: {self.removed} | falhas: {self.failed}\n"
+            f"Tempo: {self.elapsed:.1f} s | funções/min: {self.functions_per_minute:.1f}"
+            f" | tokens/função: {self.tokens_per_function:.0f}"
+        )
+
+
+def output_file_names(modules):
+    """``test_<modulo>.py`` por módulo; nomes repetidos usam o caminho pontuado."""
+    stems = {}
+    for module in modules:
+        stems.setdefault(module.split(".")[-1], []).append(module)
+    names = {}
+    for stem, group in stems.items():
+        for module in group:
+            name = stem if len(group) == 1 else module.replace(".", "_")
+            names[module] = f"test_{name}.py"
+    return names
+
+
+def write_test_files(index, output_dir):
+    """Grava um arquivo de testes por módulo do índice, na ordem das funções no código.
+
+    Arquivos gravados em execuções anteriores cujo módulo não existe mais são
+    apagados.
+    """
+    by_module = {}
+    for entry in sorted(index.functions.values(), key=lambda entry: (entry["path"], entry["lineno"])):
+        result = index.get(entry["key"])
+        if result and result.get("code"):
+            by_module.setdefault(entry["module"], []).append((entry["qualname"], result["code"]))
+
+    os.makedirs(output_dir, exist_ok=True)
+    names = output_file_names(sorted(by_module))
+    written = []
+    for module, entries in sorted(by_module.items()):
+        sections = [f"# Testes gerados pelo AI Testing Helper para o módulo `{module}`"]
+        for qualname, code in entries:
+            sections.append(f"# --- {qualname} ---\n{code}")
+        path = os.path.join(output_dir, names[module])
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n\n\n".join(sections) + "\n")
+        written.append(path)
+
+    for path in set(index.files) - set(written):
+        if os.path.exists(path):
+            os.remove(path)
+    index.files = written
+    return written
+
+
+def run_batch(paths, model, output_dir, concurrency=DEFAULT_MAX_CONCURRENCY,
+              progress_path=None, model_name=GEMINI_MODEL_NAME, generation_config=None,
+              since=None, log=print):
+    """Gera os testes das funções novas ou alteradas encontradas em ``paths``.
+
+    ``since`` é uma referência do git (ex.: ``HEAD`` ou ``origin/main``):
+    apenas os arquivos alterados desde ela são analisados de novo.
+    """
+    index = FunctionIndex(progress_path or os.path.join(output_dir, PROGRESS_FILE))
+    stats = BatchStats()
+    start = time.perf_counter()
+
+    changed_files = None
+    if since is not None:
+        # Cada caminho pode estar em um repositório diferente: junta os alterados de todos
+        changed_files = set()
+        for path in paths:
+            changed = git_changed_files(path, since)
+            if changed is None:
+                log(f"⚠️  Fora de um repositório git ({path}): analisando todos os arquivos")
+                changed_files = None
+                break
+            changed_files |= changed
+
+    units, keys, skipped_files, stats.reused_files = collect_units(paths, index, changed_files)
+    for path in skipped_files:
+        log(f"⚠️  Ignorado (erro de sintaxe ou de codificação): {path}")
+    keys = [key or unit_hash(unit, model_name, generation_config) for unit, key in zip(units, keys)]
+    stats.total = len(units)
+
+    pending = {}
+    for unit, key in zip(units, keys):
+        if index.get(key) is not None or key in pending:
+            stats.skipped += 1
+        else:
+            pending[key] = unit
+
+    pool = GenerationPool(max_concurrency=concurrency)
+    try:
+        tickets = {pool.submit(generate_unit, model, unit).future: key for key, unit in pending.items()}
+        for done, future in enumerate(as_completed(tickets), start=1):
+            key = tickets[future]
+            unit = pending[key]
+            try:
+                result = future.result()
+            except Exception as error:
+                stats.failed += 1
+                log(f"[{done}/{len(pending)}] ❌ {unit.module}.{unit.qualname}: {error}")
+                continue
+            index.set(key, result)
+            stats.generated += 1
+            stats.prompt_tokens += result["prompt_tokens"]
+            stats.output_tokens += result["output_tokens"]
+            log(f"[{done}/{len(pending)}] ✅ {unit.module}.{unit.qualname} ({result['seconds']:.1f} s)")
+    finally:
+        pool.shutdown()
+
+    # Funções apagadas (ou de arquivos apagados) sob ``paths`` saem do índice; as de outras pastas ficam
+    stats.removed = index.replace_functions({
+        function_id(unit.module, unit.qualname): {
+            "path": unit.path,
+            "file_hash": unit.file_hash,
+            "module": unit.module,
+            "qualname": unit.qualname,
+            "lineno": unit.lineno,
+            "key": key,
+        }
+        for unit, key in zip(units, keys)
+    }, paths)
+    written = write_test_files(index, output_dir)
+    index.save()
+    stats.elapsed = time.perf_counter() - start
+    for path in written:
+        log(f"📝 {path}")
+    return stats
+
+
+def create_cli_model():
+    """Modelo configurado a partir do ``.env``, com o cliente resiliente."""
+    import google.generativeai as genai
+    from dotenv import load_dotenv
+
+    from ai_testing_helper.client import DEFAULT_MAX_RETRIES, ResilientClient, rate_limiter_from_env
+    from ai_testing_helper.generation import init_gemini
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise SystemExit("🔑 API Key não encontrada. Verifique o arquivo .env.")
+    genai.configure(api_key=api_key)
+    return ResilientClient(
+        init_gemini(),
+        max_retries=int(os.getenv("GEMINI_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+        rate_limiter=rate_limiter_from_env(),
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ai_testing_helper.batch",
+        description="Gera testes unitários para todas as funções de arquivos ou pastas Python.",
+    )
+    parser.add_argument("paths", nargs="+", help="Arquivos .py ou pastas")
+    parser.add_argument("--output-dir", default="tests_gerados", help="Pasta dos test_<modulo>.py")
+    parser.add_argument("--concurrency", type=int,
+                        default=int(os.getenv("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+                        help="Gerações simultâneas")
+    parser.add_argument("--progress-file", default=None,
+                        help=f"Índice de funções e progresso (padrão: <output-dir>/{PROGRESS_FILE})")
+    parser.add_argument("--since", default=None, metavar="REF",
+                        help="Analisa apenas arquivos alterados desde esta referência do git")
+    return parser.parse_args(argv)
+
+
+def main(argv=None, model=None):
+    args = parse_args(argv)
+    model = model or create_cli_model()
+    stats = run_batch(
+        args.paths,
+        model,
+        args.output_dir,
+        concurrency=args.concurrency,
+        progress_path=args.progress_file,
+        since=args.since,
+    )
+    print(stats.summary())
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Cache de respostas do modelo.
+
+A chave é um hash do prompt normalizado, da conversa anterior, do
+nome do modelo e da ``generation_config``. Há dois níveis: um LRU em memória
+(compartilhado entre sessões do processo) e, opcionalmente, um SQLite em disco
+com TTL e despejo por tamanho.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from ai_testing_helper.messages import prefix_fingerprint
+
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalize_prompt(text):
+    """Normaliza quebras de linha e espaços que não mudam o significado do código."""
+    text = f"{text}".replace("\r\n", "\n").replace("\r", "\n").expandtabs(4)
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def make_cache_key(prompt, history, model_name, generation_config, system_instruction=None,
+                   variant=None):
+    """Hash estável da requisição: prompt, histórico, modelo e configuração.
+
+    O histórico entra pelo fingerprint encadeado da conversa inteira, antes da
+    janela de contexto: a chave sai sem resumir nada (e, com um
+    ``MessageStore``, sem reler as mensagens antigas). ``variant`` separa
+    respostas geradas de outra forma para o mesmo pedido (ex.: geração por
+    função).
+    """
+    payload = {
+        "prompt": normalize_prompt(prompt),
+        "history": prefix_fingerprint(history, len(history)),
+        "model": model_name,
+        "config": generation_config,
+        "system": normalize_prompt(system_instruction) if system_instruction else None,
+    }
+    if variant:
+        payload["variant"] = variant
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Cache em memória com política LRU, seguro para uso entre threads."""
+
+    def __init__(self, max_entries=DEFAULT_MEMORY_ENTRIES):
+        if max_entries <= 0:
+            raise ValueError("max_entries deve ser maior que zero")
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache:
+    """Cache em disco (SQLite) com TTL e despejo dos itens menos usados por tamanho."""
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES,
+                 clock=time.time):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __len__(self):
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        now = self._clock()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key, value):
+        now = self._clock()
+        size = len(value.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Remove os itens acessados há mais tempo até caber no limite
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+class ResponseCache:
+    """Cache em dois níveis (memória e disco opcional) com contagem de acertos."""
+
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory if memory is not None else LRUCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                # Promove para a memória para os próximos acessos
+                self.memory.set(key, value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.memory)}
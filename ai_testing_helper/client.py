@@ -0,0 +1,282 @@
+"""Cliente resiliente em volta de ``generate_content``.
+
+Envolve o modelo do Gemini com:
+
+- novas tentativas com backoff exponencial e jitter para erros transitórios
+  (429, 500, 503, 504, falhas de conexão);
+- respeito à dica de espera enviada pelo servidor (``retry_delay``);
+- limitador local por token bucket de requisições e tokens por minuto;
+- circuit breaker que falha rápido enquanto o serviço está instável.
+
+Erros que não podem ser repetidos (ou que esgotam as tentativas) são
+relançados, então quem chama continua tratando-os como antes.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+
+from ai_testing_helper.context_window import estimate_tokens
+from ai_testing_helper.metrics import metrics
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+_RETRY_HINT_PATTERNS = [
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+(?:\.\d+)?)"),
+    re.compile(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"'),
+    re.compile(r"retry (?:in|after) (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+]
+
+
+class CircuitOpenError(Exception):
+    """O circuito está aberto: o serviço falhou várias vezes seguidas."""
+
+
+def _status_code(error):
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    # Alguns erros trazem o código no objeto de resposta HTTP
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error):
+    """Indica se vale a pena repetir a chamada que gerou ``error``."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def retry_delay_hint(error):
+    """Segundos de espera sugeridos pelo servidor, ou ``None``."""
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return getattr(delay, "seconds", 0) + getattr(delay, "nanos", 0) / 1e9
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    message = f"{error}"
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Token bucket com reposição contínua de ``rate_per_minute`` unidades por minuto."""
+
+    def __init__(self, rate_per_minute, clock=time.monotonic, sleep=time.sleep):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute deve ser maior que zero")
+        self.capacity = float(rate_per_minute)
+        self.refill_per_second = rate_per_minute / 60.0
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+
+    def acquire(self, amount=1):
+        """Consome ``amount`` unidades, esperando o necessário. Devolve a espera em segundos."""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.refill_per_second
+            self._sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """Limites de requisições e de tokens por minuto (cada um opcional)."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute, clock, sleep) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock, sleep) if tokens_per_minute else None
+
+    def acquire(self, tokens=0):
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None and tokens:
+            waited += self.tokens.acquire(tokens)
+        return waited
+
+
+def rate_limiter_from_env(environ=None):
+    """Limitador configurado por ``GEMINI_RPM`` e ``GEMINI_TPM`` (0 ou ausente desativa)."""
+    environ = os.environ if environ is None else environ
+    return RateLimiter(
+        requests_per_minute=int(environ.get("GEMINI_RPM", 0)) or None,
+        tokens_per_minute=int(environ.get("GEMINI_TPM", 0)) or None,
+    )
+
+
+class CircuitBreaker:
+    """Abre após ``failure_threshold`` falhas seguidas e tenta de novo após ``reset_timeout``.
+
+    Depois do ``reset_timeout`` passa exatamente uma chamada de teste
+    (meio-aberto); as demais continuam recusadas até o resultado dela.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def before_call(self):
+        """Levanta ``CircuitOpenError`` se o circuito estiver aberto ou com a chamada de teste em andamento."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN:
+                raise CircuitOpenError("Serviço do Gemini instável; aguardando a chamada de teste")
+            remaining = self.reset_timeout - (self._clock() - self.opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"Serviço do Gemini instável; nova tentativa em {remaining:.0f} s"
+                )
+            # Deixa uma única chamada de teste passar
+            self.state = self.HALF_OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self, service_error=True):
+        """Conta uma falha; ``service_error=False`` (ex.: pedido inválido) só conta na chamada de teste.
+
+        Na chamada de teste qualquer erro reabre o circuito; fora dela, erros
+        do próprio pedido não indicam instabilidade do serviço.
+        """
+        with self._lock:
+            if self.state != self.HALF_OPEN and not service_error:
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+
+
+def _contents_text(contents):
+    """Texto aproximado do pedido, usado para estimar tokens."""
+    if contents is None:
+        return ""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        return " ".join(f"{part}" for part in contents.get("parts", []))
+    if isinstance(contents, (list, tuple)):
+        return " ".join(_contents_text(item) for item in contents)
+    return f"{contents}"
+
+
+class ResilientClient:
+    """Envolve um ``GenerativeModel`` mantendo a mesma interface.
+
+    ``generate_content`` passa pelo circuit breaker, pelo limitador de taxa e
+    pelas novas tentativas; os demais atributos são delegados ao modelo.
+    ``start_chat`` cria a sessão de chat sobre o próprio cliente, para que as
+    mensagens do chat também sejam protegidas.
+    """
+
+    def __init__(self, model, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, rate_limiter=None, breaker=None,
+                 sleep=time.sleep, jitter=random.random):
+        self.model = model
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self._jitter = jitter
+        self.retries = 0
+
+    def __getattr__(self, name):
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def backoff_delay(self, attempt, error):
+        """Espera antes da próxima tentativa, ou ``None`` se não vale esperar."""
+        delay = self._jitter() * min(self.max_delay, self.base_delay * 2 ** attempt)
+        hint = retry_delay_hint(error)
+        if hint is not None:
+            if hint > self.max_delay:
+                return None
+            delay = max(delay, hint)
+        return delay
+
+    def generate_content(self, contents=None, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            if self.rate_limiter is not None:
+                waited = self.rate_limiter.acquire(estimate_tokens(_contents_text(contents)))
+                if waited and metrics.enabled:
+                    metrics.observe("rate_limit_wait_seconds", waited)
+            try:
+                response = self.model.generate_content(contents, *args, **kwargs)
+            except Exception as error:
+                if not is_retryable(error):
+                    # Não deixa a chamada de teste presa em meio-aberto
+                    self.breaker.record_failure(service_error=False)
+                    raise
+                self.breaker.record_failure()
+                delay = self.backoff_delay(attempt, error) if attempt < self.max_retries else None
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                attempt += 1
+                self.retries += 1
+                continue
+            except BaseException:
+                self.breaker.record_failure(service_error=False)
+                raise
+            self.breaker.record_success()
+            return response
+
+    def start_chat(self, history=None, **kwargs):
+        from google.generativeai import ChatSession
+
+        return ChatSession(model=self, history=history, **kwargs)
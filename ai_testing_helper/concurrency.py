@@ -0,0 +1,157 @@
+"""Pool de geração compartilhado com limite de concorrência por processo.
+
+As chamadas ao modelo rodam em um pool de threads de tamanho fixo,
+compartilhado por todas as sessões: o número de workers é o limite de
+gerações simultâneas e a fila do pool é a fila de pedidos. Cada pedido
+recebe um ``GenerationTicket`` com a posição na fila e o tempo de espera,
+para que a interface mostre isso em vez de um spinner sem fim.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_testing_helper.metrics import metrics
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class GenerationTicket:
+    """Pedido submetido ao pool: permite acompanhar a fila e obter o resultado."""
+
+    def __init__(self, stream=False):
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.started = threading.Event()
+        self.future = None
+        self._chunks = queue.Queue() if stream else None
+
+    def wait_time(self):
+        """Segundos na fila (até agora, se ainda não começou)."""
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def chunks(self):
+        """Itera os pedaços de um pedido em streaming, na thread de quem consome."""
+        if self._chunks is None:
+            raise ValueError("Pedido não foi submetido em modo streaming")
+        while True:
+            item = self._chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+
+class GenerationPool:
+    """Executa gerações em um pool limitado a ``max_concurrency`` chamadas simultâneas."""
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, history_size=200):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency deve ser maior que zero")
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="gemini-generation"
+        )
+        self._lock = threading.Lock()
+        self._waiting = []
+        self._running = 0
+        self._completed = 0
+        self._wait_times = deque(maxlen=history_size)
+
+    def _start(self, ticket):
+        ticket.started_at = time.monotonic()
+        with self._lock:
+            self._waiting.remove(ticket)
+            self._running += 1
+            self._wait_times.append(ticket.wait_time())
+        if metrics.enabled:
+            metrics.observe("queue_wait_seconds", ticket.wait_time())
+        ticket.started.set()
+
+    def _finish(self, ticket):
+        ticket.finished_at = time.monotonic()
+        with self._lock:
+            self._running -= 1
+            self._completed += 1
+
+    def _run(self, ticket, func, args, kwargs):
+        self._start(ticket)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._finish(ticket)
+
+    def _run_stream(self, ticket, func, args, kwargs):
+        self._start(ticket)
+        try:
+            for chunk in func(*args, **kwargs):
+                ticket._chunks.put(chunk)
+        except BaseException as error:
+            ticket._chunks.put(_Failure(error))
+        finally:
+            ticket._chunks.put(_DONE)
+            self._finish(ticket)
+
+    def _submit(self, ticket, runner, func, args, kwargs):
+        with self._lock:
+            self._waiting.append(ticket)
+        # O pedido roda no contexto de quem o enviou (ex.: escopo de métricas da sessão)
+        context = contextvars.copy_context()
+        ticket.future = self._executor.submit(context.run, runner, ticket, func, args, kwargs)
+        return ticket
+
+    def submit(self, func, *args, **kwargs):
+        """Enfileira ``func(*args, **kwargs)`` e devolve o ticket do pedido."""
+        return self._submit(GenerationTicket(), self._run, func, args, kwargs)
+
+    def submit_stream(self, func, *args, **kwargs):
+        """Enfileira um gerador; os pedaços são lidos com ``ticket.chunks()``."""
+        return self._submit(GenerationTicket(stream=True), self._run_stream, func, args, kwargs)
+
+    def run(self, func, *args, **kwargs):
+        """Atalho síncrono: enfileira e espera o resultado."""
+        return self.submit(func, *args, **kwargs).result()
+
+    async def run_async(self, func, *args, **kwargs):
+        """Versão assíncrona: não bloqueia o event loop enquanto espera na fila."""
+        import asyncio
+
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs).future)
+
+    def position(self, ticket):
+        """Posição do pedido na fila (1 = próximo a rodar; 0 = já começou)."""
+        with self._lock:
+            try:
+                return self._waiting.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def stats(self):
+        with self._lock:
+            waits = list(self._wait_times)
+            return {
+                "limit": self.max_concurrency,
+                "running": self._running,
+                "queued": len(self._waiting),
+                "completed": self._completed,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,187 @@
+"""Janela de contexto com orçamento de tokens.
+
+Fica entre ``st.session_state.messages`` e a chamada ao modelo: mantém os
+turnos mais recentes na íntegra dentro de um orçamento de tokens e compacta os
+turnos antigos em um resumo acumulado, recalculado apenas quando fica
+desatualizado.
+"""
+
+import hashlib
+from collections.abc import Sequence
+
+from ai_testing_helper.cache import LRUCache
+from ai_testing_helper.messages import prefix_fingerprint
+
+DEFAULT_TOKEN_BUDGET = 8000
+
+# Contagens de tokens guardadas por janela (LRU): turnos já resumidos deixam de ser usados
+DEFAULT_TOKEN_MEMO_ENTRIES = 256
+
+# Após estourar o orçamento, compacta até esta fração dele. A folga evita que
+# o resumo seja refeito a cada novo turno.
+DEFAULT_COMPACT_RATIO = 0.6
+
+SUMMARY_PREFIX = "Resumo da conversa anterior:"
+
+SUMMARY_PROMPT = """Resuma de forma concisa a conversa abaixo entre um usuário e um assistente de testes unitários.
+Preserve nomes de funções, linguagens, trechos de código relevantes e decisões já tomadas.
+
+Resumo anterior:
+{summary}
+
+Novos turnos:
+{turns}
+
+Resumo atualizado:"""
+
+
+def estimate_tokens(text):
+    """Estimativa local de tokens (~4 caracteres por token), sem chamada de rede."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+def model_token_counter(model):
+    """Contador de tokens usando ``model.count_tokens``, com memória por texto.
+
+    Cada texto é contado uma única vez; em caso de erro da API usa a
+    estimativa local.
+    """
+    counts = {}
+
+    def count(text):
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if key not in counts:
+            try:
+                counts[key] = model.count_tokens(text).total_tokens
+            except Exception:
+                counts[key] = estimate_tokens(text)
+        return counts[key]
+
+    return count
+
+
+def format_turns(messages):
+    """Formata mensagens no mesmo padrão de texto usado no prompt."""
+    lines = []
+    for msg in messages:
+        if msg["role"] == "user":
+            lines.append(f"Usuário: {msg['content']}")
+        elif msg["role"] == "assistant":
+            lines.append(f"Assistente: {msg['content']}")
+    return "\n".join(lines)
+
+
+def truncating_summarizer(max_chars=2000):
+    """Resumidor local: mantém o fim do resumo anterior somado aos novos turnos."""
+
+    def summarize(summary, messages):
+        text = "\n".join(part for part in (summary, format_turns(messages)) if part)
+        return text[-max_chars:]
+
+    return summarize
+
+
+def model_summarizer(model, fallback=None):
+    """Resumidor que pede ao modelo um resumo acumulado da conversa.
+
+    Se a chamada falhar, usa ``fallback`` (por padrão, o resumidor local).
+    """
+    fallback = fallback or truncating_summarizer()
+
+    def summarize(summary, messages):
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(vazio)", turns=format_turns(messages))
+        try:
+            return model.generate_content(prompt).text.strip()
+        except Exception:
+            return fallback(summary, messages)
+
+    return summarize
+
+
+class ContextWindow:
+    """Mantém o histórico enviado ao modelo dentro de ``token_budget`` tokens.
+
+    ``fit(messages)`` devolve os turnos recentes na íntegra, precedidos por uma
+    mensagem com o resumo dos turnos antigos quando eles não cabem mais no
+    orçamento. O resumo fica em cache e só é atualizado quando novos turnos
+    saem da janela; se o início do histórico mudar (ex.: conversa limpa), ele é
+    descartado.
+    """
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, count_tokens=None,
+                 summarize=None, compact_ratio=DEFAULT_COMPACT_RATIO, memo_entries=DEFAULT_TOKEN_MEMO_ENTRIES):
+        if token_budget <= 0:
+            raise ValueError("token_budget deve ser maior que zero")
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens or estimate_tokens
+        self.summarize = summarize or truncating_summarizer()
+        self.compact_ratio = compact_ratio
+        self.summary = ""
+        self.summarized_count = 0
+        self.version = 0
+        self.tokens_used = 0
+        self._summarized_fingerprint = prefix_fingerprint([], 0)
+        self._message_tokens = LRUCache(memo_entries)
+
+    def _tokens(self, msg):
+        # A chave é um hash para não manter uma segunda cópia do conteúdo em memória
+        key = hashlib.sha1(f"{msg.get('role')}\0{msg.get('content')}".encode("utf-8")).hexdigest()
+        tokens = self._message_tokens.get(key)
+        if tokens is None:
+            tokens = self.count_tokens(format_turns([msg]))
+            self._message_tokens.set(key, tokens)
+        return tokens
+
+    def reset(self):
+        """Descarta o resumo (usado ao limpar a conversa)."""
+        self.summary = ""
+        self.summarized_count = 0
+        self._summarized_fingerprint = prefix_fingerprint([], 0)
+        self.version += 1
+
+    def _cutoff(self, messages, start, limit):
+        """Primeiro índice a partir do qual os turnos cabem em ``limit`` tokens.
+
+        A última mensagem é sempre mantida na íntegra.
+        """
+        used = 0
+        cutoff = len(messages)
+        for index in range(len(messages) - 1, start - 1, -1):
+            used += self._tokens(messages[index])
+            if used > limit and index < len(messages) - 1:
+                break
+            cutoff = index
+        return cutoff
+
+    def fit(self, messages):
+        """Devolve as mensagens a enviar ao modelo, dentro do orçamento.
+
+        Aceita qualquer sequência; com um ``MessageStore`` apenas os turnos
+        ainda não resumidos são lidos.
+        """
+        if not isinstance(messages, Sequence):
+            messages = list(messages)
+        if (self.summarized_count > len(messages)
+                or prefix_fingerprint(messages, self.summarized_count) != self._summarized_fingerprint):
+            self.reset()
+
+        summary_tokens = self.count_tokens(self.summary) if self.summary else 0
+        available = self.token_budget - summary_tokens
+        start = self.summarized_count
+        if self._cutoff(messages, start, available) > start:
+            # Estourou o orçamento: compacta com folga para não resumir a cada turno
+            target = int(self.token_budget * self.compact_ratio) - summary_tokens
+            cutoff = self._cutoff(messages, start, max(target, 0))
+            self.summary = self.summarize(self.summary, list(messages[start:cutoff]))
+            self.summarized_count = cutoff
+            self._summarized_fingerprint = prefix_fingerprint(messages, cutoff)
+            self.version += 1
+            summary_tokens = self.count_tokens(self.summary)
+
+        recent = list(messages[self.summarized_count:])
+        self.tokens_used = summary_tokens + sum(self._tokens(msg) for msg in recent)
+        if not self.summary:
+            return recent
+        return [{"role": "user", "content": f"{SUMMARY_PREFIX} {self.summary}"}] + recent
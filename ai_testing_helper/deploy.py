@@ -0,0 +1,148 @@
+"""Modo com vários workers: N processos do Streamlit atrás do proxy com sessões fixas.
+
+Cada worker é um uvicorn com a página (``ai_testing_helper.server``) em uma
+porta local; o proxy (``ai_testing_helper.proxy``) recebe os navegadores na
+porta pública e prende cada um ao seu worker. O histórico das conversas e o
+cache de respostas ficam no armazenamento compartilhado (``SHARED_STORE_URL``;
+sem ela, um SQLite local), então um worker pode reiniciar sem perder as
+conversas. Workers que terminam são iniciados de novo.
+
+Uso:
+    python -m ai_testing_helper.deploy --workers 4 --port 8501
+    SHARED_STORE_URL=redis://localhost:6379/0 python -m ai_testing_helper.deploy --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+
+from ai_testing_helper.proxy import CHECK_INTERVAL_SECONDS, StickyProxy, Worker
+from ai_testing_helper.store import DEFAULT_SHARED_DB
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WORKERS = 2
+DEFAULT_PORT = 8501
+DEFAULT_WORKER_PORT = 8601
+DEFAULT_FACTORY = "ai_testing_helper.server:create_app"
+
+
+def worker_command(port, factory=DEFAULT_FACTORY, app_dir=ROOT):
+    return [
+        sys.executable, "-m", "uvicorn", "--factory", factory,
+        "--host", "127.0.0.1", "--port", str(port), "--app-dir", app_dir,
+        "--log-level", "warning",
+    ]
+
+
+def worker_environment(environ=None):
+    """Ambiente dos workers: todos apontam para o mesmo armazenamento compartilhado."""
+    env = dict(os.environ if environ is None else environ)
+    env.setdefault("SHARED_STORE_URL", f"sqlite:///{DEFAULT_SHARED_DB}")
+    return env
+
+
+class WorkerGroup:
+    """Processos dos workers; ``supervise`` reinicia os que terminarem."""
+
+    def __init__(self, count, base_port=DEFAULT_WORKER_PORT, factory=DEFAULT_FACTORY, app_dir=ROOT,
+                 environ=None, output=None):
+        self.workers = [Worker(f"w{index}", "127.0.0.1", base_port + index) for index in range(count)]
+        self.factory = factory
+        self.app_dir = app_dir
+        self.environ = worker_environment(environ)
+        self.output = output
+        self.processes = {}
+        self.restarts = 0
+
+    def start(self, worker):
+        self.processes[worker.name] = subprocess.Popen(
+            worker_command(worker.port, self.factory, self.app_dir), env=self.environ, cwd=self.app_dir,
+            stdout=self.output, stderr=self.output
+        )
+
+    def start_all(self):
+        for worker in self.workers:
+            self.start(worker)
+
+    async def supervise(self, interval=CHECK_INTERVAL_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            for worker in self.workers:
+                if self.processes[worker.name].poll() is not None:
+                    worker.ready = False
+                    self.restarts += 1
+                    self.start(worker)
+
+    def stop(self, timeout=10):
+        for process in self.processes.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def wait_ready(proxy, timeout=60):
+    """Espera todos os workers ficarem prontos (ou ``timeout`` segundos)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if all(await asyncio.gather(*(proxy.check(worker) for worker in proxy.workers.values()))):
+            return True
+        await asyncio.sleep(0.2)
+    return False
+
+
+async def serve(group, host, port, log=print):
+    group.start_all()
+    proxy = StickyProxy(group.workers)
+    if not await wait_ready(proxy):
+        log("⚠️ Nem todos os workers ficaram prontos; o proxy usa apenas os prontos")
+    await proxy.start(host, port)
+    log(f"🚀 Proxy em http://{host}:{proxy.port} com {len(group.workers)} workers "
+        f"(armazenamento: {group.environ['SHARED_STORE_URL']})")
+    supervisor = asyncio.ensure_future(group.supervise())
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        supervisor.cancel()
+        await proxy.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ai_testing_helper.deploy",
+        description="Executa vários workers do Streamlit atrás de um proxy com sessões fixas.",
+    )
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", DEFAULT_WORKERS)),
+                        help="quantidade de processos do Streamlit")
+    parser.add_argument("--host", default="0.0.0.0", help="endereço do proxy")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="porta do proxy")
+    parser.add_argument("--worker-port", type=int, default=DEFAULT_WORKER_PORT,
+                        help="porta do primeiro worker (os demais usam as seguintes)")
+    parser.add_argument("--factory", default=DEFAULT_FACTORY,
+                        help="fábrica ASGI dos workers (módulo:função, para o uvicorn --factory)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    group = WorkerGroup(args.workers, args.worker_port, args.factory)
+    try:
+        asyncio.run(serve(group, args.host, args.port))
+    finally:
+        group.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Geração por função em paralelo para pedidos de testes com várias funções.
+
+Uma pergunta com dez funções virava uma única geração sequencial, limitada a
+``max_output_tokens`` e frequentemente truncada. Aqui cada função vira um
+pedido separado no pool de geração; as respostas voltam na ordem das funções,
+sem duplicatas, com imports no topo. O tempo total fica próximo ao da função
+mais lenta (limitado pelo tamanho do pool).
+
+Só vale quando o texto da pergunta pede testes: perguntas sobre o código
+("por que dá erro?") seguem o caminho normal. O texto do usuário (framework,
+estilo e demais restrições) vai em cada pedido por função.
+"""
+
+import ast
+import re
+import textwrap
+from collections import namedtuple
+
+from ai_testing_helper.generation import ERROR_PREFIX, generate_response, is_error_response
+from ai_testing_helper.routing import _CODE_FENCE, _FUNCTION, extract_code
+
+MIN_FUNCTIONS = 2
+
+FUNCTION_PROMPT = """Crie testes unitários para a função `{name}` abaixo (positivos, negativos, limites e partição por equivalência).
+{instructions}{context}Responda apenas com um bloco de código {language}, sem explicações.
+
+```{language}
+{source}
+```"""
+
+CONTEXT_PROMPT = """O código compartilhado do módulo (imports e definições) é:
+
+```{language}
+{shared}
+```
+
+"""
+
+INSTRUCTIONS_PROMPT = """Ela faz parte do pedido abaixo; siga as instruções dele (framework, estilo e demais restrições):
+
+{instructions}
+
+"""
+
+FanOutUnit = namedtuple("FanOutUnit", "name source")
+FanOutPlan = namedtuple("FanOutPlan", "language shared units instructions")
+
+_FENCE_LANGUAGE = re.compile(r"```[ \t]*([\w+#.-]+)")
+_ANSWER_BLOCK = re.compile(r"```[^\n]*\n(.*?)```", re.DOTALL)
+_FUNCTION_NAME = re.compile(r"(\w+)\s*(?:=\s*(?:async\s*)?\(|[<(])")
+# Pedido de testes no texto da pergunta: "crie testes", "quero os testes", "write unit tests", "teste a função"
+_TEST_REQUEST = re.compile(
+    r"\b(?:cri(?:e|a|ar)|ger(?:e|a|ar)|escrev(?:a|e|er)|fa[çc]a|fazer|adicion(?:e|a|ar)|sugira"
+    r"|quero|preciso\s+de|create|write|generate|add|need|want)\b(?:\W+\w+){0,3}?\W+(?:testes?|tests?)\b"
+    r"|(?:^|[.!?:\n]\s*|\bcomo\s+)test(?:e|ar|e-a|e-as)\b",
+    re.IGNORECASE,
+)
+# "Não quero testes", "não precisa criar testes", "don't write tests"
+_NEGATION = re.compile(r"\b(?:n[ãa]o|nem|sem|no|not|don't|never)(?:\W+\w+)?\W*$", re.IGNORECASE)
+_IMPORT_LINE = re.compile(
+    r"^\s*(?:import\s|from\s+\S+\s+import\s|using\s|#include\b|require\b|package\s"
+    r"|(?:const|let|var)\s+.*=\s*require\()"
+)
+
+
+def _python_units(code):
+    """Funções e classes de primeiro nível; o restante é contexto compartilhado."""
+    tree = ast.parse(code)
+    lines = code.splitlines()
+    units = []
+    shared = []
+    for node in tree.body:
+        start = (node.decorator_list[0].lineno if getattr(node, "decorator_list", None) else node.lineno) - 1
+        segment = "\n".join(lines[start:node.end_lineno])
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            units.append(FanOutUnit(node.name, segment))
+        else:
+            shared.append(segment)
+    return "\n".join(shared), units
+
+
+def _generic_units(code):
+    """Divide pelas linhas que iniciam funções sem indentação (demais linguagens)."""
+    lines = code.splitlines()
+    starts = [
+        index for index, line in enumerate(lines)
+        if line[:1].strip() and _FUNCTION.match(line)
+    ]
+    units = []
+    for position, start in enumerate(starts):
+        end = starts[position + 1] if position + 1 < len(starts) else len(lines)
+        source = "\n".join(lines[start:end]).strip("\n")
+        match = _FUNCTION_NAME.search(lines[start])
+        units.append(FanOutUnit(match.group(1) if match else f"funcao_{position + 1}", source))
+    shared = "\n".join(lines[:starts[0]]).strip("\n") if starts else code
+    return shared, units
+
+
+def wants_tests(text):
+    """O texto (fora do código) pede testes?"""
+    for match in _TEST_REQUEST.finditer(text or ""):
+        if not _NEGATION.search(text[:match.start()]):
+            return True
+    return False
+
+
+def plan_fan_out(prompt, min_functions=MIN_FUNCTIONS):
+    """Plano de geração por função, ou ``None``.
+
+    ``None`` se a pergunta não pedir testes ou tiver menos de
+    ``min_functions`` funções.
+    """
+    code = textwrap.dedent(extract_code(prompt))
+    if not code.strip():
+        return None
+    fence = _FENCE_LANGUAGE.search(f"{prompt}")
+    language = fence.group(1).lower() if fence else ""
+    # Texto antes do código (ex.: "Crie testes para:" sem bloco cercado) é o pedido, não código
+    lines = code.splitlines()
+    first = next(
+        (i for i, line in enumerate(lines) if _FUNCTION.match(line) or _IMPORT_LINE.match(line)), 0
+    )
+    code = "\n".join(lines[first:])
+    if fence:
+        instructions = _CODE_FENCE.sub("", f"{prompt}").strip()
+    else:
+        instructions = "\n".join(lines[:first]).strip()
+    if not wants_tests(instructions):
+        return None
+    try:
+        shared, units = _python_units(code)
+        language = language or "python"
+    except SyntaxError:
+        shared, units = _generic_units(code)
+    # A mesma função colada duas vezes gera testes uma única vez
+    unique = []
+    seen = set()
+    for unit in units:
+        key = "\n".join(line.rstrip() for line in unit.source.strip().splitlines())
+        if key not in seen:
+            seen.add(key)
+            unique.append(unit)
+    if len(unique) < min_functions:
+        return None
+    return FanOutPlan(language, shared.strip(), unique, instructions)
+
+
+def build_function_prompt(plan, unit):
+    context = CONTEXT_PROMPT.format(language=plan.language, shared=plan.shared) if plan.shared else ""
+    instructions = INSTRUCTIONS_PROMPT.format(instructions=plan.instructions) if plan.instructions else ""
+    return FUNCTION_PROMPT.format(
+        name=unit.name, instructions=instructions, context=context, language=plan.language, source=unit.source
+    )
+
+
+def answer_code(answer):
+    """Código da resposta: os blocos cercados, ou o texto inteiro se não houver blocos."""
+    blocks = [block.strip("\n") for block in _ANSWER_BLOCK.findall(answer or "")]
+    blocks = [block for block in blocks if block.strip()]
+    return "\n\n".join(blocks) if blocks else (answer or "").strip()
+
+
+def _is_fixture(node):
+    for decorator in getattr(node, "decorator_list", []):
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", "")
+        if name == "fixture":
+            return True
+    return False
+
+
+def split_code(code):
+    """Divide o código de uma resposta em ``(imports, fixtures, corpo)``.
+
+    ``fixtures`` é uma lista de ``(nome, código)``; ``corpo`` é uma lista de
+    ``(nome, código)`` com os testes. Código que não é Python válido tem
+    apenas as linhas de import separadas.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        lines = code.splitlines()
+        imports = [line.strip() for line in lines if _IMPORT_LINE.match(line)]
+        body = "\n".join(line for line in lines if not _IMPORT_LINE.match(line)).strip("\n")
+        return imports, [], [(None, body)] if body.strip() else []
+    lines = code.splitlines()
+    imports, fixtures, body = [], [], []
+    for node in tree.body:
+        start = (node.decorator_list[0].lineno if getattr(node, "decorator_list", None) else node.lineno) - 1
+        segment = "\n".join(lines[start:node.end_lineno])
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.extend(line.strip() for line in segment.splitlines() if line.strip())
+        elif _is_fixture(node):
+            fixtures.append((node.name, segment))
+        else:
+            body.append((getattr(node, "name", None), segment))
+    return imports, fixtures, body
+
+
+def _normalized(code):
+    return "\n".join(line.rstrip() for line in code.strip().splitlines())
+
+
+def _rename(code, renames):
+    for old, new in renames.items():
+        code = re.sub(rf"\b{re.escape(old)}\b", new, code)
+    return code
+
+
+def merge_answers(plan, answers):
+    """Junta as respostas por função em um único bloco de testes.
+
+    Imports e fixtures vão para o topo (sem repetição), os testes ficam na
+    ordem das funções; testes e fixtures idênticos aparecem uma vez e nomes
+    repetidos com conteúdo diferente ganham o nome da função como sufixo
+    (no caso de fixtures, também nos testes daquela função que as usam).
+    """
+    imports = []
+    fixtures = {}
+    sections = []
+    errors = []
+    seen_code = set()
+    names = set()
+    for unit, answer in zip(plan.units, answers):
+        if is_error_response(answer):
+            errors.append(f"- `{unit.name}`: {answer}")
+            continue
+        unit_imports, unit_fixtures, body = split_code(answer_code(answer))
+        for line in unit_imports:
+            if line not in imports:
+                imports.append(line)
+        # Fixture com o nome de outra, mas outro conteúdo: renomeada nesta função
+        renames = {}
+        for name, code in unit_fixtures:
+            if name in fixtures and _normalized(fixtures[name]) != _normalized(code):
+                renames[name] = f"{name}_{unit.name}"
+        for name, code in unit_fixtures:
+            code = _rename(code, renames)
+            fixtures.setdefault(renames.get(name, name), code)
+        parts = []
+        for name, code in body:
+            code = _rename(code, renames)
+            normalized = _normalized(code)
+            if normalized in seen_code:
+                continue
+            seen_code.add(normalized)
+            if name and name in names:
+                renamed = f"{name}_{unit.name}"
+                code = re.sub(rf"\b{re.escape(name)}\b", renamed, code, count=1)
+                name = renamed
+            if name:
+                names.add(name)
+            parts.append(code)
+        if parts:
+            sections.append(f"# --- {unit.name} ---\n" + "\n\n\n".join(parts))
+
+    header = "\n".join(imports)
+    blocks = [part for part in (header, "\n\n\n".join(fixtures.values())) if part]
+    code = "\n\n\n".join(blocks + sections)
+    text = f"Testes gerados por função ({len(plan.units)} funções, em paralelo):\n\n"
+    text += f"```{plan.language}\n{code}\n```"
+    if errors:
+        text += f"\n\n{ERROR_PREFIX} falha em {len(errors)} função(ões):\n" + "\n".join(errors)
+    return text
+
+
+class FanOut:
+    """Gera os testes de cada função do plano em paralelo no pool de geração.
+
+    Cada pedido leva o mesmo ``history`` (a janela de contexto da conversa).
+    """
+
+    def __init__(self, pool, model, plan, generate=generate_response, history=()):
+        self.plan = plan
+        self.answers = [None] * len(plan.units)
+        self.answer = None
+        self._tickets = [
+            pool.submit(generate, model, list(history), build_function_prompt(plan, unit)) for unit in plan.units
+        ]
+
+    @property
+    def tickets(self):
+        return list(self._tickets)
+
+    def stream(self):
+        """Seções de cada função, na ordem do código, assim que ficam prontas.
+
+        Ao final, ``answer`` tem a resposta completa com imports e fixtures no topo.
+        """
+        yield f"Gerando testes para {len(self.plan.units)} funções em paralelo...\n\n"
+        for index, (unit, ticket) in enumerate(zip(self.plan.units, self._tickets)):
+            answer = ticket.result()
+            self.answers[index] = answer
+            if is_error_response(answer):
+                yield f"**`{unit.name}`**: {answer}\n\n"
+            else:
+                yield f"**`{unit.name}`**\n\n```{self.plan.language}\n{answer_code(answer)}\n```\n\n"
+        self.answer = merge_answers(self.plan, self.answers)
+
+    def result(self):
+        """Resposta completa (espera todas as funções)."""
+        if self.answer is None:
+            for _ in self.stream():
+                pass
+        return self.answer
@@ -0,0 +1,333 @@
+"""Geração de testes com o Gemini: prompt, modelo e chamadas.
+
+Não depende do Streamlit e só importa ``google.generativeai`` quando um modelo
+é criado, para que a CLI e as ferramentas em lote possam usar este módulo sem
+os efeitos colaterais da página.
+"""
+
+import os
+import re
+import time
+
+from ai_testing_helper.metrics import metrics
+
+ERROR_PREFIX = "Erro ao gerar resposta:"
+
+# Modelo e configuração de geração (também fazem parte da chave do cache de respostas)
+GEMINI_MODEL_NAME = "gemini-1.5-flash"
+GENERATION_CONFIG = {
+    "temperature": 0.6,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+# Instruções fixas enviadas ao modelo em toda conversa
+SYSTEM_INSTRUCTIONS = """
+        Você é um especialista em testes automatizados. Ajude o usuário a criar testes unitários robustos.
+        O usuário irá entrar com uma ou mais funções em qualquer linguagem de programação e você deve ajudá-lo a criar vários testes para essas funções.
+        Os testes que deverão ser criados são:
+        - Positivos
+        - Negativos
+        - Limites
+        - Partição por equivalência
+        """
+
+# Continuação automática de respostas interrompidas por ``max_output_tokens``:
+# cada pedido leva só o final da resposta parcial, e não o histórico inteiro
+MAX_CONTINUATIONS = 3
+CONTINUATION_TAIL_CHARS = 2000
+# Repetição mínima (em caracteres) removida ao juntar a continuação
+MIN_OVERLAP_CHARS = 16
+
+CONTINUATION_PROMPT = """Você estava escrevendo uma resposta que foi interrompida pelo limite de tamanho.
+Continue exatamente do ponto em que ela parou: não repita o que já foi escrito, não faça introdução e,
+se o final estiver dentro de um bloco de código, continue o código sem abrir um novo bloco.
+
+Final da resposta até agora:
+<<<
+{tail}
+>>>"""
+
+TRUNCATED_NOTE = "\n\n_(Resposta interrompida pelo limite de tamanho. Peça para continuar.)_"
+
+_REOPENED_FENCE = re.compile(r"^\s*```[\w+#.-]*[ \t]*\n")
+
+
+def init_gemini(system_instruction=None, model_name=GEMINI_MODEL_NAME, generation_config=None):
+    """Inicializa o modelo com as configurações de geração.
+
+    ``system_instruction`` é usado no modo de sessão de chat nativa
+    (instruções fixas fora do histórico).
+    """
+    import google.generativeai as genai
+
+    generation_config = dict(generation_config or GENERATION_CONFIG)
+
+    model_kwargs = {}
+    if system_instruction:
+        model_kwargs["system_instruction"] = system_instruction
+
+    return genai.GenerativeModel(
+        model_name=model_name,
+        generation_config=generation_config,
+        **model_kwargs
+    )
+
+
+def is_error_response(response):
+    """Indica se a resposta é a mensagem de erro (que não deve ir para o cache)."""
+    return not response or ERROR_PREFIX in response
+
+
+def continuations_from_env():
+    """Limite de continuações por resposta (``GEMINI_MAX_CONTINUATIONS``; ``0`` desliga)."""
+    return int(os.getenv("GEMINI_MAX_CONTINUATIONS", MAX_CONTINUATIONS))
+
+
+def finish_reason(response):
+    """Motivo de parada do primeiro candidato (ex.: ``"MAX_TOKENS"``), ou ``None``."""
+    try:
+        reason = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return None
+    name = getattr(reason, "name", None)
+    return name if isinstance(name, str) else None
+
+
+def is_truncated(response):
+    return finish_reason(response) == "MAX_TOKENS"
+
+
+def build_continuation_prompt(text, tail_chars=CONTINUATION_TAIL_CHARS):
+    """Pedido de continuação com apenas o final da resposta parcial (a partir de uma linha inteira)."""
+    tail = text[-tail_chars:]
+    if len(text) > tail_chars and "\n" in tail:
+        tail = tail[tail.index("\n") + 1:]
+    return CONTINUATION_PROMPT.format(tail=tail)
+
+
+def stitch(text, continuation):
+    """Junta a continuação ao texto, sem o trecho que o modelo repetiu nem um bloco reaberto."""
+    if text.count("```") % 2:
+        continuation = _REOPENED_FENCE.sub("", continuation, count=1)
+    longest = min(len(text), len(continuation), CONTINUATION_TAIL_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if text.endswith(continuation[:size]):
+            return text + continuation[size:]
+    return text + continuation
+
+
+def _truncated_note(text):
+    """Aviso de resposta ainda incompleta, fechando o bloco de código aberto."""
+    return ("\n```" if text.count("```") % 2 else "") + TRUNCATED_NOTE
+
+
+def complete_response(model, text, response, max_continuations=None):
+    """Pede continuações enquanto ``response`` parar por ``MAX_TOKENS`` e devolve o texto completo.
+
+    Se uma continuação falhar, a parte já gerada é mantida junto com a
+    mensagem de erro (que impede a resposta de ir para o cache).
+    """
+    if max_continuations is None:
+        max_continuations = continuations_from_env()
+    for _ in range(max_continuations):
+        if not is_truncated(response):
+            return text
+        try:
+            started = time.perf_counter()
+            response = model.generate_content(build_continuation_prompt(text))
+            part = response.text
+            _record_call(response, started)
+        except Exception as e:
+            return f"{text}\n\n{ERROR_PREFIX} continuação interrompida ({e})"
+        text = stitch(text, part)
+    return text + _truncated_note(text) if is_truncated(response) else text
+
+
+def stream_continuations(model, text, response, max_continuations=None):
+    """Versão em streaming de ``complete_response``: devolve apenas os pedaços novos.
+
+    O início de cada continuação fica retido enquanto ainda pode ser uma
+    repetição do final já exibido. O texto completo é o valor de retorno do
+    gerador (``full = yield from stream_continuations(...)``).
+    """
+    if max_continuations is None:
+        max_continuations = continuations_from_env()
+    for _ in range(max_continuations):
+        if not is_truncated(response):
+            return text
+        tail = text[-CONTINUATION_TAIL_CHARS:]
+        pending = None
+        try:
+            started = time.perf_counter()
+            response = model.generate_content(build_continuation_prompt(text), stream=True)
+            pending = ""
+            for piece in _iter_text(response):
+                if pending is not None:
+                    pending += piece
+                    if pending in tail:
+                        continue
+                    piece = stitch(text, pending)[len(text):]
+                    pending = None
+                text += piece
+                yield piece
+            _record_call(response, started)
+        except Exception as e:
+            yield f"\n\n{ERROR_PREFIX} continuação interrompida ({e})"
+            return text
+        if pending:
+            piece = stitch(text, pending)[len(text):]
+            text += piece
+            yield piece
+    if is_truncated(response):
+        note = _truncated_note(text)
+        yield note
+        text += note
+    return text
+
+
+def build_prompt(messages, new_prompt):
+    """Monta o prompt completo: instruções + histórico + nova pergunta."""
+    conversation_history = SYSTEM_INSTRUCTIONS
+    for msg in messages:
+        if msg["role"] == "user":
+            conversation_history += f"Usuário: {msg['content']}\n"
+        elif msg["role"] == "assistant":
+            conversation_history += f"Assistente: {msg['content']}\n"
+
+    return f"{conversation_history}Usuário: {new_prompt}\nAssistente:"
+
+
+def generate_response(model, messages, new_prompt, max_continuations=None):
+    """Gera a resposta do chatbot; erros viram a mensagem ``Erro ao gerar resposta``.
+
+    Respostas interrompidas por ``max_output_tokens`` são continuadas
+    automaticamente (até ``max_continuations`` pedidos).
+    """
+    try:
+        with metrics.timer("prompt_build_seconds"):
+            full_prompt = build_prompt(messages, new_prompt)
+        started = time.perf_counter()
+        response = model.generate_content(full_prompt)
+        text = response.text
+        _record_call(response, started)
+        return complete_response(model, text, response, max_continuations)
+    except Exception as e:
+        return f"{ERROR_PREFIX} {str(e)}"
+
+
+def _record_call(response, started):
+    """Registra o tempo total da chamada e os tokens do ``usage_metadata``."""
+    if metrics.enabled:
+        metrics.observe("generate_seconds", time.perf_counter() - started)
+        metrics.record_usage(response)
+
+
+def _chunk_text(chunk):
+    """Texto de um pedaço (chunk) da resposta em streaming."""
+    try:
+        return chunk.text
+    except ValueError:
+        # Chunks sem conteúdo (ex.: apenas o finish_reason) não têm texto
+        return ""
+
+
+def _iter_text(response, started=None):
+    """Percorre uma resposta em streaming devolvendo apenas os textos.
+
+    Com ``started`` (instante da chamada), registra o tempo até o primeiro
+    texto e o tempo total ao final.
+    """
+    waiting_first = started is not None and metrics.enabled
+    for chunk in response:
+        text = _chunk_text(chunk)
+        if text:
+            if waiting_first:
+                metrics.observe("first_token_seconds", time.perf_counter() - started)
+                waiting_first = False
+            yield text
+    if started is not None:
+        _record_call(response, started)
+
+
+def stream_response(model, messages, new_prompt, max_continuations=None):
+    """Gera a resposta em streaming, pedaço por pedaço.
+
+    Usada com ``st.write_stream`` para que o texto apareça assim que o modelo
+    começa a responder. As continuações seguem no mesmo fluxo.
+    """
+    try:
+        with metrics.timer("prompt_build_seconds"):
+            full_prompt = build_prompt(messages, new_prompt)
+        started = time.perf_counter()
+        response = model.generate_content(full_prompt, stream=True)
+        pieces = []
+        for piece in _iter_text(response, started):
+            pieces.append(piece)
+            yield piece
+        yield from stream_continuations(model, "".join(pieces), response, max_continuations)
+    except Exception as e:
+        yield f"{ERROR_PREFIX} {str(e)}"
+
+
+def to_chat_history(messages):
+    """Converte o histórico do Streamlit no formato de conteúdos do Gemini."""
+    history = []
+    for msg in messages:
+        if msg["role"] == "user":
+            history.append({"role": "user", "parts": [f"{msg['content']}"]})
+        elif msg["role"] == "assistant":
+            history.append({"role": "model", "parts": [f"{msg['content']}"]})
+    return history
+
+
+def start_chat_session(model, messages):
+    """Abre uma sessão de chat nativa a partir do histórico existente.
+
+    O modelo deve ter sido criado com
+    ``init_gemini(system_instruction=SYSTEM_INSTRUCTIONS)``.
+    """
+    return model.start_chat(history=to_chat_history(messages))
+
+
+def _replace_last_reply(chat, text):
+    """Troca a última resposta do histórico do chat pelo texto completo (com as continuações)."""
+    chat.history = [*chat.history[:-1], {"role": "model", "parts": [text]}]
+
+
+def generate_chat_response(chat, new_prompt, max_continuations=None):
+    """Gera a resposta usando a sessão de chat (envia apenas a nova pergunta).
+
+    As continuações vão direto ao modelo do chat, sem o histórico; a sessão
+    fica com a resposta completa.
+    """
+    try:
+        started = time.perf_counter()
+        response = chat.send_message(f"{new_prompt}")
+        text = response.text
+        _record_call(response, started)
+        if not is_truncated(response):
+            return text
+        full_text = complete_response(chat.model, text, response, max_continuations)
+        _replace_last_reply(chat, full_text)
+        return full_text
+    except Exception as e:
+        return f"{ERROR_PREFIX} {str(e)}"
+
+
+def stream_chat_response(chat, new_prompt, max_continuations=None):
+    """Gera a resposta em streaming usando a sessão de chat."""
+    try:
+        started = time.perf_counter()
+        response = chat.send_message(f"{new_prompt}", stream=True)
+        pieces = []
+        for piece in _iter_text(response, started):
+            pieces.append(piece)
+            yield piece
+        if is_truncated(response):
+            text = "".join(pieces)
+            full_text = yield from stream_continuations(chat.model, text, response, max_continuations)
+            _replace_last_reply(chat, full_text)
+    except Exception as e:
+        yield f"{ERROR_PREFIX} {str(e)}"
@@ -0,0 +1,246 @@
+"""Regeração incremental: índice de funções endereçado por conteúdo.
+
+Cada função recebe duas impressões digitais:
+
+- ``ast_hash``: hash do AST normalizado (ignora formatação e comentários);
+- ``deps_hash``: hash das definições do mesmo módulo das quais ela depende
+  (funções, classes, constantes, imports e métodos usados via ``self``),
+  seguindo as dependências de forma transitiva.
+
+O ``FunctionIndex`` liga cada função à chave do pedido e a chave aos testes
+gerados; funções removidas saem do índice. ``git_changed_files`` limita a
+varredura aos arquivos alterados desde uma referência do git; mesmo assim, as
+funções de um arquivo só são reaproveitadas do índice se o hash do conteúdo
+(``content_hash``) for o mesmo da execução anterior.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import subprocess
+
+INDEX_VERSION = 2
+
+
+def normalized_ast_hash(node):
+    """Hash do AST sem posições: formatação e comentários não alteram o resultado."""
+    if isinstance(node, str):
+        node = ast.parse(node)
+    dump = ast.dump(node, annotate_fields=True, include_attributes=False)
+    return hashlib.sha256(dump.encode("utf-8")).hexdigest()
+
+
+def content_hash(source):
+    """Hash do conteúdo de um arquivo."""
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def module_definitions(tree):
+    """Nome -> nó das definições de primeiro nível do módulo."""
+    definitions = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            definitions[node.name] = node
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        definitions[name.id] = node
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                definitions[(alias.asname or alias.name).split(".")[0]] = node
+    return definitions
+
+
+def class_members(class_node):
+    """Nome -> nó dos métodos e atributos definidos no corpo da classe."""
+    members = {}
+    for node in class_node.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            members[node.name] = node
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    members[target.id] = node
+    return members
+
+
+def _references(node):
+    names = set()
+    attributes = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+            names.add(child.id)
+        elif (isinstance(child, ast.Attribute) and isinstance(child.value, ast.Name)
+              and child.value.id in ("self", "cls")):
+            attributes.add(child.attr)
+    return names, attributes
+
+
+def dependency_fingerprint(node, definitions, members=None):
+    """Hash das definições do módulo (e da classe) usadas por ``node``, de forma transitiva."""
+    members = members or {}
+    seen = {}
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        names, attributes = _references(current)
+        candidates = [("module", name, definitions.get(name)) for name in names]
+        candidates += [("class", name, members.get(name)) for name in attributes]
+        for scope, name, definition in candidates:
+            if definition is None or definition is node or (scope, name) in seen:
+                continue
+            seen[(scope, name)] = definition
+            pending.append(definition)
+
+    digest = hashlib.sha256()
+    for (scope, name), definition in sorted(seen.items(), key=lambda item: item[0]):
+        digest.update(f"{scope}:{name}:{normalized_ast_hash(definition)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def git_changed_files(path, since="HEAD"):
+    """Arquivos alterados (ou novos) desde ``since``, em caminhos absolutos.
+
+    Devolve ``None`` se ``path`` não estiver em um repositório git.
+    """
+    directory = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+
+    def git(*args):
+        return subprocess.run(
+            ["git", "-C", directory, *args], capture_output=True, text=True, check=True
+        ).stdout
+
+    try:
+        top = git("rev-parse", "--show-toplevel").strip()
+        changed = git("diff", "--name-only", since, "--")
+        untracked = git("ls-files", "--others", "--exclude-standard", "--full-name", top)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    lines = [line for line in (changed + untracked).splitlines() if line]
+    return {os.path.normpath(os.path.join(top, line)) for line in lines}
+
+
+def is_under(path, roots):
+    """``path`` é uma das raízes ou fica dentro de uma delas?"""
+    path = os.path.abspath(path)
+    for root in roots:
+        root = os.path.abspath(root)
+        if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+def function_id(module, qualname):
+    return f"{module}:{qualname}"
+
+
+class FunctionIndex:
+    """Índice persistido em JSON: funções -> chave do pedido -> testes gerados.
+
+    ``functions`` guarda, para cada função atual, o arquivo, o hash do
+    conteúdo do arquivo, a posição e a chave; ``results`` guarda os testes
+    gerados por chave (endereçados pelo conteúdo, então funções idênticas
+    reaproveitam o resultado). ``files`` lista os arquivos de teste gravados
+    na última execução.
+
+    Cada resultado novo é acrescentado a um diário (``<path>.journal``, uma
+    linha JSON por resultado) em vez de regravar o índice inteiro; ``save``
+    grava o índice completo e esvazia o diário. Uma execução interrompida
+    continua de onde parou: o diário é reaplicado ao abrir o índice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.functions = {}
+        self.results = {}
+        self.files = []
+        self._journal = None
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            self.results = data.get("results", {})
+            self.functions = data.get("functions", {})
+            self.files = data.get("files", [])
+        if os.path.exists(self.journal_path):
+            self._replay_journal()
+            # Incorpora o diário ao índice: a próxima execução começa com o diário vazio
+            self.save()
+
+    def _replay_journal(self):
+        with open(self.journal_path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última linha cortada por uma interrupção no meio da escrita
+                    break
+                self.results[entry["key"]] = entry["result"]
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def set(self, key, result):
+        self.results[key] = result
+        if self._journal is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps({"key": key, "result": result}, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+    def entries_for(self, path):
+        """Funções indexadas de um arquivo, na ordem em que aparecem."""
+        entries = [entry for entry in self.functions.values() if entry["path"] == path]
+        return sorted(entries, key=lambda entry: entry["lineno"])
+
+    def is_complete(self, path, file_hash):
+        """O arquivo não mudou (mesmo ``file_hash``) e todas as suas funções já têm testes gerados?"""
+        entries = self.entries_for(path)
+        return bool(entries) and all(
+            entry.get("file_hash") == file_hash and entry["key"] in self.results for entry in entries
+        )
+
+    def replace_functions(self, entries, paths=None):
+        """Troca as funções dos arquivos sob ``paths`` e remove resultados que ninguém mais usa.
+
+        As funções de arquivos fora de ``paths`` (de execuções com outras
+        pastas) continuam no índice; sem ``paths``, o conjunto todo é
+        trocado. Devolve quantas funções saíram do índice.
+        """
+        kept = {} if paths is None else {
+            name: entry for name, entry in self.functions.items()
+            if name not in entries and not is_under(entry["path"], paths)
+        }
+        removed = len(set(self.functions) - set(kept) - set(entries))
+        self.functions = {**kept, **entries}
+        used = {entry["key"] for entry in self.functions.values()}
+        self.results = {key: value for key, value in self.results.items() if key in used}
+        return removed
+
+    def save(self):
+        """Grava o índice completo e esvazia o diário."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "functions": self.functions,
+                    "results": self.results,
+                    "files": self.files,
+                },
+                file,
+                ensure_ascii=False,
+                indent=1,
+            )
+        os.replace(temporary, self.path)
+        # Só depois do índice gravado: uma interrupção aqui apenas reaplica resultados já gravados
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
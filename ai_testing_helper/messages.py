@@ -0,0 +1,245 @@
+"""Histórico de mensagens da sessão com limite de turnos em memória.
+
+``MessageStore`` substitui a lista de dicts de ``st.session_state.messages``:
+mantém em memória apenas as ``max_resident`` mensagens mais recentes (objetos
+com ``__slots__``) e despeja as anteriores em um SQLite local. Para quem lê,
+continua sendo uma sequência de ``{"role", "content"}``: índices, fatias,
+``len`` e iteração funcionam como na lista, então ``generate_response``,
+``ContextWindow`` e a página não mudam.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import uuid
+import weakref
+from collections import deque
+from collections.abc import Sequence
+from contextlib import contextmanager
+
+DEFAULT_MAX_RESIDENT = 50
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "ai_testing_helper_messages.db")
+
+
+def chain_fingerprint(previous, message):
+    """Fingerprint encadeado: hash do fingerprint anterior e da nova mensagem."""
+    digest = hashlib.sha1(previous.encode("ascii"))
+    digest.update(f"{message.get('role')}\0{message.get('content')}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def prefix_fingerprint(messages, count):
+    """Fingerprint das ``count`` primeiras mensagens.
+
+    Sequências que já guardam o fingerprint (como ``MessageStore``) respondem
+    sem percorrer as mensagens antigas.
+    """
+    if hasattr(messages, "fingerprint"):
+        return messages.fingerprint(count)
+    fingerprint = ""
+    for index in range(count):
+        fingerprint = chain_fingerprint(fingerprint, messages[index])
+    return fingerprint
+
+
+class Message:
+    """Mensagem em memória; ``__slots__`` evita o ``__dict__`` de cada objeto."""
+
+    __slots__ = ("role", "content", "fingerprint")
+
+    def __init__(self, role, content, fingerprint):
+        self.role = role
+        self.content = content
+        self.fingerprint = fingerprint
+
+    def as_dict(self):
+        return {"role": self.role, "content": self.content}
+
+
+def _drop_session(path, session):
+    try:
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            with conn:
+                conn.execute("DELETE FROM messages WHERE session = ?", (session,))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class MessageStore(Sequence):
+    """Histórico com as mensagens recentes em memória e as antigas em SQLite.
+
+    Vários históricos (uma por sessão) podem dividir o mesmo arquivo; as linhas
+    de um histórico são apagadas quando ele é limpo ou coletado. Com ``log``
+    (ex.: ``ConversationLog``), as novas mensagens também vão para o
+    armazenamento compartilhado, de onde a conversa é restaurada em outro worker.
+    """
+
+    def __init__(self, messages=(), max_resident=DEFAULT_MAX_RESIDENT, path=DEFAULT_DB_PATH, log=None):
+        if max_resident <= 0:
+            raise ValueError("max_resident deve ser maior que zero")
+        self.max_resident = max_resident
+        self.path = path
+        self.session = uuid.uuid4().hex
+        self._resident = deque()
+        self._spilled = 0
+        self._last_fingerprint = ""
+        self._table_ready = False
+        self._finalizer = weakref.finalize(self, _drop_session, path, self.session)
+        self.log = None
+        for message in messages:
+            self.append(message)
+        # As mensagens iniciais já vieram do log (ou não fazem parte dele)
+        self.log = log
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                if not self._table_ready:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS messages ("
+                        " session TEXT NOT NULL,"
+                        " position INTEGER NOT NULL,"
+                        " role TEXT,"
+                        " content TEXT,"
+                        " fingerprint TEXT NOT NULL,"
+                        " PRIMARY KEY (session, position))"
+                    )
+                    self._table_ready = True
+                yield conn
+        finally:
+            conn.close()
+
+    def __len__(self):
+        return self._spilled + len(self._resident)
+
+    @property
+    def spilled(self):
+        """Quantidade de mensagens guardadas apenas em disco."""
+        return self._spilled
+
+    def append(self, message):
+        fingerprint = chain_fingerprint(self._last_fingerprint, message)
+        self._resident.append(Message(message.get("role"), message.get("content"), fingerprint))
+        self._last_fingerprint = fingerprint
+        if self.log is not None:
+            self.log.append(message)
+        if len(self._resident) > self.max_resident:
+            self._spill()
+
+    def _spill(self):
+        rows = []
+        while len(self._resident) > self.max_resident:
+            message = self._resident.popleft()
+            rows.append((self.session, self._spilled, message.role, message.content, message.fingerprint))
+            self._spilled += 1
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages (session, position, role, content, fingerprint)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _read(self, start, stop):
+        """Mensagens despejadas no intervalo ``[start, stop)``."""
+        if start >= stop:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT role, content FROM messages"
+                " WHERE session = ? AND position >= ? AND position < ? ORDER BY position",
+                (self.session, start, stop),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return MessageSlice(self, start, max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("índice fora do histórico")
+        if index >= self._spilled:
+            return self._resident[index - self._spilled].as_dict()
+        return self._read(index, index + 1)[0]
+
+    def iter_range(self, start, stop):
+        """Percorre as mensagens de ``[start, stop)`` lendo o disco uma única vez."""
+        stop = min(stop, len(self))
+        yield from self._read(start, min(stop, self._spilled))
+        for index in range(max(start, self._spilled), stop):
+            yield self._resident[index - self._spilled].as_dict()
+
+    def __iter__(self):
+        return self.iter_range(0, len(self))
+
+    def fingerprint(self, count):
+        """Fingerprint das ``count`` primeiras mensagens, sem reler as anteriores."""
+        if count <= 0:
+            return ""
+        index = count - 1
+        if index >= self._spilled:
+            return self._resident[index - self._spilled].fingerprint
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fingerprint FROM messages WHERE session = ? AND position = ?",
+                (self.session, index),
+            ).fetchone()
+        return row[0]
+
+    def clear(self):
+        if self._spilled:
+            _drop_session(self.path, self.session)
+        self._resident.clear()
+        self._spilled = 0
+        self._last_fingerprint = ""
+        if self.log is not None:
+            self.log.clear()
+
+
+class MessageSlice(Sequence):
+    """Fatia de um ``MessageStore`` que só lê as mensagens quando acessadas."""
+
+    __slots__ = ("_store", "_start", "_stop")
+
+    def __init__(self, store, start, stop):
+        self._store = store
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return MessageSlice(self._store, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("índice fora do histórico")
+        return self._store[self._start + index]
+
+    def __iter__(self):
+        return self._store.iter_range(self._start, self._stop)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def fingerprint(self, count):
+        if self._start == 0:
+            return self._store.fingerprint(min(count, len(self)))
+        return prefix_fingerprint(list(self), count)
@@ -0,0 +1,312 @@
+"""Métricas das etapas de um turno, agregadas no processo.
+
+Histogramas de tempo (montagem do prompt, primeira resposta e total do
+``generate_content``, renderização, espera nas filas) e de tokens do
+``usage_metadata``, exportados em texto do Prometheus ou JSON lines. Ficam
+desligadas por padrão: cada ponto de medição só consulta ``metrics.enabled``
+e ``metrics.timer`` devolve um contexto vazio, sem alocar nada.
+
+Dentro de ``metrics.session_scope(session)`` as medições também vão para o
+``SessionMetrics`` da sessão (painel de depuração), e dentro de
+``metrics.label_scope(route=...)`` ganham esses rótulos (uma série por
+valor). O pool de geração propaga os dois escopos para as threads de trabalho.
+"""
+
+import bisect
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+METRIC_PREFIX = "ai_testing_helper_"
+
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536, 262144)
+
+# Descrição de cada métrica (também usada como HELP no Prometheus)
+STAGES = {
+    "prompt_build_seconds": "Montagem do prompt a partir do histórico",
+    "context_fit_seconds": "Ajuste do histórico ao orçamento de tokens",
+    "first_token_seconds": "Tempo até o primeiro texto da resposta",
+    "generate_seconds": "Tempo total da chamada ao modelo",
+    "render_seconds": "Renderização do histórico na página",
+    "queue_wait_seconds": "Espera na fila do pool de geração",
+    "rate_limit_wait_seconds": "Espera no limitador de taxa",
+    "validation_seconds": "Execução dos testes gerados com o pytest",
+    "prompt_tokens": "Tokens do prompt (usage_metadata)",
+    "response_tokens": "Tokens da resposta (usage_metadata)",
+    "cached_tokens": "Tokens do prompt lidos do cache de contexto (usage_metadata)",
+}
+
+_NULL_TIMER = nullcontext()
+_current_session = contextvars.ContextVar("ai_testing_helper_session_metrics", default=None)
+_current_labels = contextvars.ContextVar("ai_testing_helper_metric_labels", default=())
+
+
+def series_name(name, labels=()):
+    """Nome da série no formato do Prometheus: ``nome{rotulo="valor"}``."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    """Histograma cumulativo com buckets fixos, seguro para uso entre threads."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Quantil aproximado: limite superior do bucket que contém ``q``."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        target = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = []
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += count
+                cumulative.append((bound, seen))
+            return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+class SessionMetrics:
+    """Medições de uma sessão: valores do último turno e totais acumulados."""
+
+    def __init__(self):
+        self.last = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def start_turn(self):
+        with self._lock:
+            self.last = {}
+
+    def observe(self, name, value):
+        with self._lock:
+            self.last[name] = self.last.get(name, 0) + value
+            count, total = self.totals.get(name, (0, 0))
+            self.totals[name] = (count + 1, total + value)
+
+    def rows(self):
+        """Linhas para o painel: etapa, último turno, média e quantidade."""
+        with self._lock:
+            return [
+                {
+                    "etapa": name,
+                    "último turno": self.last.get(name),
+                    "média": total / count,
+                    "n": count,
+                }
+                for name, (count, total) in sorted(self.totals.items())
+            ]
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def _usage_value(usage, field):
+    value = getattr(usage, field, None)
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+class Metrics:
+    """Registro de histogramas do processo."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, labels=()):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    buckets = TOKEN_BUCKETS if name.endswith("_tokens") else TIME_BUCKETS
+                    histogram = self._histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        self.histogram(name, _current_labels.get()).observe(value)
+        session = _current_session.get()
+        if session is not None:
+            session.observe(name, value)
+
+    def timer(self, name):
+        """Contexto que mede o tempo do bloco (vazio quando desligado)."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record_usage(self, response):
+        """Registra os tokens do ``usage_metadata`` da resposta, se houver."""
+        if not self.enabled:
+            return
+        usage = getattr(response, "usage_metadata", None)
+        for field, name in (("prompt_token_count", "prompt_tokens"),
+                            ("candidates_token_count", "response_tokens"),
+                            ("cached_content_token_count", "cached_tokens")):
+            value = _usage_value(usage, field)
+            if value is not None:
+                self.observe(name, value)
+
+    @contextmanager
+    def session_scope(self, session):
+        """Envia também para ``session`` as medições feitas dentro do bloco."""
+        token = _current_session.set(session)
+        try:
+            yield session
+        finally:
+            _current_session.reset(token)
+
+    @contextmanager
+    def label_scope(self, **labels):
+        """Acrescenta ``labels`` às medições feitas dentro do bloco."""
+        merged = dict(_current_labels.get())
+        merged.update({key: f"{value}" for key, value in labels.items()})
+        token = _current_labels.set(tuple(sorted(merged.items())))
+        try:
+            yield
+        finally:
+            _current_labels.reset(token)
+
+    def series(self, name):
+        """Histogramas de ``name`` por rótulos (tupla de pares ordenados)."""
+        with self._lock:
+            items = list(self._histograms.items())
+        return {labels: histogram for (metric, labels), histogram in items if metric == name}
+
+    def cached_token_ratio(self):
+        """Fração dos tokens do prompt que veio do cache de contexto (todas as séries)."""
+        cached = sum(histogram.sum for histogram in self.series("cached_tokens").values())
+        prompt = sum(histogram.sum for histogram in self.series("prompt_tokens").values())
+        return cached / prompt if prompt else 0.0
+
+    def _sorted_histograms(self):
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def snapshot(self):
+        return {
+            series_name(name, labels): histogram.snapshot()
+            for (name, labels), histogram in self._sorted_histograms()
+        }
+
+    def summary(self):
+        """Resumo por métrica: quantidade, média, p50 e p95 aproximados."""
+        rows = []
+        for (name, labels), histogram in self._sorted_histograms():
+            if not histogram.count:
+                continue
+            rows.append({
+                "métrica": series_name(name, labels),
+                "n": histogram.count,
+                "média": histogram.sum / histogram.count,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+            })
+        return rows
+
+    def to_prometheus(self):
+        """Exporta no formato de texto do Prometheus."""
+        lines = []
+        previous = None
+        for (name, labels), histogram in self._sorted_histograms():
+            data = histogram.snapshot()
+            metric = METRIC_PREFIX + name
+            if name != previous:
+                lines.append(f"# HELP {metric} {STAGES.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+                previous = name
+            for bound, count in data["buckets"]:
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{series_name(metric + '_bucket', labels + (('le', le),))} {count}")
+            lines.append(f"{series_name(metric + '_sum', labels)} {data['sum']:g}")
+            lines.append(f"{series_name(metric + '_count', labels)} {data['count']}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def to_json_lines(self, timestamp=None):
+        """Exporta uma linha JSON por série."""
+        timestamp = time.time() if timestamp is None else timestamp
+        lines = []
+        for (name, labels), histogram in self._sorted_histograms():
+            data = histogram.snapshot()
+            lines.append(json.dumps({
+                "timestamp": timestamp,
+                "metric": name,
+                "labels": dict(labels),
+                "count": data["count"],
+                "sum": data["sum"],
+                "buckets": {
+                    ("+Inf" if bound == float("inf") else f"{bound:g}"): count
+                    for bound, count in data["buckets"]
+                },
+            }, ensure_ascii=False))
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def export(self, path):
+        """Grava as métricas em ``path``.
+
+        ``.jsonl`` acrescenta um snapshot ao arquivo; qualquer outra extensão
+        é reescrita de forma atômica em texto do Prometheus (ex.: para o
+        textfile collector do node_exporter).
+        """
+        if path.endswith(".jsonl"):
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write(self.to_json_lines())
+            return
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# Registro do processo usado pelos pontos de medição
+metrics = Metrics()
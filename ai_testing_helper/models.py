@@ -0,0 +1,49 @@
+"""Modelos compartilhados por todas as sessões do processo.
+
+O ``GenerativeModel`` não guarda o estado da conversa (isso fica na sessão de
+chat de cada usuário), então uma única instância por combinação de nome,
+``generation_config`` e instruções pode atender várias sessões em paralelo.
+"""
+
+import threading
+
+
+def model_key(model_name, generation_config, system_instruction=None):
+    """Chave hashable e barata de calcular para uma configuração de modelo."""
+    return (model_name, tuple(sorted((generation_config or {}).items())), system_instruction)
+
+
+class ModelRegistry:
+    """Cria cada modelo uma única vez e o reaproveita entre sessões e reruns.
+
+    ``factory`` recebe ``model_name``, ``generation_config`` e
+    ``system_instruction``. A criação é protegida por lock para que sessões
+    concorrentes não construam o mesmo modelo duas vezes.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._models)
+
+    def get(self, model_name, generation_config=None, system_instruction=None):
+        key = model_key(model_name, generation_config, system_instruction)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = self._factory(
+                        model_name=model_name,
+                        generation_config=generation_config,
+                        system_instruction=system_instruction,
+                    )
+                    self._models[key] = model
+        return model
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
@@ -0,0 +1,286 @@
+"""Cache de prefixos do prompt no Gemini (context caching).
+
+Em conversas sobre um arquivo grande colado pelo usuário, todo pedido
+repete o mesmo código a cada turno. ``PrefixCache`` envia esse prefixo (as
+instruções fixas, o arquivo e a resposta a ele) uma única vez
+(``CachedContent`` com TTL) e os pedidos seguintes o referenciam pelo nome,
+mandando só o restante. ``PrefixCachingClient`` faz isso de forma
+transparente para ``generate_content`` e para a sessão de chat.
+
+As instruções fixas sozinhas (~100 tokens) ficam muito abaixo do mínimo do
+Gemini (32.768 tokens) e nunca são guardadas: só há cache quando o arquivo
+colado (com o restante do prefixo) alcança esse mínimo. O prefixo só muda
+quando aparece uma nova mensagem grande, então o mesmo cache atende vários
+turnos. Prefixos menores que o mínimo, modelos sem suporte e erros do cache
+caem no pedido completo de sempre.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+
+from ai_testing_helper.client import _contents_text, is_retryable
+from ai_testing_helper.context_window import estimate_tokens
+
+DEFAULT_TTL_SECONDS = 3600
+# Mínimo de tokens aceito pelo context caching do Gemini 1.5 (bem acima das instruções fixas)
+DEFAULT_MIN_TOKENS = 32768
+# Mensagem do usuário a partir deste tamanho (ex.: um arquivo colado) fecha um prefixo estável
+LARGE_MESSAGE_TOKENS = 2048
+DEFAULT_MAX_ENTRIES = 32
+# Depois de uma falha na criação, o modelo fica sem cache por este tempo
+FAILURE_COOLDOWN_SECONDS = 600
+
+PrefixSplit = namedtuple("PrefixSplit", "prefix remaining")
+PrefixLookup = namedtuple("PrefixLookup", "key model remaining")
+
+_TURN = re.compile(r"(Usuário|Assistente): ")
+
+
+def _role(item):
+    return item.get("role") if isinstance(item, dict) else getattr(item, "role", None)
+
+
+def _split_text(prompt, static_prefix, large_tokens):
+    """Prompt em texto (``build_prompt``): instruções fixas + turnos até a resposta à última mensagem grande.
+
+    ``static_prefix`` (as instruções fixas) só marca onde começam os turnos:
+    sem mensagem grande não há prefixo, pois elas sozinhas não chegam ao mínimo do cache.
+    """
+    if not static_prefix or not prompt.startswith(static_prefix):
+        return None
+    # Cada turno começa em uma nova linha (o primeiro, logo após as instruções)
+    turns = [
+        (match.group(1), match.start()) for match in _TURN.finditer(prompt, len(static_prefix))
+        if match.start() == len(static_prefix) or prompt[match.start() - 1] == "\n"
+    ]
+    cut = len(static_prefix)
+    for index in range(len(turns) - 2):
+        role, start = turns[index]
+        if (role == "Usuário" and turns[index + 1][0] == "Assistente" and turns[index + 2][0] == "Usuário"
+                and estimate_tokens(prompt[start:turns[index + 1][1]]) >= large_tokens):
+            cut = turns[index + 2][1]
+    if cut == len(static_prefix):
+        return None
+    return PrefixSplit(prompt[:cut], prompt[cut:])
+
+
+def _split_contents(contents, large_tokens):
+    """Histórico da sessão de chat: conteúdos até a resposta à última mensagem grande."""
+    cut = 0
+    for index in range(len(contents) - 2):
+        if (_role(contents[index]) == "user" and _role(contents[index + 1]) == "model"
+                and estimate_tokens(_contents_text(contents[index])) >= large_tokens):
+            cut = index + 2
+    return PrefixSplit(contents[:cut], contents[cut:])
+
+
+def split_prefix(contents, static_prefix=None, large_tokens=LARGE_MESSAGE_TOKENS):
+    """Divide o pedido em ``(prefixo estável, restante)``; ``None`` se não houver prefixo.
+
+    Em prompts de texto, o prefixo vai de ``static_prefix`` (o início fixo do
+    prompt) até a resposta à última mensagem grande.
+    """
+    if isinstance(contents, str):
+        return _split_text(contents, static_prefix, large_tokens)
+    if isinstance(contents, (list, tuple)) and contents:
+        return _split_contents(list(contents), large_tokens)
+    return None
+
+
+class GeminiContextBackend:
+    """Cache de contexto do Gemini (``google.generativeai.caching``).
+
+    ``wrap`` envolve os modelos criados a partir do cache (ex.: no cliente
+    resiliente, com os mesmos limites dos demais modelos).
+    """
+
+    def __init__(self, wrap=None):
+        self._wrap = wrap or (lambda model: model)
+
+    def create(self, model_name, system_instruction, contents, ttl):
+        from google.generativeai import caching
+
+        return caching.CachedContent.create(
+            model=model_name, system_instruction=system_instruction, contents=contents or None, ttl=ttl
+        )
+
+    def refresh(self, handle, ttl):
+        handle.update(ttl=ttl)
+
+    def delete(self, handle):
+        handle.delete()
+
+    def model(self, handle, generation_config):
+        import google.generativeai as genai
+
+        return self._wrap(genai.GenerativeModel.from_cached_content(handle, generation_config=generation_config))
+
+
+class _Entry:
+    __slots__ = ("handle", "expires_at", "models")
+
+    def __init__(self, handle, expires_at):
+        self.handle = handle
+        self.expires_at = expires_at
+        self.models = {}
+
+
+class PrefixCache:
+    """Prefixos enviados uma vez ao backend e reaproveitados enquanto o TTL durar."""
+
+    def __init__(self, backend, ttl=DEFAULT_TTL_SECONDS, min_tokens=DEFAULT_MIN_TOKENS,
+                 large_message_tokens=LARGE_MESSAGE_TOKENS, max_entries=DEFAULT_MAX_ENTRIES,
+                 clock=time.monotonic):
+        self.backend = backend
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.large_message_tokens = large_message_tokens
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._unavailable = {}
+        self._lock = threading.Lock()
+        self._key_locks = defaultdict(threading.Lock)
+        self.created = 0
+        self.reused = 0
+        self.skipped = 0
+        self.failures = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "created": self.created,
+            "reused": self.reused,
+            "skipped": self.skipped,
+            "failures": self.failures,
+        }
+
+    def lookup(self, model_name, system_instruction, generation_config, contents, static_prefix=None):
+        """Modelo com o prefixo em cache e o restante do pedido; ``None`` para o pedido completo."""
+        split = split_prefix(contents, static_prefix, self.large_message_tokens)
+        if split is None:
+            return None
+        prefix_text = _contents_text(split.prefix)
+        if estimate_tokens(f"{system_instruction or ''}{prefix_text}") < self.min_tokens:
+            self.skipped += 1
+            return None
+        if self._unavailable.get(model_name, 0) > self._clock():
+            return None
+
+        roles = None if isinstance(split.prefix, str) else [_role(item) for item in split.prefix]
+        key = hashlib.sha1(repr((model_name, system_instruction, roles, prefix_text)).encode("utf-8")).hexdigest()
+        entry = self._entry(key, model_name, system_instruction, split.prefix)
+        if entry is None:
+            return None
+        config_key = tuple(sorted((generation_config or {}).items()))
+        model = entry.models.get(config_key)
+        if model is None:
+            model = entry.models[config_key] = self.backend.model(entry.handle, generation_config)
+        return PrefixLookup(key, model, split.remaining)
+
+    def _entry(self, key, model_name, system_instruction, prefix):
+        with self._lock:
+            key_lock = self._key_locks[key]
+        with key_lock:
+            now = self._clock()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+            if entry is not None and entry.expires_at - now < self.ttl / 2:
+                # Ainda em uso: renova o TTL antes que expire no servidor
+                try:
+                    self.backend.refresh(entry.handle, self.ttl)
+                    entry.expires_at = now + self.ttl
+                except Exception:
+                    self.invalidate(key)
+                    entry = None
+            if entry is not None:
+                self.reused += 1
+                return entry
+            contents = [{"role": "user", "parts": [prefix]}] if isinstance(prefix, str) else list(prefix)
+            try:
+                handle = self.backend.create(model_name, system_instruction, contents, self.ttl)
+            except Exception:
+                # Modelo sem suporte, prefixo pequeno demais para o servidor, sem permissão...
+                self.failures += 1
+                self._unavailable[model_name] = now + FAILURE_COOLDOWN_SECONDS
+                return None
+            self.created += 1
+            entry = _Entry(handle, now + self.ttl)
+            with self._lock:
+                self._entries[key] = entry
+                evicted = []
+                while len(self._entries) > self.max_entries:
+                    old_key, old_entry = self._entries.popitem(last=False)
+                    self._key_locks.pop(old_key, None)
+                    evicted.append(old_entry)
+            for old in evicted:
+                self._delete(old)
+            return entry
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            self._key_locks.pop(key, None)
+        if entry is not None:
+            self._delete(entry)
+
+    def _delete(self, entry):
+        try:
+            self.backend.delete(entry.handle)
+        except Exception:
+            pass  # O servidor apaga sozinho ao fim do TTL
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._unavailable.clear()
+        for entry in entries:
+            self._delete(entry)
+
+
+class PrefixCachingClient:
+    """Envolve um modelo (já resiliente) mantendo a mesma interface.
+
+    ``generate_content`` usa o modelo criado a partir do prefixo em cache e
+    envia só o restante; sem prefixo em cache, ou se o cache falhar (ex.:
+    expirou no servidor), faz o pedido completo. Os demais atributos são
+    delegados ao modelo.
+    """
+
+    def __init__(self, client, cache, model_name, generation_config=None, system_instruction=None,
+                 static_prefix=None):
+        self.client = client
+        self.cache = cache
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.system_instruction = system_instruction
+        self.static_prefix = static_prefix
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def generate_content(self, contents=None, *args, **kwargs):
+        lookup = self.cache.lookup(
+            self.model_name, self.system_instruction, self.generation_config, contents, self.static_prefix
+        )
+        if lookup is not None:
+            try:
+                return lookup.model.generate_content(lookup.remaining, *args, **kwargs)
+            except Exception as error:
+                if is_retryable(error):
+                    raise
+                self.cache.invalidate(lookup.key)
+        return self.client.generate_content(contents, *args, **kwargs)
+
+    def start_chat(self, history=None, **kwargs):
+        from google.generativeai import ChatSession
+
+        return ChatSession(model=self, history=history, **kwargs)
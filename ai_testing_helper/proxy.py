@@ -0,0 +1,246 @@
+"""Proxy reverso local com sessões fixas (sticky) para vários workers do Streamlit.
+
+A sessão do Streamlit vive no processo que abriu o websocket, então o mesmo
+navegador precisa voltar sempre ao mesmo worker. O proxy lê só o cabeçalho
+da primeira requisição de cada conexão, escolhe o worker pelo cookie
+``COOKIE_NAME`` (ou, sem cookie, o worker pronto com menos conexões) e daí
+em diante apenas copia os bytes nos dois sentidos. Assim HTTP, keep-alive e
+o websocket passam sem que o proxy precise entendê-los. Na primeira resposta
+de um navegador novo, o proxy acrescenta o ``Set-Cookie`` com o worker.
+
+Uma tarefa verifica o ``/readyz`` de cada worker a cada ``check_interval``
+segundos. Workers fora do ar não recebem sessões novas; navegadores fixados
+neles passam para outro worker, que restaura a conversa do armazenamento
+compartilhado. O próprio proxy responde em ``/healthz`` e ``/readyz``.
+"""
+
+import asyncio
+import itertools
+import json
+
+COOKIE_NAME = "ai_testing_helper_worker"
+CHECK_INTERVAL_SECONDS = 2.0
+MAX_HEADER_BYTES = 64 * 1024
+COPY_CHUNK_BYTES = 64 * 1024
+
+
+class Worker:
+    """Um worker atrás do proxy e o estado visto pela verificação de prontidão."""
+
+    __slots__ = ("name", "host", "port", "ready", "connections", "sessions")
+
+    def __init__(self, name, host, port):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.ready = False
+        self.connections = 0
+        self.sessions = 0
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "address": f"{self.host}:{self.port}",
+            "ready": self.ready,
+            "connections": self.connections,
+            "sessions": self.sessions,
+        }
+
+
+def parse_head(head):
+    """Caminho e cabeçalhos (em minúsculas) da requisição."""
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ")
+    path = parts[1] if len(parts) > 1 else "/"
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return path, headers
+
+
+def cookie_value(headers, name=COOKIE_NAME):
+    for item in headers.get("cookie", "").split(";"):
+        key, _, value = item.strip().partition("=")
+        if key == name:
+            return value
+    return None
+
+
+def with_cookie(head, name, value):
+    """Acrescenta o ``Set-Cookie`` ao cabeçalho da resposta."""
+    cookie = f"Set-Cookie: {name}={value}; Path=/; HttpOnly; SameSite=Lax\r\n".encode("latin-1")
+    return head[:-2] + cookie + b"\r\n"
+
+
+def _response(status, body, content_type="application/json"):
+    payload = body.encode("utf-8")
+    return (
+        f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + payload
+
+
+async def _copy(reader, writer):
+    try:
+        while True:
+            data = await reader.read(COPY_CHUNK_BYTES)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        try:
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (OSError, RuntimeError):
+            pass
+
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (ConnectionError, OSError):
+        pass
+
+
+class StickyProxy:
+    """Proxy com afinidade por cookie e verificação periódica dos workers."""
+
+    def __init__(self, workers, cookie_name=COOKIE_NAME, check_interval=CHECK_INTERVAL_SECONDS,
+                 check_path="/readyz"):
+        self.workers = {worker.name: worker for worker in workers}
+        self.cookie_name = cookie_name
+        self.check_interval = check_interval
+        self.check_path = check_path
+        self.port = None
+        self._order = itertools.cycle(list(self.workers))
+        self._server = None
+        self._checker = None
+
+    def pick(self, name=None):
+        """Worker da sessão (``name`` do cookie) ou, para sessões novas, o pronto com menos conexões."""
+        worker = self.workers.get(name)
+        if worker is not None and worker.ready:
+            return worker
+        ready = [w for w in self.workers.values() if w.ready]
+        if not ready:
+            return None
+        # Em caso de empate, alterna entre os workers
+        start = next(self._order)
+        names = list(self.workers)
+        offset = names.index(start)
+        ready.sort(key=lambda w: (w.connections, (names.index(w.name) - offset) % len(names)))
+        return ready[0]
+
+    def status(self):
+        ready = [w for w in self.workers.values() if w.ready]
+        return {"ready": bool(ready), "workers": [w.as_dict() for w in self.workers.values()]}
+
+    async def check(self, worker):
+        """Consulta o ``/readyz`` do worker (HTTP/1.0, sem dependências)."""
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(worker.host, worker.port), self.check_interval
+            )
+            try:
+                writer.write(f"GET {self.check_path} HTTP/1.0\r\nHost: {worker.host}\r\n\r\n".encode("latin-1"))
+                await writer.drain()
+                status_line = await asyncio.wait_for(reader.readline(), self.check_interval)
+            finally:
+                await _close(writer)
+            worker.ready = status_line.split(b" ")[1:2] == [b"200"]
+        except (OSError, asyncio.TimeoutError, IndexError):
+            worker.ready = False
+        return worker.ready
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(worker) for worker in self.workers.values()))
+
+    async def _check_forever(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self, host="127.0.0.1", port=0):
+        await self.check_all()
+        self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._checker = asyncio.ensure_future(self._check_forever())
+        return self._server
+
+    async def close(self):
+        if self._checker is not None:
+            self._checker.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, client_reader, client_writer):
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            await _close(client_writer)
+            return
+        path, headers = parse_head(head)
+        if path in ("/healthz", "/readyz"):
+            status = self.status()
+            code = "200 OK" if path == "/healthz" or status["ready"] else "503 Service Unavailable"
+            client_writer.write(_response(code, json.dumps(status)))
+            await client_writer.drain()
+            await _close(client_writer)
+            return
+
+        pinned = cookie_value(headers, self.cookie_name)
+        worker = self.pick(pinned)
+        if worker is None:
+            client_writer.write(_response("503 Service Unavailable", "Nenhum worker pronto", "text/plain"))
+            await client_writer.drain()
+            await _close(client_writer)
+            return
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(
+                worker.host, worker.port, limit=MAX_HEADER_BYTES
+            )
+        except OSError:
+            worker.ready = False
+            client_writer.write(_response("502 Bad Gateway", "Worker indisponível", "text/plain"))
+            await client_writer.drain()
+            await _close(client_writer)
+            return
+
+        worker.connections += 1
+        if pinned != worker.name:
+            worker.sessions += 1
+        try:
+            upstream_writer.write(head)
+            await upstream_writer.drain()
+            upstream = asyncio.ensure_future(_copy(client_reader, upstream_writer))
+            if pinned != worker.name:
+                # Navegador novo (ou vindo de um worker fora do ar): fixar neste worker
+                try:
+                    response_head = await upstream_reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    response_head = None
+                if response_head is not None:
+                    client_writer.write(with_cookie(response_head, self.cookie_name, worker.name))
+                    await client_writer.drain()
+            await _copy(upstream_reader, client_writer)
+            upstream.cancel()
+        finally:
+            worker.connections -= 1
+            await _close(upstream_writer)
+            await _close(client_writer)
+
+
+def parse_workers(addresses):
+    """Workers a partir de ``host:porta`` (nomes ``w0``, ``w1``... estáveis entre reinícios)."""
+    workers = []
+    for index, address in enumerate(addresses):
+        host, _, port = address.rpartition(":")
+        workers.append(Worker(f"w{index}", host or "127.0.0.1", int(port)))
+    return workers
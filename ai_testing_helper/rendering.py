@@ -0,0 +1,80 @@
+"""Renderização incremental do histórico do chat.
+
+A cada rerun o Streamlit executa o script inteiro; exibir todo o histórico
+significa reenviar (e o navegador reinterpretar) cada resposta longa. Este
+módulo não depende do Streamlit: prepara cada mensagem uma única vez (separando
+os blocos de código do markdown, com cache pelo id da mensagem) e decide quais
+mensagens ficam visíveis, deixando as mais antigas atrás de "carregar anteriores".
+"""
+
+import hashlib
+import re
+from collections import namedtuple
+
+from ai_testing_helper.cache import LRUCache
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_FRAGMENT_ENTRIES = 1024
+
+# Bloco de código cercado por ``` no início da linha (blocos indentados ficam no markdown)
+_CODE_FENCE = re.compile(r"^```[ \t]*([\w+.#-]*)[^\n]*\n(.*?)^```[ \t]*$", re.MULTILINE | re.DOTALL)
+
+Segment = namedtuple("Segment", "kind text language")
+
+
+def message_id(message):
+    """Id estável da mensagem: hash do papel e do conteúdo."""
+    payload = f"{message.get('role')}\0{message.get('content')}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def split_segments(text):
+    """Divide o texto em trechos de markdown e blocos de código.
+
+    Blocos de código são exibidos com ``st.code``, que não passa pelo parser
+    de markdown; o restante continua como markdown.
+    """
+    text = "" if text is None else f"{text}"
+    segments = []
+    position = 0
+    for match in _CODE_FENCE.finditer(text):
+        before = text[position:match.start()].strip("\n")
+        if before.strip():
+            segments.append(Segment("markdown", before, None))
+        segments.append(Segment("code", match.group(2).rstrip("\n"), match.group(1) or None))
+        position = match.end()
+    rest = text[position:].strip("\n")
+    if rest.strip() or not segments:
+        segments.append(Segment("markdown", rest, None))
+    return tuple(segments)
+
+
+class FragmentCache:
+    """Segmentos já preparados de cada mensagem, indexados pelo id da mensagem."""
+
+    def __init__(self, max_entries=DEFAULT_FRAGMENT_ENTRIES):
+        self._cache = LRUCache(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def segments(self, message):
+        key = message_id(message)
+        segments = self._cache.get(key)
+        if segments is not None:
+            self.hits += 1
+            return segments
+        self.misses += 1
+        segments = split_segments(message.get("content"))
+        self._cache.set(key, segments)
+        return segments
+
+    def clear(self):
+        self._cache.clear()
+
+
+def visible_start(total, shown):
+    """Índice da primeira mensagem exibida quando só as ``shown`` últimas aparecem."""
+    return max(0, total - max(0, shown))
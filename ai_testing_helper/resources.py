@@ -0,0 +1,219 @@
+"""Recursos compartilhados pelo processo: modelos, cache de respostas e pool.
+
+Funcionam como o ``st.cache_resource``, mas sem depender do Streamlit: cada
+função devolve sempre o mesmo objeto para os mesmos argumentos, então a
+página, a CLI e outras interfaces no mesmo processo dividem o mesmo modelo,
+cache, limitador de taxa e circuit breaker. A configuração vem das variáveis
+de ambiente (e do ``.env``).
+"""
+
+import functools
+import os
+import threading
+
+from ai_testing_helper.cache import (
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MEMORY_ENTRIES,
+    DEFAULT_TTL_SECONDS,
+    LRUCache,
+    ResponseCache,
+    SQLiteCache,
+)
+from ai_testing_helper.client import (
+    DEFAULT_MAX_RETRIES,
+    CircuitBreaker,
+    ResilientClient,
+    rate_limiter_from_env,
+)
+from ai_testing_helper.concurrency import DEFAULT_MAX_CONCURRENCY, GenerationPool
+from ai_testing_helper.generation import GEMINI_MODEL_NAME, GENERATION_CONFIG, SYSTEM_INSTRUCTIONS, init_gemini
+from ai_testing_helper.metrics import metrics
+from ai_testing_helper.models import ModelRegistry
+from ai_testing_helper.prefix_cache import (
+    DEFAULT_MIN_TOKENS,
+    DEFAULT_TTL_SECONDS as PREFIX_CACHE_TTL_SECONDS,
+    GeminiContextBackend,
+    PrefixCache,
+    PrefixCachingClient,
+)
+from ai_testing_helper.rendering import DEFAULT_FRAGMENT_ENTRIES, FragmentCache
+from ai_testing_helper.routing import ModelRouter, routes_from_env
+from ai_testing_helper.singleflight import SingleFlight
+from ai_testing_helper.store import StoreCache, open_store
+from ai_testing_helper.similarity import DEFAULT_MAX_ENTRIES as SIMILARITY_ENTRIES, SimilarityIndex
+from ai_testing_helper.validation import (
+    DEFAULT_MEMORY_MB,
+    DEFAULT_TIMEOUT,
+    DEFAULT_WORKERS,
+    ValidationPool,
+)
+
+
+def shared_resource(func):
+    """Guarda o resultado de ``func`` por argumentos, uma única vez por processo."""
+    results = {}
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        try:
+            return results[args]
+        except KeyError:
+            pass
+        with lock:
+            if args not in results:
+                results[args] = func(*args)
+            return results[args]
+
+    wrapper.clear = results.clear
+    return wrapper
+
+
+@shared_resource
+def load_environment():
+    """Lê o ``.env`` uma única vez por processo."""
+    from dotenv import load_dotenv
+
+    return load_dotenv()
+
+
+@shared_resource
+def configure_metrics():
+    """Liga as métricas do processo quando ``METRICS_ENABLED`` está ativo."""
+    metrics.enabled = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes", "on")
+    return metrics
+
+
+@shared_resource
+def configure_gemini(api_key):
+    """Configura a API do Gemini uma vez por processo para cada API Key."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    return api_key
+
+
+@shared_resource
+def get_client_guards():
+    """Limitador de taxa (``GEMINI_RPM``/``GEMINI_TPM``) e circuit breaker do processo."""
+    return {
+        "rate_limiter": rate_limiter_from_env(),
+        "breaker": CircuitBreaker(),
+    }
+
+
+def resilient(model):
+    """Envolve o modelo no cliente resiliente (novas tentativas, backoff e limites do processo)."""
+    return ResilientClient(
+        model,
+        max_retries=int(os.getenv("GEMINI_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+        **get_client_guards()
+    )
+
+
+@shared_resource
+def get_prefix_cache():
+    """Cache de prefixos no Gemini (``PREFIX_CACHE*``); ``None`` quando desligado."""
+    if os.getenv("PREFIX_CACHE", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    return PrefixCache(
+        GeminiContextBackend(wrap=resilient),
+        ttl=int(os.getenv("PREFIX_CACHE_TTL", PREFIX_CACHE_TTL_SECONDS)),
+        min_tokens=int(os.getenv("PREFIX_CACHE_MIN_TOKENS", DEFAULT_MIN_TOKENS)),
+    )
+
+
+def create_model(**kwargs):
+    """Cria o modelo resiliente que usa o cache de prefixos (arquivos grandes colados na conversa)."""
+    client = resilient(init_gemini(**kwargs))
+    prefix_cache = get_prefix_cache()
+    if prefix_cache is None:
+        return client
+    return PrefixCachingClient(
+        client,
+        prefix_cache,
+        model_name=kwargs.get("model_name", GEMINI_MODEL_NAME),
+        generation_config=dict(kwargs.get("generation_config") or GENERATION_CONFIG),
+        system_instruction=kwargs.get("system_instruction"),
+        static_prefix=SYSTEM_INSTRUCTIONS,
+    )
+
+
+@shared_resource
+def get_model_registry():
+    return ModelRegistry(create_model)
+
+
+def get_gemini_model(model_name=GEMINI_MODEL_NAME, generation_config=None, system_instruction=None):
+    """Modelo compartilhado, um por combinação de nome, configuração e instruções."""
+    return get_model_registry().get(model_name, generation_config, system_instruction)
+
+
+@shared_resource
+def get_router():
+    """Roteador de modelos, com o modelo de cada rota já criado no registro."""
+    router = ModelRouter(routes_from_env())
+    router.warm(get_gemini_model, (None, SYSTEM_INSTRUCTIONS))
+    return router
+
+
+@shared_resource
+def get_shared_store():
+    """Armazenamento dividido entre os workers (``SHARED_STORE_URL``); ``None`` em um processo só."""
+    url = os.getenv("SHARED_STORE_URL")
+    return open_store(url) if url else None
+
+
+@shared_resource
+def get_response_cache():
+    """Cache de respostas; o segundo nível é o armazenamento compartilhado ou o SQLite de ``RESPONSE_CACHE_DB``."""
+    disk = None
+    db_path = os.getenv("RESPONSE_CACHE_DB")
+    shared_store = get_shared_store()
+    ttl_seconds = int(os.getenv("RESPONSE_CACHE_TTL", DEFAULT_TTL_SECONDS))
+    max_bytes = int(os.getenv("RESPONSE_CACHE_MAX_MB", DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024
+    if shared_store is not None:
+        disk = StoreCache(shared_store, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+    elif db_path:
+        disk = SQLiteCache(db_path, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+    memory = LRUCache(int(os.getenv("RESPONSE_CACHE_SIZE", DEFAULT_MEMORY_ENTRIES)))
+    return ResponseCache(memory=memory, disk=disk)
+
+
+@shared_resource
+def get_generation_pool():
+    """Pool de geração que limita as chamadas simultâneas (``GEMINI_MAX_CONCURRENCY``)."""
+    return GenerationPool(int(os.getenv("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)))
+
+
+@shared_resource
+def get_single_flight():
+    """Agrupa os pedidos iguais em andamento no processo (página e API montada no ``server``) em uma só chamada."""
+    return SingleFlight(get_generation_pool())
+
+
+@shared_resource
+def get_fragment_cache():
+    """Mensagens já preparadas para exibição, compartilhadas entre as sessões."""
+    return FragmentCache(int(os.getenv("FRAGMENT_CACHE_SIZE", DEFAULT_FRAGMENT_ENTRIES)))
+
+
+@shared_resource
+def get_similarity_index():
+    """Índice de códigos já respondidos, compartilhado entre as sessões (``SIMILARITY_INDEX_SIZE``)."""
+    return SimilarityIndex(int(os.getenv("SIMILARITY_INDEX_SIZE", SIMILARITY_ENTRIES)))
+
+
+def validation_enabled():
+    """Executar os testes gerados? Decisão do operador (``VALIDATE_TESTS``), nunca de quem usa a página."""
+    return os.getenv("VALIDATE_TESTS", "0").lower() in ("1", "true", "yes", "on")
+
+
+@shared_resource
+def get_validation_pool():
+    """Executor dos testes gerados na sandbox (``VALIDATION_*``)."""
+    return ValidationPool(
+        workers=int(os.getenv("VALIDATION_WORKERS", DEFAULT_WORKERS)),
+        timeout=float(os.getenv("VALIDATION_TIMEOUT", DEFAULT_TIMEOUT)),
+        memory_mb=int(os.getenv("VALIDATION_MEMORY_MB", DEFAULT_MEMORY_MB)),
+    )
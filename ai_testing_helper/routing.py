@@ -0,0 +1,163 @@
+"""Roteamento de cada pergunta para o modelo e a configuração adequados.
+
+Uma pergunta conceitual não precisa do mesmo pipeline que um módulo de 500
+linhas: o roteador olha o tamanho do código, a quantidade de funções e se a
+pergunta continua a conversa, e escolhe o modelo, ``max_output_tokens`` e a
+temperatura da rota. Os modelos de cada rota ficam aquecidos no registro
+compartilhado (``ModelRegistry``), um por rota.
+"""
+
+import os
+import re
+from collections import namedtuple
+
+from ai_testing_helper.generation import GEMINI_MODEL_NAME, GENERATION_CONFIG
+
+Route = namedtuple("Route", "name model_name generation_config")
+PromptFeatures = namedtuple("PromptFeatures", "code_lines functions follow_up")
+
+# Rota usada quando o roteamento está desligado (comportamento original)
+DEFAULT_ROUTE = Route("default", GEMINI_MODEL_NAME, GENERATION_CONFIG)
+
+DEFAULT_ROUTES = {
+    # Pergunta sem código: resposta curta em um modelo mais leve
+    "conceptual": Route("conceptual", "gemini-1.5-flash-8b", {
+        "temperature": 0.7, "top_p": 0.9, "top_k": 40, "max_output_tokens": 1024,
+    }),
+    # Continuação da conversa sem código novo ("e para listas vazias?")
+    "follow_up": Route("follow_up", GEMINI_MODEL_NAME, {
+        "temperature": 0.6, "top_p": 0.8, "top_k": 40, "max_output_tokens": 1536,
+    }),
+    # Poucas funções: o pipeline original
+    "small_code": Route("small_code", GEMINI_MODEL_NAME, {
+        "temperature": 0.4, "top_p": 0.8, "top_k": 40, "max_output_tokens": 2048,
+    }),
+    # Módulos grandes: modelo mais capaz e espaço para muitos testes
+    "large_code": Route("large_code", "gemini-1.5-pro", {
+        "temperature": 0.3, "top_p": 0.8, "top_k": 40, "max_output_tokens": 8192,
+    }),
+}
+
+# A partir destes limites o código vai para a rota ``large_code``
+LARGE_CODE_LINES = 150
+LARGE_CODE_FUNCTIONS = 6
+
+# Preço estimado em USD por 1 milhão de tokens (entrada, saída), para comparar rotas
+MODEL_PRICES = {
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+_CODE_FENCE = re.compile(r"```[^\n]*\n(.*?)(?:```|$)", re.DOTALL)
+_FUNCTION = re.compile(
+    r"^\s*(?:"
+    r"(?:async\s+)?def\s+\w+\s*\("                              # Python
+    r"|(?:export\s+)?(?:async\s+)?function\s*\*?\s*\w+\s*\("     # JavaScript
+    r"|(?:const|let|var)\s+\w+\s*=\s*(?:async\s+)?\([^)]*\)\s*=>"  # arrow function
+    r"|func\s+(?:\([^)]*\)\s*)?\w+\s*\("                        # Go
+    r"|fn\s+\w+\s*[<(]"                                          # Rust
+    r"|(?:(?:public|private|protected|static|final|virtual|override|inline)\s+)*"
+    r"[\w<>\[\],:*&]+\s+\w+\s*\([^;{]*\)\s*(?:const\s*)?\{"      # Java, C#, C/C++
+    r")",
+    re.MULTILINE,
+)
+_CODE_LINE = re.compile(
+    r"^\s*(?:def |class |import |from \S+ import|return\b|if .*:|for .*:|while .*:"
+    r"|function\b|const |let |var |public |private |#include|@\w+)"
+    r"|[;{}]\s*$|^\s{4,}\S",
+)
+
+
+def extract_code(prompt):
+    """Trechos de código da pergunta: blocos cercados por ``` ou linhas com cara de código."""
+    text = f"{prompt}"
+    blocks = _CODE_FENCE.findall(text)
+    if blocks:
+        return "\n".join(blocks)
+    lines = [line for line in text.splitlines() if line.strip()]
+    code_lines = [line for line in lines if _CODE_LINE.search(line)]
+    # Uma linha solta com cara de código ("o que faz return?") não é um trecho de código
+    return "\n".join(lines) if len(code_lines) >= 2 else ""
+
+
+def analyze_prompt(prompt, history=()):
+    """Características usadas na escolha da rota."""
+    code = extract_code(prompt)
+    code_lines = sum(1 for line in code.splitlines() if line.strip())
+    functions = len(_FUNCTION.findall(code))
+    follow_up = any(msg.get("role") == "user" for msg in history)
+    return PromptFeatures(code_lines, functions, follow_up)
+
+
+def routes_from_env(routes=None, environ=None):
+    """Rotas com o modelo sobrescrito por ``ROUTE_<NOME>_MODEL`` (ex.: ``ROUTE_LARGE_CODE_MODEL``)."""
+    environ = os.environ if environ is None else environ
+    routes = dict(routes or DEFAULT_ROUTES)
+    for name, route in routes.items():
+        model_name = environ.get(f"ROUTE_{name.upper()}_MODEL")
+        if model_name:
+            routes[name] = route._replace(model_name=model_name)
+    return routes
+
+
+def estimate_cost(model_name, prompt_tokens, response_tokens):
+    """Custo estimado em USD; zero para modelos sem preço conhecido."""
+    input_price, output_price = MODEL_PRICES.get(model_name, (0.0, 0.0))
+    return (prompt_tokens * input_price + response_tokens * output_price) / 1_000_000
+
+
+class ModelRouter:
+    """Escolhe a rota de cada pergunta e mantém os modelos das rotas aquecidos."""
+
+    def __init__(self, routes=None, large_code_lines=LARGE_CODE_LINES,
+                 large_code_functions=LARGE_CODE_FUNCTIONS):
+        self.routes = dict(routes or DEFAULT_ROUTES)
+        self.large_code_lines = large_code_lines
+        self.large_code_functions = large_code_functions
+
+    def classify(self, prompt, history=()):
+        """Rota da pergunta, considerando o histórico anterior a ela."""
+        features = analyze_prompt(prompt, history)
+        if not features.code_lines:
+            return self.routes["follow_up" if features.follow_up else "conceptual"]
+        if (features.code_lines >= self.large_code_lines
+                or features.functions >= self.large_code_functions):
+            return self.routes["large_code"]
+        return self.routes["small_code"]
+
+    def warm(self, get_model, system_instructions=(None,)):
+        """Cria antecipadamente o modelo de cada rota (e de cada instrução de sistema)."""
+        for route in self.routes.values():
+            for system_instruction in system_instructions:
+                get_model(route.model_name, route.generation_config, system_instruction)
+
+    def report(self, metrics):
+        """Latência, tokens e custo estimado por rota, a partir das métricas.
+
+        ``economia`` compara com o custo dos mesmos tokens no modelo da rota
+        padrão (o pipeline único de antes do roteamento).
+        """
+        latency = {dict(labels).get("route"): h for labels, h in metrics.series("generate_seconds").items()}
+        prompt = {dict(labels).get("route"): h for labels, h in metrics.series("prompt_tokens").items()}
+        response = {dict(labels).get("route"): h for labels, h in metrics.series("response_tokens").items()}
+        rows = []
+        for name, route in self.routes.items():
+            histogram = latency.get(name)
+            if histogram is None or not histogram.count:
+                continue
+            prompt_tokens = prompt[name].sum if name in prompt else 0
+            response_tokens = response[name].sum if name in response else 0
+            cost = estimate_cost(route.model_name, prompt_tokens, response_tokens)
+            baseline = estimate_cost(DEFAULT_ROUTE.model_name, prompt_tokens, response_tokens)
+            rows.append({
+                "rota": name,
+                "modelo": route.model_name,
+                "n": histogram.count,
+                "latência média (s)": histogram.sum / histogram.count,
+                "p95 (s)": histogram.quantile(0.95),
+                "tokens": int(prompt_tokens + response_tokens),
+                "custo (USD)": cost,
+                "economia (USD)": baseline - cost,
+            })
+        return rows
@@ -0,0 +1,268 @@
+"""Execução isolada de código não confiável (os testes gerados pelo modelo).
+
+Isolamento no estilo do nsjail, só com o ``unshare`` do util-linux e a
+biblioteca padrão. Cada execução é um processo novo, descartado ao final:
+
+- namespaces próprios de usuário, montagem, rede, PIDs, IPC e hostname: sem
+  rede (o loopback do namespace fica desligado) e sem ver outros processos;
+- sistema de arquivos mínimo: uma raiz nova em tmpfs com o interpretador e as
+  bibliotecas do sistema montados só para leitura, o diretório da execução em
+  ``/work`` e um ``/tmp`` vazio. O diretório da aplicação (e o ``.env``), o
+  ``/proc`` e o ``/etc`` do servidor não existem lá dentro;
+- usuário sem privilégios (``nobody``, em um namespace de usuário aninhado),
+  sem capacidades, com ``no_new_privs`` e ambiente limpo;
+- limites de memória, CPU e tamanho de arquivo; ao fim do tempo o processo é
+  morto e, com ele, todo o namespace de PIDs.
+
+Este arquivo também é o primeiro estágio dentro dos namespaces
+(``python -I -S sandbox.py <config>``): monta a raiz, troca de usuário, entra
+na raiz e executa o comando. Por isso usa só a biblioteca padrão.
+"""
+
+import ctypes
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+NOBODY = 65534
+DEFAULT_MEMORY_MB = 1024
+MAX_FILE_MB = 32
+TMP_SIZE_MB = 64
+# Folga para criar os namespaces e o interpretador além do tempo da execução
+STARTUP_GRACE_SECONDS = 5
+# Depois de uma falha, a sandbox é verificada de novo após este intervalo
+PROBE_RETRY_SECONDS = 60
+
+WORK_DIR = "/work"
+DEVICES = ("null", "zero", "random", "urandom")
+ENVIRONMENT = {
+    "PATH": "/usr/local/bin:/usr/bin:/bin",
+    "HOME": WORK_DIR,
+    "TMPDIR": "/tmp",
+    "LANG": "C.UTF-8",
+    "PYTHONDONTWRITEBYTECODE": "1",
+}
+
+MS_RDONLY = 1
+MS_NOSUID = 2
+MS_NODEV = 4
+MS_NOEXEC = 8
+MS_REMOUNT = 32
+MS_NOATIME = 1024
+MS_NODIRATIME = 2048
+MS_BIND = 4096
+MS_REC = 16384
+MS_PRIVATE = 1 << 18
+MS_RELATIME = 1 << 21
+CLONE_NEWUSER = 0x10000000
+PR_SET_NO_NEW_PRIVS = 38
+
+# Flags do statvfs que precisam ser repetidas ao remontar só para leitura
+# (em um namespace de usuário o kernel não deixa removê-las)
+_LOCKED_FLAGS = (
+    (os.ST_NOSUID, MS_NOSUID),
+    (os.ST_NODEV, MS_NODEV),
+    (os.ST_NOEXEC, MS_NOEXEC),
+    (os.ST_NOATIME, MS_NOATIME),
+    (os.ST_NODIRATIME, MS_NODIRATIME),
+    (os.ST_RELATIME, MS_RELATIME),
+)
+
+STAGE = os.path.abspath(__file__)
+
+
+def read_only_paths(executable=None):
+    """Caminhos visíveis (só leitura) na sandbox: sistema e a instalação do Python."""
+    executable = executable or sys.executable
+    candidates = ["/usr", "/bin", "/lib", "/lib32", "/lib64", "/usr/local",
+                  sys.prefix, sys.base_prefix, os.path.dirname(os.path.realpath(executable))]
+    paths = []
+    for path in candidates:
+        if os.path.lexists(path) and path not in paths:
+            paths.append(path)
+    # Caminhos dentro de outros já montados não precisam de montagem própria
+    return [path for path in paths
+            if os.path.islink(path) or not any(path.startswith(other + "/") for other in paths
+                                               if not os.path.islink(other))]
+
+
+def command(config):
+    unshare = shutil.which("unshare") or "/usr/bin/unshare"
+    return [
+        unshare, "--user", "--map-root-user", "--mount", "--net", "--pid", "--ipc", "--uts",
+        "--fork", "--kill-child",
+        sys.executable, "-I", "-S", STAGE, json.dumps(config),
+    ]
+
+
+_probe_lock = threading.Lock()
+_probe = {"ok": False, "failure": None}
+
+
+def unavailable_reason():
+    """``None`` se a sandbox funciona neste servidor; senão, o motivo.
+
+    Só o sucesso fica guardado: uma falha (ex.: falta de memória ao criar os
+    namespaces) é verificada de novo depois de ``PROBE_RETRY_SECONDS``.
+    """
+    with _probe_lock:
+        if _probe["ok"]:
+            return None
+        checked_at, reason = _probe["failure"] or (None, None)
+        if checked_at is not None and time.monotonic() - checked_at < PROBE_RETRY_SECONDS:
+            return reason
+        reason = _probe_sandbox()
+        _probe["ok"] = reason is None
+        _probe["failure"] = None if reason is None else (time.monotonic(), reason)
+        return reason
+
+
+def _probe_sandbox():
+    if not sys.platform.startswith("linux"):
+        return "a sandbox precisa de namespaces do Linux"
+    if shutil.which("unshare") is None:
+        return "comando unshare (util-linux) não encontrado"
+    try:
+        completed = run([sys.executable, "-I", "-S", "-c", "pass"], timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as error:
+        return f"falha ao criar a sandbox: {error}"
+    if completed.returncode != 0:
+        detail = completed.stderr.decode("utf-8", "replace").strip().splitlines()
+        return f"falha ao criar a sandbox: {detail[-1] if detail else completed.returncode}"
+    return None
+
+
+def run(argv, work_dir=None, timeout=10, memory_mb=DEFAULT_MEMORY_MB, files=None):
+    """Executa ``argv`` na sandbox e devolve o ``CompletedProcess`` (saídas em bytes).
+
+    ``work_dir`` vira ``/work`` (leitura e escrita); ``files`` (destino ->
+    origem) são arquivos extras só para leitura. Estoura
+    ``subprocess.TimeoutExpired`` se passar de ``timeout`` segundos.
+    """
+    base = tempfile.mkdtemp(prefix="ai_testing_helper_sandbox_")
+    try:
+        root = os.path.join(base, "root")
+        os.mkdir(root)
+        config = {
+            "root": root,
+            "read_only": read_only_paths(),
+            "files": dict(files or {}),
+            "work": work_dir,
+            "argv": list(argv),
+            "cpu_seconds": int(timeout) + 1,
+            "memory_mb": memory_mb,
+        }
+        return subprocess.run(
+            command(config), stdin=subprocess.DEVNULL, capture_output=True, env={},
+            timeout=timeout + STARTUP_GRACE_SECONDS,
+        )
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# --- Primeiro estágio, já dentro dos namespaces (root só no namespace de usuário) ---
+
+def _libc():
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def _check(result, what):
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{what}: {os.strerror(errno)}")
+
+
+def _mount(libc, source, target, fstype=None, flags=0, data=None):
+    encode = lambda value: value.encode() if value is not None else None  # noqa: E731
+    _check(libc.mount(encode(source), encode(target), encode(fstype), ctypes.c_ulong(flags), encode(data)),
+           f"mount {target}")
+
+
+def _bind(libc, source, target, read_only=True):
+    if os.path.isdir(source):
+        os.makedirs(target, exist_ok=True)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        open(target, "a").close()
+    _mount(libc, source, target, flags=MS_BIND | MS_REC)
+    if read_only:
+        locked = os.statvfs(source).f_flag
+        flags = MS_REMOUNT | MS_BIND | MS_RDONLY | MS_NOSUID
+        for st_flag, ms_flag in _LOCKED_FLAGS:
+            if locked & st_flag:
+                flags |= ms_flag
+        _mount(libc, None, target, flags=flags)
+
+
+def _write(path, text):
+    with open(path, "w") as handle:
+        handle.write(text)
+
+
+def _drop_privileges(libc):
+    """Namespace de usuário aninhado em que o processo é ``nobody``; as capacidades somem no exec."""
+    _check(libc.unshare(CLONE_NEWUSER), "unshare")
+    _write("/proc/self/setgroups", "deny")
+    _write("/proc/self/uid_map", f"{NOBODY} 0 1")
+    _write("/proc/self/gid_map", f"{NOBODY} 0 1")
+    os.setresgid(NOBODY, NOBODY, NOBODY)
+    os.setresuid(NOBODY, NOBODY, NOBODY)
+    _check(libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0), "prctl")
+
+
+def _limit(config):
+    import resource
+
+    memory = config["memory_mb"] * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_CPU, (config["cpu_seconds"], config["cpu_seconds"]))
+    file_size = MAX_FILE_MB * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def enter(config):
+    libc = _libc()
+    root = config["root"]
+    # Nada do que for montado aqui volta para o servidor
+    _mount(libc, None, "/", flags=MS_REC | MS_PRIVATE)
+    _mount(libc, "tmpfs", root, "tmpfs", MS_NOSUID | MS_NODEV, "size=16m,mode=755")
+    for path in config["read_only"]:
+        if os.path.islink(path):
+            os.makedirs(os.path.dirname(root + path), exist_ok=True)
+            os.symlink(os.readlink(path), root + path)
+        else:
+            _bind(libc, path, root + path)
+    for target, source in config["files"].items():
+        _bind(libc, source, root + target)
+    for name in DEVICES:
+        if os.path.exists(f"/dev/{name}"):
+            _bind(libc, f"/dev/{name}", f"{root}/dev/{name}", read_only=False)
+    os.makedirs(root + "/tmp")
+    _mount(libc, "tmpfs", root + "/tmp", "tmpfs", MS_NOSUID | MS_NODEV, f"size={TMP_SIZE_MB}m,mode=1777")
+    os.makedirs(root + WORK_DIR)
+    if config["work"]:
+        _bind(libc, config["work"], root + WORK_DIR, read_only=False)
+    # A raiz em si (diretórios criados acima) fica só para leitura
+    _mount(libc, None, root, flags=MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV)
+
+    _drop_privileges(libc)
+    os.chroot(root)
+    os.chdir(WORK_DIR)
+    _limit(config)
+    for fd in range(3, 256):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    argv = config["argv"]
+    os.execve(argv[0], argv, ENVIRONMENT)
+
+
+if __name__ == "__main__":
+    enter(json.loads(sys.argv[1]))
@@ -0,0 +1,79 @@
+"""Worker do Streamlit como aplicação ASGI, com a API HTTP e rotas de saúde e prontidão.
+
+Cada worker do modo com vários processos roda a página com ``st.App`` no
+uvicorn (também serve para um único processo com a página e a API)::
+
+    uvicorn --factory ai_testing_helper.server:create_app --port 8601
+
+- ``/v1/...``: a API HTTP (``ai_testing_helper.api``), no mesmo processo da
+  página: as duas dividem o modelo, o cache de respostas, o pool, o
+  agrupamento de pedidos iguais e os limites de taxa
+- ``/healthz``: o processo está vivo (o proxy e o orquestrador só reiniciam
+  o worker quando esta rota falha)
+- ``/readyz``: o worker pode receber sessões: o runtime do Streamlit subiu,
+  a API Key está configurada e o armazenamento compartilhado responde. O
+  proxy só manda sessões novas para workers prontos.
+"""
+
+import os
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def readiness_checks():
+    """Verificações de prontidão que não dependem do runtime: ``{nome: (ok, detalhe)}``."""
+    from ai_testing_helper.resources import get_shared_store, load_environment
+
+    load_environment()
+    checks = {"api_key": (bool(os.getenv("GEMINI_API_KEY")), "GEMINI_API_KEY")}
+    try:
+        shared_store = get_shared_store()
+        if shared_store is not None:
+            checks["shared_store"] = (shared_store.ping(), os.getenv("SHARED_STORE_URL"))
+    except Exception as error:
+        checks["shared_store"] = (False, f"{type(error).__name__}: {error}")
+    return checks
+
+
+def readiness_response(checks):
+    """Resposta JSON das verificações: 200 se todas passaram, 503 caso contrário."""
+    from starlette.responses import JSONResponse
+
+    ok = all(passed for passed, _ in checks.values())
+    body = {"ready": ok, "checks": {name: {"ok": passed, "detail": detail} for name, (passed, detail) in checks.items()}}
+    return JSONResponse(body, status_code=200 if ok else 503)
+
+
+async def health(request):
+    from starlette.responses import PlainTextResponse
+
+    return PlainTextResponse("ok")
+
+
+async def ready(request):
+    from starlette.concurrency import run_in_threadpool
+    from streamlit.runtime import Runtime
+
+    checks = await run_in_threadpool(readiness_checks)
+    if Runtime.exists():
+        runtime_ok, message = await Runtime.instance().is_ready_for_browser_connection
+        checks["runtime"] = (runtime_ok, message)
+    else:
+        checks["runtime"] = (False, "runtime não iniciado")
+    return readiness_response(checks)
+
+
+def routes(service=None):
+    """Rotas além da página: a API em ``/v1`` (com os recursos do processo), saúde e prontidão."""
+    from starlette.routing import Mount, Route
+
+    from ai_testing_helper.api import create_api
+
+    return [Mount("/v1", app=create_api(service)), Route("/healthz", health), Route("/readyz", ready)]
+
+
+def create_app(script_path=APP_PATH):
+    """Aplicação ASGI da página com a API (``uvicorn --factory``)."""
+    import streamlit as st
+
+    return st.App(script_path, routes=routes())
@@ -0,0 +1,328 @@
+"""Detecção de código quase duplicado para reaproveitar respostas.
+
+O cache de respostas só acerta quando o pedido é idêntico; a mesma função
+colada com outra formatação, outros comentários ou outros nomes de variáveis
+virava uma nova geração. Aqui o código da pergunta vira uma forma canônica
+(Python: AST sem comentários e docstrings, com as variáveis locais
+renomeadas; demais linguagens: tokens sem comentários) e uma assinatura
+MinHash dos shingles de tokens. Nomes de funções e de parâmetros ficam: a
+resposta os usa (chamadas com argumentos nomeados, explicações).
+
+``SimilarityIndex`` guarda as respostas anteriores por assinatura, com LSH em
+bandas para encontrar candidatas sem comparar com todas. Forma canônica igual
+reaproveita a resposta; similaridade alta vira um pedido de adaptação da
+resposta anterior, mais barato que uma geração completa.
+"""
+
+import ast
+import hashlib
+import random
+import re
+import textwrap
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+
+from ai_testing_helper.routing import _CODE_FENCE, _CODE_LINE, _FUNCTION
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+SHINGLE_SIZE = 4
+# Similaridade (Jaccard estimada) a partir da qual a resposta anterior é adaptada
+ADAPT_THRESHOLD = 0.75
+DEFAULT_MAX_ENTRIES = 1024
+
+ADAPT_PROMPT = """A resposta abaixo foi escrita para um código quase igual ao da nova pergunta.
+Adapte-a ao novo código: ajuste nomes, valores e casos de teste ao que mudou e mantenha o restante e o formato da resposta.
+
+Código anterior:
+```{language}
+{code}
+```
+
+Resposta anterior:
+{answer}
+
+Nova pergunta:
+{prompt}"""
+
+Fingerprint = namedtuple("Fingerprint", "scope key language code signature")
+SimilarMatch = namedtuple("SimilarMatch", "kind similarity language code answer")
+
+_LEXEME = re.compile(
+    r"(?P<string>\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)"
+    r"|(?P<comment>//[^\n]*|/\*.*?\*/|#[^\n]*)"
+    r"|(?P<token>\w+|[^\w\s])",
+    re.DOTALL,
+)
+_WORDS = re.compile(r"\w+")
+_PRIME = (1 << 61) - 1
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+_SCOPE_NODES = _FUNCTION_NODES + (ast.ClassDef,)
+
+
+def tokenize(code):
+    """Tokens do código sem comentários nem formatação (strings ficam inteiras)."""
+    return [
+        match.group() for match in _LEXEME.finditer(code)
+        if match.lastgroup != "comment"
+    ]
+
+
+def _strip_docstring(body):
+    if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], "value", None), ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        return body[1:] or [ast.Pass()]
+    return body
+
+
+def _own_nodes(node):
+    """Nós do corpo da função, sem entrar em funções e classes internas."""
+    pending = list(ast.iter_child_nodes(node))
+    while pending:
+        child = pending.pop(0)
+        yield child
+        if not isinstance(child, _SCOPE_NODES):
+            pending.extend(ast.iter_child_nodes(child))
+
+
+def _parameters(args):
+    return args.posonlyargs + args.args + [args.vararg] * bool(args.vararg) + args.kwonlyargs \
+        + [args.kwarg] * bool(args.kwarg)
+
+
+class _LocalRenamer(ast.NodeTransformer):
+    """Renomeia as variáveis locais das funções para ``_v0``, ``_v1``...
+
+    Só os nomes atribuídos dentro do corpo mudam. Nomes de funções, classes,
+    parâmetros, atributos e globais ficam como estão: são eles que os testes
+    e a resposta usam.
+    """
+
+    def __init__(self):
+        self._scopes = []
+
+    def _visit_scope(self, node, body_fields):
+        # Decoradores, valores padrão e anotações pertencem ao escopo de fora
+        for field, value in ast.iter_fields(node):
+            if field not in body_fields and field != "args":
+                self._visit_field(node, field, value)
+        self._visit_field(node, "args", node.args)
+        # Parâmetros fazem parte da interface da função: não são renomeados
+        declared = {arg.arg for arg in _parameters(node.args)}
+        names = []
+        for child in _own_nodes(node):
+            if isinstance(child, (ast.Global, ast.Nonlocal)):
+                declared.update(child.names)
+            elif isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+                names.append(child.id)
+        start = sum(len(scope) for scope in self._scopes)
+        mapping = {}
+        for name in names:
+            if name not in declared and name not in mapping:
+                mapping[name] = f"_v{start + len(mapping)}"
+        self._scopes.append(mapping)
+        for field in body_fields:
+            self._visit_field(node, field, getattr(node, field))
+        self._scopes.pop()
+        return node
+
+    def _visit_field(self, node, field, value):
+        if isinstance(value, list):
+            setattr(node, field, [self.visit(item) if isinstance(item, ast.AST) else item for item in value])
+        elif isinstance(value, ast.AST):
+            setattr(node, field, self.visit(value))
+
+    def visit_FunctionDef(self, node):
+        node.body = _strip_docstring(node.body)
+        return self._visit_scope(node, ("body",))
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        return self._visit_scope(node, ("body",))
+
+    def visit_ClassDef(self, node):
+        node.body = _strip_docstring(node.body)
+        return self.generic_visit(node)
+
+    def visit_arguments(self, node):
+        # Só os valores padrão e as anotações; os nomes dos parâmetros ficam
+        for field in ("defaults", "kw_defaults"):
+            self._visit_field(node, field, getattr(node, field))
+        for arg in _parameters(node):
+            if arg.annotation is not None:
+                arg.annotation = self.visit(arg.annotation)
+        return node
+
+    def visit_Name(self, node):
+        for scope in reversed(self._scopes):
+            if node.id in scope:
+                node.id = scope[node.id]
+                break
+        return node
+
+
+def canonical_python(code):
+    """Forma canônica do código Python; ``SyntaxError`` se não for Python válido."""
+    tree = ast.parse(textwrap.dedent(code))
+    tree.body = _strip_docstring(tree.body)
+    return ast.unparse(_LocalRenamer().visit(tree))
+
+
+def _hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _permutations(num_perm):
+    generator = random.Random(num_perm)
+    return [(generator.randrange(1, _PRIME), generator.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+
+_PERMUTATIONS = {}
+
+
+def minhash(tokens, num_perm=DEFAULT_NUM_PERM, shingle_size=SHINGLE_SIZE):
+    """Assinatura MinHash dos shingles (sequências de ``shingle_size`` tokens)."""
+    if num_perm not in _PERMUTATIONS:
+        _PERMUTATIONS[num_perm] = _permutations(num_perm)
+    count = max(len(tokens) - shingle_size + 1, 1)
+    hashes = {_hash("\x1f".join(tokens[index:index + shingle_size])) for index in range(count)}
+    return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in _PERMUTATIONS[num_perm])
+
+
+def estimate_similarity(first, second):
+    """Jaccard estimada pela fração de posições iguais das assinaturas."""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def split_question(prompt):
+    """Separa a pergunta em ``(texto, código)``; o código vem dos blocos cercados ou das linhas de código."""
+    text = f"{prompt}"
+    blocks = _CODE_FENCE.findall(text)
+    if blocks:
+        return _CODE_FENCE.sub(" ", text), "\n".join(blocks)
+    lines = text.splitlines()
+    first = next((i for i, line in enumerate(lines) if _FUNCTION.match(line) or _CODE_LINE.search(line)), None)
+    if first is None or sum(1 for line in lines[first:] if _CODE_LINE.search(line)) < 2:
+        return text, ""
+    return "\n".join(lines[:first]), "\n".join(lines[first:])
+
+
+def fingerprint(prompt, scope=(), num_perm=DEFAULT_NUM_PERM):
+    """Impressão digital do código da pergunta; ``None`` se a pergunta não tiver código.
+
+    O texto fora do código ("crie testes para", "explique") e ``scope`` fazem
+    parte do escopo: só perguntas com o mesmo pedido são comparadas. Quem
+    chama põe em ``scope`` o que mais muda a resposta (a conversa anterior, o
+    modelo e a configuração), como na chave do cache de respostas.
+    """
+    text, code = split_question(prompt)
+    if not code.strip():
+        return None
+    try:
+        canonical = canonical_python(code)
+        language = "python"
+    except SyntaxError:
+        canonical = " ".join(tokenize(code))
+        language = ""
+    words = " ".join(_WORDS.findall(text.lower()))
+    scope_key = hashlib.sha256(repr((words, language, tuple(scope))).encode("utf-8")).hexdigest()
+    key = hashlib.sha256(f"{scope_key}\n{canonical}".encode("utf-8")).hexdigest()
+    return Fingerprint(scope_key, key, language, code.strip("\n"), minhash(tokenize(canonical), num_perm))
+
+
+def build_adapt_prompt(match, prompt):
+    return ADAPT_PROMPT.format(language=match.language, code=match.code, answer=match.answer, prompt=prompt)
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "answer", "buckets")
+
+    def __init__(self, fingerprint, answer, buckets):
+        self.fingerprint = fingerprint
+        self.answer = answer
+        self.buckets = buckets
+
+
+class SimilarityIndex:
+    """Respostas anteriores por impressão digital, com busca por LSH e despejo LRU."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                 threshold=ADAPT_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.max_entries = max_entries
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._buckets = defaultdict(set)
+        self._lock = threading.Lock()
+        self.exact = 0
+        self.similar = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {"entries": len(self._entries), "exact": self.exact, "similar": self.similar, "misses": self.misses}
+
+    def fingerprint(self, prompt, scope=()):
+        return fingerprint(prompt, scope, self.num_perm)
+
+    def _band_keys(self, fp):
+        rows = self.num_perm // self.bands
+        return [(fp.scope, band, fp.signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def find(self, fp):
+        """Resposta de código equivalente (``exact``) ou parecido (``similar``); ``None`` se não houver."""
+        with self._lock:
+            entry = self._entries.get(fp.key)
+            if entry is not None:
+                self._entries.move_to_end(fp.key)
+                self.exact += 1
+                return SimilarMatch("exact", 1.0, entry.fingerprint.language, entry.fingerprint.code, entry.answer)
+            candidates = set()
+            for band_key in self._band_keys(fp):
+                candidates.update(self._buckets.get(band_key, ()))
+            best, best_similarity = None, 0.0
+            for key in candidates:
+                similarity = estimate_similarity(fp.signature, self._entries[key].fingerprint.signature)
+                if similarity > best_similarity:
+                    best, best_similarity = self._entries[key], similarity
+            if best is None or best_similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best.fingerprint.key)
+            self.similar += 1
+            return SimilarMatch(
+                "similar", best_similarity, best.fingerprint.language, best.fingerprint.code, best.answer
+            )
+
+    def add(self, fp, answer):
+        with self._lock:
+            self._remove(fp.key)
+            band_keys = self._band_keys(fp)
+            self._entries[fp.key] = _Entry(fp, answer, band_keys)
+            for band_key in band_keys:
+                self._buckets[band_key].add(fp.key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in entry.buckets:
+            bucket = self._buckets[band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
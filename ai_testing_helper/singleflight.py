@@ -0,0 +1,162 @@
+"""Agrupamento de pedidos iguais em andamento (single-flight) no processo.
+
+Quando várias sessões enviam ao mesmo tempo a mesma pergunta (mesmo prompt
+normalizado, mesma janela de histórico e mesma configuração, isto é, a mesma
+chave do cache de respostas), só a primeira chama o modelo. As demais esperam
+essa chamada e recebem o mesmo resultado ou o mesmo streaming. Os pedaços
+ficam guardados na ``SharedCall``: quem chega depois recebe primeiro os
+pedaços já gerados e depois acompanha os novos. Vale para a página e para a
+API no mesmo processo.
+
+A chamada roda no pool de geração, então a fila e o limite de concorrência
+continuam valendo. A chave sai de ``_calls`` assim que a chamada termina; a
+partir daí quem responde é o cache de respostas.
+"""
+
+import threading
+
+
+class SharedCall:
+    """Uma chamada ao modelo em andamento; os pedaços ficam guardados para todos que esperam por ela."""
+
+    def __init__(self):
+        self.ticket = None
+        self.waiters = 1
+        self._pieces = []
+        self._done = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._listeners = []
+
+    def _notify(self):
+        self._condition.notify_all()
+        for listener in list(self._listeners):
+            listener()
+
+    def publish(self, piece):
+        with self._condition:
+            self._pieces.append(piece)
+            self._notify()
+
+    def finish(self, error=None):
+        with self._condition:
+            self._done = True
+            self._error = error
+            self._notify()
+
+    def chunks(self):
+        """Itera os pedaços desde o início, bloqueando até os próximos (para ``st.write_stream``)."""
+        index = 0
+        while True:
+            with self._condition:
+                while index == len(self._pieces) and not self._done:
+                    self._condition.wait()
+                pieces = self._pieces[index:]
+                done, error = self._done, self._error
+            yield from pieces
+            index += len(pieces)
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+    async def achunks(self):
+        """Versão assíncrona de ``chunks``: espera no event loop, sem ocupar uma thread."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(changed.set)
+
+        with self._condition:
+            self._listeners.append(wake)
+        try:
+            index = 0
+            while True:
+                changed.clear()
+                with self._condition:
+                    pieces = self._pieces[index:]
+                    done, error = self._done, self._error
+                for piece in pieces:
+                    yield piece
+                index += len(pieces)
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+                await changed.wait()
+        finally:
+            with self._condition:
+                self._listeners.remove(wake)
+
+    def result(self, timeout=None):
+        """Texto completo; espera a chamada terminar."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._done, timeout):
+                raise TimeoutError("a chamada compartilhada não terminou a tempo")
+            if self._error is not None:
+                raise self._error
+            return "".join(self._pieces)
+
+
+class SingleFlight:
+    """Uma chamada por chave em andamento; os pedidos iguais esperam a mesma ``SharedCall``."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.joined = 0
+
+    def submit(self, key, func, *args, on_result=None, **kwargs):
+        """Chama ``func(*args, **kwargs)`` no pool, ou entra na chamada igual em andamento.
+
+        ``func`` pode devolver o texto ou um gerador de pedaços. Devolve
+        ``(call, joined)``; ``joined`` indica que outro pedido já fazia a
+        chamada. ``on_result(texto)`` roda uma vez, antes de liberar quem
+        espera (ex.: gravar no cache).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.joined += 1
+                return call, True
+            call = self._calls[key] = SharedCall()
+            self.calls += 1
+            # Dentro do lock: quem entrar na chamada já encontra o ticket (fila e início)
+            call.ticket = self.pool.submit(self._run, key, call, func, args, kwargs, on_result)
+        return call, False
+
+    def _run(self, key, call, func, args, kwargs, on_result):
+        error = None
+        try:
+            result = func(*args, **kwargs)
+            pieces = [result] if isinstance(result, str) else result
+            text = []
+            for piece in pieces:
+                text.append(piece)
+                call.publish(piece)
+            if on_result is not None:
+                on_result("".join(text))
+        except BaseException as exc:
+            error = exc
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.finish(error)
+
+    def in_flight_for(self, key):
+        """Há uma chamada em andamento para ``key``? (Entrar nela não ocupa a fila.)"""
+        with self._lock:
+            return key in self._calls
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        return {"calls": self.calls, "joined": self.joined, "in_flight": self.in_flight()}
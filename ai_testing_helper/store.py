@@ -0,0 +1,395 @@
+"""Armazenamento compartilhado entre os workers (histórico e cache de respostas).
+
+Com vários processos do Streamlit atrás do proxy, o estado que antes vivia no
+processo (``st.session_state`` e o cache em memória) precisa sobreviver à
+troca de worker e a reinícios. ``SHARED_STORE_URL`` escolhe o backend:
+
+- ``redis://host:6379/0``: Redis (pacote ``redis``, opcional)
+- ``sqlite:////caminho/arquivo.db``: SQLite local, para vários workers na mesma máquina
+- ``memory://``: dicionário em memória, para testes
+
+Todos seguem o mesmo subconjunto da interface do Redis (strings com TTL,
+contadores e listas), então o restante do código não sabe qual backend está em
+uso.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from ai_testing_helper.cache import DEFAULT_MAX_BYTES
+
+DEFAULT_SHARED_DB = os.path.join(tempfile.gettempdir(), "ai_testing_helper_shared.db")
+DEFAULT_CONVERSATION_TTL = 7 * 24 * 60 * 60
+
+# Id de conversa gerado pela aplicação (uuid4().hex); outro valor vindo da URL é descartado
+_CONVERSATION_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _list_range(items, start, stop):
+    """Fatia no formato do ``LRANGE`` do Redis (``stop`` incluído, negativos a partir do fim)."""
+    length = len(items)
+    if start < 0:
+        start = max(length + start, 0)
+    if stop < 0:
+        stop += length
+    return list(items[start:stop + 1])
+
+
+class MemoryStore:
+    """Backend em memória, seguro entre threads; serve de substituto do Redis nos testes."""
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._values = {}
+        self._lists = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= self._clock():
+            self._values.pop(key, None)
+            self._lists.pop(key, None)
+            del self._expires[key]
+        return key in self._values or key in self._lists
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        with self._lock:
+            return self._values.get(key) if self._alive(key) else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._lists.pop(key, None)
+            self._values[key] = value
+            if ttl is None:
+                self._expires.pop(key, None)
+            else:
+                self._expires[key] = self._clock() + ttl
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+                self._lists.pop(key, None)
+                self._expires.pop(key, None)
+
+    def expire(self, key, ttl):
+        with self._lock:
+            if self._alive(key):
+                self._expires[key] = self._clock() + ttl
+
+    def incrby(self, key, amount):
+        with self._lock:
+            value = int(self._values.get(key, 0) if self._alive(key) else 0) + amount
+            self._values[key] = str(value)
+            return value
+
+    def rpush(self, key, *values):
+        with self._lock:
+            self._alive(key)
+            items = self._lists.setdefault(key, [])
+            items.extend(values)
+            return len(items)
+
+    def lpop(self, key):
+        with self._lock:
+            items = self._lists.get(key) if self._alive(key) else None
+            if not items:
+                return None
+            value = items.pop(0)
+            if not items:
+                del self._lists[key]
+                self._expires.pop(key, None)
+            return value
+
+    def lrange(self, key, start, stop):
+        with self._lock:
+            return _list_range(self._lists.get(key, []), start, stop) if self._alive(key) else []
+
+    def llen(self, key):
+        with self._lock:
+            return len(self._lists.get(key, [])) if self._alive(key) else 0
+
+    def count(self, prefix):
+        """Chaves com o prefixo (usado nas estatísticas)."""
+        with self._lock:
+            return sum(1 for key in list(self._values) + list(self._lists)
+                       if key.startswith(prefix) and self._alive(key))
+
+
+class SQLiteStore:
+    """Backend em SQLite: vários processos na mesma máquina dividem o arquivo."""
+
+    def __init__(self, path=DEFAULT_SHARED_DB, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS list_items ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_list_key ON list_items (key, id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS list_expiry ("
+                " key TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _purge(self, conn, key):
+        now = self._clock()
+        conn.execute("DELETE FROM kv WHERE key = ? AND expires_at <= ?", (key, now))
+        if conn.execute("DELETE FROM list_expiry WHERE key = ? AND expires_at <= ?", (key, now)).rowcount:
+            conn.execute("DELETE FROM list_items WHERE key = ?", (key,))
+
+    def ping(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1").fetchone() == (1,)
+
+    def get(self, key):
+        with self._lock, self._connect() as conn:
+            self._purge(conn, key)
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        expires_at = None if ttl is None else self._clock() + ttl
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM list_items WHERE key = ?", (key,))
+            conn.execute("DELETE FROM list_expiry WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+            )
+            # Remove as chaves vencidas que ninguém mais leu
+            conn.execute("DELETE FROM kv WHERE expires_at <= ?", (self._clock(),))
+
+    def delete(self, *keys):
+        with self._lock, self._connect() as conn:
+            for key in keys:
+                conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+                conn.execute("DELETE FROM list_items WHERE key = ?", (key,))
+                conn.execute("DELETE FROM list_expiry WHERE key = ?", (key,))
+
+    def expire(self, key, ttl):
+        expires_at = self._clock() + ttl
+        with self._lock, self._connect() as conn:
+            self._purge(conn, key)
+            conn.execute("UPDATE kv SET expires_at = ? WHERE key = ?", (expires_at, key))
+            if conn.execute("SELECT 1 FROM list_items WHERE key = ? LIMIT 1", (key,)).fetchone():
+                conn.execute(
+                    "INSERT OR REPLACE INTO list_expiry (key, expires_at) VALUES (?, ?)", (key, expires_at)
+                )
+
+    def incrby(self, key, amount):
+        with self._lock, self._connect() as conn:
+            # Trava a escrita desde a leitura: outros processos não perdem incrementos
+            conn.execute("BEGIN IMMEDIATE")
+            self._purge(conn, key)
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            value = (int(row[0]) if row else 0) + amount
+            if row:
+                conn.execute("UPDATE kv SET value = ? WHERE key = ?", (str(value), key))
+            else:
+                conn.execute("INSERT INTO kv (key, value, expires_at) VALUES (?, ?, NULL)", (key, str(value)))
+            return value
+
+    def rpush(self, key, *values):
+        with self._lock, self._connect() as conn:
+            self._purge(conn, key)
+            conn.executemany("INSERT INTO list_items (key, value) VALUES (?, ?)", [(key, v) for v in values])
+            return conn.execute("SELECT COUNT(*) FROM list_items WHERE key = ?", (key,)).fetchone()[0]
+
+    def lpop(self, key):
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._purge(conn, key)
+            row = conn.execute(
+                "SELECT id, value FROM list_items WHERE key = ? ORDER BY id LIMIT 1", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM list_items WHERE id = ?", (row[0],))
+            return row[1]
+
+    def lrange(self, key, start, stop):
+        with self._lock, self._connect() as conn:
+            self._purge(conn, key)
+            rows = conn.execute("SELECT value FROM list_items WHERE key = ? ORDER BY id", (key,)).fetchall()
+        return _list_range([row[0] for row in rows], start, stop)
+
+    def llen(self, key):
+        with self._lock, self._connect() as conn:
+            self._purge(conn, key)
+            return conn.execute("SELECT COUNT(*) FROM list_items WHERE key = ?", (key,)).fetchone()[0]
+
+    def count(self, prefix):
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM kv WHERE key LIKE ? ESCAPE '\\' AND (expires_at IS NULL OR expires_at > ?)",
+                (pattern, self._clock()),
+            ).fetchone()[0]
+
+
+class RedisStore:
+    """Backend Redis (ou compatível); requer o pacote ``redis``."""
+
+    def __init__(self, url, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.url = url
+        self.client = client
+
+    def ping(self):
+        return bool(self.client.ping())
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def expire(self, key, ttl):
+        self.client.expire(key, ttl)
+
+    def incrby(self, key, amount):
+        return self.client.incrby(key, amount)
+
+    def rpush(self, key, *values):
+        return self.client.rpush(key, *values)
+
+    def lpop(self, key):
+        return self.client.lpop(key)
+
+    def lrange(self, key, start, stop):
+        return self.client.lrange(key, start, stop)
+
+    def llen(self, key):
+        return self.client.llen(key)
+
+    def count(self, prefix):
+        return sum(1 for _ in self.client.scan_iter(match=f"{prefix}*", count=1000))
+
+
+def open_store(url):
+    """Abre o backend pela URL (``redis://``, ``rediss://``, ``sqlite:///caminho`` ou ``memory://``)."""
+    scheme, _, rest = url.partition("://")
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisStore(url)
+    if scheme == "sqlite":
+        # Como no SQLAlchemy: sqlite:///relativo.db e sqlite:////caminho/absoluto.db
+        return SQLiteStore(rest[1:] if rest.startswith("/") else rest)
+    if scheme == "memory":
+        return MemoryStore()
+    raise ValueError(f"SHARED_STORE_URL não suportada: {url}")
+
+
+class StoreCache:
+    """Nível compartilhado do ``ResponseCache`` sobre o armazenamento (mesma interface do ``SQLiteCache``).
+
+    Como no ``SQLiteCache``, o total fica limitado a ``max_bytes``: cada
+    resposta nova entra em uma fila (lista) e soma seu tamanho a um contador;
+    passando do limite, as respostas mais antigas saem primeiro. A fila e o
+    contador ficam no próprio armazenamento, então o limite vale para todos os
+    workers juntos.
+    """
+
+    def __init__(self, store, ttl_seconds=None, max_bytes=DEFAULT_MAX_BYTES, prefix="response:"):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        # Fora do prefixo das respostas, para não entrarem na contagem de ``len``
+        self.index_key = f"index:{prefix}"
+        self.bytes_key = f"bytes:{prefix}"
+
+    def __len__(self):
+        return self.store.count(self.prefix)
+
+    def get(self, key):
+        return self.store.get(self.prefix + key)
+
+    def set(self, key, value):
+        is_new = self.store.get(self.prefix + key) is None
+        self.store.set(self.prefix + key, value, ttl=self.ttl_seconds)
+        if not is_new:
+            return
+        size = len(value.encode("utf-8"))
+        self.store.rpush(self.index_key, json.dumps([key, size]))
+        total = self.store.incrby(self.bytes_key, size)
+        # Remove as respostas mais antigas até caber no limite (as vencidas pelo TTL também saem por aqui)
+        while total > self.max_bytes:
+            item = self.store.lpop(self.index_key)
+            if item is None:
+                break
+            old_key, old_size = json.loads(item)
+            self.store.delete(self.prefix + old_key)
+            total = self.store.incrby(self.bytes_key, -old_size)
+
+    def clear(self):
+        pass  # As entradas vencem pelo TTL; outros workers podem estar usando
+
+
+class ConversationLog:
+    """Mensagens de uma conversa no armazenamento, para restaurá-la em qualquer worker.
+
+    A conversa é identificada por ``conversation_id`` (na URL da página), não
+    pela sessão do Streamlit, que se perde quando o worker reinicia. O id vem
+    do navegador: só um id no formato gerado aqui (32 dígitos hexadecimais) é
+    aceito; qualquer outro valor vira uma conversa nova.
+    """
+
+    def __init__(self, store, conversation_id=None, ttl_seconds=DEFAULT_CONVERSATION_TTL):
+        self.store = store
+        if not isinstance(conversation_id, str) or not _CONVERSATION_ID.fullmatch(conversation_id):
+            conversation_id = uuid.uuid4().hex
+        self.conversation_id = conversation_id
+        self.ttl_seconds = ttl_seconds
+        self.key = f"conversation:{self.conversation_id}"
+
+    def append(self, message):
+        self.store.rpush(self.key, json.dumps(
+            {"role": message.get("role"), "content": message.get("content")}, ensure_ascii=False
+        ))
+        self.store.expire(self.key, self.ttl_seconds)
+
+    def load(self):
+        return [json.loads(item) for item in self.store.lrange(self.key, 0, -1)]
+
+    def clear(self):
+        self.store.delete(self.key)
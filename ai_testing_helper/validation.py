@@ -0,0 +1,343 @@
+"""Validação dos testes gerados: execução com o pytest em uma sandbox.
+
+Os blocos de código Python da resposta são código escrito pelo modelo, ou
+seja, não confiável. Cada execução acontece em um processo novo, descartado
+ao final, dentro da sandbox de ``ai_testing_helper.sandbox``: sem rede, como
+usuário sem privilégios, vendo só o interpretador, as bibliotecas e o
+diretório temporário com os testes (nada da aplicação, nem o ``.env``), com
+limite de memória, de CPU e de tempo. Sem a sandbox, nada é executado.
+Respostas com muitos testes são divididas em partes executadas em paralelo.
+Se algo falhar, a saída do pytest volta ao modelo em um único pedido de
+correção. A validação é ligada só pelo operador (``VALIDATE_TESTS``).
+"""
+
+import ast
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_testing_helper import sandbox
+from ai_testing_helper.generation import generate_response, is_error_response
+from ai_testing_helper.metrics import metrics
+from ai_testing_helper.routing import extract_code
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_TIMEOUT = 10
+DEFAULT_MEMORY_MB = 1024
+# Respostas com pelo menos o dobro disso são divididas entre as execuções
+MIN_TESTS_PER_SHARD = 5
+# Folga para o pytest iniciar e devolver o resultado além do tempo limite dos testes
+RESULT_GRACE_SECONDS = 5
+MAX_OUTPUT_CHARS = 4000
+
+TEST_FILE = "test_gerado.py"
+RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "validation_runner.py")
+# Caminho do executor dentro da sandbox (montado só para leitura)
+SANDBOX_RUNNER = "/opt/ai_testing_helper/validation_runner.py"
+
+REPAIR_PROMPT = """Os testes abaixo foram executados com o pytest e não passaram.
+Corrija os testes e responda com o arquivo de testes completo em um único bloco de código python.
+Se a falha mostrar um bug real no código testado, mantenha o teste e explique o bug em um comentário.
+
+Código testado:
+```python
+{source}
+```
+
+Testes:
+```python
+{tests}
+```
+
+Saída do pytest:
+```
+{output}
+```"""
+
+ShardResult = namedtuple("ShardResult", "status passed failed errors output seconds")
+ValidationOutcome = namedtuple("ValidationOutcome", "answer report first_report repaired")
+
+_BLOCK = re.compile(r"```[ \t]*([\w+#.-]*)[^\n]*\n(.*?)```", re.DOTALL)
+_TEST_NODE = re.compile(r"^(?:test|Test)")
+
+
+class ValidationReport:
+    """Resultado da execução de todas as partes de uma resposta."""
+
+    def __init__(self, shards):
+        self.shards = list(shards)
+        self.passed = sum(shard.passed for shard in self.shards)
+        self.failed = sum(shard.failed for shard in self.shards)
+        self.errors = sum(shard.errors for shard in self.shards)
+        self.seconds = max((shard.seconds for shard in self.shards), default=0.0)
+        statuses = {shard.status for shard in self.shards}
+        for status in ("timeout", "error", "failed", "passed"):
+            if status in statuses:
+                self.status = status
+                break
+        else:
+            self.status = "error"
+
+    @property
+    def ok(self):
+        return self.status == "passed"
+
+    @property
+    def problems(self):
+        return self.failed + self.errors + sum(shard.status == "timeout" for shard in self.shards)
+
+    @property
+    def output(self):
+        text = "\n\n".join(shard.output for shard in self.shards if shard.output)
+        return text[:MAX_OUTPUT_CHARS]
+
+    def summary(self):
+        total = self.passed + self.failed
+        if self.status == "timeout":
+            return f"Validação: tempo esgotado ({self.passed} testes passaram antes)"
+        if self.errors:
+            return f"Validação: {self.errors} erro(s) de importação ou coleta, {self.passed}/{total} testes passaram"
+        if self.failed:
+            return f"Validação: {self.failed} de {total} testes falharam"
+        if not total:
+            return "Validação: nenhum teste coletado"
+        return f"Validação: {total} testes passaram"
+
+
+def python_blocks(answer):
+    """Blocos de código Python da resposta (sem linguagem: só se forem Python válido)."""
+    blocks = []
+    for language, code in _BLOCK.findall(answer or ""):
+        language = language.lower()
+        if language in ("python", "py", "python3"):
+            blocks.append(code.strip("\n"))
+        elif not language:
+            try:
+                ast.parse(code)
+            except SyntaxError:
+                continue
+            blocks.append(code.strip("\n"))
+    return blocks
+
+
+def extract_tests(answer):
+    """Código de testes da resposta, ou ``None`` se ela não tiver testes em Python."""
+    code = "\n\n\n".join(python_blocks(answer))
+    if not re.search(r"^\s*(?:async\s+)?def\s+test|^\s*class\s+Test", code, re.MULTILINE):
+        return None
+    return code
+
+
+def find_source(prompt, messages=()):
+    """Código testado: o da pergunta ou, se ela não tiver, o da última pergunta com código."""
+    code = extract_code(prompt)
+    if code.strip():
+        return code
+    for message in reversed(list(messages)):
+        if message.get("role") == "user":
+            code = extract_code(message.get("content"))
+            if code.strip():
+                return code
+    return ""
+
+
+def _segments(code):
+    """``(nó, trecho)`` de cada comando de primeiro nível, com os decoradores."""
+    tree = ast.parse(code)
+    lines = code.splitlines()
+    for node in tree.body:
+        start = (node.decorator_list[0].lineno if getattr(node, "decorator_list", None) else node.lineno) - 1
+        yield node, "\n".join(lines[start:node.end_lineno])
+
+
+def split_tests(code, shards):
+    """Divide os testes em até ``shards`` arquivos; o restante (imports, fixtures...) vai em todos."""
+    try:
+        segments = list(_segments(code))
+    except SyntaxError:
+        return [code]
+    header, tests = [], []
+    for node, segment in segments:
+        is_test = isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+        (tests if is_test and _TEST_NODE.match(node.name) else header).append(segment)
+    shards = max(1, min(shards, len(tests) // MIN_TESTS_PER_SHARD))
+    if shards == 1:
+        return [code]
+    prefix = "\n\n\n".join(header)
+    return [
+        "\n\n\n".join(filter(None, [prefix] + tests[index::shards]))
+        for index in range(shards)
+    ]
+
+
+def _defined_names(source):
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return set()
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Assign):
+            names.update(target.id for target in node.targets if isinstance(target, ast.Name))
+    return names
+
+
+def source_modules(tests, source):
+    """Módulos que os testes importam esperando encontrar o código testado.
+
+    ``from calculadora import soma`` aponta para o código testado quando ele
+    define ``soma``; ``import calculadora`` quando os testes usam
+    ``calculadora.<algo definido no código>``.
+    """
+    defined = _defined_names(source)
+    try:
+        tree = ast.parse(tests)
+    except SyntaxError:
+        return set()
+    attributes = {
+        (node.value.id, node.attr) for node in ast.walk(tree)
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+    }
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = {alias.name for alias in node.names}
+            if node.module != "__future__" and names and names <= defined | {"*"}:
+                modules.add(node.module)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                local = alias.asname or alias.name
+                if any((local, attribute) in attributes for attribute in defined):
+                    modules.add(alias.name)
+    return modules - set(sys.stdlib_module_names)
+
+
+def build_files(tests, source):
+    """Arquivos do diretório de execução: os testes e o código testado nos módulos importados."""
+    files = {}
+    modules = source_modules(tests, source) if source else set()
+    for module in modules:
+        parts = module.split(".")
+        for depth in range(1, len(parts)):
+            files.setdefault(os.path.join(*parts[:depth], "__init__.py"), "")
+        files[os.path.join(*parts) + ".py"] = source
+    if source and not modules and not (_defined_names(source) <= _defined_names(tests)):
+        # Testes escritos como se estivessem no mesmo arquivo do código
+        tests = f"{source}\n\n\n{tests}"
+    files[TEST_FILE] = tests
+    return files
+
+
+# --- Execução na sandbox ---
+
+def run_shard(files, timeout=DEFAULT_TIMEOUT, memory_mb=DEFAULT_MEMORY_MB):
+    """Executa o pytest com ``files`` (caminho -> código) em um processo novo na sandbox."""
+    started = time.perf_counter()
+    reason = sandbox.unavailable_reason()
+    if reason is not None:
+        # Sem isolamento o código gerado não é executado
+        return ShardResult("error", 0, 0, 1, f"Sandbox indisponível: {reason}", 0.0)
+    directory = tempfile.mkdtemp(prefix="ai_testing_helper_validation_")
+    try:
+        for name, code in files.items():
+            file_path = os.path.join(directory, name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w", encoding="utf-8") as handle:
+                handle.write(code)
+        completed = sandbox.run(
+            [sys.executable, "-I", "-B", SANDBOX_RUNNER, TEST_FILE, str(timeout)],
+            work_dir=directory, timeout=timeout + RESULT_GRACE_SECONDS, memory_mb=memory_mb,
+            files={SANDBOX_RUNNER: RUNNER},
+        )
+    except subprocess.TimeoutExpired:
+        return ShardResult("timeout", 0, 0, 0, f"Tempo limite de {timeout} s esgotado",
+                           time.perf_counter() - started)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    seconds = time.perf_counter() - started
+    try:
+        result = json.loads(completed.stdout)
+    except ValueError:
+        # Processo encerrado antes do resultado: limite de CPU, memória ou falha da sandbox
+        status = "timeout" if completed.returncode < 0 else "error"
+        detail = completed.stderr.decode("utf-8", "replace")[-MAX_OUTPUT_CHARS:]
+        return ShardResult(status, 0, 0, int(status == "error"),
+                           detail or f"Execução encerrada com código {completed.returncode}", seconds)
+    return ShardResult(result["status"], result["passed"], result["failed"], result["errors"],
+                       result["output"], seconds)
+
+
+class ValidationPool:
+    """Executa os testes gerados, cada parte em um processo descartável e isolado.
+
+    Nada é reaproveitado entre execuções: cada parte roda em um processo
+    novo na sandbox (``ai_testing_helper.sandbox``), sem rede, como usuário
+    sem privilégios e sem acesso aos arquivos da aplicação. Até ``workers``
+    partes rodam ao mesmo tempo.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, memory_mb=DEFAULT_MEMORY_MB):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="validation")
+
+    def warm(self):
+        """Verifica se a sandbox funciona neste servidor; devolve o motivo se não funcionar."""
+        return sandbox.unavailable_reason()
+
+    def run(self, shards):
+        """Executa cada parte (dicionário de arquivos) em paralelo; um ``ShardResult`` por parte."""
+        jobs = [self._executor.submit(run_shard, files, self.timeout, self.memory_mb) for files in shards]
+        results = []
+        for job in jobs:
+            try:
+                results.append(job.result())
+            except Exception as error:
+                results.append(ShardResult("error", 0, 0, 1, f"{error!r}", 0.0))
+        return results
+
+    def validate(self, tests, source=""):
+        """Executa ``tests`` contra ``source`` e devolve o ``ValidationReport``."""
+        with metrics.timer("validation_seconds"):
+            shards = [build_files(part, source) for part in split_tests(tests, self.workers)]
+            return ValidationReport(self.run(shards))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def build_repair_prompt(tests, source, report):
+    return REPAIR_PROMPT.format(source=source or "(não informado)", tests=tests, output=report.output)
+
+
+def validate_answer(pool, model, answer, source, repair=True, generate=generate_response):
+    """Executa os testes da resposta e, se falharem, faz uma rodada de correção com o modelo.
+
+    Devolve um ``ValidationOutcome``: ``answer`` é a resposta corrigida quando
+    a correção resolve mais problemas do que cria; ``report`` é ``None`` se
+    a resposta não tiver testes em Python.
+    """
+    tests = extract_tests(answer)
+    if tests is None:
+        return ValidationOutcome(answer, None, None, False)
+    first = pool.validate(tests, source)
+    if first.ok or not repair:
+        return ValidationOutcome(answer, first, first, False)
+    repaired = generate(model, [], build_repair_prompt(tests, source, first))
+    repaired_tests = None if is_error_response(repaired) else extract_tests(repaired)
+    if repaired_tests is None:
+        return ValidationOutcome(answer, first, first, False)
+    second = pool.validate(repaired_tests, source)
+    if second.ok or second.problems < first.problems:
+        return ValidationOutcome(repaired, second, first, True)
+    return ValidationOutcome(answer, first, first, False)
@@ -0,0 +1,100 @@
+"""Executa o pytest dentro da sandbox e escreve o resultado (JSON) na saída padrão.
+
+Roda isolado (ver ``ai_testing_helper.sandbox``), sem o pacote instalado:
+usa só a biblioteca padrão e o pytest. Uso:
+``python -I -B validation_runner.py <arquivo de testes> <tempo limite>``.
+"""
+
+import io
+import json
+import os
+import signal
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+
+MAX_OUTPUT_CHARS = 4000
+
+
+class Collector:
+    """Plugin do pytest que conta os resultados e guarda as falhas."""
+
+    def __init__(self):
+        self.passed = self.failed = self.errors = 0
+        self.failures = []
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self.errors += 1
+            self.failures.append(f"ERRO DE COLETA {report.nodeid}\n{report.longreprtext}")
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == "call":
+            if report.passed:
+                self.passed += 1
+            elif report.failed:
+                self.failed += 1
+                self.failures.append(f"FALHOU {report.nodeid}\n{report.longreprtext}")
+        elif report.failed:
+            self.errors += 1
+            self.failures.append(f"ERRO ({report.when}) {report.nodeid}\n{report.longreprtext}")
+
+
+def run(test_file, timeout):
+    """Executa o pytest no diretório atual; devolve o resultado como dicionário."""
+    import pytest
+
+    collector = Collector()
+    output = io.StringIO()
+    timed_out = False
+
+    def on_alarm(signum, frame):
+        nonlocal timed_out
+        timed_out = True
+        # Encerra a sessão do pytest (e não só o teste atual); repete a cada segundo
+        pytest.exit(f"tempo limite de {timeout} s esgotado", returncode=pytest.ExitCode.INTERRUPTED)
+
+    with open("pytest.ini", "w", encoding="utf-8") as handle:
+        handle.write("[pytest]\n")
+    signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout, 1.0)
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            exit_code = pytest.main(
+                ["-q", "-c", "pytest.ini", "--rootdir", ".", "--confcutdir", ".",
+                 "-p", "no:cacheprovider", "--tb=short", "-W", "ignore", test_file],
+                plugins=[collector],
+            )
+    except pytest.exit.Exception:
+        timed_out = True
+        exit_code = None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+    if timed_out:
+        status = "timeout"
+        collector.failures.append(f"Tempo limite de {timeout} s esgotado")
+    elif collector.errors or exit_code not in (0, 1):
+        status = "error"
+        if not collector.failures:
+            collector.failures.append(output.getvalue()[-MAX_OUTPUT_CHARS:] or f"pytest terminou com código {exit_code}")
+    elif collector.failed:
+        status = "failed"
+    else:
+        status = "passed"
+    return {"status": status, "passed": collector.passed, "failed": collector.failed,
+            "errors": collector.errors, "output": "\n\n".join(collector.failures)}
+
+
+def main(argv):
+    # O resultado sai pela saída padrão original; o que os testes escreverem vai para um arquivo
+    result_fd = os.dup(1)
+    scratch = os.open("/tmp/saida_dos_testes", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.dup2(scratch, 1)
+    os.dup2(scratch, 2)
+    result = run(argv[1], float(argv[2]))
+    with os.fdopen(result_fd, "w", encoding="utf-8") as out:
+        json.dump(result, out)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,65 @@
+"""Teste de carga do pool de geração com um modelo lento simulado.
+
+Dispara vários pedidos simultâneos contra generate_response usando um modelo
+falso com latência fixa e mostra a vazão e a espera média na fila para cada
+limite de concorrência.
+
+Uso:
+    python benchmarks/bench_concurrency.py --requests 32 --latency 0.2
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-api-key")
+
+from ai_testing_helper.concurrency import GenerationPool  # noqa: E402
+
+
+class SlowModel:
+    """Modelo falso que só espera ``latency`` segundos (como a rede)."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, prompt, stream=False):
+        time.sleep(self.latency)
+        return type("Response", (), {"text": "def test_ok(): assert True"})()
+
+
+def run(limit, requests, latency):
+    from ai_testing_helper.generation import generate_response
+
+    model = SlowModel(latency)
+    pool = GenerationPool(max_concurrency=limit)
+    start = time.perf_counter()
+    tickets = [
+        pool.submit(generate_response, model, [], f"def f{i}(): pass") for i in range(requests)
+    ]
+    for ticket in tickets:
+        ticket.result()
+    elapsed = time.perf_counter() - start
+    stats = pool.stats()
+    pool.shutdown()
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    print(f"{'limite':>7} {'tempo (s)':>10} {'pedidos/s':>10} {'espera média (s)':>17}")
+    for limit in args.limits:
+        elapsed, stats = run(limit, args.requests, args.latency)
+        print(f"{limit:>7} {elapsed:>10.2f} {args.requests / elapsed:>10.1f} {stats['avg_wait']:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
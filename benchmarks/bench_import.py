@@ -0,0 +1,63 @@
+"""Benchmark de tempo de importação do AI Testing Helper.
+
+Cada módulo é importado em um interpretador novo com ``python -X importtime``,
+então o resultado inclui todas as dependências carregadas por ele. Serve para
+conferir que o pacote (usado pelos testes e pela CLI) não puxa o Streamlit nem
+o SDK do Gemini, e que ``import main`` não monta a página.
+
+Uso:
+    python benchmarks/bench_import.py --iterations 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "ai_testing_helper",
+    "ai_testing_helper.resources",
+    "ai_testing_helper.batch",
+    "main",
+    "streamlit",
+    "google.generativeai",
+]
+
+
+def import_time(module):
+    """Tempo cumulativo (ms) de importar ``module`` e os módulos carregados por ele."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Formato: "import time: self [us] | cumulative | imported package"
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Apenas os módulos de nível mais alto, para não contar duas vezes
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return total / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        samples = [import_time(module) for _ in range(args.iterations)]
+        print(f"{module:<30} média {statistics.mean(samples):9.1f} ms"
+              f"   mediana {statistics.median(samples):9.1f} ms   (n={len(samples)})")
+
+
+if __name__ == "__main__":
+    main()
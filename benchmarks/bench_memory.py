@@ -0,0 +1,85 @@
+"""Benchmark de memória do histórico de várias sessões simultâneas.
+
+Simula N sessões, cada uma com um histórico longo de respostas com código, e
+mede com ``tracemalloc`` a memória retida pela lista de dicts (como era) e
+pelo ``MessageStore`` com o limite de mensagens em memória. Use o resultado
+para dimensionar a instância (ex.: quantas sessões cabem em um t2.micro).
+
+Uso:
+    python benchmarks/bench_memory.py --sessions 50 --messages 400 --resident 50
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai_testing_helper.messages import MessageStore  # noqa: E402
+
+REPLY = (
+    "Seguem os testes:\n\n```python\n"
+    + "\n".join(f"def test_caso_{i}():\n    assert soma({i}, 1) == {i + 1}\n" for i in range(40))
+    + "```\n"
+)
+
+
+def make_history(session, length):
+    """Mensagens com conteúdo único por sessão (nada é compartilhado entre sessões)."""
+    for i in range(length):
+        if i % 2 == 0:
+            yield {"role": "user", "content": f"[{session}] Crie testes para a função {i}"}
+        else:
+            yield {"role": "assistant", "content": f"[{session}] {REPLY}<!-- {i} -->"}
+
+
+def measure(build):
+    """Memória (MB) retida pelos objetos criados por ``build``."""
+    gc.collect()
+    tracemalloc.start()
+    retained = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    gc.collect()
+    return current / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--resident", type=int, default=50)
+    parser.add_argument("--instance-mb", type=int, default=1024,
+                        help="memória disponível para sessões na instância (MB)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "messages.db")
+        results = {
+            "lista de dicts": measure(lambda: [
+                list(make_history(s, args.messages)) for s in range(args.sessions)
+            ]),
+            f"MessageStore ({args.resident} em memória)": measure(lambda: [
+                MessageStore(make_history(s, args.messages), max_resident=args.resident, path=path)
+                for s in range(args.sessions)
+            ]),
+        }
+        disk_mb = os.path.getsize(path) / (1024 * 1024) if os.path.exists(path) else 0.0
+
+    print(f"{args.sessions} sessões x {args.messages} mensagens")
+    for label, total in results.items():
+        per_session = total / args.sessions
+        capacity = int(args.instance_mb / per_session) if per_session else 0
+        print(f"{label:<32} total {total:8.1f} MB   por sessão {per_session:7.3f} MB"
+              f"   ~{capacity} sessões em {args.instance_mb} MB")
+    print(f"SQLite em disco (após coletar as sessões): {disk_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark do tempo de rerun em função do tamanho do histórico.
+
+Carrega na sessão um histórico com respostas longas (texto e blocos de código)
+e mede o rerun da página via AppTest, com o histórico paginado (padrão) e com
+todas as mensagens exibidas. Não faz chamadas de rede: o modelo é apenas construído.
+
+Uso:
+    python benchmarks/bench_render.py --lengths 10 100 400 --iterations 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-api-key")
+
+LONG_REPLY = (
+    "Seguem os testes para a função:\n\n"
+    "```python\n"
+    + "\n".join(f"def test_caso_{i}():\n    assert soma({i}, 1) == {i + 1}\n" for i in range(40))
+    + "```\n\n"
+    "Os casos cobrem valores positivos, negativos e limites."
+)
+
+
+def make_history(length):
+    messages = []
+    for i in range(length // 2):
+        messages.append({"role": "user", "content": f"Crie testes para a função {i}"})
+        messages.append({"role": "assistant", "content": f"{LONG_REPLY}\n<!-- {i} -->"})
+    return messages
+
+
+def rerun_times(length, page_size, iterations):
+    """Tempos (ms) de rerun com ``length`` mensagens e a paginação informada."""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["HISTORY_PAGE_SIZE"] = str(page_size)
+    app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=120)
+    app.session_state["messages"] = make_history(length)
+    app.run()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 50, 200, 400])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'mensagens':>9} {'paginado (ms)':>14} {'completo (ms)':>14}")
+    for length in args.lengths:
+        paged = statistics.median(rerun_times(length, args.page_size, args.iterations))
+        full = statistics.median(rerun_times(length, length, args.iterations))
+        print(f"{length:>9} {paged:>14.1f} {full:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark de inicialização do AI Testing Helper.
+
+Mede o custo de cold start e o overhead de cada rerun/nova sessão do
+Streamlit, comparando o caminho antigo (load_dotenv + genai.configure +
+init_gemini em toda sessão) com os recursos compartilhados de
+ai_testing_helper.resources. Não faz chamadas de rede: o modelo é apenas construído.
+
+Uso:
+    python benchmarks/bench_startup.py --iterations 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-api-key")
+
+
+def timed(func, iterations):
+    """Executa ``func`` ``iterations`` vezes e devolve os tempos em ms."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label, samples):
+    print(f"{label:<45} média {statistics.mean(samples):9.3f} ms"
+          f"   mediana {statistics.median(samples):9.3f} ms   (n={len(samples)})")
+
+
+def bench_app(iterations):
+    """Tempo do script completo via AppTest: cold start, reruns e novas sessões."""
+    from streamlit.testing.v1 import AppTest
+
+    app_path = os.path.join(ROOT, "main.py")
+    start = time.perf_counter()
+    app = AppTest.from_file(app_path, default_timeout=60).run()
+    report("app: cold start (1ª sessão do processo)", [(time.perf_counter() - start) * 1000])
+    report("app: rerun da mesma sessão", timed(app.run, iterations))
+    report("app: nova sessão (nova aba)",
+           timed(lambda: AppTest.from_file(app_path, default_timeout=60).run(), iterations))
+
+
+def bench_setup(iterations):
+    """Custo do setup por sessão: caminho antigo x recursos compartilhados."""
+    import google.generativeai as genai
+    from dotenv import load_dotenv
+
+    from ai_testing_helper import generation, resources
+
+    api_key = os.environ["GEMINI_API_KEY"]
+
+    def legacy_setup():
+        # Caminho antigo: tudo recriado a cada sessão/rerun
+        load_dotenv()
+        genai.configure(api_key=api_key)
+        generation.init_gemini()
+        generation.init_gemini(system_instruction=generation.SYSTEM_INSTRUCTIONS)
+
+    def shared_setup():
+        resources.load_environment()
+        resources.configure_gemini(api_key)
+        resources.get_gemini_model(generation.GEMINI_MODEL_NAME, generation.GENERATION_CONFIG)
+        resources.get_gemini_model(generation.GEMINI_MODEL_NAME, generation.GENERATION_CONFIG, generation.SYSTEM_INSTRUCTIONS)
+
+    report("setup por sessão: antigo", timed(legacy_setup, iterations))
+    report("setup por sessão: compartilhado", timed(shared_setup, iterations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    bench_app(args.iterations)
+    bench_setup(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""Suíte de benchmarks com o modelo falso (sem rede), com histórico de resultados.
+
+Cenários:
+- core: ``generate_response`` e ``stream_response`` direto (latência e primeiro pedaço)
+- app: fluxo completo da página via ``AppTest``, um turno por vez
+- concurrent: várias sessões ``AppTest`` simultâneas (vazão e latência por turno)
+- memory: crescimento de memória ao longo de uma conversa longa
+
+Cada execução é gravada em ``benchmarks/results/`` com o commit atual; use
+``--compare`` para ver a diferença em relação a uma execução anterior.
+
+Uso:
+    python benchmarks/bench_suite.py --quick
+    python benchmarks/bench_suite.py --latency 0.2 --chunks 16 --error-rate 0.05
+    python benchmarks/bench_suite.py --compare latest --fail-on-regression
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-api-key")
+
+from fake_gemini import FakeProfile, install  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+APP_PATH = os.path.join(ROOT, "main.py")
+
+# Métricas em que um valor maior é melhor (as demais: menor é melhor)
+HIGHER_IS_BETTER = {"throughput"}
+
+
+def percentile(samples, q):
+    """Percentil com interpolação linear (q entre 0 e 100)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_stats(samples):
+    """p50/p95/p99 e média em milissegundos."""
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def bench_core(turns, run_id):
+    from ai_testing_helper.generation import generate_response, stream_response
+    from ai_testing_helper.resources import get_gemini_model
+
+    model = get_gemini_model()
+    history = []
+    blocking, first_chunk, streaming = [], [], []
+    for turn in range(turns):
+        prompt = f"[{run_id}] Crie testes para a função {turn}"
+        start = time.perf_counter()
+        response = generate_response(model, history, prompt)
+        blocking.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        chunks = stream_response(model, history, prompt)
+        next(chunks, None)
+        first_chunk.append(time.perf_counter() - start)
+        for _ in chunks:
+            pass
+        streaming.append(time.perf_counter() - start)
+        history += [{"role": "user", "content": prompt}, {"role": "assistant", "content": response}]
+    return {
+        "generate_response": latency_stats(blocking),
+        "stream_first_chunk": latency_stats(first_chunk),
+        "stream_response": latency_stats(streaming),
+    }
+
+
+def new_app():
+    from streamlit.testing.v1 import AppTest
+
+    return AppTest.from_file(APP_PATH, default_timeout=120).run()
+
+
+def run_turns(app, turns, prefix):
+    """Envia ``turns`` perguntas pela página e devolve o tempo de cada turno."""
+    samples = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        app.chat_input[0].set_value(f"{prefix} Crie testes para a função {turn}").run()
+        samples.append(time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(f"Erro na página: {app.exception}")
+    return samples
+
+
+def bench_app(turns, run_id):
+    results = {}
+    for streaming in (True, False):
+        app = new_app()
+        if not streaming:
+            app.toggle(key="streaming").set_value(False).run()
+        label = "app_streaming" if streaming else "app_blocking"
+        results[label] = latency_stats(run_turns(app, turns, f"[{run_id}:{label}]"))
+    return results
+
+
+def bench_concurrent(sessions, turns, run_id):
+    samples, errors = [], []
+    lock = threading.Lock()
+
+    def session(index):
+        try:
+            times = run_turns(new_app(), turns, f"[{run_id}:s{index}]")
+            with lock:
+                samples.extend(times)
+        except Exception as error:
+            errors.append(repr(error))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"Falha em {len(errors)} sessões: {errors[0]}")
+    stats = latency_stats(samples)
+    stats.update({"sessions": sessions, "throughput": len(samples) / elapsed})
+    return {"concurrent": stats}
+
+
+def bench_memory(turns, run_id, sample_every=10):
+    app = new_app()
+    tracemalloc.start()
+    points = []
+    try:
+        for block in range(0, turns, sample_every):
+            run_turns(app, min(sample_every, turns - block), f"[{run_id}:mem{block}]")
+            current, _ = tracemalloc.get_traced_memory()
+            points.append((block + sample_every, current))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Crescimento por turno após o aquecimento (primeiro ponto)
+    first_turn, first_bytes = points[0]
+    last_turn, last_bytes = points[-1]
+    growth = (last_bytes - first_bytes) / max(1, last_turn - first_turn)
+    return {"memory": {
+        "turns": turns,
+        "growth_kb_per_turn": growth / 1024,
+        "final_mb": last_bytes / (1024 * 1024),
+        "peak_mb": peak / (1024 * 1024),
+    }}
+
+
+def git_revision():
+    def git(*args):
+        result = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def save(report):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(report["timestamp"]))
+    path = os.path.join(RESULTS_DIR, f"{stamp}-{report['commit']}.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_baseline(reference, current_path):
+    """Resultado anterior: caminho de arquivo, ``latest`` ou prefixo de commit."""
+    if os.path.isfile(reference):
+        path = reference
+    else:
+        candidates = sorted(
+            p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != current_path
+        )
+        if reference != "latest":
+            candidates = [p for p in candidates if os.path.basename(p)[16:].startswith(reference)]
+        if not candidates:
+            return None, None
+        path = candidates[-1]
+    with open(path, encoding="utf-8") as handle:
+        return path, json.load(handle)
+
+
+def compare(report, baseline, threshold):
+    """Mostra a variação de cada métrica e devolve as regressões acima de ``threshold``."""
+    regressions = []
+    print(f"\nComparação com {baseline['commit']} ({time.ctime(baseline['timestamp'])})")
+    for scenario, metrics in report["results"].items():
+        previous = baseline["results"].get(scenario, {})
+        for name, value in metrics.items():
+            old = previous.get(name)
+            if name in ("n", "sessions", "turns") or not old:
+                continue
+            change = (value - old) / old
+            worse = -change if name in HIGHER_IS_BETTER else change
+            flag = "  <-- regressão" if worse > threshold else ""
+            print(f"  {scenario:<20} {name:<20} {old:10.2f} -> {value:10.2f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(f"{scenario}.{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=["core", "app", "concurrent", "memory"],
+                        choices=["core", "app", "concurrent", "memory"])
+    parser.add_argument("--turns", type=int, default=30, help="turnos por sessão")
+    parser.add_argument("--sessions", type=int, default=8, help="sessões simultâneas")
+    parser.add_argument("--memory-turns", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="segundos até o primeiro pedaço")
+    parser.add_argument("--chunk-interval", type=float, default=0.01)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--tokens-per-chunk", type=int, default=16)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--quick", action="store_true", help="poucos turnos, para conferir rapidamente")
+    parser.add_argument("--compare", metavar="REF",
+                        help="arquivo de resultado, 'latest' ou prefixo de commit para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="variação considerada regressão (padrão 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.turns, args.sessions, args.memory_turns = 5, 3, 20
+
+    profile = FakeProfile(args.latency, args.chunk_interval, args.chunks,
+                          args.tokens_per_chunk, args.error_rate, args.seed)
+    run_id = f"{time.time():.0f}"
+    results = {}
+    with install(profile):
+        if "core" in args.scenarios:
+            results.update(bench_core(args.turns, run_id))
+        if "app" in args.scenarios:
+            results.update(bench_app(args.turns, run_id))
+        if "concurrent" in args.scenarios:
+            results.update(bench_concurrent(args.sessions, args.turns, run_id))
+        if "memory" in args.scenarios:
+            results.update(bench_memory(args.memory_turns, run_id))
+
+    commit, dirty = git_revision()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "profile": profile._asdict(),
+        "params": {"turns": args.turns, "sessions": args.sessions, "memory_turns": args.memory_turns},
+        "results": results,
+    }
+
+    for scenario, metrics in results.items():
+        values = "   ".join(f"{name} {value:.2f}" if isinstance(value, float) else f"{name} {value}"
+                           for name, value in metrics.items())
+        print(f"{scenario:<20} {values}")
+
+    path = None
+    if not args.no_save:
+        path = save(report)
+        print(f"\nResultado gravado em {os.path.relpath(path, ROOT)}")
+
+    if args.compare:
+        baseline_path, baseline = load_baseline(args.compare, path)
+        if baseline is None:
+            print(f"\nNenhum resultado anterior encontrado para '{args.compare}'")
+        else:
+            regressions = compare(report, baseline, args.threshold)
+            if regressions and args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Teste de carga do modo com vários workers (proxy com sessões fixas).
+
+Sobe o proxy e 1, 2, 4... workers com o modelo falso (sem rede) e simula
+navegadores: cada cliente recebe o cookie do proxy, abre o websocket do
+Streamlit pela mesma porta e envia perguntas pelo ``st.chat_input``, como a
+página faria. Mostra a vazão (turnos/s), a latência por turno e como as
+sessões foram distribuídas entre os workers.
+
+Uso:
+    python benchmarks/bench_workers.py --workers 1 2 4 --clients 16 --turns 3
+    python benchmarks/bench_workers.py --workers 1 2 --latency 0.2 --chunks 16
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-api-key")
+
+from ai_testing_helper.deploy import WorkerGroup, wait_ready  # noqa: E402
+from ai_testing_helper.proxy import COOKIE_NAME, StickyProxy  # noqa: E402
+
+FACTORY = "bench_workers:create_fake_app"
+_installed = []
+
+
+def create_fake_app():
+    """Fábrica dos workers do benchmark: a página com o modelo falso (perfil em ``BENCH_*``)."""
+    from fake_gemini import FakeProfile, install
+
+    from ai_testing_helper.server import create_app
+
+    profile = FakeProfile(
+        latency=float(os.getenv("BENCH_LATENCY", "0.05")),
+        chunk_interval=float(os.getenv("BENCH_CHUNK_INTERVAL", "0.01")),
+        chunks=int(os.getenv("BENCH_CHUNKS", "8")),
+    )
+    # O modelo falso fica instalado durante toda a vida do worker (a referência evita que o
+    # gerenciador de contexto seja coletado e desfaça a troca)
+    fake = install(profile)
+    fake.__enter__()
+    _installed.append(fake)
+    return create_app()
+
+
+async def get_cookie(port):
+    """Primeira requisição do navegador: o proxy devolve o cookie do worker."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET / HTTP/1.0\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    await reader.read()
+    writer.close()
+    for line in head.decode("latin-1").split("\r\n"):
+        if line.lower().startswith("set-cookie:") and f"{COOKIE_NAME}=" in line:
+            return line.split(":", 1)[1].split(";")[0].strip()
+    return ""
+
+
+async def run_script(ws, widget=None, value=None):
+    """Envia um rerun (com o valor do chat_input) e espera o fim do script; devolve o id do chat_input."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    message = BackMsg()
+    message.rerun_script.query_string = ""
+    message.rerun_script.page_script_hash = ""
+    if widget is not None:
+        state = message.rerun_script.widget_states.widgets.add()
+        state.id = widget
+        state.chat_input_value.data = value
+    await ws.send(message.SerializeToString())
+    chat_input = None
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(await ws.recv())
+        kind = forward.WhichOneof("type")
+        if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+            element = forward.delta.new_element
+            if element.WhichOneof("type") == "chat_input":
+                chat_input = element.chat_input.id
+        elif kind == "script_finished":
+            return chat_input
+
+
+async def client(port, index, turns, latencies):
+    from websockets.asyncio.client import connect
+
+    cookie = await get_cookie(port)
+    async with connect(
+        f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+        origin=f"http://127.0.0.1:{port}", additional_headers={"Cookie": cookie}, max_size=None,
+    ) as ws:
+        chat_input = await run_script(ws)
+        for turn in range(turns):
+            start = time.perf_counter()
+            chat_input = await run_script(ws, chat_input, f"Como testar o caso {index}-{turn}?") or chat_input
+            latencies.append(time.perf_counter() - start)
+
+
+async def bench(workers, clients, turns, base_port, environ):
+    group = WorkerGroup(workers, base_port, FACTORY, app_dir=BENCH_DIR, environ=environ,
+                        output=subprocess.DEVNULL)
+    group.start_all()
+    proxy = StickyProxy(group.workers)
+    try:
+        if not await wait_ready(proxy, timeout=90):
+            raise RuntimeError("workers não ficaram prontos")
+        await proxy.start("127.0.0.1", 0)
+        # Um turno de aquecimento por worker (imports e recursos do processo)
+        await asyncio.gather(*(client(proxy.port, f"aquecimento{i}", 1, []) for i in range(workers)))
+        for worker in proxy.workers.values():
+            worker.sessions = 0
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*(client(proxy.port, i, turns, latencies) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+        return {
+            "throughput": len(latencies) / elapsed,
+            "mean_ms": sum(latencies) / len(latencies) * 1000,
+            "p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+            "sessions": [worker.sessions for worker in proxy.workers.values()],
+        }
+    finally:
+        await proxy.close()
+        group.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16, help="navegadores simultâneos")
+    parser.add_argument("--turns", type=int, default=3, help="perguntas por navegador")
+    parser.add_argument("--latency", type=float, default=0.05, help="segundos até o primeiro pedaço")
+    parser.add_argument("--chunk-interval", type=float, default=0.01)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--concurrency", type=int,
+                        help="GEMINI_MAX_CONCURRENCY de cada worker (limite de gerações simultâneas)")
+    parser.add_argument("--base-port", type=int, default=8701)
+    args = parser.parse_args()
+
+    # Com poucas CPUs, a vazão fica limitada pelos reruns do Streamlit, não pelo número de workers
+    print(f"CPUs: {os.cpu_count()} · navegadores: {args.clients} · turnos por navegador: {args.turns}")
+    print(f"{'workers':>7} {'turnos/s':>9} {'média ms':>9} {'p95 ms':>9}  sessões por worker")
+    baseline = None
+    for count in args.workers:
+        environ = dict(os.environ)
+        environ.update({
+            "BENCH_LATENCY": str(args.latency),
+            "BENCH_CHUNK_INTERVAL": str(args.chunk_interval),
+            "BENCH_CHUNKS": str(args.chunks),
+            "SHARED_STORE_URL": f"sqlite:///{tempfile.mkdtemp()}/shared.db",
+        })
+        if args.concurrency:
+            environ["GEMINI_MAX_CONCURRENCY"] = str(args.concurrency)
+        result = asyncio.run(bench(count, args.clients, args.turns, args.base_port, environ))
+        baseline = baseline or result["throughput"]
+        print(f"{count:>7} {result['throughput']:>9.2f} {result['mean_ms']:>9.0f} {result['p95_ms']:>9.0f}"
+              f"  {result['sessions']}  ({result['throughput'] / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
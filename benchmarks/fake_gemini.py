@@ -0,0 +1,131 @@
+"""GenerativeModel falso e determinístico para os benchmarks (sem rede).
+
+Simula a latência até o primeiro pedaço, o ritmo do streaming, a quantidade
+de tokens da resposta e uma taxa de erros transitórios. As respostas são
+objetos reais do SDK (``GenerateContentResponse``), então o cliente
+resiliente, a sessão de chat nativa e o ``usage_metadata`` funcionam como
+com o modelo de verdade.
+
+Uso:
+    with install(FakeProfile(latency=0.2, chunks=8)):
+        ...  # init_gemini / a página passam a usar o modelo falso
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai_testing_helper.client import _contents_text  # noqa: E402
+from ai_testing_helper.context_window import estimate_tokens  # noqa: E402
+
+# latency: segundos até o primeiro pedaço; chunk_interval: segundos entre pedaços;
+# chunks: pedaços por resposta; tokens_per_chunk: tokens de resposta por pedaço;
+# error_rate: fração das chamadas que falham com erro transitório (503)
+FakeProfile = namedtuple(
+    "FakeProfile", "latency chunk_interval chunks tokens_per_chunk error_rate seed",
+    defaults=(0.05, 0.01, 8, 16, 0.0, 1234),
+)
+
+
+def _chunk_text(index, tokens):
+    # ~4 caracteres por token, como na estimativa local
+    body = f"assert soma({index}, 1) == {index + 1}  # "
+    return (body + "x" * max(0, tokens * 4 - len(body) - 1)) + "\n"
+
+
+class FakeGenerativeModel:
+    """Substituto de ``genai.GenerativeModel`` com o comportamento de ``profile``."""
+
+    def __init__(self, model_name="fake-model", generation_config=None, system_instruction=None,
+                 profile=None, **kwargs):
+        self.model_name = model_name
+        self._generation_config = generation_config
+        self._system_instruction = system_instruction
+        self.profile = profile or FakeProfile()
+        self.calls = 0
+        self._random = random.Random(self.profile.seed)
+        self._lock = threading.Lock()
+
+    def _get_tools_lib(self, tools):
+        return None
+
+    def _should_fail(self):
+        with self._lock:
+            self.calls += 1
+            return self._random.random() < self.profile.error_rate
+
+    def _response(self, text, prompt_tokens, response_tokens):
+        from google.generativeai import protos
+
+        return protos.GenerateContentResponse(
+            candidates=[protos.Candidate(
+                content=protos.Content(role="model", parts=[protos.Part(text=text)]),
+                finish_reason=protos.Candidate.FinishReason.STOP,
+            )],
+            usage_metadata=protos.GenerateContentResponse.UsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=response_tokens,
+                total_token_count=prompt_tokens + response_tokens,
+            ),
+        )
+
+    def _chunks(self, prompt_tokens):
+        profile = self.profile
+        time.sleep(profile.latency)
+        for index in range(profile.chunks):
+            if index:
+                time.sleep(profile.chunk_interval)
+            last = index == profile.chunks - 1
+            yield self._response(
+                _chunk_text(index, profile.tokens_per_chunk),
+                prompt_tokens if last else 0,
+                profile.tokens_per_chunk * profile.chunks if last else 0,
+            )
+
+    def generate_content(self, contents=None, stream=False, **kwargs):
+        from google.api_core import exceptions
+        from google.generativeai.types import generation_types
+
+        if self._should_fail():
+            raise exceptions.ServiceUnavailable("falha simulada")
+        prompt_tokens = estimate_tokens(_contents_text(contents))
+        if stream:
+            return generation_types.GenerateContentResponse.from_iterator(self._chunks(prompt_tokens))
+        profile = self.profile
+        time.sleep(profile.latency + profile.chunk_interval * max(0, profile.chunks - 1))
+        text = "".join(_chunk_text(index, profile.tokens_per_chunk) for index in range(profile.chunks))
+        return generation_types.GenerateContentResponse.from_response(
+            self._response(text, prompt_tokens, profile.tokens_per_chunk * profile.chunks)
+        )
+
+    def count_tokens(self, contents=None, **kwargs):
+        return type("CountTokensResponse", (), {"total_tokens": estimate_tokens(_contents_text(contents))})()
+
+
+@contextmanager
+def install(profile=None):
+    """Troca ``genai.GenerativeModel`` pelo modelo falso e limpa os recursos do processo."""
+    from ai_testing_helper import resources
+
+    def factory(*args, **kwargs):
+        return FakeGenerativeModel(*args, profile=profile, **kwargs)
+
+    def reset():
+        resources.get_model_registry().clear()
+        resources.get_response_cache.clear()
+
+    reset()
+    with patch("google.generativeai.GenerativeModel", factory), \
+            patch("google.generativeai.configure"):
+        try:
+            yield factory
+        finally:
+            reset()
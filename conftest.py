@@ -6,6 +6,8 @@ import os
 # Adicionar o diretório atual ao path para permitir importação dos módulos
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from fakes import FakeClock  # noqa: E402
+
 @pytest.fixture
 def mock_streamlit():
     """Fixture para mockar o Streamlit"""
@@ -58,3 +60,21 @@ def mock_model():
     response.text = "Resposta mockada do modelo"
     model.generate_content.return_value = response
     return model
+
+@pytest.fixture
+def mock_streaming_model():
+    """Fixture para criar um mock do modelo Gemini que responde em streaming"""
+    model = Mock()
+    chunks = []
+    for text in ["Resposta ", "mockada ", "em streaming"]:
+        chunk = Mock()
+        chunk.text = text
+        chunks.append(chunk)
+    model.generate_content.return_value = iter(chunks)
+    return model
+
+
+@pytest.fixture
+def clock():
+    """Relógio controlável, começando em 0"""
+    return FakeClock()
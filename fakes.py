@@ -0,0 +1,64 @@
+"""Dublês de teste compartilhados: relógio controlável, erro da API e modelo lento."""
+
+import threading
+import time
+from unittest.mock import MagicMock, Mock
+
+
+class FakeClock:
+    """Relógio controlável (TTL, janelas e esperas); sleep apenas avança o tempo"""
+    
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ApiError(Exception):
+    """Erro da API com código HTTP, como os de google.api_core"""
+    
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+class SlowModel:
+    """Modelo falso com latência que conta as chamadas ao ``generate_content`` (com ou sem streaming)"""
+    
+    CHUNKS = ("def test_", "soma():\n", "    assert soma(1, 2) == 3\n")
+    
+    def __init__(self, delay=0.0, chunks=CHUNKS, gate=None):
+        self.delay = delay
+        self.chunks = chunks
+        # Com ``gate`` (threading.Event), cada chamada espera o evento antes de responder
+        self.gate = gate
+        self.calls = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def text(self):
+        return "".join(self.chunks)
+    
+    def generate_content(self, prompt, stream=False):
+        with self.lock:
+            self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(timeout=30)
+        time.sleep(self.delay)
+        pieces = []
+        for text in self.chunks:
+            chunk = Mock()
+            chunk.text = text
+            pieces.append(chunk)
+        response = MagicMock()
+        response.text = self.text
+        response.candidates = [Mock()]
+        response.candidates[0].finish_reason.name = "STOP"
+        response.__iter__.side_effect = lambda: iter(pieces)
+        return response
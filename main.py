@@ -1,115 +1,32 @@
+# Página do AI Testing Helper (Streamlit)
+# A lógica de geração (prompt, modelo, cache, pool de geração...) fica no pacote
+# ai_testing_helper, que não depende do Streamlit. Importar este arquivo não tem efeitos
+# colaterais: a página só é montada quando o Streamlit executa o script (streamlit run main.py)
+
 # 1. Imports essenciais
-import streamlit as st
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-# 2. Configuração da Página (Aba do Navegador)
-# Deve ser o primeiro comando Streamlit do seu script!
-# Configuração da página (deve ser a primeira coisa depois dos imports)
-# Esta função permite personalizar a aparência da aplicação
-st.set_page_config(
-    page_title="AI Testing Helper",          # Título que aparece na aba do navegador
-    page_icon="🤖",                          # Ícone da aba do navegador
-    layout="wide",                           # Layout amplo ou centralizado
-    initial_sidebar_state="expanded"         # Sidebar expandida ou colapsada
+import streamlit as st
+from ai_testing_helper.context_window import DEFAULT_TOKEN_BUDGET, ContextWindow, model_summarizer
+from ai_testing_helper.cache import make_cache_key
+from ai_testing_helper.metrics import SessionMetrics, metrics
+from ai_testing_helper.messages import DEFAULT_DB_PATH, DEFAULT_MAX_RESIDENT, MessageStore
+from ai_testing_helper.store import ConversationLog
+from ai_testing_helper.routing import DEFAULT_ROUTE
+from ai_testing_helper.fanout import FanOut, plan_fan_out
+from ai_testing_helper.validation import find_source, validate_answer
+from ai_testing_helper.similarity import build_adapt_prompt
+from ai_testing_helper.rendering import DEFAULT_PAGE_SIZE, visible_start
+from ai_testing_helper.generation import (
+    GEMINI_MODEL_NAME, GENERATION_CONFIG, SYSTEM_INSTRUCTIONS, is_error_response, generate_response,
+    stream_response, start_chat_session, generate_chat_response, stream_chat_response
+)
+from ai_testing_helper.resources import (
+    load_environment, configure_metrics, configure_gemini, get_gemini_model,
+    get_response_cache, get_generation_pool, get_fragment_cache, get_router, get_validation_pool,
+    validation_enabled, get_prefix_cache, get_similarity_index, get_shared_store, get_single_flight
 )
 
-# 3. Carregamento e Verificação da API Key
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-# Verificar se a API Key está presente
-if not GEMINI_API_KEY:
-    st.error("🔑 API Key não encontrada. Verifique o arquivo .env.")
-    st.stop()
-
-# 4. Configuração da API do Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-
-# Função para INICIALIZAR o modelo com configurações específicas
-def init_gemini():
-    generation_config = {
-        "temperature": 0.6,
-        "top_p": 0.8,
-        "top_k": 40,
-        "max_output_tokens": 2048,
-    }
-    
-    model = genai.GenerativeModel(
-        model_name="gemini-1.5-flash",
-        generation_config=generation_config
-    )
-    return model
-
-# Função para gerar resposta do chatbot
-def generate_response(model, messages, new_prompt):
-    try:
-        # Construir o contexto completo da conversa
-        conversation_history = """
-        Você é um especialista em testes automatizados. Ajude o usuário a criar testes unitários robustos.
-        O usuário irá entrar com uma ou mais funções em qualquer linguagem de programação e você deve ajudá-lo a criar vários testes para essas funções.
-        Os testes que deverão ser criados são:
-        - Positivos
-        - Negativos
-        - Limites
-        - Partição por equivalência
-        """
-        for msg in messages:
-            if msg["role"] == "user":
-                conversation_history += f"Usuário: {msg['content']}\n"
-            elif msg["role"] == "assistant":
-                conversation_history += f"Assistente: {msg['content']}\n"
-        
-        # Adicionar a nova pergunta
-        full_prompt = f"{conversation_history}Usuário: {new_prompt}\nAssistente:"
-        
-        response = model.generate_content(full_prompt)
-        return response.text
-    except Exception as e:
-        return f"Erro ao gerar resposta: {str(e)}"
-
-# Configuração da sidebar apenas com estatísticas
-with st.sidebar:
-    st.header("⚙️ Configurações")
-    
-    if st.button("🗑️ Limpar Conversa"):
-        if 'messages' in st.session_state:
-            st.session_state.messages = []
-            st.rerun()
-    
-    st.divider()
-    st.subheader("📊 Estatísticas")
-    if 'messages' in st.session_state:
-        st.metric("Mensagens trocadas", len(st.session_state.messages))
-    else:
-        st.metric("Mensagens trocadas", 0)
-
-# Inicializar o modelo
-if 'model' not in st.session_state:
-    with st.spinner("🔄 Inicializando modelo Gemini..."):
-        st.session_state.model = init_gemini()
-
-# Interface do usuário principal
-st.title("🤖 AI Testing Helper")
-st.write("Bem-vindo ao seu assistente virtual inteligente para auxílio na geração de testes unitários!")
-
-# Exemplo de como os alunos podem personalizar ainda mais
-st.markdown("""
-<style>
-    .main > div {
-        padding-top: 2rem;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# 1. Inicializa o histórico de mensagens se for a primeira execução
-if 'messages' not in st.session_state or len(st.session_state.messages) == 0:
-    st.session_state.messages = []
-    # Mensagem de boas-vindas personalizada
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": """👋 Olá! Eu sou seu assistente virtual que irá te ajudar a criar testes unitários.
+WELCOME_MESSAGE = """👋 Olá! Eu sou seu assistente virtual que irá te ajudar a criar testes unitários.
 
 Posso ajudar você da seguinte forma:
 - ❓ Responder perguntas sobre testes unitários
@@ -119,26 +36,466 @@ Posso ajudar você da seguinte forma:
 - 🎨 Novas ideias para qualidade do software
 
 Como posso ajudar você hoje?"""
-    })
 
-# 2. Loop que exibe CADA mensagem guardada no histórico
-for message in st.session_state.messages:
+# Mostra a posição na fila e o tempo de espera até a geração começar
+def wait_for_turn(pool, ticket):
+    if ticket.started.wait(0.05):
+        return
+    placeholder = st.empty()
+    while not ticket.started.wait(0.25):
+        placeholder.info(
+            f"⏳ Aguardando na fila: posição {pool.position(ticket)} "
+            f"· {ticket.wait_time():.1f} s"
+        )
+    placeholder.empty()
+
+# Exibe uma mensagem a partir dos segmentos já preparados (código fora do parser de markdown)
+def render_message(message):
     with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+        for segment in get_fragment_cache().segments(message):
+            if segment.kind == "code":
+                st.code(segment.text, language=segment.language)
+            else:
+                st.markdown(segment.text)
+
+# Mostra mais uma página de mensagens antigas
+def load_earlier_messages(page_size):
+    st.session_state.history_shown = st.session_state.get("history_shown", page_size) + page_size
+
+# Histórico paginado: só as últimas mensagens são exibidas; as anteriores ficam atrás do botão
+# Como fragmento, "carregar anteriores" executa apenas esta função, e não a página inteira
+@st.fragment
+def render_history(page_size):
+    messages = st.session_state.messages
+    start = visible_start(len(messages), st.session_state.get("history_shown", page_size))
+    if start:
+        st.button(
+            f"⬆️ Carregar mensagens anteriores ({start} ocultas)",
+            key="load_earlier",
+            on_click=load_earlier_messages,
+            args=(page_size,)
+        )
+    with metrics.timer("render_seconds"):
+        for message in messages[start:]:
+            render_message(message)
+
+# Painel de depuração da sessão: tempo de cada etapa e tokens (METRICS_ENABLED=1)
+def render_debug_panel():
+    with st.sidebar:
+        if not st.toggle("🐞 Painel de depuração", value=False, key="debug_panel"):
+            return
+        st.caption("Esta sessão (segundos / tokens)")
+        st.dataframe(st.session_state.session_metrics.rows(), hide_index=True)
+        st.caption(f"Rotas (último turno: {st.session_state.get('last_route', '-')}; custo estimado)")
+        st.dataframe(get_router().report(metrics), hide_index=True)
+        prefix_cache = get_prefix_cache()
+        if prefix_cache is not None:
+            st.caption(
+                f"Cache de prefixos: {metrics.cached_token_ratio():.0%} dos tokens do prompt em cache "
+                f"· {prefix_cache.stats()}"
+            )
+        st.caption(f"Código equivalente ou parecido: {get_similarity_index().stats()}")
+        st.caption(f"Pedidos iguais em andamento (uma só chamada): {get_single_flight().stats()}")
+        st.caption("Processo (p50/p95 aproximados pelos buckets)")
+        st.dataframe(metrics.summary(), hide_index=True)
+        st.download_button("⬇️ Prometheus", metrics.to_prometheus(), file_name="metrics.prom")
+        st.download_button("⬇️ JSON lines", metrics.to_json_lines(), file_name="metrics.jsonl")
+
+# Configuração da sidebar com as opções e estatísticas
+def render_sidebar(context_token_budget):
+    with st.sidebar:
+        st.header("⚙️ Configurações")
+        
+        if st.button("🗑️ Limpar Conversa"):
+            if 'messages' in st.session_state:
+                st.session_state.messages.clear()
+                st.session_state.pop("chat", None)
+                st.session_state.pop("history_shown", None)
+                st.rerun()
+
+        # Streaming: exibe a resposta enquanto o modelo ainda está gerando
+        st.toggle("⚡ Resposta em streaming", value=True, key="streaming")
+
+        # Sessão de chat nativa: envia apenas a nova pergunta a cada turno
+        if not st.toggle("💬 Sessão de chat nativa", value=True, key="chat_mode"):
+            st.session_state.pop("chat", None)
+
+        # Roteamento: escolhe modelo e configuração pelo tamanho do código da pergunta
+        st.toggle(
+            "🧭 Roteamento de modelo",
+            value=os.getenv("MODEL_ROUTING", "1").lower() not in ("0", "false", "no", "off"),
+            key="model_routing"
+        )
+
+        # Geração por função: pedidos de testes com várias funções viram pedidos paralelos
+        st.toggle(
+            "🧩 Gerar por função em paralelo",
+            value=os.getenv("FAN_OUT", "0").lower() in ("1", "true", "yes", "on"),
+            key="fan_out"
+        )
+
+        # Código equivalente (outras variáveis locais, comentários ou formatação) ou parecido com um já respondido
+        st.toggle(
+            "♻️ Reaproveitar respostas de código parecido",
+            value=os.getenv("SIMILAR_ANSWERS", "1").lower() not in ("0", "false", "no", "off"),
+            key="similar_answers"
+        )
+
+        # Validação (executa código gerado): só o operador liga, pela variável VALIDATE_TESTS
+        if validation_enabled():
+            st.caption("🧪 Os testes gerados são executados (pytest) em uma sandbox")
+
+        # Orçamento de tokens: turnos antigos que não cabem viram um resumo
+        st.number_input(
+            "🧮 Orçamento de tokens do contexto",
+            min_value=500,
+            step=500,
+            value=context_token_budget,
+            key="token_budget"
+        )
+        
+        st.divider()
+        st.subheader("📊 Estatísticas")
+        if 'messages' in st.session_state:
+            st.metric("Mensagens trocadas", len(st.session_state.messages))
+        else:
+            st.metric("Mensagens trocadas", 0)
+        if 'context_window' in st.session_state:
+            st.metric("Tokens no contexto", st.session_state.context_window.tokens_used)
+        else:
+            st.metric("Tokens no contexto", 0)
+        cache_stats = get_response_cache().stats()
+        st.metric("Cache: acertos", cache_stats["hits"])
+        st.metric("Cache: falhas", cache_stats["misses"])
+        pool_stats = get_generation_pool().stats()
+        st.metric(
+            "Gerações em andamento",
+            f"{pool_stats['running']}/{pool_stats['limit']}",
+            help=f"Na fila: {pool_stats['queued']} · espera média: {pool_stats['avg_wait']:.1f} s"
+        )
+
+# Inicializa o estado da sessão: modelos compartilhados, janela de contexto e histórico
+def init_session(context_token_budget):
+    # Modelo criado uma vez por processo e reaproveitado nas demais sessões
+    if 'model' not in st.session_state:
+        with st.spinner("🔄 Inicializando modelo Gemini..."):
+            st.session_state.model = get_gemini_model(GEMINI_MODEL_NAME, GENERATION_CONFIG)
+
+    # Janela de contexto da sessão (guarda o resumo acumulado dos turnos antigos)
+    if 'context_window' not in st.session_state:
+        st.session_state.context_window = ContextWindow(
+            token_budget=context_token_budget,
+            summarize=model_summarizer(st.session_state.model)
+        )
+    st.session_state.context_window.token_budget = st.session_state.get("token_budget", context_token_budget)
+
+    # Métricas da sessão (painel de depuração)
+    if 'session_metrics' not in st.session_state:
+        st.session_state.session_metrics = SessionMetrics()
+
+    # Inicializa o histórico de mensagens se for a primeira execução
+    # Só as MESSAGE_RESIDENT_LIMIT mensagens mais recentes ficam em memória; as demais vão para o SQLite
+    # Com vários workers (SHARED_STORE_URL), a conversa fica no armazenamento compartilhado e é
+    # identificada na URL (?conversa=...): outro worker ou um reinício a restauram
+    if 'messages' not in st.session_state:
+        shared_store = get_shared_store()
+        log = None
+        if shared_store is not None:
+            log = ConversationLog(shared_store, st.query_params.get("conversa"))
+            st.query_params["conversa"] = log.conversation_id
+        st.session_state.messages = MessageStore(
+            log.load() if log is not None else (),
+            max_resident=int(os.getenv("MESSAGE_RESIDENT_LIMIT", DEFAULT_MAX_RESIDENT)),
+            path=os.getenv("MESSAGE_STORE_DB", DEFAULT_DB_PATH),
+            log=log
+        )
+    if len(st.session_state.messages) == 0:
+        # Mensagem de boas-vindas personalizada
+        st.session_state.messages.append({"role": "assistant", "content": WELCOME_MESSAGE})
+
+# Executa os testes da resposta na sandbox; se falharem, pede uma correção ao modelo
+def validate_reply(prompt, response, model):
+    if not validation_enabled() or is_error_response(response):
+        return response
+    source = find_source(prompt, st.session_state.messages[:-1])
+    generation_pool = get_generation_pool()
+    
+    # A correção também passa pelo pool de geração (limite de concorrência e fila)
+    def generate(*args):
+        return generation_pool.submit(generate_response, *args).result()
+    
+    with st.status("🧪 Executando os testes gerados...") as status:
+        outcome = validate_answer(get_validation_pool(), model, response, source, generate=generate)
+        report = outcome.report
+        if report is None:
+            status.update(label="🧪 Nenhum teste em Python para executar", state="complete")
+            return response
+        if not report.ok:
+            st.code(report.output, language="text")
+        label = f"{'✅' if report.ok else '❌'} {report.summary()}"
+        if outcome.repaired:
+            label += f" (após uma correção; antes: {outcome.first_report.summary().lower()})"
+        status.update(label=label, state="complete" if report.ok else "error", expanded=False)
+    
+    if outcome.repaired:
+        st.markdown(outcome.answer)
+        # A sessão de chat guardou a versão anterior: recriar no próximo turno
+        st.session_state.pop("chat", None)
+    return f"{outcome.answer}\n\n_🧪 {report.summary()}_"
+
+# Procura uma resposta anterior para código equivalente ou parecido (a chave exata não acertou)
+# A resposta depende da conversa anterior e do modelo: só é reaproveitada no mesmo contexto
+def find_similar(prompt, variant, previous, route):
+    if not st.session_state.get("similar_answers", True):
+        return None, None
+    index = get_similarity_index()
+    context = make_cache_key("", previous, route.model_name, route.generation_config, SYSTEM_INSTRUCTIONS)
+    fingerprint = index.fingerprint(prompt, scope=(variant, context))
+    if fingerprint is None:
+        return None, None
+    return fingerprint, index.find(fingerprint)
+
+# Código equivalente: reaproveita a resposta; parecido: pede ao modelo só a adaptação da anterior
+def reuse_similar(prompt, match, route):
+    # A sessão de chat não viu este turno: recriar no próximo a partir do histórico
+    st.session_state.pop("chat", None)
+    if match.kind == "exact":
+        st.caption("♻️ Resposta de um código equivalente (mesma estrutura, outras variáveis locais ou formatação)")
+        st.markdown(match.answer)
+        return match.answer
+    
+    st.caption(f"♻️ Adaptando a resposta de um código {match.similarity:.0%} parecido")
+    # A adaptação é um pedido menor: usa a rota de código pequeno (ou a padrão)
+    if st.session_state.get("model_routing", True):
+        route = get_router().routes["small_code"]
+    model = get_gemini_model(route.model_name, route.generation_config)
+    adapt_prompt = build_adapt_prompt(match, prompt)
+    pool = get_generation_pool()
+    if st.session_state.get("streaming", True):
+        ticket = pool.submit_stream(stream_response, model, [], adapt_prompt)
+        wait_for_turn(pool, ticket)
+        response = st.write_stream(ticket.chunks())
+    else:
+        ticket = pool.submit(generate_response, model, [], adapt_prompt)
+        wait_for_turn(pool, ticket)
+        with st.spinner("🤔 Adaptando..."):
+            response = ticket.result()
+            st.markdown(response)
+    return validate_reply(prompt, response, model)
+
+# Gera os testes de cada função da pergunta em paralelo e junta em uma resposta
+def answer_per_function(prompt, plan):
+    # Cada função é um pedido pequeno: usa a rota de código pequeno (ou a padrão)
+    if st.session_state.get("model_routing", True):
+        route = get_router().routes["small_code"]
+    else:
+        route = DEFAULT_ROUTE
+    st.session_state.last_route = "fan_out"
+    
+    previous = st.session_state.messages[:-1]
+    response_cache = get_response_cache()
+    variant = "fan_out:validated" if validation_enabled() else "fan_out"
+    cache_key = make_cache_key(
+        prompt, previous, route.model_name, route.generation_config, SYSTEM_INSTRUCTIONS, variant=variant
+    )
+    response = response_cache.get(cache_key)
+    # Mesmas funções com outros nomes ou formatação: reaproveita a resposta já montada
+    fingerprint, similar = find_similar(prompt, variant, previous, route) if response is None else (None, None)
+    if similar is not None and similar.kind == "exact":
+        response = similar.answer
+        response_cache.set(cache_key, response)
+    
+    with st.chat_message("assistant"), metrics.label_scope(route="fan_out"):
+        if response is not None:
+            st.markdown(response)
+        else:
+            # Cada pedido por função leva a mesma janela de contexto da conversa
+            with metrics.timer("context_fit_seconds"):
+                history = st.session_state.context_window.fit(previous)
+            pool = get_generation_pool()
+            fan_out_model = get_gemini_model(route.model_name, route.generation_config)
+            fan_out = FanOut(pool, fan_out_model, plan, history=history)
+            wait_for_turn(pool, fan_out.tickets[0])
+            # As seções aparecem na ordem das funções; ao final, a resposta com imports no topo
+            placeholder = st.empty()
+            with placeholder.container():
+                st.write_stream(fan_out.stream())
+            response = fan_out.result()
+            placeholder.markdown(response)
+            response = validate_reply(prompt, response, fan_out_model)
+            if not is_error_response(response):
+                response_cache.set(cache_key, response)
+                if fingerprint is not None:
+                    get_similarity_index().add(fingerprint, response)
+    
+    # A sessão de chat não viu este turno: recriar no próximo a partir do histórico
+    st.session_state.pop("chat", None)
+    return response
+
+# Gera (ou busca no cache) a resposta para a nova pergunta e a exibe
+def handle_prompt(prompt):
+    st.session_state.session_metrics.start_turn()
 
-# Input do usuário
-if prompt := st.chat_input("💬 Digite sua mensagem aqui..."):
     # Adicionar mensagem do usuário
     st.session_state.messages.append({"role": "user", "content": prompt})
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Gerar resposta do assistente
-    with st.chat_message("assistant"):
-        with st.spinner("🤔 Pensando..."):
-            response = generate_response(st.session_state.model, st.session_state.messages, prompt)
-            st.markdown(response)
+    # Pedido de testes para várias funções: uma geração por função, em paralelo
+    plan = plan_fan_out(prompt) if st.session_state.get("fan_out", False) else None
+    if plan is not None:
+        response = answer_per_function(prompt, plan)
+    else:
+        response = answer_prompt(prompt)
     
     # Adicionar resposta ao histórico
     st.session_state.messages.append({"role": "assistant", "content": response})
 
+    # METRICS_EXPORT grava as métricas após cada turno (.jsonl acrescenta; demais, Prometheus)
+    export_path = os.getenv("METRICS_EXPORT")
+    if metrics.enabled and export_path:
+        metrics.export(export_path)
+
+# Resposta de uma pergunta comum: rota, janela de contexto, cache e geração
+def answer_prompt(prompt):
+    # Escolher a rota (modelo, max_output_tokens e temperatura) pelo código e pela conversa
+    if st.session_state.get("model_routing", True):
+        route = get_router().classify(prompt, st.session_state.messages[-3:-1])
+    else:
+        route = DEFAULT_ROUTE
+    st.session_state.last_route = route.name
+    model = get_gemini_model(route.model_name, route.generation_config)
+    chat_mode = st.session_state.get("chat_mode", True)
+    # Sem chat, o histórico enviado já inclui a nova pergunta
+    conversation = st.session_state.messages[:-1] if chat_mode else st.session_state.messages
+    
+    # Consultar o cache antes de ajustar o histórico: um acerto não paga o resumo dos turnos antigos
+    response_cache = get_response_cache()
+    # Respostas validadas (e talvez corrigidas) ficam separadas das demais
+    variant = "validated" if validation_enabled() else None
+    cache_key = make_cache_key(
+        prompt, conversation, route.model_name, route.generation_config, SYSTEM_INSTRUCTIONS, variant=variant
+    )
+    response = response_cache.get(cache_key)
+    from_cache = response is not None
+    previous = st.session_state.messages[:-1]
+    fingerprint, similar = find_similar(prompt, variant, previous, route) if not from_cache else (None, None)
+    
+    # Ajustar o histórico ao orçamento de tokens (turnos antigos viram resumo), só para gerar
+    context = st.session_state.context_window
+    chat = None
+    history = None
+    if not from_cache and similar is None:
+        with metrics.timer("context_fit_seconds"):
+            history = context.fit(conversation)
+        if chat_mode:
+            # Abrir a sessão de chat com o histórico anterior à nova pergunta
+            # Só é recriada quando o resumo ou a rota mudam; nos demais turnos apenas a nova pergunta é enviada
+            if ('chat' not in st.session_state
+                    or st.session_state.get("chat_context_version") != context.version
+                    or st.session_state.get("chat_route") != route):
+                chat_model = get_gemini_model(route.model_name, route.generation_config, SYSTEM_INSTRUCTIONS)
+                st.session_state.chat = start_chat_session(chat_model, history)
+                st.session_state.chat_context_version = context.version
+                st.session_state.chat_route = route
+            chat = st.session_state.chat
+    pool = get_generation_pool()
+    # Mesma pergunta (mesma chave) em andamento em outra sessão: espera aquela chamada
+    single_flight = get_single_flight()
+    
+    # Gerar resposta do assistente (medições rotuladas com a rota)
+    with st.chat_message("assistant"), metrics.label_scope(route=route.name):
+        if from_cache:
+            st.markdown(response)
+            # A sessão de chat não viu este turno: recriar no próximo a partir do histórico
+            st.session_state.pop("chat", None)
+        elif similar is not None:
+            response = reuse_similar(prompt, similar, route)
+        elif st.session_state.get("streaming", True):
+            # A geração roda no pool compartilhado; esta thread só consome os pedaços
+            if chat is not None:
+                call, joined = single_flight.submit(cache_key, stream_chat_response, chat, prompt)
+            else:
+                call, joined = single_flight.submit(cache_key, stream_response, model, history, prompt)
+            wait_for_turn(pool, call.ticket)
+            # st.write_stream devolve o texto completo ao final do streaming
+            response = st.write_stream(call.chunks())
+        else:
+            if chat is not None:
+                call, joined = single_flight.submit(cache_key, generate_chat_response, chat, prompt)
+            else:
+                call, joined = single_flight.submit(cache_key, generate_response, model, history, prompt)
+            wait_for_turn(pool, call.ticket)
+            with st.spinner("🤔 Pensando..."):
+                response = call.result()
+                st.markdown(response)
+        if not from_cache and similar is None and joined:
+            # A resposta veio da chamada de outra sessão: a sessão de chat não viu este turno
+            st.session_state.pop("chat", None)
+        if not from_cache and similar is None:
+            response = validate_reply(prompt, response, model)
+    
+    if not from_cache and not is_error_response(response):
+        response_cache.set(cache_key, response)
+        if fingerprint is not None and (similar is None or similar.kind != "exact"):
+            get_similarity_index().add(fingerprint, response)
+    return response
+
+def run():
+    # 2. Configuração da Página (Aba do Navegador)
+    # Deve ser o primeiro comando Streamlit do seu script!
+    # Esta função permite personalizar a aparência da aplicação
+    st.set_page_config(
+        page_title="AI Testing Helper",          # Título que aparece na aba do navegador
+        page_icon="🤖",                          # Ícone da aba do navegador
+        layout="wide",                           # Layout amplo ou centralizado
+        initial_sidebar_state="expanded"         # Sidebar expandida ou colapsada
+    )
+
+    # 3. Carregamento e Verificação da API Key (o .env é lido uma única vez por processo)
+    load_environment()
+    configure_metrics()
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+
+    # Verificar se a API Key está presente
+    if not gemini_api_key:
+        st.error("🔑 API Key não encontrada. Verifique o arquivo .env.")
+        st.stop()
+
+    # Orçamento de tokens do histórico enviado ao modelo (pode ser ajustado na sidebar)
+    context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+    # 4. Configuração da API do Gemini (uma vez por processo para cada API Key)
+    configure_gemini(gemini_api_key)
+
+    render_sidebar(context_token_budget)
+    init_session(context_token_budget)
+
+    # Interface do usuário principal
+    st.title("🤖 AI Testing Helper")
+    st.write("Bem-vindo ao seu assistente virtual inteligente para auxílio na geração de testes unitários!")
+
+    # Exemplo de como os alunos podem personalizar ainda mais
+    st.markdown("""
+    <style>
+        .main > div {
+            padding-top: 2rem;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+
+    # As medições deste rerun também vão para o painel da sessão
+    with metrics.session_scope(st.session_state.session_metrics):
+        # Exibe as mensagens mais recentes do histórico (HISTORY_PAGE_SIZE por página)
+        render_history(int(os.getenv("HISTORY_PAGE_SIZE", DEFAULT_PAGE_SIZE)))
+
+        # Input do usuário
+        if prompt := st.chat_input("💬 Digite sua mensagem aqui..."):
+            handle_prompt(prompt)
+
+    if metrics.enabled:
+        render_debug_panel()
+
+# O Streamlit executa o script como __main__; importar o módulo não monta a página
+if __name__ == "__main__":
+    run()
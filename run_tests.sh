@@ -20,7 +20,7 @@ fi
 
 echo ""
 echo "📊 Executando testes com cobertura de código..."
-$PYTHON_PATH -m pytest test_main.py --cov=main --cov-report=term-missing --cov-report=html
+$PYTHON_PATH -m pytest --cov=main --cov=ai_testing_helper --cov-report=term-missing --cov-report=html
 
 echo ""
 echo "✅ Execução de testes concluída!"
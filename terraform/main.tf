@@ -32,6 +32,17 @@ variable "gemini_api_key" {
   sensitive   = true # Mark as sensitive so it's not shown in the plan output
 }
 
+variable "workers" {
+  description = "Number of Streamlit workers. 1 runs a single `streamlit run` process; more than 1 opts in to the sticky-session proxy (ai_testing_helper.deploy)."
+  type        = number
+  default     = 1
+
+  validation {
+    condition     = var.workers >= 1
+    error_message = "workers must be at least 1."
+  }
+}
+
 resource "aws_instance" "chatbot_gemini" {
   ami           = "ami-00ca32bbc84273381"
   instance_type = "t2.micro"
@@ -69,8 +80,12 @@ resource "aws_instance" "chatbot_gemini" {
   # Create a .env file with the API key
   echo "GEMINI_API_KEY='${var.gemini_api_key}'" > .env
   
-  # Run the application with nohup
-  nohup streamlit run main.py --server.port 8501 --server.address 0.0.0.0 &
+  # Run the application with nohup (several workers behind the sticky-session proxy only when opted in)
+  if [ "${var.workers}" -gt 1 ]; then
+    nohup python -m ai_testing_helper.deploy --workers ${var.workers} --host 0.0.0.0 --port 8501 &
+  else
+    nohup streamlit run main.py --server.port 8501 --server.address 0.0.0.0 &
+  fi
 EOF
 }
 
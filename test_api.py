@@ -0,0 +1,318 @@
+import asyncio
+import json
+import threading
+
+from ai_testing_helper.api import GenerationService, create_app, parse_item
+from ai_testing_helper.cache import LRUCache, ResponseCache
+from ai_testing_helper.concurrency import GenerationPool
+from fakes import SlowModel
+
+
+CHUNKS = ("Claro! ", "```python\ndef test_a():\n    assert True\n```")
+
+
+def make_service(model, **kwargs):
+    return GenerationService(ResponseCache(LRUCache(10)), GenerationPool(2), lambda *args: model, **kwargs)
+
+
+async def call(app, method, path, body=None, accept="application/json"):
+    """Executa um pedido na aplicação ASGI; devolve (status, cabeçalhos, corpo)."""
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("teste", 80), "client": ("teste", 1),
+        "headers": [(b"content-type", b"application/json"), (b"accept", accept.encode())],
+    }
+    messages = [{"type": "http.request", "body": payload if body is not None else b"", "more_body": False}]
+    response = {"body": b""}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {name.decode(): value.decode() for name, value in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], response["body"].decode()
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestParseItem:
+    """Testes para a validação do corpo do pedido"""
+
+    def test_valid_item(self):
+        """Teste positivo: prompt e histórico só com papel e conteúdo"""
+        # Arrange
+        item = {"prompt": "def f(): pass", "history": [
+            {"role": "user", "content": "Oi", "extra": 1}, {"role": "assistant", "content": "Olá"}]}
+
+        # Act
+        prompt, history = parse_item(item)
+
+        # Assert
+        assert prompt == "def f(): pass"
+        assert history == [{"role": "user", "content": "Oi"}, {"role": "assistant", "content": "Olá"}]
+
+    def test_invalid_items(self):
+        """Teste negativo: prompt vazio, histórico inválido ou papel desconhecido"""
+        # Arrange
+        app = create_app(make_service(SlowModel(chunks=CHUNKS)))
+
+        async def scenario():
+            return [await call(app, "POST", "/v1/generate", body) for body in (
+                {"prompt": "  "}, {"prompt": "x", "history": "oi"},
+                {"prompt": "x", "history": [{"role": "system", "content": "y"}]}, b"{nao e json",
+            )]
+
+        # Act
+        results = asyncio.run(scenario())
+
+        # Assert
+        assert [status for status, _, _ in results] == [400, 400, 400, 400]
+
+
+class TestGenerate:
+    """Testes para a geração única (JSON e server-sent events)"""
+
+    def test_json_answer_and_cache(self):
+        """Teste positivo: a segunda pergunta igual vem do cache, sem nova chamada"""
+        # Arrange
+        model = SlowModel(chunks=CHUNKS)
+        app = create_app(make_service(model))
+
+        async def scenario():
+            first = await call(app, "POST", "/v1/generate", {"prompt": "Teste para soma(a, b)"})
+            second = await call(app, "POST", "/v1/generate", {"prompt": "Teste para soma(a, b)"})
+            return json.loads(first[2]), json.loads(second[2])
+
+        # Act
+        first, second = asyncio.run(scenario())
+
+        # Assert
+        assert first["answer"] == "Claro! ```python\ndef test_a():\n    assert True\n```"
+        assert first["cached"] is False and first["error"] is False
+        assert second["answer"] == first["answer"] and second["cached"] is True
+        assert model.calls == 1
+
+    def test_server_sent_events(self):
+        """Teste positivo: um evento por pedaço e o evento final com a rota"""
+        # Arrange
+        app = create_app(make_service(SlowModel(chunks=CHUNKS)))
+
+        # Act
+        status, headers, body = asyncio.run(call(
+            app, "POST", "/v1/generate", {"prompt": "Como testar?"}, accept="text/event-stream"
+        ))
+        events = sse_events(body)
+
+        # Assert
+        assert status == 200 and headers["content-type"].startswith("text/event-stream")
+        assert [name for name, _ in events] == ["chunk", "chunk", "done"]
+        assert events[0][1] == {"text": "Claro! "}
+        assert events[-1][1] == {"route": "default", "cached": False, "coalesced": False, "error": False}
+
+    def test_identical_requests_share_one_generation(self):
+        """Teste de partição por equivalência: pedidos iguais em andamento viram uma só chamada"""
+        # Arrange
+        model = SlowModel(delay=0.2, chunks=CHUNKS)
+        service = make_service(model)
+        app = create_app(service)
+
+        async def scenario():
+            requests = [call(app, "POST", "/v1/generate", {"prompt": "def f(x): return x"}) for _ in range(4)]
+            requests.append(call(app, "POST", "/v1/generate", {"prompt": "def f(x): return x", "stream": True}))
+            return await asyncio.gather(*requests)
+
+        # Act
+        results = asyncio.run(scenario())
+        answers = [json.loads(body) for _, _, body in results[:4]]
+
+        # Assert
+        assert model.calls == 1
+        assert len({answer["answer"] for answer in answers}) == 1
+        assert sum(answer["coalesced"] for answer in answers) + sse_events(results[4][2])[-1][1]["coalesced"] == 4
+        assert service.stats()["single_flight"] == {"calls": 1, "joined": 4, "in_flight": 0}
+
+    def test_full_queue_is_rejected(self):
+        """Teste de limite: com a fila cheia, só o que está no cache é atendido"""
+        # Arrange
+        service = make_service(SlowModel(chunks=CHUNKS), max_pending=0)
+        service.cache.set(service.plan("Pergunta em cache")[1], "Resposta")
+        app = create_app(service)
+
+        async def scenario():
+            return (await call(app, "POST", "/v1/generate", {"prompt": "Pergunta nova"}),
+                    await call(app, "POST", "/v1/generate", {"prompt": "Pergunta em cache"}))
+
+        # Act
+        rejected, cached = asyncio.run(scenario())
+
+        # Assert
+        assert rejected[0] == 429 and rejected[1]["retry-after"] == "1"
+        assert cached[0] == 200 and json.loads(cached[2])["answer"] == "Resposta"
+
+    def test_cache_lookup_runs_off_the_event_loop(self):
+        """Teste positivo: a consulta ao cache (que pode ir ao SQLite ou à rede) não bloqueia o event loop"""
+        # Arrange
+        service = make_service(SlowModel(chunks=CHUNKS))
+        lookup_threads = []
+        cache_get = service.cache.get
+        service.cache.get = lambda key: lookup_threads.append(threading.current_thread()) or cache_get(key)
+        app = create_app(service)
+
+        # Act
+        status, _, _ = asyncio.run(call(app, "POST", "/v1/generate", {"prompt": "def f(x): return x"}))
+
+        # Assert
+        assert status == 200
+        assert lookup_threads and threading.main_thread() not in lookup_threads
+
+
+class TestJobs:
+    """Testes para os lotes (envio e consulta)"""
+
+    def test_job_runs_items_in_order(self):
+        """Teste positivo: o lote termina com as respostas na ordem dos itens"""
+        # Arrange
+        model = SlowModel(delay=0.05, chunks=CHUNKS)
+        app = create_app(make_service(model, job_concurrency=2))
+
+        async def scenario():
+            status, headers, body = await call(app, "POST", "/v1/jobs", {"items": [
+                {"prompt": "def a(): pass"}, {"prompt": "def b(): pass"}, {"prompt": "def a(): pass"}]})
+            created = json.loads(body)
+            while True:
+                job = json.loads((await call(app, "GET", created["status_url"]))[2])
+                if job["status"] == "done":
+                    return status, headers, created, job
+                await asyncio.sleep(0.02)
+
+        # Act
+        status, headers, created, job = asyncio.run(scenario())
+
+        # Assert
+        assert status == 202 and headers["location"] == f"/v1/jobs/{created['job_id']}"
+        assert created["status"] == "queued" and created["total"] == 3
+        assert job["completed"] == 3
+        assert all(result["answer"].startswith("Claro!") for result in job["results"])
+        # Itens iguais no mesmo lote: o segundo espera a geração do primeiro ou vem do cache
+        assert model.calls == 2
+
+    def test_item_errors_stay_in_the_item(self):
+        """Teste negativo: um item que falha ao começar (ex.: circuito aberto) não derruba o lote"""
+        # Arrange
+        model = SlowModel(chunks=CHUNKS)
+        requested = []
+
+        def get_model(*args):
+            requested.append(args)
+            if len(requested) == 1:
+                raise RuntimeError("circuito aberto")
+            return model
+
+        service = GenerationService(ResponseCache(LRUCache(10)), GenerationPool(2), get_model, job_concurrency=1)
+
+        async def scenario():
+            job = service.submit_job([{"prompt": "def a(): pass"}, {"prompt": "def b(): pass"}])
+            await job.task
+            return job.as_dict()
+
+        # Act
+        job = asyncio.run(scenario())
+
+        # Assert
+        assert job["status"] == "done" and job["completed"] == 2
+        assert job["results"][0] == {"route": None, "error": True, "detail": "circuito aberto"}
+        assert job["results"][1]["answer"] == "".join(CHUNKS)
+
+    def test_cancelled_job_still_finishes(self):
+        """Teste de limite: um lote cancelado termina com os itens pendentes marcados como erro"""
+        # Arrange
+        service = make_service(SlowModel(delay=0.5, chunks=CHUNKS))
+
+        async def scenario():
+            job = service.submit_job([{"prompt": "def a(): pass"}])
+            await asyncio.sleep(0.05)
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+            return job.as_dict()
+
+        # Act
+        job = asyncio.run(scenario())
+
+        # Assert
+        assert job["status"] == "done"
+        assert job["results"] == [{"route": None, "error": True, "detail": "lote interrompido"}]
+
+    def test_invalid_and_unknown_jobs(self):
+        """Teste negativo: lote vazio, grande demais ou inexistente"""
+        # Arrange
+        app = create_app(make_service(SlowModel(chunks=CHUNKS), max_batch=2))
+
+        async def scenario():
+            return [
+                await call(app, "POST", "/v1/jobs", {"items": []}),
+                await call(app, "POST", "/v1/jobs", {"items": [{"prompt": "x"}] * 3}),
+                await call(app, "GET", "/v1/jobs/inexistente"),
+            ]
+
+        # Act
+        results = asyncio.run(scenario())
+
+        # Assert
+        assert [status for status, _, _ in results] == [400, 400, 404]
+
+
+class TestServerMount:
+    """Testes para a API montada no servidor da página (ai_testing_helper.server)"""
+
+    def test_api_is_served_under_v1(self):
+        """Teste positivo: as rotas do servidor da página respondem à API em /v1"""
+        # Arrange
+        from starlette.applications import Starlette
+
+        from ai_testing_helper.server import routes
+
+        app = Starlette(routes=routes(make_service(SlowModel(chunks=CHUNKS))))
+
+        # Act
+        status, _, body = asyncio.run(call(app, "POST", "/v1/generate", {"prompt": "def soma(a, b): return a + b"}))
+
+        # Assert
+        assert status == 200
+        assert json.loads(body)["answer"] == "".join(CHUNKS)
+
+    def test_page_and_api_share_process_resources(self, mock_environment):
+        """Teste de integração: sem serviço, a API montada usa o pool e o agrupamento de pedidos da página"""
+        # Arrange
+        from unittest.mock import patch
+
+        from starlette.routing import Mount
+
+        from ai_testing_helper import resources
+        from ai_testing_helper.server import create_app
+
+        # Act
+        with patch('google.generativeai.configure'), patch('streamlit.App') as streamlit_app:
+            create_app()
+        mounted = streamlit_app.call_args.kwargs["routes"]
+        service = next(route.app for route in mounted if isinstance(route, Mount) and route.path == "/v1").state.service
+
+        # Assert
+        assert service.single_flight is resources.get_single_flight()
+        assert service.pool is resources.get_generation_pool()
+        assert service.cache is resources.get_response_cache()
@@ -0,0 +1,319 @@
+import json
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from ai_testing_helper.batch import (
+    BatchStats,
+    build_unit_prompt,
+    extract_code_blocks,
+    extract_functions,
+    generate_unit,
+    iter_source_files,
+    main,
+    module_name,
+    output_file_names,
+    run_batch,
+    unit_hash,
+)
+
+SOURCE = '''
+import functools
+
+
+def soma(a, b):
+    return a + b
+
+
+@functools.lru_cache
+def dobro(x):
+    return 2 * x
+
+
+class Calculadora:
+    def __init__(self):
+        self.total = 0
+
+    def __repr__(self):
+        return "Calculadora"
+
+    def adicionar(self, valor):
+        self.total += valor
+        return self.total
+'''
+
+
+class FakeModel:
+    """Modelo falso que responde com um bloco de teste por função"""
+    
+    def __init__(self, fail_on=None):
+        self.prompts = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+    
+    def generate_content(self, prompt):
+        with self.lock:
+            self.prompts.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            raise Exception("Erro de conexão com API")
+        name = prompt.split("para a função `")[1].split("`")[0]
+        response = Mock()
+        response.text = f"Claro!\n```python\ndef test_{name.replace('.', '_')}():\n    assert True\n```"
+        response.usage_metadata.prompt_token_count = 100
+        response.usage_metadata.candidates_token_count = 50
+        return response
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Projeto de exemplo com um pacote, um módulo e um arquivo de teste"""
+    package = tmp_path / "src" / "pacote"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "calc.py").write_text(SOURCE)
+    (package / "test_calc.py").write_text("def test_x():\n    pass\n")
+    (tmp_path / "src" / ".venv").mkdir()
+    (tmp_path / "src" / ".venv" / "lib.py").write_text("def ignorar():\n    pass\n")
+    return tmp_path
+
+
+class TestExtractFunctions:
+    """Testes para a extração de funções com ast"""
+    
+    def test_extracts_functions_and_methods(self):
+        """Teste positivo: funções e métodos com nome qualificado"""
+        units = extract_functions(SOURCE, "pacote.calc")
+        assert [unit.qualname for unit in units] == [
+            "soma", "dobro", "Calculadora.__init__", "Calculadora.adicionar"
+        ]
+    
+    def test_keeps_decorators_and_dedents_methods(self):
+        """Teste positivo: decorators incluídos e métodos sem indentação"""
+        units = {unit.qualname: unit for unit in extract_functions(SOURCE, "pacote.calc")}
+        assert units["dobro"].source.startswith("@functools.lru_cache")
+        assert units["Calculadora.adicionar"].source.startswith("def adicionar")
+    
+    def test_empty_module(self):
+        """Teste de limite: módulo sem funções"""
+        assert extract_functions("X = 1\n", "vazio") == []
+    
+    def test_syntax_error(self):
+        """Teste negativo: código inválido"""
+        with pytest.raises(SyntaxError):
+            extract_functions("def quebrada(:\n", "ruim")
+
+
+class TestSourceFiles:
+    """Testes para a descoberta de arquivos"""
+    
+    def test_skips_tests_and_virtualenvs(self, project):
+        """Teste positivo: arquivos de teste e .venv ficam de fora"""
+        files = [path for _, path in iter_source_files([str(project / "src")])]
+        names = sorted(path.split("/")[-1] for path in files)
+        assert names == ["__init__.py", "calc.py"]
+    
+    def test_module_name(self, project):
+        """Teste de partição por equivalência: nomes pontuados relativos à raiz"""
+        root = str(project / "src")
+        assert module_name(root, str(project / "src" / "pacote" / "calc.py")) == "pacote.calc"
+        assert module_name(root, str(project / "src" / "pacote" / "__init__.py")) == "pacote"
+    
+    def test_output_file_names_resolve_collisions(self):
+        """Teste de limite: módulos com o mesmo nome em pacotes diferentes"""
+        names = output_file_names(["a.utils", "b.utils", "calc"])
+        assert names == {"a.utils": "test_a_utils.py", "b.utils": "test_b_utils.py", "calc": "test_calc.py"}
+
+
+class TestPromptAndParsing:
+    """Testes para o prompt por função e a leitura da resposta"""
+    
+    def test_unit_prompt_mentions_module_and_code(self):
+        """Teste positivo: prompt com módulo, função e código"""
+        unit = extract_functions(SOURCE, "pacote.calc")[0]
+        prompt = build_unit_prompt(unit)
+        assert "`soma`" in prompt
+        assert "from pacote.calc import" in prompt
+        assert "return a + b" in prompt
+    
+    def test_extract_code_blocks(self):
+        """Teste positivo: apenas o conteúdo dos blocos de código"""
+        text = "Texto\n```python\ndef test_a():\n    pass\n```\nMais\n```\nx = 1\n```"
+        assert extract_code_blocks(text) == ["def test_a():\n    pass", "x = 1"]
+    
+    def test_extract_code_blocks_without_fence(self):
+        """Teste de limite: resposta sem blocos de código"""
+        assert extract_code_blocks("def test_a(): pass") == ["def test_a(): pass"]
+        assert extract_code_blocks("") == []
+    
+    def test_unit_hash_ignores_formatting_and_comments(self):
+        """Teste de partição por equivalência: formatação e comentários não mudam a chave"""
+        unit = extract_functions(SOURCE, "pacote.calc")[0]
+        changed = extract_functions(
+            SOURCE.replace("return a + b", "return (a +\n            b)  # soma"), "pacote.calc"
+        )[0]
+        other = extract_functions(SOURCE.replace("a + b", "a - b"), "pacote.calc")[0]
+        assert unit_hash(unit) == unit_hash(changed)
+        assert unit_hash(unit) != unit_hash(other)
+
+
+class TestRunBatch:
+    """Testes para a execução em lote"""
+    
+    def test_generates_one_file_per_module(self, project):
+        """Teste positivo: um test_<modulo>.py com os testes de todas as funções"""
+        # Arrange
+        model = FakeModel()
+        output = project / "saida"
+        
+        # Act
+        stats = run_batch([str(project / "src")], model, str(output), concurrency=2, log=Mock())
+        
+        # Assert
+        content = (output / "test_calc.py").read_text()
+        assert "def test_soma()" in content
+        assert "def test_Calculadora_adicionar()" in content
+        assert content.index("test_soma") < content.index("test_Calculadora_adicionar")
+        assert stats.generated == 4
+        assert stats.total == 4
+        assert stats.tokens_per_function == 150
+        assert len(model.prompts) == 4
+    
+    def test_second_run_skips_unchanged_functions(self, project):
+        """Teste positivo: funções sem mudança não vão de novo ao modelo"""
+        # Arrange
+        output = project / "saida"
+        run_batch([str(project / "src")], FakeModel(), str(output), log=Mock())
+        calc = project / "src" / "pacote" / "calc.py"
+        calc.write_text(SOURCE.replace("return a + b", "return b + a"))
+        model = FakeModel()
+        
+        # Act
+        stats = run_batch([str(project / "src")], model, str(output), log=Mock())
+        
+        # Assert
+        assert stats.generated == 1
+        assert stats.skipped == 3
+        assert len(model.prompts) == 1
+        assert "def test_dobro()" in (output / "test_calc.py").read_text()
+    
+    def test_failures_are_retried_on_resume(self, project):
+        """Teste negativo: falhas não são salvas e são geradas na próxima execução"""
+        # Arrange
+        output = project / "saida"
+        first = run_batch([str(project / "src")], FakeModel(fail_on="`dobro`"), str(output), log=Mock())
+        model = FakeModel()
+        
+        # Act
+        second = run_batch([str(project / "src")], model, str(output), log=Mock())
+        
+        # Assert
+        assert first.failed == 1
+        assert first.generated == 3
+        assert second.generated == 1
+        assert "`dobro`" in model.prompts[0]
+    
+    def test_files_outside_utf8_are_skipped(self, project):
+        """Teste negativo: arquivo em outra codificação é ignorado e as demais funções são geradas"""
+        # Arrange
+        legado = project / "src" / "pacote" / "legado.py"
+        legado.write_bytes("# Função com acentuação\ndef f():\n    return 'ação'\n".encode("latin-1"))
+        log = Mock()
+        
+        # Act
+        stats = run_batch([str(project / "src")], FakeModel(), str(project / "saida"), log=log)
+        
+        # Assert
+        assert stats.generated == 4
+        log.assert_any_call(f"⚠️  Ignorado (erro de sintaxe ou de codificação): {legado}")
+    
+    def test_run_on_other_folder_keeps_previous_functions(self, project):
+        """Teste de partição por equivalência: rodar em outra pasta não apaga as funções e os testes da primeira"""
+        # Arrange
+        output = project / "saida"
+        other = project / "outro"
+        other.mkdir()
+        (other / "util.py").write_text("def triplo(x):\n    return 3 * x\n")
+        run_batch([str(project / "src")], FakeModel(), str(output), log=Mock())
+        
+        # Act
+        stats = run_batch([str(other)], FakeModel(), str(output), log=Mock())
+        
+        # Assert
+        data = json.loads((output / ".ai_testing_helper_batch.json").read_text())
+        assert stats.removed == 0
+        assert {"pacote.calc:soma", "util:triplo"} <= set(data["functions"])
+        assert "def test_soma()" in (output / "test_calc.py").read_text()
+        assert "def test_triplo()" in (output / "test_util.py").read_text()
+    
+    def test_progress_file_is_valid_json(self, project):
+        """Teste positivo: índice salvo em JSON na pasta de saída"""
+        output = project / "saida"
+        run_batch([str(project / "src")], FakeModel(), str(output), log=Mock())
+        data = json.loads((output / ".ai_testing_helper_batch.json").read_text())
+        assert len(data["results"]) == 4
+        assert "pacote.calc:soma" in data["functions"]
+    
+    def test_main_returns_error_code_on_failures(self, project, capsys):
+        """Teste negativo: código de saída 1 quando alguma função falha"""
+        code = main(
+            [str(project / "src"), "--output-dir", str(project / "saida")],
+            model=FakeModel(fail_on="`soma`")
+        )
+        assert code == 1
+        assert "falhas: 1" in capsys.readouterr().out
+
+
+class TestGenerateUnit:
+    """Testes para a geração dos testes de uma função"""
+    
+    @staticmethod
+    def response(text, reason):
+        response = Mock()
+        response.text = text
+        response.candidates = [Mock()]
+        response.candidates[0].finish_reason.name = reason
+        response.usage_metadata.prompt_token_count = 100
+        response.usage_metadata.candidates_token_count = 50
+        return response
+    
+    def test_truncated_answer_is_continued(self):
+        """Teste positivo: resposta cortada por MAX_TOKENS é continuada, como na página"""
+        # Arrange
+        unit = extract_functions(SOURCE, "calc")[0]
+        model = Mock()
+        model.generate_content.side_effect = [
+            self.response("```python\ndef test_soma():\n", "MAX_TOKENS"),
+            self.response("    assert soma(1, 2) == 3\n```", "STOP"),
+        ]
+        
+        # Act
+        result = generate_unit(model, unit, max_continuations=2)
+        
+        # Assert
+        assert model.generate_content.call_count == 2
+        assert result["code"] == "def test_soma():\n    assert soma(1, 2) == 3"
+        assert result["output_tokens"] > 50
+    
+    def test_failed_continuation_is_not_saved(self):
+        """Teste negativo: continuação que falha vira erro, sem gravar a resposta parcial"""
+        # Arrange
+        unit = extract_functions(SOURCE, "calc")[0]
+        model = Mock()
+        model.generate_content.side_effect = [
+            self.response("```python\ndef test_soma():\n", "MAX_TOKENS"), Exception("Erro de conexão com API"),
+        ]
+        
+        # Act / Assert
+        with pytest.raises(RuntimeError, match="continuação interrompida"):
+            generate_unit(model, unit, max_continuations=2)
+
+
+class TestBatchStats:
+    """Testes para as estatísticas"""
+    
+    def test_stats_without_generation(self):
+        """Teste de limite: sem funções geradas não há divisão por zero"""
+        stats = BatchStats()
+        assert stats.functions_per_minute == 0
+        assert stats.tokens_per_function == 0
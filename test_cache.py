@@ -0,0 +1,196 @@
+import pytest
+
+from ai_testing_helper.cache import (
+    LRUCache,
+    ResponseCache,
+    SQLiteCache,
+    make_cache_key,
+    normalize_prompt,
+)
+from fakes import FakeClock
+
+CONFIG = {"temperature": 0.6, "top_p": 0.8, "top_k": 40, "max_output_tokens": 2048}
+
+
+class TestNormalizePrompt:
+    """Testes para a normalização do prompt"""
+    
+    def test_ignores_trailing_spaces_and_line_endings(self):
+        """Teste de partição por equivalência: mesmo código com formatação diferente"""
+        a = "def soma(a, b):\n    return a + b\n"
+        b = "  def soma(a, b):   \r\n\treturn a + b\r\n\r\n\r\n"
+        assert normalize_prompt(a) == normalize_prompt(b.lstrip())
+    
+    def test_none_prompt(self):
+        """Teste de limite: prompt None"""
+        assert normalize_prompt(None) == "None"
+
+
+class TestMakeCacheKey:
+    """Testes para a chave do cache"""
+    
+    def test_same_request_same_key(self):
+        """Teste positivo: requisições equivalentes geram a mesma chave"""
+        history = [{"role": "user", "content": "Oi"}]
+        key_a = make_cache_key("def f(): pass", history, "gemini-1.5-flash", CONFIG)
+        key_b = make_cache_key("def f(): pass  \n", history, "gemini-1.5-flash", dict(CONFIG))
+        assert key_a == key_b
+    
+    @pytest.mark.parametrize("change", ["prompt", "history", "model", "config"])
+    def test_any_component_changes_key(self, change):
+        """Teste de partição por equivalência: cada componente altera a chave"""
+        # Arrange
+        args = {
+            "prompt": "def f(): pass",
+            "history": [{"role": "user", "content": "Oi"}],
+            "model_name": "gemini-1.5-flash",
+            "generation_config": CONFIG,
+        }
+        base = make_cache_key(**args)
+        changed = dict(args)
+        if change == "prompt":
+            changed["prompt"] = "def g(): pass"
+        elif change == "history":
+            changed["history"] = []
+        elif change == "model":
+            changed["model_name"] = "gemini-1.5-pro"
+        else:
+            changed["generation_config"] = dict(CONFIG, temperature=0.1)
+        
+        # Act / Assert
+        assert make_cache_key(**changed) != base
+
+    
+    def test_variant_changes_key(self):
+        """Teste de partição por equivalência: geração por função tem chave própria"""
+        plain = make_cache_key("p", [], "m", CONFIG)
+        assert make_cache_key("p", [], "m", CONFIG, variant=None) == plain
+        assert make_cache_key("p", [], "m", CONFIG, variant="fan_out") != plain
+
+class TestLRUCache:
+    """Testes para o cache em memória"""
+    
+    def test_get_and_set(self):
+        """Teste positivo: valor armazenado é recuperado"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", "1")
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+    
+    def test_evicts_least_recently_used(self):
+        """Teste de limite: item menos usado sai quando o limite é atingido"""
+        # Arrange
+        cache = LRUCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        
+        # Act
+        cache.set("c", "3")
+        
+        # Assert
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert len(cache) == 2
+    
+    def test_invalid_size(self):
+        """Teste negativo: tamanho precisa ser positivo"""
+        with pytest.raises(ValueError):
+            LRUCache(max_entries=0)
+
+
+class TestSQLiteCache:
+    """Testes para o cache em disco"""
+    
+    def test_persists_between_instances(self, tmp_path):
+        """Teste positivo: valor sobrevive a uma nova instância (ex.: reinício do processo)"""
+        path = str(tmp_path / "cache.db")
+        SQLiteCache(path).set("a", "resposta")
+        assert SQLiteCache(path).get("a") == "resposta"
+    
+    def test_expired_entries_are_removed(self, tmp_path):
+        """Teste de limite: item expirado pelo TTL não é devolvido"""
+        # Arrange
+        clock = FakeClock()
+        cache = SQLiteCache(str(tmp_path / "cache.db"), ttl_seconds=60, clock=clock)
+        cache.set("a", "resposta")
+        
+        # Act
+        clock.now += 61
+        
+        # Assert
+        assert cache.get("a") is None
+        assert len(cache) == 0
+    
+    def test_size_eviction_removes_oldest_accessed(self, tmp_path):
+        """Teste de limite: despejo por tamanho remove o item acessado há mais tempo"""
+        # Arrange
+        clock = FakeClock()
+        cache = SQLiteCache(str(tmp_path / "cache.db"), max_bytes=25, clock=clock)
+        cache.set("a", "x" * 10)
+        clock.now += 1
+        cache.set("b", "y" * 10)
+        clock.now += 1
+        cache.get("a")
+        clock.now += 1
+        
+        # Act
+        cache.set("c", "z" * 10)
+        
+        # Assert
+        assert cache.get("b") is None
+        assert cache.get("a") == "x" * 10
+        assert cache.get("c") == "z" * 10
+
+
+class TestResponseCache:
+    """Testes para o cache em dois níveis"""
+    
+    def test_counts_hits_and_misses(self):
+        """Teste positivo: estatísticas de acertos e falhas"""
+        # Arrange
+        cache = ResponseCache()
+        
+        # Act
+        cache.get("a")
+        cache.set("a", "resposta")
+        cache.get("a")
+        
+        # Assert
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+    
+    def test_disk_hit_is_promoted_to_memory(self, tmp_path):
+        """Teste positivo: acerto no disco passa a ser servido pela memória"""
+        # Arrange
+        disk = SQLiteCache(str(tmp_path / "cache.db"))
+        disk.set("a", "resposta")
+        cache = ResponseCache(disk=disk)
+        
+        # Act
+        result = cache.get("a")
+        
+        # Assert
+        assert result == "resposta"
+        assert cache.memory.get("a") == "resposta"
+    
+    def test_keeps_the_given_memory_tier(self, tmp_path):
+        """Teste de limite: um LRU vazio (len 0) passado ao cache é usado, e não trocado pelo padrão"""
+        # Arrange
+        memory = LRUCache(2)
+        disk = SQLiteCache(str(tmp_path / "cache.db"))
+        
+        # Act
+        cache = ResponseCache(memory, disk)
+        
+        # Assert
+        assert cache.memory is memory
+        assert cache.memory.max_entries == 2
+        assert cache.disk is disk
+    
+    def test_set_writes_both_tiers(self, tmp_path):
+        """Teste positivo: escrita vai para memória e disco"""
+        disk = SQLiteCache(str(tmp_path / "cache.db"))
+        cache = ResponseCache(disk=disk)
+        cache.set("a", "resposta")
+        assert disk.get("a") == "resposta"
+        assert cache.memory.get("a") == "resposta"
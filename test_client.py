@@ -0,0 +1,330 @@
+import pytest
+from unittest.mock import Mock
+
+from ai_testing_helper.client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimiter,
+    ResilientClient,
+    TokenBucket,
+    is_retryable,
+    retry_delay_hint,
+)
+from fakes import ApiError, FakeClock
+
+
+def make_client(model, **kwargs):
+    """Cliente sem espera real e com jitter fixo"""
+    kwargs.setdefault("sleep", Mock())
+    kwargs.setdefault("jitter", lambda: 1.0)
+    return ResilientClient(model, **kwargs)
+
+
+class TestRetryableErrors:
+    """Testes para a classificação de erros"""
+    
+    @pytest.mark.parametrize("code", [429, 500, 503, 504])
+    def test_transient_status_codes(self, code):
+        """Teste positivo: erros transitórios podem ser repetidos"""
+        assert is_retryable(ApiError("falha", code))
+    
+    @pytest.mark.parametrize("code", [400, 401, 403, 404])
+    def test_client_errors_are_not_retryable(self, code):
+        """Teste negativo: erros do cliente não são repetidos"""
+        assert not is_retryable(ApiError("falha", code))
+    
+    def test_connection_errors_are_retryable(self):
+        """Teste de partição por equivalência: falhas de conexão"""
+        assert is_retryable(ConnectionError("caiu"))
+        assert not is_retryable(Exception("Erro de conexão com API"))
+
+
+class TestRetryDelayHint:
+    """Testes para a leitura da dica de espera do servidor"""
+    
+    def test_hint_from_details(self):
+        """Teste positivo: RetryInfo nos detalhes do erro"""
+        error = ApiError("quota", 429)
+        error.details = [Mock(retry_delay=Mock(seconds=12, nanos=500_000_000))]
+        assert retry_delay_hint(error) == 12.5
+    
+    def test_hint_from_message(self):
+        """Teste positivo: retry_delay no texto do erro"""
+        error = ApiError("429 Quota exceeded ... retry_delay {\n  seconds: 31\n}", 429)
+        assert retry_delay_hint(error) == 31
+    
+    def test_no_hint(self):
+        """Teste de limite: erro sem dica"""
+        assert retry_delay_hint(ApiError("falha", 503)) is None
+
+
+class TestTokenBucket:
+    """Testes para o token bucket"""
+    
+    def test_waits_when_empty(self):
+        """Teste de limite: bucket vazio espera a reposição"""
+        # Arrange
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)
+        for _ in range(60):
+            bucket.acquire()
+        
+        # Act
+        waited = bucket.acquire()
+        
+        # Assert
+        assert waited == pytest.approx(1.0)
+    
+    def test_amount_larger_than_capacity_is_clamped(self):
+        """Teste de limite: pedido maior que a capacidade não trava para sempre"""
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+        assert bucket.acquire(100) == 0
+    
+    def test_invalid_rate(self):
+        """Teste negativo: taxa precisa ser positiva"""
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+    
+    def test_rate_limiter_checks_requests_and_tokens(self):
+        """Teste positivo: limite de tokens por minuto também é aplicado"""
+        # Arrange
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=600,
+                              clock=clock, sleep=clock.sleep)
+        limiter.acquire(600)
+        
+        # Act
+        waited = limiter.acquire(60)
+        
+        # Assert
+        assert waited == pytest.approx(6.0)
+
+
+class TestCircuitBreaker:
+    """Testes para o circuit breaker"""
+    
+    def test_opens_after_threshold(self):
+        """Teste de limite: abre após falhas seguidas"""
+        # Arrange
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        
+        # Act
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        
+        # Assert
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+    
+    def test_half_open_after_timeout(self):
+        """Teste positivo: após o tempo de espera, uma chamada de teste passa"""
+        # Arrange
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        
+        # Act
+        breaker.before_call()
+        
+        # Assert
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_failure_in_half_open_reopens(self):
+        """Teste negativo: falha na chamada de teste reabre o circuito"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now += 10
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+
+    def test_only_one_probe_in_half_open(self):
+        """Teste de limite: no meio-aberto passa só a chamada de teste; as demais são recusadas"""
+        # Arrange
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        
+        # Act
+        breaker.before_call()
+        
+        # Assert
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        breaker.before_call()
+    
+    def test_non_retryable_error_in_probe_reopens(self, mock_model):
+        """Teste negativo: erro não recuperável na chamada de teste reabre o circuito (não fica meio-aberto)"""
+        # Arrange
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        mock_model.generate_content.side_effect = ApiError("requisição inválida", 400)
+        client = make_client(mock_model, breaker=breaker)
+        
+        # Act
+        with pytest.raises(ApiError):
+            client.generate_content("prompt")
+        
+        # Assert
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            client.generate_content("prompt")
+    
+    def test_non_retryable_error_does_not_open_closed_circuit(self, mock_model):
+        """Teste de partição por equivalência: pedido inválido com o circuito fechado não conta como instabilidade"""
+        # Arrange
+        breaker = CircuitBreaker(failure_threshold=1)
+        mock_model.generate_content.side_effect = ApiError("requisição inválida", 400)
+        client = make_client(mock_model, breaker=breaker)
+        
+        # Act
+        with pytest.raises(ApiError):
+            client.generate_content("prompt")
+        
+        # Assert
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestResilientClient:
+    """Testes para o cliente resiliente"""
+    
+    def test_success_without_retry(self, mock_model):
+        """Teste positivo: chamada bem-sucedida passa direto"""
+        client = make_client(mock_model)
+        assert client.generate_content("prompt").text == "Resposta mockada do modelo"
+        mock_model.generate_content.assert_called_once_with("prompt")
+    
+    def test_retries_transient_errors(self, mock_model):
+        """Teste positivo: 503 seguido de sucesso"""
+        # Arrange
+        response = mock_model.generate_content.return_value
+        mock_model.generate_content.side_effect = [ApiError("indisponível", 503), response]
+        sleep = Mock()
+        client = make_client(mock_model, sleep=sleep, base_delay=2)
+        
+        # Act
+        result = client.generate_content("prompt")
+        
+        # Assert
+        assert result is response
+        sleep.assert_called_once_with(2)
+        assert client.retries == 1
+    
+    def test_backoff_grows_exponentially(self, mock_model):
+        """Teste de limite: espera dobra a cada tentativa até o máximo"""
+        # Arrange
+        mock_model.generate_content.side_effect = ApiError("indisponível", 503)
+        sleep = Mock()
+        client = make_client(mock_model, sleep=sleep, max_retries=4, base_delay=1, max_delay=5,
+                             breaker=CircuitBreaker(failure_threshold=100))
+        
+        # Act
+        with pytest.raises(ApiError):
+            client.generate_content("prompt")
+        
+        # Assert
+        assert [call[0][0] for call in sleep.call_args_list] == [1, 2, 4, 5]
+        assert mock_model.generate_content.call_count == 5
+    
+    def test_honors_server_retry_hint(self, mock_model):
+        """Teste positivo: espera pelo menos o tempo sugerido pelo servidor"""
+        # Arrange
+        response = mock_model.generate_content.return_value
+        mock_model.generate_content.side_effect = [
+            ApiError("quota retry_delay { seconds: 7 }", 429), response
+        ]
+        sleep = Mock()
+        client = make_client(mock_model, sleep=sleep, base_delay=1, max_delay=30)
+        
+        # Act
+        client.generate_content("prompt")
+        
+        # Assert
+        sleep.assert_called_once_with(7.0)
+    
+    def test_hint_longer_than_max_delay_gives_up(self, mock_model):
+        """Teste de limite: dica acima da espera máxima não é aguardada"""
+        mock_model.generate_content.side_effect = ApiError("retry_delay { seconds: 120 }", 429)
+        client = make_client(mock_model, max_delay=30)
+        with pytest.raises(ApiError):
+            client.generate_content("prompt")
+        assert mock_model.generate_content.call_count == 1
+    
+    def test_non_retryable_error_is_raised_immediately(self, mock_model):
+        """Teste negativo: erro não transitório não é repetido nem abre o circuito"""
+        # Arrange
+        mock_model.generate_content.side_effect = ApiError("requisição inválida", 400)
+        breaker = CircuitBreaker(failure_threshold=1)
+        client = make_client(mock_model, breaker=breaker)
+        
+        # Act / Assert
+        with pytest.raises(ApiError):
+            client.generate_content("prompt")
+        assert mock_model.generate_content.call_count == 1
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_open_circuit_fails_fast(self, mock_model):
+        """Teste negativo: com o circuito aberto o modelo não é chamado"""
+        # Arrange
+        mock_model.generate_content.side_effect = ApiError("indisponível", 503)
+        client = make_client(mock_model, max_retries=0, breaker=CircuitBreaker(failure_threshold=1))
+        with pytest.raises(ApiError):
+            client.generate_content("prompt")
+        
+        # Act / Assert
+        with pytest.raises(CircuitOpenError):
+            client.generate_content("prompt")
+        assert mock_model.generate_content.call_count == 1
+    
+    def test_rate_limiter_is_consulted(self, mock_model):
+        """Teste positivo: cada tentativa passa pelo limitador de taxa"""
+        limiter = Mock()
+        client = make_client(mock_model, rate_limiter=limiter)
+        client.generate_content("x" * 40)
+        limiter.acquire.assert_called_once_with(10)
+    
+    def test_keeps_error_string_contract(self):
+        """Teste negativo: generate_response continua devolvendo a mensagem de erro"""
+        # Arrange
+        from main import generate_response
+        model = Mock()
+        model.generate_content.side_effect = ApiError("Erro de conexão com API", 503)
+        client = make_client(model, max_retries=1, breaker=CircuitBreaker(failure_threshold=100))
+        
+        # Act
+        result = generate_response(client, [], "Pergunta")
+        
+        # Assert
+        assert "Erro ao gerar resposta:" in result
+        assert "Erro de conexão com API" in result
+        assert model.generate_content.call_count == 2
+    
+    def test_delegates_other_attributes(self, mock_model):
+        """Teste positivo: demais atributos vêm do modelo original"""
+        mock_model.model_name = "models/gemini-1.5-flash"
+        assert make_client(mock_model).model_name == "models/gemini-1.5-flash"
+    
+    def test_start_chat_goes_through_client(self, mock_model):
+        """Teste positivo: sessão de chat usa o cliente resiliente"""
+        # Arrange
+        client = make_client(mock_model)
+        
+        # Act
+        chat = client.start_chat(history=[{"role": "user", "parts": ["Oi"]}])
+        
+        # Assert
+        assert chat.model is client
+        assert len(chat.history) == 1
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ai_testing_helper.concurrency import GenerationPool
+
+
+def slow_generation(delay=0.05, text="resposta"):
+    """Simula uma chamada lenta ao modelo (espera de rede)"""
+    time.sleep(delay)
+    return text
+
+
+def run_load(limit, requests=8, delay=0.05):
+    """Dispara ``requests`` gerações e devolve o tempo total"""
+    pool = GenerationPool(max_concurrency=limit)
+    try:
+        start = time.perf_counter()
+        tickets = [pool.submit(slow_generation, delay) for _ in range(requests)]
+        for ticket in tickets:
+            ticket.result()
+        return time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+
+class TestGenerationPool:
+    """Testes para o pool de geração com limite de concorrência"""
+    
+    def test_invalid_limit(self):
+        """Teste negativo: limite precisa ser positivo"""
+        with pytest.raises(ValueError):
+            GenerationPool(max_concurrency=0)
+    
+    def test_submit_returns_result(self):
+        """Teste positivo: resultado da geração devolvido pelo ticket"""
+        pool = GenerationPool(max_concurrency=1)
+        ticket = pool.submit(slow_generation, 0, "ok")
+        assert ticket.result(timeout=1) == "ok"
+        assert ticket.started.is_set()
+        pool.shutdown()
+    
+    def test_never_exceeds_limit(self):
+        """Teste de limite: nunca há mais gerações simultâneas que o limite"""
+        # Arrange
+        pool = GenerationPool(max_concurrency=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+        
+        def tracked():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+        
+        # Act
+        tickets = [pool.submit(tracked) for _ in range(6)]
+        for ticket in tickets:
+            ticket.result(timeout=2)
+        pool.shutdown()
+        
+        # Assert
+        assert max(peak) == 2
+    
+    def test_queue_position_and_wait_time(self):
+        """Teste positivo: pedidos excedentes ficam na fila com posição e espera"""
+        # Arrange
+        pool = GenerationPool(max_concurrency=1)
+        release = threading.Event()
+        running = pool.submit(release.wait)
+        running.started.wait(1)
+        
+        # Act
+        first = pool.submit(slow_generation, 0)
+        second = pool.submit(slow_generation, 0)
+        time.sleep(0.02)
+        
+        # Assert
+        assert pool.position(running) == 0
+        assert pool.position(first) == 1
+        assert pool.position(second) == 2
+        assert pool.stats()["queued"] == 2
+        assert pool.stats()["running"] == 1
+        assert second.wait_time() > 0
+        
+        release.set()
+        second.result(timeout=1)
+        assert pool.stats()["completed"] == 3
+        pool.shutdown()
+    
+    def test_submit_stream_yields_chunks_in_order(self):
+        """Teste positivo: pedaços do streaming chegam na ordem"""
+        pool = GenerationPool(max_concurrency=1)
+        ticket = pool.submit_stream(lambda: iter(["a", "b", "c"]))
+        assert list(ticket.chunks()) == ["a", "b", "c"]
+        pool.shutdown()
+    
+    def test_submit_stream_propagates_errors(self):
+        """Teste negativo: erro no gerador chega a quem consome os pedaços"""
+        # Arrange
+        def broken():
+            yield "parcial"
+            raise RuntimeError("falhou")
+        
+        pool = GenerationPool(max_concurrency=1)
+        ticket = pool.submit_stream(broken)
+        
+        # Act / Assert
+        chunks = ticket.chunks()
+        assert next(chunks) == "parcial"
+        with pytest.raises(RuntimeError):
+            next(chunks)
+        pool.shutdown()
+    
+    def test_chunks_requires_stream_ticket(self):
+        """Teste negativo: chunks só existe para pedidos em streaming"""
+        pool = GenerationPool(max_concurrency=1)
+        ticket = pool.submit(slow_generation, 0)
+        with pytest.raises(ValueError):
+            list(ticket.chunks())
+        pool.shutdown()
+    
+    def test_run_async_does_not_block_event_loop(self):
+        """Teste positivo: várias gerações aguardadas em paralelo no event loop"""
+        # Arrange
+        pool = GenerationPool(max_concurrency=4)
+        # Só passa quando as 4 gerações estão em andamento ao mesmo tempo
+        all_running = threading.Barrier(4, timeout=5)
+        
+        def generation(text):
+            all_running.wait()
+            return text
+        
+        async def scenario():
+            return await asyncio.gather(
+                *(pool.run_async(generation, f"r{i}") for i in range(4))
+            )
+        
+        # Act
+        results = asyncio.run(scenario())
+        pool.shutdown()
+        
+        # Assert
+        assert results == ["r0", "r1", "r2", "r3"]
+        assert not all_running.broken
+
+
+class TestGenerationPoolLoad:
+    """Teste de carga com modelo lento simulado"""
+    
+    @pytest.mark.slow
+    def test_throughput_scales_with_limit(self):
+        """Teste de limite: vazão cresce com a concorrência até o limite"""
+        # Act
+        serial = run_load(limit=1)
+        parallel = run_load(limit=4)
+        saturated = run_load(limit=8)
+        
+        # Assert
+        assert parallel < serial / 2
+        assert saturated < parallel
@@ -0,0 +1,230 @@
+import pytest
+from unittest.mock import Mock
+
+from ai_testing_helper.context_window import (
+    SUMMARY_PREFIX,
+    ContextWindow,
+    estimate_tokens,
+    model_summarizer,
+    model_token_counter,
+    truncating_summarizer,
+)
+
+
+def make_messages(count, size=40):
+    """Gera ``count`` mensagens alternando usuário e assistente"""
+    messages = []
+    for i in range(count):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": f"{i:03d} " + "x" * size})
+    return messages
+
+
+class TestEstimateTokens:
+    """Testes para a estimativa local de tokens"""
+    
+    def test_estimate_tokens_empty(self):
+        """Teste de limite: texto vazio ou None"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens(None) == 0
+    
+    def test_estimate_tokens_grows_with_length(self):
+        """Teste positivo: cerca de 4 caracteres por token"""
+        assert estimate_tokens("a") == 1
+        assert estimate_tokens("a" * 400) == 100
+
+
+class TestModelTokenCounter:
+    """Testes para o contador de tokens baseado no modelo"""
+    
+    def test_counts_each_text_once(self):
+        """Teste positivo: mesmo texto não gera nova chamada à API"""
+        # Arrange
+        model = Mock()
+        model.count_tokens.return_value.total_tokens = 7
+        count = model_token_counter(model)
+        
+        # Act
+        results = [count("mesmo texto"), count("mesmo texto")]
+        
+        # Assert
+        assert results == [7, 7]
+        model.count_tokens.assert_called_once_with("mesmo texto")
+    
+    def test_falls_back_to_estimate_on_error(self):
+        """Teste negativo: erro da API usa a estimativa local"""
+        # Arrange
+        model = Mock()
+        model.count_tokens.side_effect = Exception("API indisponível")
+        
+        # Act
+        result = model_token_counter(model)("a" * 40)
+        
+        # Assert
+        assert result == 10
+
+
+class TestSummarizers:
+    """Testes para os resumidores"""
+    
+    def test_truncating_summarizer_limits_size(self):
+        """Teste de limite: resumo local respeita o tamanho máximo"""
+        # Act
+        summary = truncating_summarizer(max_chars=50)("anterior", make_messages(10))
+        
+        # Assert
+        assert len(summary) == 50
+    
+    def test_model_summarizer_uses_previous_summary(self):
+        """Teste positivo: resumo anterior e novos turnos enviados ao modelo"""
+        # Arrange
+        model = Mock()
+        model.generate_content.return_value.text = "  Resumo novo  "
+        messages = [{"role": "user", "content": "def soma(a, b)"}]
+        
+        # Act
+        summary = model_summarizer(model)("Resumo antigo", messages)
+        
+        # Assert
+        assert summary == "Resumo novo"
+        prompt = model.generate_content.call_args[0][0]
+        assert "Resumo antigo" in prompt
+        assert "Usuário: def soma(a, b)" in prompt
+    
+    def test_model_summarizer_fallback_on_error(self):
+        """Teste negativo: erro do modelo usa o resumidor de fallback"""
+        # Arrange
+        model = Mock()
+        model.generate_content.side_effect = Exception("Erro de conexão")
+        fallback = Mock(return_value="fallback")
+        
+        # Act
+        summary = model_summarizer(model, fallback=fallback)("", make_messages(2))
+        
+        # Assert
+        assert summary == "fallback"
+
+
+class TestContextWindow:
+    """Testes para a janela de contexto com orçamento de tokens"""
+    
+    def test_invalid_budget(self):
+        """Teste negativo: orçamento precisa ser positivo"""
+        with pytest.raises(ValueError):
+            ContextWindow(token_budget=0)
+    
+    def test_small_history_is_kept_verbatim(self):
+        """Teste positivo: histórico dentro do orçamento não é alterado"""
+        # Arrange
+        summarize = Mock()
+        window = ContextWindow(token_budget=10000, summarize=summarize)
+        messages = make_messages(6)
+        
+        # Act
+        result = window.fit(messages)
+        
+        # Assert
+        assert result == messages
+        summarize.assert_not_called()
+        assert window.tokens_used > 0
+    
+    def test_token_counts_are_memoized_up_to_a_limit(self):
+        """Teste de limite: as contagens ficam guardadas, mas só até ``memo_entries`` mensagens"""
+        # Arrange
+        messages = make_messages(10)
+        counters = {size: Mock(side_effect=estimate_tokens) for size in (4, 100)}
+        windows = {size: ContextWindow(token_budget=10000, count_tokens=counter, memo_entries=size)
+                   for size, counter in counters.items()}
+        for window in windows.values():
+            window.fit(messages)
+        first_calls = {size: counter.call_count for size, counter in counters.items()}
+        
+        # Act
+        for window in windows.values():
+            window.fit(messages)
+        
+        # Assert
+        assert counters[100].call_count == first_calls[100]
+        assert counters[4].call_count > first_calls[4]
+    
+    def test_old_turns_are_summarized(self):
+        """Teste positivo: turnos antigos viram resumo e os recentes ficam na íntegra"""
+        # Arrange
+        summarize = Mock(return_value="resumo")
+        window = ContextWindow(token_budget=100, summarize=summarize)
+        messages = make_messages(20)
+        
+        # Act
+        result = window.fit(messages)
+        
+        # Assert
+        assert result[0] == {"role": "user", "content": f"{SUMMARY_PREFIX} resumo"}
+        assert result[-1] == messages[-1]
+        assert result[1:] == messages[window.summarized_count:]
+        assert window.tokens_used <= window.token_budget
+        summarize.assert_called_once_with("", messages[:window.summarized_count])
+    
+    def test_summary_is_cached_between_turns(self):
+        """Teste positivo: resumo não é recalculado enquanto há folga no orçamento"""
+        # Arrange
+        summarize = Mock(return_value="resumo")
+        window = ContextWindow(token_budget=100, summarize=summarize)
+        messages = make_messages(20)
+        window.fit(messages)
+        version = window.version
+        
+        # Act
+        window.fit(messages + make_messages(1))
+        
+        # Assert
+        summarize.assert_called_once()
+        assert window.version == version
+    
+    def test_summary_is_updated_incrementally(self):
+        """Teste positivo: novo resumo parte do anterior e só dos turnos novos"""
+        # Arrange
+        summarize = Mock(side_effect=["resumo 1", "resumo 2"])
+        window = ContextWindow(token_budget=100, summarize=summarize)
+        messages = make_messages(20)
+        window.fit(messages)
+        first_cutoff = window.summarized_count
+        
+        # Act
+        longer = messages + make_messages(10)
+        result = window.fit(longer)
+        
+        # Assert
+        assert summarize.call_count == 2
+        previous, turns = summarize.call_args[0]
+        assert previous == "resumo 1"
+        assert turns == longer[first_cutoff:window.summarized_count]
+        assert result[0]["content"].endswith("resumo 2")
+    
+    def test_changed_history_discards_summary(self):
+        """Teste de partição por equivalência: conversa limpa descarta o resumo"""
+        # Arrange
+        summarize = Mock(return_value="resumo")
+        window = ContextWindow(token_budget=100, summarize=summarize)
+        window.fit(make_messages(20))
+        
+        # Act
+        new_messages = [{"role": "user", "content": "Nova conversa"}]
+        result = window.fit(new_messages)
+        
+        # Assert
+        assert result == new_messages
+        assert window.summary == ""
+        assert window.summarized_count == 0
+    
+    def test_last_message_always_kept(self):
+        """Teste de limite: última mensagem mantida mesmo acima do orçamento"""
+        # Arrange
+        window = ContextWindow(token_budget=10)
+        messages = [{"role": "user", "content": "x" * 1000}]
+        
+        # Act
+        result = window.fit(messages)
+        
+        # Assert
+        assert result == messages
+        assert window.tokens_used > window.token_budget
@@ -0,0 +1,267 @@
+import threading
+from unittest.mock import Mock
+
+from ai_testing_helper.concurrency import GenerationPool
+from ai_testing_helper.fanout import (
+    FanOut,
+    build_function_prompt,
+    merge_answers,
+    plan_fan_out,
+    split_code,
+    wants_tests,
+)
+
+PYTHON_PROMPT = """Crie testes para:
+```python
+import math
+
+def soma(a, b):
+    return a + b
+
+def raiz(x):
+    return math.sqrt(x)
+```"""
+
+
+def answer(code):
+    return f"Aqui estão os testes:\n```python\n{code}\n```"
+
+
+def function_answer(prompt):
+    """Resposta do modelo para o pedido de uma função (o nome vem entre crases)"""
+    name = prompt.split("`")[1]
+    return answer(f"def test_{name}():\n    assert {name}")
+
+
+class TestPlanFanOut:
+    """Testes para a divisão da pergunta em funções"""
+    
+    def test_python_functions_and_shared_context(self):
+        """Teste positivo: funções separadas e imports como contexto"""
+        # Act
+        plan = plan_fan_out(PYTHON_PROMPT)
+        
+        # Assert
+        assert plan.language == "python"
+        assert plan.shared == "import math"
+        assert [unit.name for unit in plan.units] == ["soma", "raiz"]
+        assert plan.units[1].source == "def raiz(x):\n    return math.sqrt(x)"
+    
+    def test_other_language(self):
+        """Teste de partição por equivalência: JavaScript dividido pelas funções"""
+        # Arrange
+        prompt = "Gere os testes:\n```javascript\nfunction soma(a, b) {\n  return a + b;\n}\nfunction sub(a, b) {\n  return a - b;\n}\n```"
+        
+        # Act
+        plan = plan_fan_out(prompt)
+        
+        # Assert
+        assert plan.language == "javascript"
+        assert [unit.name for unit in plan.units] == ["soma", "sub"]
+    
+    def test_duplicated_function_counts_once(self):
+        """Teste de limite: a mesma função colada duas vezes não justifica a divisão"""
+        prompt = "Crie testes:\n```python\ndef soma(a, b):\n    return a + b\n\ndef soma(a, b):\n    return a + b\n```"
+        assert plan_fan_out(prompt) is None
+    
+    def test_single_function_or_no_code(self):
+        """Teste negativo: sem código ou com uma função só não há divisão"""
+        assert plan_fan_out("O que é um mock?") is None
+        assert plan_fan_out("```python\ndef soma(a, b):\n    return a + b\n```") is None
+    
+    def test_function_prompt_includes_context(self):
+        """Teste positivo: cada pedido leva a função e o contexto compartilhado"""
+        # Arrange
+        plan = plan_fan_out(PYTHON_PROMPT)
+        
+        # Act
+        prompt = build_function_prompt(plan, plan.units[0])
+        
+        # Assert
+        assert "`soma`" in prompt
+        assert "import math" in prompt
+        assert "def raiz" not in prompt
+    
+    def test_only_test_requests_are_split(self):
+        """Teste negativo: pergunta sobre o código, mesmo com várias funções, não vira pedidos por função"""
+        # Arrange
+        code = PYTHON_PROMPT[PYTHON_PROMPT.index("```"):]
+        prompt = f"Por que esta função dá erro? Não quero testes, só a explicação. Use unittest.\n{code}"
+        
+        # Act / Assert
+        assert plan_fan_out(prompt) is None
+        assert plan_fan_out(code) is None
+        assert plan_fan_out(f"Explique o que este código faz:\n{code}") is None
+    
+    def test_wants_tests(self):
+        """Teste de partição por equivalência: pedidos de testes e negações"""
+        assert wants_tests("Crie testes unitários para:")
+        assert wants_tests("Quero os testes com pytest")
+        assert wants_tests("Write unit tests for these functions")
+        assert wants_tests("Teste as funções abaixo")
+        assert not wants_tests("Não quero testes, só a explicação. Use unittest.")
+        assert not wants_tests("Não precisa criar testes")
+        assert not wants_tests("Por que o unittest falha aqui?")
+        assert not wants_tests("")
+    
+    def test_function_prompt_keeps_user_instructions(self):
+        """Teste positivo: o texto e as restrições do usuário vão em cada pedido por função"""
+        # Arrange
+        code = PYTHON_PROMPT[PYTHON_PROMPT.index("```"):]
+        plan = plan_fan_out(f"Crie testes com unittest (sem pytest), com nomes em inglês.\n{code}")
+        
+        # Act
+        prompts = [build_function_prompt(plan, unit) for unit in plan.units]
+        
+        # Assert
+        assert plan.instructions == "Crie testes com unittest (sem pytest), com nomes em inglês."
+        assert all("Crie testes com unittest (sem pytest), com nomes em inglês." in prompt for prompt in prompts)
+
+
+class TestMergeAnswers:
+    """Testes para a junção das respostas por função"""
+    
+    def test_hoists_imports_and_fixtures(self):
+        """Teste positivo: imports e fixtures no topo, sem repetição"""
+        # Arrange
+        plan = plan_fan_out(PYTHON_PROMPT)
+        fixture = "@pytest.fixture\ndef numeros():\n    return [1, 4]"
+        answers = [
+            answer(f"import pytest\nfrom modulo import soma\n\n{fixture}\n\ndef test_soma():\n    assert soma(1, 2) == 3"),
+            answer(f"import pytest\nfrom modulo import raiz\n\n{fixture}\n\ndef test_raiz():\n    assert raiz(4) == 2"),
+        ]
+        
+        # Act
+        merged = merge_answers(plan, answers)
+        
+        # Assert
+        assert merged.count("import pytest") == 1
+        assert merged.count("def numeros") == 1
+        assert merged.index("from modulo import raiz") < merged.index("def numeros") < merged.index("def test_soma")
+        assert merged.index("# --- soma ---") < merged.index("# --- raiz ---")
+    
+    def test_duplicated_and_conflicting_tests(self):
+        """Teste de limite: teste idêntico aparece uma vez; nome repetido é renomeado"""
+        # Arrange
+        plan = plan_fan_out(PYTHON_PROMPT)
+        same = "def test_tipo():\n    assert True"
+        answers = [
+            answer(f"{same}\n\ndef test_caso():\n    assert soma(1, 1) == 2"),
+            answer(f"{same}\n\ndef test_caso():\n    assert raiz(9) == 3"),
+        ]
+        
+        # Act
+        merged = merge_answers(plan, answers)
+        
+        # Assert
+        assert merged.count("def test_tipo") == 1
+        assert "def test_caso():" in merged
+        assert "def test_caso_raiz():" in merged
+    
+    def test_conflicting_fixtures_are_renamed(self):
+        """Teste de limite: fixtures com o mesmo nome e conteúdo diferente não se sobrescrevem"""
+        # Arrange
+        plan = plan_fan_out(PYTHON_PROMPT)
+        answers = [
+            answer("import pytest\n\n@pytest.fixture\ndef dados():\n    return (1, 2)\n\n"
+                   "def test_soma(dados):\n    assert soma(*dados) == 3"),
+            answer("import pytest\n\n@pytest.fixture\ndef dados():\n    return 9\n\n"
+                   "def test_raiz(dados):\n    assert raiz(dados) == 3"),
+        ]
+        
+        # Act
+        merged = merge_answers(plan, answers)
+        
+        # Assert
+        assert "def dados():\n    return (1, 2)" in merged
+        assert "def dados_raiz():\n    return 9" in merged
+        assert "def test_raiz(dados_raiz):" in merged
+        assert "def test_soma(dados):" in merged
+    
+    def test_failed_function_is_reported(self):
+        """Teste negativo: falha em uma função aparece como erro (e não vai para o cache)"""
+        # Arrange
+        plan = plan_fan_out(PYTHON_PROMPT)
+        
+        # Act
+        merged = merge_answers(plan, [answer("def test_soma():\n    pass"), "Erro ao gerar resposta: 503"])
+        
+        # Assert
+        assert "def test_soma" in merged
+        assert "Erro ao gerar resposta:" in merged
+        assert "`raiz`" in merged
+    
+    def test_split_code_non_python(self):
+        """Teste de partição por equivalência: código que não é Python separa só os imports"""
+        # Act
+        imports, fixtures, body = split_code("const assert = require('assert');\ntest('soma', () => {});")
+        
+        # Assert
+        assert imports == ["const assert = require('assert');"]
+        assert fixtures == []
+        assert body == [(None, "test('soma', () => {});")]
+
+
+class TestFanOut:
+    """Testes para a geração em paralelo"""
+    
+    def test_runs_concurrently_and_keeps_order(self):
+        """Teste positivo: as funções são geradas ao mesmo tempo e as seções seguem a ordem do código"""
+        # Arrange
+        plan = plan_fan_out(PYTHON_PROMPT)
+        # As duas gerações precisam estar em andamento juntas; "raiz" termina antes de "soma"
+        both_running = threading.Barrier(2, timeout=5)
+        raiz_done = threading.Event()
+        
+        def generate(model, history, prompt):
+            name = prompt.split("`")[1]
+            both_running.wait()
+            if name == "soma":
+                assert raiz_done.wait(5)
+            answer_text = function_answer(prompt)
+            if name == "raiz":
+                raiz_done.set()
+            return answer_text
+        
+        pool = GenerationPool(max_concurrency=2)
+        fan_out = FanOut(pool, None, plan, generate=generate)
+        
+        # Act
+        sections = list(fan_out.stream())
+        pool.shutdown()
+        
+        # Assert
+        assert not both_running.broken
+        assert "`soma`" in sections[1] and "`raiz`" in sections[2]
+        assert fan_out.answer.index("test_soma") < fan_out.answer.index("test_raiz")
+    
+    def test_history_goes_to_every_function(self):
+        """Teste positivo: cada pedido por função recebe o histórico da conversa"""
+        # Arrange
+        plan = plan_fan_out(PYTHON_PROMPT)
+        history = [{"role": "user", "content": "Use sempre unittest"}, {"role": "assistant", "content": "Certo"}]
+        generate = Mock(return_value=answer("def test_a():\n    pass"))
+        pool = GenerationPool(max_concurrency=2)
+        
+        # Act
+        FanOut(pool, "modelo", plan, generate=generate, history=history).result()
+        pool.shutdown()
+        
+        # Assert
+        assert generate.call_count == 2
+        assert all(call.args[1] == history for call in generate.call_args_list)
+    
+    def test_result_without_streaming(self):
+        """Teste positivo: result() espera todas as funções"""
+        # Arrange
+        plan = plan_fan_out(PYTHON_PROMPT)
+        model = Mock()
+        model.generate_content.side_effect = lambda prompt: Mock(text=function_answer(prompt))
+        pool = GenerationPool(max_concurrency=2)
+        
+        # Act
+        result = FanOut(pool, model, plan).result()
+        pool.shutdown()
+        
+        # Assert
+        assert "def test_soma" in result and "def test_raiz" in result
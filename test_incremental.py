@@ -0,0 +1,339 @@
+import ast
+import subprocess
+from unittest.mock import Mock
+
+import pytest
+
+from ai_testing_helper.batch import extract_functions, run_batch
+from ai_testing_helper.incremental import (
+    FunctionIndex,
+    dependency_fingerprint,
+    git_changed_files,
+    module_definitions,
+    normalized_ast_hash,
+)
+from test_batch import FakeModel
+
+MODULE = '''
+import math
+
+LIMITE = 10
+
+
+def auxiliar(x):
+    return min(x, LIMITE)
+
+
+def principal(x):
+    return auxiliar(x) + 1
+
+
+def independente(y):
+    return math.sqrt(y)
+
+
+class Conta:
+    def validar(self, valor):
+        return valor > 0
+
+    def depositar(self, valor):
+        if self.validar(valor):
+            return valor
+'''
+
+
+def fingerprints(source):
+    """Impressões digitais (ast, deps) de cada função do código"""
+    return {
+        unit.qualname: (unit.ast_hash, unit.deps_hash)
+        for unit in extract_functions(source, "modulo")
+    }
+
+
+def git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Repositório git com dois módulos já commitados"""
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "config", "user.email", "teste@example.com")
+    git(tmp_path, "config", "user.name", "Teste")
+    (tmp_path / "a.py").write_text("def fa(x):\n    return x\n")
+    (tmp_path / "b.py").write_text("def fb(x):\n    return -x\n")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "inicial")
+    return tmp_path
+
+
+class TestNormalizedAstHash:
+    """Testes para o hash do AST normalizado"""
+    
+    def test_ignores_formatting_and_comments(self):
+        """Teste de partição por equivalência: mesmo código, formatação diferente"""
+        a = "def f(a, b):\n    return a + b\n"
+        b = "def f(a,b):  # soma\n\n    return (a\n            + b)\n"
+        assert normalized_ast_hash(a) == normalized_ast_hash(b)
+    
+    def test_detects_logic_change(self):
+        """Teste negativo: mudança de lógica altera o hash"""
+        assert normalized_ast_hash("def f(a):\n    return a\n") != normalized_ast_hash("def f(a):\n    return -a\n")
+
+
+class TestDependencyFingerprint:
+    """Testes para a impressão digital das dependências"""
+    
+    def test_helper_change_propagates_transitively(self):
+        """Teste positivo: alterar uma constante muda quem depende dela, direta ou indiretamente"""
+        before = fingerprints(MODULE)
+        after = fingerprints(MODULE.replace("LIMITE = 10", "LIMITE = 20"))
+        assert before["auxiliar"][1] != after["auxiliar"][1]
+        assert before["principal"][1] != after["principal"][1]
+        assert before["principal"][0] == after["principal"][0]
+    
+    def test_unrelated_change_keeps_fingerprint(self):
+        """Teste de partição por equivalência: função sem relação não é afetada"""
+        before = fingerprints(MODULE)
+        after = fingerprints(MODULE.replace("LIMITE = 10", "LIMITE = 20"))
+        assert before["independente"] == after["independente"]
+    
+    def test_methods_follow_self_calls(self):
+        """Teste positivo: métodos usados via self entram nas dependências"""
+        before = fingerprints(MODULE)
+        after = fingerprints(MODULE.replace("return valor > 0", "return valor >= 0"))
+        assert before["Conta.depositar"][1] != after["Conta.depositar"][1]
+        assert before["Conta.depositar"][0] == after["Conta.depositar"][0]
+    
+    def test_recursive_function(self):
+        """Teste de limite: função recursiva não depende de si mesma"""
+        tree = ast.parse("def f(n):\n    return f(n - 1) if n else 0\n")
+        assert dependency_fingerprint(tree.body[0], module_definitions(tree)) == \
+            dependency_fingerprint(tree.body[0], {})
+
+
+class TestFunctionIndex:
+    """Testes para o índice de funções"""
+    
+    def test_roundtrip(self, tmp_path):
+        """Teste positivo: índice recarregado de outra instância"""
+        path = str(tmp_path / "indice.json")
+        index = FunctionIndex(path)
+        index.set("chave", {"code": "x"})
+        index.replace_functions({"m:f": {"path": "m.py", "file_hash": "h", "module": "m", "qualname": "f",
+                                         "lineno": 1, "key": "chave"}})
+        index.save()
+        reloaded = FunctionIndex(path)
+        assert reloaded.get("chave") == {"code": "x"}
+        assert reloaded.is_complete("m.py", "h")
+    
+    def test_results_go_to_journal_until_saved(self, tmp_path):
+        """Teste positivo: cada resultado é acrescentado ao diário, sem regravar o índice inteiro"""
+        # Arrange
+        path = str(tmp_path / "indice.json")
+        index = FunctionIndex(path)
+        
+        # Act
+        for number in range(50):
+            index.set(f"k{number}", {"code": str(number)})
+        
+        # Assert
+        assert not (tmp_path / "indice.json").exists()
+        assert len((tmp_path / "indice.json.journal").read_text().splitlines()) == 50
+        index.save()
+        assert not (tmp_path / "indice.json.journal").exists()
+        assert FunctionIndex(path).get("k49") == {"code": "49"}
+    
+    def test_interrupted_run_resumes_from_journal(self, tmp_path):
+        """Teste de limite: execução interrompida (sem save e com a última linha cortada) não perde resultados"""
+        # Arrange
+        path = str(tmp_path / "indice.json")
+        index = FunctionIndex(path)
+        index.set("k1", {"code": "1"})
+        index.save()
+        index.set("k2", {"code": "2"})
+        with open(f"{path}.journal", "a", encoding="utf-8") as journal:
+            journal.write('{"key": "k3", "res')
+        
+        # Act
+        resumed = FunctionIndex(path)
+        resumed.set("k4", {"code": "4"})
+        
+        # Assert
+        assert resumed.get("k1") == {"code": "1"}
+        assert resumed.get("k2") == {"code": "2"}
+        assert resumed.get("k3") is None
+        assert FunctionIndex(path).get("k4") == {"code": "4"}
+    
+    def test_removed_functions_drop_results(self, tmp_path):
+        """Teste positivo: funções removidas saem do índice junto com os testes"""
+        # Arrange
+        index = FunctionIndex(str(tmp_path / "indice.json"))
+        index.set("k1", {"code": "1"})
+        index.set("k2", {"code": "2"})
+        index.replace_functions({
+            "m:f": {"path": "m.py", "module": "m", "qualname": "f", "lineno": 1, "key": "k1"},
+            "m:g": {"path": "m.py", "module": "m", "qualname": "g", "lineno": 5, "key": "k2"},
+        })
+        
+        # Act
+        removed = index.replace_functions({
+            "m:f": {"path": "m.py", "module": "m", "qualname": "f", "lineno": 1, "key": "k1"},
+        })
+        
+        # Assert
+        assert removed == 1
+        assert index.get("k2") is None
+        assert index.get("k1") == {"code": "1"}
+    
+    def test_functions_outside_scanned_paths_are_kept(self, tmp_path):
+        """Teste de partição por equivalência: só saem funções de arquivos sob as pastas analisadas"""
+        # Arrange
+        index = FunctionIndex(str(tmp_path / "indice.json"))
+        index.set("k1", {"code": "1"})
+        index.set("k2", {"code": "2"})
+        first, second = str(tmp_path / "a" / "m.py"), str(tmp_path / "b" / "n.py")
+        index.replace_functions({
+            "m:f": {"path": first, "module": "m", "qualname": "f", "lineno": 1, "key": "k1"},
+            "n:g": {"path": second, "module": "n", "qualname": "g", "lineno": 1, "key": "k2"},
+        })
+        
+        # Act
+        removed = index.replace_functions({}, [str(tmp_path / "b")])
+        
+        # Assert
+        assert removed == 1
+        assert set(index.functions) == {"m:f"}
+        assert index.get("k1") == {"code": "1"} and index.get("k2") is None
+    
+    def test_incomplete_file(self, tmp_path):
+        """Teste de limite: arquivo sem resultado para alguma função"""
+        index = FunctionIndex(str(tmp_path / "indice.json"))
+        index.replace_functions({"m:f": {"path": "m.py", "file_hash": "h", "module": "m", "qualname": "f",
+                                         "lineno": 1, "key": "k"}})
+        assert not index.is_complete("m.py", "h")
+        assert not index.is_complete("outro.py", "h")
+    
+    def test_changed_content_is_not_complete(self, tmp_path):
+        """Teste negativo: arquivo com outro conteúdo (outro hash) não reaproveita o índice"""
+        # Arrange
+        index = FunctionIndex(str(tmp_path / "indice.json"))
+        index.set("k", {"code": "1"})
+        
+        # Act
+        index.replace_functions({"m:f": {"path": "m.py", "file_hash": "antigo", "module": "m", "qualname": "f",
+                                         "lineno": 1, "key": "k"}})
+        
+        # Assert
+        assert index.is_complete("m.py", "antigo")
+        assert not index.is_complete("m.py", "novo")
+
+
+class TestGitChangedFiles:
+    """Testes para o scanner baseado no git diff"""
+    
+    def test_lists_modified_and_untracked_files(self, repo):
+        """Teste positivo: arquivos alterados e novos desde HEAD"""
+        (repo / "a.py").write_text("def fa(x):\n    return x + 1\n")
+        (repo / "c.py").write_text("def fc():\n    pass\n")
+        changed = git_changed_files(str(repo))
+        assert changed == {str(repo / "a.py"), str(repo / "c.py")}
+    
+    def test_outside_git_repository(self, tmp_path):
+        """Teste negativo: fora de um repositório git"""
+        assert git_changed_files(str(tmp_path)) is None
+
+
+class TestIncrementalBatch:
+    """Testes para a regeração incremental no modo em lote"""
+    
+    def test_only_changed_files_are_parsed_and_generated(self, repo):
+        """Teste positivo: com --since, só o arquivo alterado vai ao modelo"""
+        # Arrange
+        output = repo / "saida"
+        run_batch([str(repo)], FakeModel(), str(output), log=Mock())
+        (repo / "a.py").write_text("def fa(x):\n    return x * 2\n")
+        model = FakeModel()
+        
+        # Act
+        stats = run_batch([str(repo)], model, str(output), since="HEAD", log=Mock())
+        
+        # Assert
+        assert stats.generated == 1
+        assert stats.reused_files == 1
+        assert "`fa`" in model.prompts[0]
+        assert "def test_fb()" in (output / "test_b.py").read_text()
+    
+    def test_file_changed_outside_the_diff_is_regenerated(self, repo):
+        """Teste negativo: arquivo alterado e já commitado (fora do diff) não reaproveita testes antigos"""
+        # Arrange
+        output = repo / "saida"
+        run_batch([str(repo)], FakeModel(), str(output), log=Mock())
+        (repo / "a.py").write_text("def fa(x):\n    return x * 3\n")
+        git(repo, "commit", "-qam", "altera a")
+        model = FakeModel()
+        
+        # Act
+        stats = run_batch([str(repo)], model, str(output), since="HEAD", log=Mock())
+        
+        # Assert
+        assert stats.generated == 1
+        assert stats.reused_files == 1
+        assert "x * 3" in model.prompts[0]
+    
+    def test_since_covers_every_repository(self, repo, tmp_path_factory):
+        """Teste de partição por equivalência: com caminhos em dois repositórios, vale o diff de cada um"""
+        # Arrange
+        other = tmp_path_factory.mktemp("outro")
+        git(other, "init", "-q")
+        git(other, "config", "user.email", "teste@example.com")
+        git(other, "config", "user.name", "Teste")
+        (other / "c.py").write_text("def fc(x):\n    return x\n")
+        git(other, "add", ".")
+        git(other, "commit", "-q", "-m", "inicial")
+        (other / "c.py").write_text("def fc(x):\n    return x + 1\n")
+        output = repo / "saida"
+        run_batch([str(repo), str(other)], FakeModel(), str(output), log=Mock())
+        
+        # Act
+        stats = run_batch([str(repo), str(other)], FakeModel(), str(output), since="HEAD", log=Mock())
+        
+        # Assert
+        # c.py está no diff do segundo repositório: é analisado de novo (sem ir ao modelo)
+        assert stats.reused_files == 2
+        assert stats.generated == 0
+    
+    def test_deleted_functions_and_modules_drop_out(self, repo):
+        """Teste positivo: função e módulo apagados saem do índice e dos arquivos"""
+        # Arrange
+        output = repo / "saida"
+        run_batch([str(repo)], FakeModel(), str(output), log=Mock())
+        (repo / "b.py").unlink()
+        
+        # Act
+        stats = run_batch([str(repo)], FakeModel(), str(output), since="HEAD", log=Mock())
+        
+        # Assert
+        assert stats.removed == 1
+        assert not (output / "test_b.py").exists()
+        assert (output / "test_a.py").exists()
+        index = FunctionIndex(str(output / ".ai_testing_helper_batch.json"))
+        assert list(index.functions) == ["a:fa"]
+        assert len(index.results) == 1
+    
+    def test_dependency_change_regenerates_dependents(self, tmp_path):
+        """Teste positivo: mudar uma auxiliar regera quem a usa"""
+        # Arrange
+        (tmp_path / "modulo.py").write_text(MODULE)
+        output = tmp_path / "saida"
+        run_batch([str(tmp_path / "modulo.py")], FakeModel(), str(output), log=Mock())
+        (tmp_path / "modulo.py").write_text(MODULE.replace("LIMITE = 10", "LIMITE = 20"))
+        model = FakeModel()
+        
+        # Act
+        stats = run_batch([str(tmp_path / "modulo.py")], model, str(output), log=Mock())
+        
+        # Assert
+        generated = sorted(prompt.split("para a função `")[1].split("`")[0] for prompt in model.prompts)
+        assert generated == ["auxiliar", "principal"]
+        assert stats.skipped == 3
@@ -3,13 +3,13 @@ import os
 from unittest.mock import Mock, patch, MagicMock
 
 # Importar as funções que queremos testar
-# Usando try/except para evitar erros de importação durante desenvolvimento
-try:
-    from main import init_gemini, generate_response
-except ImportError:
-    # Se não conseguir importar, criar mocks para os testes
-    init_gemini = Mock()
-    generate_response = Mock()
+# A lógica fica no pacote ai_testing_helper; main.py só monta a página do Streamlit
+from ai_testing_helper.generation import (
+    init_gemini, generate_response, stream_response, SYSTEM_INSTRUCTIONS,
+    to_chat_history, start_chat_session, generate_chat_response, stream_chat_response,
+    stitch, build_continuation_prompt, TRUNCATED_NOTE
+)
+from ai_testing_helper.resources import get_gemini_model, get_model_registry
 
 
 class TestInitGemini:
@@ -73,6 +73,55 @@ class TestInitGemini:
         assert call_args[1]['model_name'] == "gemini-1.5-flash"
         assert isinstance(call_args[1]['model_name'], str)
         assert len(call_args[1]['model_name']) > 0
+    
+    def test_init_gemini_with_system_instruction(self, mock_genai):
+        """Teste positivo: instruções do sistema repassadas ao modelo no modo de chat"""
+        # Act
+        init_gemini(system_instruction=SYSTEM_INSTRUCTIONS)
+        
+        # Assert
+        call_args = mock_genai.call_args
+        assert call_args[1]['system_instruction'] == SYSTEM_INSTRUCTIONS
+        assert call_args[1]['model_name'] == "gemini-1.5-flash"
+
+
+class TestSharedModel:
+    """Testes para o modelo compartilhado entre sessões"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_model_registry(self):
+        get_model_registry().clear()
+        yield
+        get_model_registry().clear()
+    
+    def test_same_configuration_reuses_model(self, mock_genai):
+        """Teste positivo: mesma configuração devolve a mesma instância"""
+        # Arrange
+        config = {"temperature": 0.6, "top_p": 0.8, "top_k": 40, "max_output_tokens": 2048}
+        
+        # Act
+        first = get_gemini_model("gemini-1.5-flash", config)
+        second = get_gemini_model("gemini-1.5-flash", dict(config))
+        
+        # Assert
+        assert first is second
+        mock_genai.assert_called_once()
+    
+    def test_different_configuration_creates_new_model(self, mock_genai):
+        """Teste de partição por equivalência: configurações diferentes, modelos diferentes"""
+        # Arrange
+        mock_genai.side_effect = lambda **kwargs: Mock()
+        config = {"temperature": 0.6, "top_p": 0.8, "top_k": 40, "max_output_tokens": 2048}
+        
+        # Act
+        plain = get_gemini_model("gemini-1.5-flash", config)
+        with_instructions = get_gemini_model("gemini-1.5-flash", config, SYSTEM_INSTRUCTIONS)
+        other_config = get_gemini_model("gemini-1.5-flash", dict(config, temperature=0.2))
+        
+        # Assert
+        assert len({id(plain), id(with_instructions), id(other_config)}) == 3
+        assert mock_genai.call_count == 3
+        assert mock_genai.call_args[1]['generation_config']['temperature'] == 0.2
 
 
 class TestGenerateResponse:
@@ -245,6 +294,348 @@ class TestGenerateResponse:
         assert "Erro ao gerar resposta:" in result
 
 
+class TestStreamResponse:
+    """Testes para a função stream_response"""
+    
+    def test_stream_response_yields_chunks(self, mock_streaming_model):
+        """Teste positivo: pedaços da resposta são entregues em ordem"""
+        # Arrange
+        messages = [{"role": "user", "content": "Pergunta"}]
+        new_prompt = "Nova pergunta"
+        
+        # Act
+        result = list(stream_response(mock_streaming_model, messages, new_prompt))
+        
+        # Assert
+        assert result == ["Resposta ", "mockada ", "em streaming"]
+        assert "".join(result) == "Resposta mockada em streaming"
+    
+    def test_stream_response_uses_stream_flag(self, mock_streaming_model):
+        """Teste positivo: o modelo é chamado com stream=True e o mesmo prompt"""
+        # Arrange
+        messages = [{"role": "user", "content": "Pergunta anterior"}]
+        new_prompt = "Nova pergunta"
+        
+        # Act
+        list(stream_response(mock_streaming_model, messages, new_prompt))
+        
+        # Assert
+        call_args = mock_streaming_model.generate_content.call_args
+        assert call_args[1]["stream"] is True
+        assert "Usuário: Pergunta anterior" in call_args[0][0]
+        assert call_args[0][0].endswith("Assistente:")
+    
+    def test_stream_response_skips_empty_chunks(self):
+        """Teste de limite: chunks sem texto são ignorados"""
+        # Arrange
+        mock_model = Mock()
+        
+        class EmptyChunk:
+            @property
+            def text(self):
+                raise ValueError("Chunk sem partes")
+        
+        empty_chunk = EmptyChunk()
+        text_chunk = Mock()
+        text_chunk.text = "Texto"
+        mock_model.generate_content.return_value = iter([text_chunk, empty_chunk])
+        
+        # Act
+        result = list(stream_response(mock_model, [], "Pergunta"))
+        
+        # Assert
+        assert result == ["Texto"]
+    
+    def test_stream_response_api_exception(self):
+        """Teste negativo: erro da API vira a mesma mensagem de erro do modo sem streaming"""
+        # Arrange
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = Exception("Erro de conexão com API")
+        
+        # Act
+        result = "".join(stream_response(mock_model, [], "Pergunta"))
+        
+        # Assert
+        assert "Erro ao gerar resposta:" in result
+        assert "Erro de conexão com API" in result
+    
+    def test_stream_response_exception_mid_stream(self):
+        """Teste negativo: erro no meio do streaming mantém o texto parcial"""
+        # Arrange
+        mock_model = Mock()
+        chunk = Mock()
+        chunk.text = "Parcial "
+        
+        def broken_stream():
+            yield chunk
+            raise Exception("Conexão perdida")
+        
+        mock_model.generate_content.return_value = broken_stream()
+        
+        # Act
+        result = "".join(stream_response(mock_model, [], "Pergunta"))
+        
+        # Assert
+        assert result.startswith("Parcial ")
+        assert "Erro ao gerar resposta: Conexão perdida" in result
+
+
+class TestChatSession:
+    """Testes para o modo de sessão de chat nativa"""
+    
+    def test_to_chat_history_maps_roles(self, sample_messages):
+        """Teste positivo: papéis convertidos para o formato do Gemini"""
+        # Act
+        history = to_chat_history(sample_messages)
+        
+        # Assert
+        assert history == [
+            {"role": "user", "parts": ["Como criar testes unitários?"]},
+            {"role": "model", "parts": ["Para criar testes unitários, você deve..."]},
+            {"role": "user", "parts": ["E testes de integração?"]},
+        ]
+    
+    def test_to_chat_history_ignores_unknown_roles(self):
+        """Teste negativo: mensagens com papel desconhecido são ignoradas"""
+        # Arrange
+        messages = [
+            {"role": "system", "content": "Ignorar"},
+            {"role": "user", "content": None}
+        ]
+        
+        # Act
+        history = to_chat_history(messages)
+        
+        # Assert
+        assert history == [{"role": "user", "parts": ["None"]}]
+    
+    def test_start_chat_session_uses_history(self, sample_messages):
+        """Teste positivo: sessão aberta com o histórico existente"""
+        # Arrange
+        mock_model = Mock()
+        
+        # Act
+        chat = start_chat_session(mock_model, sample_messages)
+        
+        # Assert
+        assert chat == mock_model.start_chat.return_value
+        history = mock_model.start_chat.call_args[1]['history']
+        assert len(history) == len(sample_messages)
+    
+    def test_generate_chat_response_sends_only_new_prompt(self):
+        """Teste positivo: apenas a nova pergunta é enviada a cada turno"""
+        # Arrange
+        chat = Mock()
+        chat.send_message.return_value.text = "Resposta do chat"
+        
+        # Act
+        first = generate_chat_response(chat, "Primeira pergunta")
+        second = generate_chat_response(chat, "Segunda pergunta")
+        
+        # Assert
+        assert first == second == "Resposta do chat"
+        sent = [call[0][0] for call in chat.send_message.call_args_list]
+        assert sent == ["Primeira pergunta", "Segunda pergunta"]
+    
+    def test_generate_chat_response_api_exception(self):
+        """Teste negativo: erro da API mantém a mensagem de erro padrão"""
+        # Arrange
+        chat = Mock()
+        chat.send_message.side_effect = Exception("Erro de conexão com API")
+        
+        # Act
+        result = generate_chat_response(chat, "Pergunta")
+        
+        # Assert
+        assert "Erro ao gerar resposta:" in result
+        assert "Erro de conexão com API" in result
+    
+    def test_stream_chat_response_yields_chunks(self, mock_streaming_model):
+        """Teste positivo: streaming pela sessão de chat"""
+        # Arrange
+        chat = Mock()
+        chat.send_message.return_value = mock_streaming_model.generate_content.return_value
+        
+        # Act
+        result = "".join(stream_chat_response(chat, "Pergunta"))
+        
+        # Assert
+        assert result == "Resposta mockada em streaming"
+        assert chat.send_message.call_args[1]["stream"] is True
+    
+    def test_system_instructions_match_prompt_content(self):
+        """Teste de partição por equivalência: mesmas instruções do prompt em texto"""
+        # Assert
+        for prompt_part in [
+            "especialista em testes automatizados",
+            "testes unitários robustos",
+            "Positivos",
+            "Negativos",
+            "Limites",
+            "Partição por equivalência"
+        ]:
+            assert prompt_part in SYSTEM_INSTRUCTIONS
+
+
+def fake_response(text, reason="STOP", chunks=None):
+    """Resposta com ``finish_reason``; com ``chunks``, iterável como no streaming"""
+    candidate = Mock()
+    candidate.finish_reason.name = reason
+    pieces = []
+    for piece in chunks or []:
+        chunk = Mock()
+        chunk.text = piece
+        pieces.append(chunk)
+    response = MagicMock()
+    response.text = text
+    response.candidates = [candidate]
+    response.__iter__.side_effect = lambda: iter(pieces)
+    return response
+
+
+class TestContinuation:
+    """Testes para a continuação automática de respostas cortadas por max_output_tokens"""
+    
+    def test_generate_response_continues_truncated_answer(self):
+        """Teste positivo: pede continuações com o final da resposta e junta as partes"""
+        # Arrange
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            fake_response("```python\ndef test_a():\n    assert a()\n", "MAX_TOKENS"),
+            fake_response("\ndef test_b():\n    assert b()\n```"),
+        ]
+        
+        # Act
+        result = generate_response(mock_model, [{"role": "user", "content": "Histórico longo"}], "Pergunta")
+        
+        # Assert
+        assert result == "```python\ndef test_a():\n    assert a()\n\ndef test_b():\n    assert b()\n```"
+        continuation_prompt = mock_model.generate_content.call_args_list[1][0][0]
+        assert "assert a()" in continuation_prompt
+        assert "Histórico longo" not in continuation_prompt
+        assert SYSTEM_INSTRUCTIONS not in continuation_prompt
+    
+    def test_continuation_limit(self):
+        """Teste de limite: respeita o máximo de continuações e avisa que ficou incompleta"""
+        # Arrange
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = lambda prompt: fake_response("mais texto ", "MAX_TOKENS")
+        
+        # Act
+        result = generate_response(mock_model, [], "Pergunta", max_continuations=2)
+        
+        # Assert
+        assert mock_model.generate_content.call_count == 3
+        assert result.endswith(TRUNCATED_NOTE)
+    
+    def test_continuation_disabled_by_env(self):
+        """Teste de partição por equivalência: GEMINI_MAX_CONTINUATIONS=0 desliga"""
+        # Arrange
+        mock_model = Mock()
+        mock_model.generate_content.return_value = fake_response("```python\nparcial", "MAX_TOKENS")
+        
+        # Act
+        with patch.dict(os.environ, {"GEMINI_MAX_CONTINUATIONS": "0"}):
+            result = generate_response(mock_model, [], "Pergunta")
+        
+        # Assert
+        mock_model.generate_content.assert_called_once()
+        assert result == "```python\nparcial\n```" + TRUNCATED_NOTE
+    
+    def test_failed_continuation_keeps_partial_answer(self):
+        """Teste negativo: erro na continuação mantém a parte gerada com a mensagem de erro"""
+        # Arrange
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            fake_response("Parte gerada", "MAX_TOKENS"),
+            Exception("Cota excedida"),
+        ]
+        
+        # Act
+        result = generate_response(mock_model, [], "Pergunta")
+        
+        # Assert
+        assert result.startswith("Parte gerada")
+        assert "Erro ao gerar resposta:" in result and "Cota excedida" in result
+    
+    def test_stitch_removes_repetition_and_reopened_fence(self):
+        """Teste de limite: o trecho repetido e o bloco de código reaberto são removidos"""
+        # Arrange
+        text = "```python\ndef test_soma():\n    assert soma(1, 2) =="
+        
+        # Act / Assert
+        assert stitch(text, "```python\n    assert soma(1, 2) == 3\n```") == text + " 3\n```"
+        assert stitch("abc", "def") == "abcdef"
+    
+    def test_continuation_prompt_sends_only_the_tail(self):
+        """Teste de limite: respostas longas mandam só o final, a partir de uma linha inteira"""
+        # Arrange
+        text = "".join(f"linha {i}\n" for i in range(1000))
+        
+        # Act
+        prompt = build_continuation_prompt(text, tail_chars=100)
+        
+        # Assert
+        assert "linha 999" in prompt
+        assert "linha 900\n" not in prompt
+        assert "<<<\nlinha" in prompt
+    
+    def test_stream_response_continues_in_the_same_stream(self):
+        """Teste positivo: as continuações seguem no mesmo streaming, sem repetir o final"""
+        # Arrange
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            fake_response("", "MAX_TOKENS", chunks=["def test_a():\n", "    assert a(1) == 2\n"]),
+            fake_response("", chunks=["    assert a(1) ", "== 2\n", "def test_b():\n", "    pass\n"]),
+        ]
+        
+        # Act
+        result = list(stream_response(mock_model, [], "Pergunta"))
+        
+        # Assert
+        assert "".join(result) == "def test_a():\n    assert a(1) == 2\ndef test_b():\n    pass\n"
+        assert mock_model.generate_content.call_args_list[1][1]["stream"] is True
+    
+    def test_chat_session_keeps_the_complete_answer(self):
+        """Teste positivo: a continuação vai direto ao modelo e o histórico do chat fica completo"""
+        # Arrange
+        chat = Mock()
+        chat.history = [{"role": "user", "parts": ["Pergunta"]}, {"role": "model", "parts": ["Parte 1 "]}]
+        chat.send_message.return_value = fake_response("Parte 1 ", "MAX_TOKENS")
+        chat.model.generate_content.return_value = fake_response("Parte 2")
+        
+        # Act
+        result = generate_chat_response(chat, "Pergunta")
+        
+        # Assert
+        assert result == "Parte 1 Parte 2"
+        chat.send_message.assert_called_once()
+        assert chat.history[-1] == {"role": "model", "parts": ["Parte 1 Parte 2"]}
+    
+    def test_real_sdk_finish_reason(self):
+        """Teste positivo: reconhece o MAX_TOKENS das respostas do SDK"""
+        # Arrange
+        from google.generativeai import protos
+        from google.generativeai.types import generation_types
+        
+        def sdk_response(text, reason):
+            return generation_types.GenerateContentResponse.from_response(protos.GenerateContentResponse(
+                candidates=[protos.Candidate(
+                    content=protos.Content(role="model", parts=[protos.Part(text=text)]),
+                    finish_reason=reason,
+                )]
+            ))
+        
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            sdk_response("Parte 1 ", protos.Candidate.FinishReason.MAX_TOKENS),
+            sdk_response("Parte 2", protos.Candidate.FinishReason.STOP),
+        ]
+        
+        # Act / Assert
+        assert generate_response(mock_model, [], "Pergunta") == "Parte 1 Parte 2"
+
+
 class TestPromptConstruction:
     """Testes específicos para construção de prompts"""
     
@@ -350,26 +741,90 @@ class TestMessageValidation:
 class TestIntegration:
     """Testes de integração simulados"""
     
+    def test_import_has_no_side_effects(self, mock_streamlit):
+        """Teste positivo: importar main não monta a página nem configura a API"""
+        import importlib
+        import streamlit as st
+        import main
+        
+        with patch('google.generativeai.configure') as mock_configure:
+            importlib.reload(main)
+        
+        st.set_page_config.assert_not_called()
+        mock_configure.assert_not_called()
+    
     @pytest.mark.integration
-    def test_complete_workflow_simulation(self, mock_streamlit, mock_environment):
-        """Teste de integração: fluxo completo simulado"""
-        # Este teste simula o fluxo completo sem executar Streamlit real
-        with patch('main.genai.configure') as mock_configure, \
-             patch('main.init_gemini') as mock_init, \
-             patch('main.generate_response') as mock_generate:
-            
-            mock_model = Mock()
-            mock_init.return_value = mock_model
-            mock_generate.return_value = "Resposta de integração"
+    def test_complete_workflow_simulation(self, mock_environment, mock_model):
+        """Teste de integração: fluxo completo da página com o modelo mockado"""
+        from streamlit.testing.v1 import AppTest
+        from ai_testing_helper.cache import LRUCache, ResponseCache
+        
+        app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        with patch('google.generativeai.configure'), \
+             patch('ai_testing_helper.resources.get_gemini_model', return_value=mock_model), \
+             patch('ai_testing_helper.resources.get_response_cache', return_value=ResponseCache(LRUCache(10))):
+            app = AppTest.from_file(app_path, default_timeout=30).run()
+            app.toggle(key="streaming").set_value(False)
+            app.toggle(key="chat_mode").set_value(False)
+            app.run()
+            app.chat_input[0].set_value("Como testar?").run()
+        
+        assert not app.exception
+        assert app.session_state.messages[-1] == {"role": "assistant", "content": "Resposta mockada do modelo"}
+        mock_model.generate_content.assert_called_once()
+
+    
+    @pytest.mark.integration
+    def test_cache_hit_skips_context_fit(self, mock_environment, mock_model):
+        """Teste de integração: uma resposta em cache sai sem ajustar (nem resumir) o histórico"""
+        from streamlit.testing.v1 import AppTest
+        from ai_testing_helper.cache import LRUCache, ResponseCache
+        from ai_testing_helper.context_window import ContextWindow
+        from ai_testing_helper.similarity import SimilarityIndex
+        
+        # Arrange
+        app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        with patch('google.generativeai.configure'), \
+             patch('ai_testing_helper.resources.get_gemini_model', return_value=mock_model), \
+             patch('ai_testing_helper.resources.get_similarity_index', return_value=SimilarityIndex()), \
+             patch('ai_testing_helper.resources.get_response_cache', return_value=ResponseCache(LRUCache(10))):
+            sessions = []
+            for _ in range(2):
+                app = AppTest.from_file(app_path, default_timeout=30).run()
+                app.toggle(key="streaming").set_value(False)
+                app.toggle(key="chat_mode").set_value(False)
+                sessions.append(app.run())
+            sessions[0].chat_input[0].set_value("Como testar?").run()
             
-            # Simular importação do módulo
-            try:
-                import main
-                # Se chegou aqui, a importação funcionou
-                assert True
-            except Exception as e:
-                # Se falhou, ainda assim podemos verificar os mocks
-                assert mock_configure.called or not mock_configure.called  # Sempre True
+            # Act
+            with patch.object(ContextWindow, "fit", autospec=True) as fit:
+                sessions[1].chat_input[0].set_value("Como testar?").run()
+        
+        # Assert
+        assert not sessions[1].exception
+        assert sessions[1].session_state.messages[-1]["content"] == "Resposta mockada do modelo"
+        fit.assert_not_called()
+        mock_model.generate_content.assert_called_once()
+    
+    @pytest.mark.integration
+    def test_history_is_paginated(self, mock_environment):
+        """Teste de integração: histórico longo exibe só a última página e carrega as anteriores"""
+        from streamlit.testing.v1 import AppTest
+        
+        app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        messages = [{"role": "user", "content": f"mensagem {i}"} for i in range(5)]
+        with patch('google.generativeai.configure'), \
+             patch.dict(os.environ, {'HISTORY_PAGE_SIZE': '2'}):
+            app = AppTest.from_file(app_path, default_timeout=30)
+            app.session_state["messages"] = messages
+            app.run()
+            first_page = [m.markdown[0].value for m in app.chat_message]
+            app.button(key="load_earlier").click().run()
+            second_page = [m.markdown[0].value for m in app.chat_message]
+        
+        assert not app.exception
+        assert first_page == ["mensagem 3", "mensagem 4"]
+        assert second_page == ["mensagem 1", "mensagem 2", "mensagem 3", "mensagem 4"]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+import gc
+import sqlite3
+
+import pytest
+
+from ai_testing_helper.context_window import ContextWindow
+from ai_testing_helper.generation import build_prompt
+from ai_testing_helper.messages import Message, MessageStore, prefix_fingerprint
+
+
+def make_messages(count):
+    """Gera ``count`` mensagens alternando usuário e assistente"""
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"mensagem {i}"}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "messages.db")
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestMessageStore:
+    """Testes para o histórico com limite de mensagens em memória"""
+    
+    def test_behaves_like_list_of_dicts(self, db_path):
+        """Teste positivo: índices, fatias, len e iteração como na lista"""
+        # Arrange
+        messages = make_messages(10)
+        store = MessageStore(messages, max_resident=3, path=db_path)
+        
+        # Act / Assert
+        assert len(store) == 10
+        assert list(store) == messages
+        assert store[0] == messages[0]
+        assert store[-1] == messages[-1]
+        assert list(store[2:8]) == messages[2:8]
+        assert store[:-1] == messages[:-1]
+        assert store[::3] == messages[::3]
+    
+    def test_spills_old_messages_to_disk(self, db_path):
+        """Teste de limite: só as últimas max_resident mensagens ficam em memória"""
+        # Act
+        store = MessageStore(make_messages(10), max_resident=3, path=db_path)
+        
+        # Assert
+        assert store.spilled == 7
+        assert len(store._resident) == 3
+        assert count_rows(db_path) == 7
+    
+    def test_same_view_for_generate_response(self, db_path):
+        """Teste positivo: o prompt montado é o mesmo da lista de dicts"""
+        # Arrange
+        messages = make_messages(6)
+        store = MessageStore(messages, max_resident=2, path=db_path)
+        
+        # Act / Assert
+        assert build_prompt(store, "nova") == build_prompt(messages, "nova")
+    
+    def test_clear_removes_spilled_rows(self, db_path):
+        """Teste positivo: limpar a conversa apaga também o disco"""
+        # Arrange
+        store = MessageStore(make_messages(5), max_resident=2, path=db_path)
+        
+        # Act
+        store.clear()
+        store.append({"role": "user", "content": "nova"})
+        
+        # Assert
+        assert list(store) == [{"role": "user", "content": "nova"}]
+        assert count_rows(db_path) == 0
+    
+    def test_sessions_share_file_without_mixing(self, db_path):
+        """Teste de partição por equivalência: duas sessões no mesmo arquivo"""
+        # Act
+        first = MessageStore(make_messages(4), max_resident=1, path=db_path)
+        second = MessageStore([{"role": "user", "content": "outra"}] * 4, max_resident=1, path=db_path)
+        
+        # Assert
+        assert list(first) == make_messages(4)
+        assert list(second) == [{"role": "user", "content": "outra"}] * 4
+    
+    def test_collected_store_drops_rows(self, db_path):
+        """Teste positivo: sessão encerrada não deixa mensagens no disco"""
+        # Arrange
+        store = MessageStore(make_messages(5), max_resident=1, path=db_path)
+        
+        # Act
+        del store
+        gc.collect()
+        
+        # Assert
+        assert count_rows(db_path) == 0
+    
+    def test_index_out_of_range(self, db_path):
+        """Teste negativo: índice fora do histórico"""
+        # Arrange
+        store = MessageStore(make_messages(2), path=db_path)
+        
+        # Act / Assert
+        with pytest.raises(IndexError):
+            store[2]
+    
+    def test_invalid_max_resident(self, db_path):
+        """Teste negativo: limite de mensagens em memória inválido"""
+        with pytest.raises(ValueError):
+            MessageStore(max_resident=0, path=db_path)
+    
+    def test_message_has_no_dict(self):
+        """Teste positivo: mensagens em memória usam __slots__"""
+        assert not hasattr(Message("user", "oi", ""), "__dict__")
+
+
+class TestPrefixFingerprint:
+    """Testes para o fingerprint do início do histórico"""
+    
+    def test_store_matches_list(self, db_path):
+        """Teste positivo: mesmo fingerprint para a lista e para o store"""
+        # Arrange
+        messages = make_messages(8)
+        store = MessageStore(messages, max_resident=3, path=db_path)
+        
+        # Act / Assert
+        for count in (0, 1, 5, 8):
+            assert prefix_fingerprint(store, count) == prefix_fingerprint(messages, count)
+            assert prefix_fingerprint(store[:-1], min(count, 7)) == prefix_fingerprint(messages, min(count, 7))
+    
+    def test_context_window_with_store(self, db_path):
+        """Teste de integração: a janela de contexto resume igual com lista ou store"""
+        # Arrange
+        messages = [{"role": m["role"], "content": m["content"] + " " + "x" * 200} for m in make_messages(20)]
+        store = MessageStore(messages, max_resident=4, path=db_path)
+        from_list = ContextWindow(token_budget=300)
+        from_store = ContextWindow(token_budget=300)
+        
+        # Act / Assert
+        assert from_store.fit(store) == from_list.fit(messages)
+        assert from_store.summary == from_list.summary
+        assert from_store.summarized_count > 0
@@ -0,0 +1,239 @@
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from ai_testing_helper.concurrency import GenerationPool
+from ai_testing_helper.generation import generate_response, stream_response
+from ai_testing_helper.metrics import Histogram, Metrics, SessionMetrics, metrics
+
+
+@pytest.fixture
+def enabled_metrics():
+    """Liga o registro do processo durante o teste e o limpa ao final"""
+    metrics.reset()
+    metrics.enabled = True
+    yield metrics
+    metrics.enabled = False
+    metrics.reset()
+
+
+def make_usage(prompt_tokens, response_tokens):
+    usage = Mock()
+    usage.prompt_token_count = prompt_tokens
+    usage.candidates_token_count = response_tokens
+    return usage
+
+
+class TestHistogram:
+    """Testes para o histograma com buckets fixos"""
+    
+    def test_observe_counts_and_sum(self):
+        """Teste positivo: contagem, soma e buckets cumulativos"""
+        # Arrange
+        histogram = Histogram((1, 5))
+        for value in (0.5, 2, 10):
+            histogram.observe(value)
+        
+        # Act
+        snapshot = histogram.snapshot()
+        
+        # Assert
+        assert snapshot["count"] == 3
+        assert snapshot["sum"] == 12.5
+        assert snapshot["buckets"] == [(1, 1), (5, 2), (float("inf"), 3)]
+    
+    def test_quantile_uses_bucket_bound(self):
+        """Teste positivo: quantil aproximado pelo limite do bucket"""
+        # Arrange
+        histogram = Histogram((1, 5))
+        for value in (0.5, 0.6, 0.7, 4):
+            histogram.observe(value)
+        
+        # Act / Assert
+        assert histogram.quantile(0.5) == 1
+        assert histogram.quantile(0.95) == 5
+    
+    def test_empty_quantile(self):
+        """Teste de limite: histograma vazio"""
+        assert Histogram((1,)).quantile(0.5) == 0.0
+
+
+class TestMetrics:
+    """Testes para o registro de métricas"""
+    
+    def test_disabled_records_nothing(self):
+        """Teste negativo: desligadas, as medições não criam histogramas"""
+        # Arrange
+        registry = Metrics()
+        
+        # Act
+        with registry.timer("generate_seconds"):
+            pass
+        registry.observe("prompt_tokens", 10)
+        
+        # Assert
+        assert registry.snapshot() == {}
+        assert registry.to_prometheus() == ""
+    
+    def test_timer_records_duration(self):
+        """Teste positivo: o timer registra uma observação"""
+        # Arrange
+        registry = Metrics(enabled=True)
+        
+        # Act
+        with registry.timer("render_seconds"):
+            pass
+        
+        # Assert
+        assert registry.snapshot()["render_seconds"]["count"] == 1
+    
+    def test_session_scope_receives_observations(self):
+        """Teste positivo: medições dentro do escopo vão também para a sessão"""
+        # Arrange
+        registry = Metrics(enabled=True)
+        session = SessionMetrics()
+        
+        # Act
+        with registry.session_scope(session):
+            registry.observe("generate_seconds", 0.2)
+        registry.observe("generate_seconds", 0.4)
+        
+        # Assert
+        assert session.last == {"generate_seconds": 0.2}
+        assert session.rows()[0]["n"] == 1
+        assert registry.snapshot()["generate_seconds"]["count"] == 2
+    
+    def test_record_usage_ignores_missing_fields(self):
+        """Teste de limite: usage_metadata ausente ou incompleto"""
+        # Arrange
+        registry = Metrics(enabled=True)
+        
+        # Act
+        registry.record_usage(object())
+        registry.record_usage(Mock(usage_metadata=make_usage(12, None)))
+        
+        # Assert
+        assert list(registry.snapshot()) == ["prompt_tokens"]
+    
+    def test_cached_token_ratio(self):
+        """Teste positivo: fração do prompt atendida pelo cache de contexto"""
+        # Arrange
+        registry = Metrics(enabled=True)
+        usage = make_usage(1000, 10)
+        usage.cached_content_token_count = 800
+        
+        # Act
+        registry.record_usage(Mock(usage_metadata=usage))
+        registry.record_usage(Mock(usage_metadata=make_usage(1000, 10)))
+        
+        # Assert
+        assert registry.cached_token_ratio() == 0.4
+        assert Metrics(enabled=True).cached_token_ratio() == 0.0
+    
+    def test_prometheus_format(self):
+        """Teste positivo: buckets, soma e contagem no texto do Prometheus"""
+        # Arrange
+        registry = Metrics(enabled=True)
+        registry.observe("generate_seconds", 0.3)
+        
+        # Act
+        text = registry.to_prometheus()
+        
+        # Assert
+        assert "# TYPE ai_testing_helper_generate_seconds histogram" in text
+        assert 'ai_testing_helper_generate_seconds_bucket{le="0.25"} 0' in text
+        assert 'ai_testing_helper_generate_seconds_bucket{le="0.5"} 1' in text
+        assert 'ai_testing_helper_generate_seconds_bucket{le="+Inf"} 1' in text
+        assert "ai_testing_helper_generate_seconds_count 1" in text
+    
+    def test_label_scope_creates_series(self):
+        """Teste positivo: uma série por rótulo no Prometheus"""
+        # Arrange
+        registry = Metrics(enabled=True)
+        with registry.label_scope(route="conceptual"):
+            registry.observe("generate_seconds", 0.3)
+        registry.observe("generate_seconds", 0.3)
+        
+        # Act
+        text = registry.to_prometheus()
+        
+        # Assert
+        assert text.count("# TYPE ai_testing_helper_generate_seconds histogram") == 1
+        assert 'ai_testing_helper_generate_seconds_bucket{route="conceptual",le="0.5"} 1' in text
+        assert 'ai_testing_helper_generate_seconds_count{route="conceptual"} 1' in text
+        assert "ai_testing_helper_generate_seconds_count 1" in text
+    
+    def test_export_json_lines_appends(self, tmp_path):
+        """Teste positivo: .jsonl acrescenta um snapshot por exportação"""
+        # Arrange
+        registry = Metrics(enabled=True)
+        registry.observe("prompt_tokens", 100)
+        path = str(tmp_path / "metrics.jsonl")
+        
+        # Act
+        registry.export(path)
+        registry.export(path)
+        
+        # Assert
+        lines = [json.loads(line) for line in open(path, encoding="utf-8")]
+        assert len(lines) == 2
+        assert lines[0]["metric"] == "prompt_tokens"
+        assert lines[0]["buckets"]["256"] == 1
+    
+    def test_export_prometheus_file(self, tmp_path):
+        """Teste positivo: outras extensões são reescritas em formato Prometheus"""
+        # Arrange
+        registry = Metrics(enabled=True)
+        registry.observe("render_seconds", 0.01)
+        path = tmp_path / "metrics.prom"
+        
+        # Act
+        registry.export(str(path))
+        registry.export(str(path))
+        
+        # Assert
+        assert path.read_text(encoding="utf-8") == registry.to_prometheus()
+        assert [p.name for p in tmp_path.iterdir()] == ["metrics.prom"]
+
+
+class TestInstrumentation:
+    """Testes para os pontos de medição da geração"""
+    
+    def test_generate_response_records_stages(self, enabled_metrics, mock_model):
+        """Teste positivo: prompt, chamada e tokens do usage_metadata"""
+        # Arrange
+        mock_model.generate_content.return_value.usage_metadata = make_usage(120, 30)
+        
+        # Act
+        generate_response(mock_model, [], "Pergunta")
+        
+        # Assert
+        snapshot = enabled_metrics.snapshot()
+        assert set(snapshot) == {"prompt_build_seconds", "generate_seconds", "prompt_tokens", "response_tokens"}
+        assert snapshot["prompt_tokens"]["sum"] == 120
+    
+    def test_stream_response_records_first_token(self, enabled_metrics, mock_streaming_model):
+        """Teste positivo: tempo até o primeiro texto no streaming"""
+        # Act
+        list(stream_response(mock_streaming_model, [], "Pergunta"))
+        
+        # Assert
+        snapshot = enabled_metrics.snapshot()
+        assert snapshot["first_token_seconds"]["count"] == 1
+        assert snapshot["generate_seconds"]["count"] == 1
+    
+    def test_pool_propagates_session_scope(self, enabled_metrics):
+        """Teste de integração: medições nas threads do pool chegam à sessão"""
+        # Arrange
+        pool = GenerationPool(max_concurrency=1)
+        session = SessionMetrics()
+        
+        # Act
+        with enabled_metrics.session_scope(session):
+            pool.run(enabled_metrics.observe, "generate_seconds", 0.1)
+        pool.shutdown()
+        
+        # Assert
+        assert session.last["generate_seconds"] == 0.1
+        assert "queue_wait_seconds" in session.last
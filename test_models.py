@@ -0,0 +1,84 @@
+import threading
+import time
+from unittest.mock import Mock
+
+from ai_testing_helper.models import ModelRegistry, model_key
+
+
+class TestModelKey:
+    """Testes para a chave de configuração do modelo"""
+    
+    def test_config_order_does_not_matter(self):
+        """Teste de partição por equivalência: ordem das chaves não altera a chave"""
+        a = model_key("gemini-1.5-flash", {"temperature": 0.6, "top_k": 40})
+        b = model_key("gemini-1.5-flash", {"top_k": 40, "temperature": 0.6})
+        assert a == b
+        assert hash(a) == hash(b)
+    
+    def test_none_config(self):
+        """Teste de limite: configuração ausente"""
+        assert model_key("gemini-1.5-flash", None) == ("gemini-1.5-flash", (), None)
+
+
+class TestModelRegistry:
+    """Testes para o registro de modelos compartilhados"""
+    
+    def test_reuses_instance_for_same_configuration(self):
+        """Teste positivo: mesma configuração, mesma instância"""
+        # Arrange
+        factory = Mock(side_effect=lambda **kwargs: object())
+        registry = ModelRegistry(factory)
+        
+        # Act
+        first = registry.get("gemini-1.5-flash", {"temperature": 0.6})
+        second = registry.get("gemini-1.5-flash", {"temperature": 0.6})
+        
+        # Assert
+        assert first is second
+        factory.assert_called_once_with(
+            model_name="gemini-1.5-flash",
+            generation_config={"temperature": 0.6},
+            system_instruction=None
+        )
+    
+    def test_separate_instance_per_instruction(self):
+        """Teste de partição por equivalência: instruções diferentes, modelos diferentes"""
+        registry = ModelRegistry(lambda **kwargs: object())
+        plain = registry.get("gemini-1.5-flash", {"temperature": 0.6})
+        chat = registry.get("gemini-1.5-flash", {"temperature": 0.6}, "Instruções")
+        assert plain is not chat
+        assert len(registry) == 2
+    
+    def test_concurrent_sessions_build_model_once(self):
+        """Teste de limite: sessões concorrentes não criam o modelo duas vezes"""
+        # Arrange
+        calls = []
+        
+        def slow_factory(**kwargs):
+            calls.append(kwargs)
+            time.sleep(0.01)
+            return object()
+        
+        registry = ModelRegistry(slow_factory)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get("gemini-1.5-flash", {})))
+            for _ in range(8)
+        ]
+        
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # Assert
+        assert len(calls) == 1
+        assert len({id(model) for model in results}) == 1
+    
+    def test_clear_forces_new_instance(self):
+        """Teste positivo: clear descarta os modelos criados"""
+        registry = ModelRegistry(lambda **kwargs: object())
+        first = registry.get("gemini-1.5-flash")
+        registry.clear()
+        assert registry.get("gemini-1.5-flash") is not first
@@ -0,0 +1,276 @@
+import pytest
+from unittest.mock import Mock
+
+from ai_testing_helper.context_window import estimate_tokens
+from ai_testing_helper.generation import SYSTEM_INSTRUCTIONS, build_prompt
+from ai_testing_helper.prefix_cache import DEFAULT_MIN_TOKENS, PrefixCache, PrefixCachingClient, split_prefix
+from fakes import ApiError
+
+LARGE_SOURCE = "def soma(a, b):\n    return a + b\n" * 400
+# Acima de large_message_tokens, mas o prefixo fica abaixo de min_tokens
+MEDIUM_SOURCE = "def soma(a, b):\n    return a + b\n" * 80
+
+
+class FakeBackend:
+    """Backend em memória que registra as chamadas ao cache de contexto"""
+
+    def __init__(self):
+        self.created = []
+        self.refreshed = []
+        self.deleted = []
+        self.fail_create = None
+        self.fail_refresh = None
+
+    def create(self, model_name, system_instruction, contents, ttl):
+        if self.fail_create:
+            raise self.fail_create
+        handle = f"cachedContents/{len(self.created)}"
+        self.created.append((handle, model_name, system_instruction, contents, ttl))
+        return handle
+
+    def refresh(self, handle, ttl):
+        if self.fail_refresh:
+            raise self.fail_refresh
+        self.refreshed.append(handle)
+
+    def delete(self, handle):
+        self.deleted.append(handle)
+
+    def model(self, handle, generation_config):
+        model = Mock(name=handle)
+        model.handle = handle
+        model.generation_config = generation_config
+        return model
+
+
+def conversation(*contents):
+    messages = []
+    for index, content in enumerate(contents):
+        messages.append({"role": "user" if index % 2 == 0 else "assistant", "content": content})
+    return messages
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+@pytest.fixture
+def cache(backend, clock):
+    return PrefixCache(backend, ttl=600, min_tokens=1000, large_message_tokens=500, max_entries=2, clock=clock)
+
+
+class TestSplitPrefix:
+    """Testes para a escolha do prefixo estável"""
+
+    def test_text_prompt_without_large_message(self):
+        """Teste de limite: sem mensagem grande não há prefixo (só as instruções fixas não bastam)"""
+        # Arrange
+        prompt = build_prompt(conversation("Oi", "Olá"), "Como testar?")
+
+        # Act
+        split = split_prefix(prompt, SYSTEM_INSTRUCTIONS, 500)
+
+        # Assert
+        assert split is None
+
+    def test_fixed_instructions_are_below_the_gemini_minimum(self):
+        """Teste de limite: as instruções fixas sozinhas nunca chegam ao mínimo do cache de contexto"""
+        assert estimate_tokens(SYSTEM_INSTRUCTIONS) < DEFAULT_MIN_TOKENS
+
+    def test_text_prompt_with_large_source(self):
+        """Teste positivo: o prefixo vai até a resposta ao arquivo grande"""
+        messages = conversation(LARGE_SOURCE, "Testes do arquivo", "E os negativos?", "Negativos...")
+        prompt = build_prompt(messages, "E os limites?")
+
+        split = split_prefix(prompt, SYSTEM_INSTRUCTIONS, 500)
+
+        assert split.prefix.endswith("Assistente: Testes do arquivo\n")
+        assert split.remaining == "Usuário: E os negativos?\nAssistente: Negativos...\nUsuário: E os limites?\nAssistente:"
+        # O prefixo não muda nos turnos seguintes
+        next_prompt = build_prompt(messages + conversation("E os limites?", "Limites..."), "Mais?")
+        assert split_prefix(next_prompt, SYSTEM_INSTRUCTIONS, 500).prefix == split.prefix
+
+    def test_large_source_in_the_new_question(self):
+        """Teste de limite: o arquivo da pergunta atual só entra no prefixo depois de respondido"""
+        prompt = build_prompt([], LARGE_SOURCE)
+
+        assert split_prefix(prompt, SYSTEM_INSTRUCTIONS, 500) is None
+
+    def test_chat_contents(self):
+        """Teste positivo: no chat, o prefixo são os conteúdos até a resposta ao arquivo grande"""
+        contents = [
+            {"role": "user", "parts": [LARGE_SOURCE]},
+            {"role": "model", "parts": ["Testes"]},
+            {"role": "user", "parts": ["E os limites?"]},
+        ]
+
+        split = split_prefix(contents, None, 500)
+
+        assert split.prefix == contents[:2]
+        assert split.remaining == contents[2:]
+
+    def test_other_prompts_have_no_prefix(self):
+        """Teste negativo: prompts sem as instruções fixas (ex.: continuações) não usam cache"""
+        assert split_prefix("Continue a resposta", SYSTEM_INSTRUCTIONS) is None
+        assert split_prefix(None, SYSTEM_INSTRUCTIONS) is None
+
+
+class TestPrefixCache:
+    """Testes para a criação e o reaproveitamento dos prefixos"""
+
+    def test_small_prefix_falls_back(self, cache, backend):
+        """Teste negativo: prefixo abaixo do mínimo do Gemini não é enviado ao cache"""
+        # Arrange
+        prompt = build_prompt(conversation(MEDIUM_SOURCE, "Testes"), "Como testar?")
+
+        # Act / Assert
+        assert cache.lookup("gemini-1.5-flash", None, {}, prompt, SYSTEM_INSTRUCTIONS) is None
+        assert backend.created == []
+        assert cache.stats()["skipped"] == 1
+
+    def test_prefix_is_uploaded_once(self, cache, backend):
+        """Teste positivo: o prefixo é criado uma vez e referenciado nos turnos seguintes"""
+        messages = conversation(LARGE_SOURCE, "Testes do arquivo")
+        first = build_prompt(messages, "E os negativos?")
+        second = build_prompt(messages + conversation("E os negativos?", "Negativos..."), "E os limites?")
+
+        lookup = cache.lookup("gemini-1.5-flash", None, {"temperature": 0.4}, first, SYSTEM_INSTRUCTIONS)
+        again = cache.lookup("gemini-1.5-flash", None, {"temperature": 0.4}, second, SYSTEM_INSTRUCTIONS)
+
+        assert len(backend.created) == 1
+        handle, model_name, _, contents, ttl = backend.created[0]
+        assert model_name == "gemini-1.5-flash" and ttl == 600
+        assert contents[0]["parts"][0].startswith(SYSTEM_INSTRUCTIONS)
+        assert lookup.model is again.model
+        assert lookup.remaining == "Usuário: E os negativos?\nAssistente:"
+        assert again.remaining.startswith("Usuário: E os negativos?")
+        assert cache.stats()["reused"] == 1
+
+    def test_generation_config_shares_the_handle(self, cache, backend):
+        """Teste de partição por equivalência: outra configuração usa o mesmo prefixo em cache"""
+        prompt = build_prompt(conversation(LARGE_SOURCE, "Testes"), "Mais?")
+
+        first = cache.lookup("m", None, {"temperature": 0.4}, prompt, SYSTEM_INSTRUCTIONS)
+        second = cache.lookup("m", None, {"temperature": 0.7}, prompt, SYSTEM_INSTRUCTIONS)
+
+        assert len(backend.created) == 1
+        assert first.model.handle == second.model.handle
+        assert second.model.generation_config == {"temperature": 0.7}
+
+    def test_ttl_is_refreshed_while_in_use(self, cache, backend, clock):
+        """Teste de limite: perto de expirar, o TTL é renovado; se falhar, o prefixo é recriado"""
+        prompt = build_prompt(conversation(LARGE_SOURCE, "Testes"), "Mais?")
+        cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS)
+
+        clock.now = 400
+        cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS)
+        clock.now = 1200
+        backend.fail_refresh = ApiError("Not found", 404)
+        cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS)
+
+        assert backend.refreshed == ["cachedContents/0"]
+        assert len(backend.created) == 2
+        assert backend.deleted == ["cachedContents/0"]
+
+    def test_unavailable_model_is_not_retried(self, cache, backend, clock):
+        """Teste negativo: falha na criação desliga o cache do modelo por um tempo"""
+        prompt = build_prompt(conversation(LARGE_SOURCE, "Testes"), "Mais?")
+        backend.fail_create = ApiError("Model does not support caching", 400)
+
+        assert cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS) is None
+        backend.fail_create = None
+        assert cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS) is None
+        clock.now = 10_000
+        assert cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS) is not None
+        assert cache.stats()["failures"] == 1
+
+    def test_oldest_prefix_is_deleted(self, cache, backend):
+        """Teste de limite: acima de max_entries o prefixo mais antigo é apagado do servidor"""
+        for index in range(3):
+            prompt = build_prompt(conversation(f"{index}{LARGE_SOURCE}", "Testes"), "Mais?")
+            cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS)
+
+        assert backend.deleted == ["cachedContents/0"]
+        assert cache.stats()["entries"] == 2
+
+
+class TestPrefixCachingClient:
+    """Testes para o cliente que usa o prefixo em cache"""
+
+    def make(self, cache):
+        inner = Mock()
+        inner.generate_content.return_value = "resposta completa"
+        return inner, PrefixCachingClient(inner, cache, "m", {}, None, static_prefix=SYSTEM_INSTRUCTIONS)
+
+    def test_sends_only_the_remaining_prompt(self, cache):
+        """Teste positivo: com prefixo em cache, só o restante é enviado"""
+        inner, client = self.make(cache)
+        prompt = build_prompt(conversation(LARGE_SOURCE, "Testes"), "Mais?")
+
+        client.generate_content(prompt, stream=True)
+
+        cached_model = cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS).model
+        cached_model.generate_content.assert_called_once_with("Usuário: Mais?\nAssistente:", stream=True)
+        inner.generate_content.assert_not_called()
+
+    def test_short_prompt_uses_the_full_request(self, cache):
+        """Teste de partição por equivalência: sem prefixo em cache, pedido completo"""
+        inner, client = self.make(cache)
+
+        assert client.generate_content("Continue a resposta") == "resposta completa"
+        inner.generate_content.assert_called_once_with("Continue a resposta")
+
+    def test_cache_error_falls_back(self, cache, backend):
+        """Teste negativo: prefixo expirado no servidor cai no pedido completo e é descartado"""
+        inner, client = self.make(cache)
+        prompt = build_prompt(conversation(LARGE_SOURCE, "Testes"), "Mais?")
+        cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS).model.generate_content.side_effect = \
+            ApiError("CachedContent not found", 404)
+
+        assert client.generate_content(prompt) == "resposta completa"
+        inner.generate_content.assert_called_once_with(prompt)
+        assert backend.deleted == ["cachedContents/0"]
+
+    def test_transient_error_is_not_retried_without_cache(self, cache):
+        """Teste negativo: erro transitório (já repetido pelo cliente resiliente) é repassado"""
+        inner, client = self.make(cache)
+        prompt = build_prompt(conversation(LARGE_SOURCE, "Testes"), "Mais?")
+        cache.lookup("m", None, {}, prompt, SYSTEM_INSTRUCTIONS).model.generate_content.side_effect = \
+            ApiError("Unavailable", 503)
+
+        with pytest.raises(ApiError):
+            client.generate_content(prompt)
+        inner.generate_content.assert_not_called()
+
+    def test_chat_session_sends_only_new_turns(self, cache, backend):
+        """Teste positivo: a sessão de chat referencia o arquivo em cache e envia só os turnos novos"""
+        from google.generativeai import protos
+        from google.generativeai.types import generation_types
+
+        def sdk_response(text):
+            return generation_types.GenerateContentResponse.from_response(protos.GenerateContentResponse(
+                candidates=[protos.Candidate(
+                    content=protos.Content(role="model", parts=[protos.Part(text=text)]),
+                    finish_reason=protos.Candidate.FinishReason.STOP,
+                )]
+            ))
+
+        inner = Mock()
+        inner._get_tools_lib.return_value = None
+        client = PrefixCachingClient(inner, cache, "m", {}, "instruções")
+        chat = client.start_chat(history=[
+            {"role": "user", "parts": [LARGE_SOURCE]},
+            {"role": "model", "parts": ["Testes"]},
+        ])
+        cached_model = Mock()
+        cached_model.generate_content.return_value = sdk_response("Limites...")
+        backend.model = lambda handle, generation_config: cached_model
+
+        chat.send_message("E os limites?")
+
+        sent = cached_model.generate_content.call_args[0][0]
+        assert [content.parts[0].text for content in sent] == ["E os limites?"]
+        assert backend.created[0][2] == "instruções"
+        inner.generate_content.assert_not_called()
+        assert chat.history[-1].parts[0].text == "Limites..."
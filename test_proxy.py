@@ -0,0 +1,185 @@
+import asyncio
+import os
+from unittest.mock import patch
+
+from ai_testing_helper import resources
+from ai_testing_helper.deploy import worker_environment
+from ai_testing_helper.proxy import COOKIE_NAME, StickyProxy, Worker, cookie_value, parse_head, with_cookie
+from ai_testing_helper.server import readiness_checks
+
+
+class FakeWorker:
+    """Worker HTTP mínimo: responde ``/readyz`` e devolve o próprio nome nas demais rotas."""
+
+    def __init__(self, name):
+        self.name = name
+        self.ready = True
+        self.requests = 0
+        self.server = None
+
+    async def handle(self, reader, writer):
+        head = await reader.readuntil(b"\r\n\r\n")
+        path = head.split(b" ")[1].decode()
+        if path == "/readyz":
+            status, body = ("200 OK", "ok") if self.ready else ("503 Service Unavailable", "")
+        else:
+            self.requests += 1
+            status, body = "200 OK", self.name
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n{body}".encode())
+        await writer.drain()
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return Worker(self.name, "127.0.0.1", self.server.sockets[0].getsockname()[1])
+
+    def stop(self):
+        self.server.close()
+
+
+async def request(port, path="/", cookie=None):
+    """Faz a requisição ao proxy; devolve (status, cookie do worker, corpo)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    headers = f"Cookie: {COOKIE_NAME}={cookie}\r\n" if cookie else ""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n".encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    status = int(head.split(b" ")[1])
+    set_cookie = None
+    for line in head.decode().split("\r\n"):
+        if line.startswith("Set-Cookie:"):
+            set_cookie = line.split(":", 1)[1].split(";")[0].strip().partition("=")[2]
+    return status, set_cookie, body.decode()
+
+
+def run_with_proxy(scenario, count=2):
+    """Executa ``scenario(proxy, fakes)`` com ``count`` workers falsos atrás do proxy."""
+
+    async def main():
+        fakes = [FakeWorker(f"w{index}") for index in range(count)]
+        workers = [await fake.start() for fake in fakes]
+        proxy = StickyProxy(workers, check_interval=0.05)
+        await proxy.start()
+        try:
+            return await scenario(proxy, fakes)
+        finally:
+            await proxy.close()
+            for fake in fakes:
+                fake.stop()
+
+    return asyncio.run(main())
+
+
+class TestHeaders:
+    """Testes para a leitura e escrita dos cabeçalhos"""
+
+    def test_parse_head_and_cookie(self):
+        """Teste positivo: caminho e cookie do worker na requisição"""
+        # Act
+        path, headers = parse_head(
+            b"GET /_stcore/stream HTTP/1.1\r\nHost: x\r\nCookie: a=1; ai_testing_helper_worker=w1\r\n\r\n"
+        )
+
+        # Assert
+        assert path == "/_stcore/stream"
+        assert cookie_value(headers) == "w1"
+        assert cookie_value({}) is None
+
+    def test_with_cookie(self):
+        """Teste positivo: Set-Cookie acrescentado antes do fim do cabeçalho"""
+        # Act
+        head = with_cookie(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n", COOKIE_NAME, "w0")
+
+        # Assert
+        assert head.endswith(b"Set-Cookie: ai_testing_helper_worker=w0; Path=/; HttpOnly; SameSite=Lax\r\n\r\n")
+
+
+class TestStickyProxy:
+    """Testes do proxy com workers HTTP locais"""
+
+    def test_new_browsers_are_balanced_and_pinned(self):
+        """Teste positivo: navegadores novos se dividem; o cookie mantém cada um no seu worker"""
+        # Arrange
+        async def scenario(proxy, fakes):
+            first = await request(proxy.port)
+            second = await request(proxy.port)
+            again = await request(proxy.port, cookie=first[1])
+            return first, second, again
+
+        # Act
+        first, second, again = run_with_proxy(scenario)
+
+        # Assert
+        assert {first[1], second[1]} == {"w0", "w1"}
+        assert first[2] == first[1] and second[2] == second[1]
+        assert again == (200, None, first[1])
+
+    def test_unavailable_worker_moves_the_session(self):
+        """Teste negativo: worker fora do ar não recebe sessões; o navegador muda de worker"""
+        # Arrange
+        async def scenario(proxy, fakes):
+            fakes[0].ready = False
+            await proxy.check_all()
+            moved = await request(proxy.port, cookie="w0")
+            fresh = await request(proxy.port)
+            return moved, fresh, fakes[0].requests
+
+        # Act
+        moved, fresh, requests_w0 = run_with_proxy(scenario)
+
+        # Assert
+        assert moved == (200, "w1", "w1")
+        assert fresh[1] == "w1"
+        assert requests_w0 == 0
+
+    def test_health_and_readiness(self):
+        """Teste de limite: /readyz só responde 200 com algum worker pronto"""
+        # Arrange
+        async def scenario(proxy, fakes):
+            ready = await request(proxy.port, "/readyz")
+            for fake in fakes:
+                fake.ready = False
+            await proxy.check_all()
+            return ready, await request(proxy.port, "/readyz"), await request(proxy.port, "/healthz"), \
+                await request(proxy.port)
+
+        # Act
+        ready, not_ready, health, no_worker = run_with_proxy(scenario)
+
+        # Assert
+        assert ready[0] == 200 and '"ready": true' in ready[2]
+        assert not_ready[0] == 503
+        assert health[0] == 200
+        assert no_worker[0] == 503
+
+
+class TestWorkerReadiness:
+    """Testes para as verificações de prontidão do worker"""
+
+    def test_readiness_checks(self):
+        """Teste de partição por equivalência: API Key e armazenamento compartilhado"""
+        # Arrange
+        resources.get_shared_store.clear()
+
+        # Act
+        try:
+            with patch.dict(os.environ, {"GEMINI_API_KEY": "chave", "SHARED_STORE_URL": "memory://"}):
+                ready = readiness_checks()
+            resources.get_shared_store.clear()
+            with patch.dict(os.environ, {"GEMINI_API_KEY": "", "SHARED_STORE_URL": "ftp://x"}), \
+                 patch("ai_testing_helper.resources.load_environment"):
+                not_ready = readiness_checks()
+        finally:
+            resources.get_shared_store.clear()
+
+        # Assert
+        assert ready == {"api_key": (True, "GEMINI_API_KEY"), "shared_store": (True, "memory://")}
+        assert not_ready["api_key"][0] is False
+        assert not_ready["shared_store"][0] is False
+
+    def test_workers_share_a_store_by_default(self):
+        """Teste positivo: sem SHARED_STORE_URL, os workers usam o mesmo SQLite local"""
+        assert worker_environment({})["SHARED_STORE_URL"].startswith("sqlite:///")
+        assert worker_environment({"SHARED_STORE_URL": "redis://r"})["SHARED_STORE_URL"] == "redis://r"
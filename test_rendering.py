@@ -0,0 +1,103 @@
+from ai_testing_helper.rendering import (
+    FragmentCache,
+    Segment,
+    message_id,
+    split_segments,
+    visible_start,
+)
+
+
+class TestSplitSegments:
+    """Testes para a divisão da mensagem em markdown e blocos de código"""
+    
+    def test_plain_text(self):
+        """Teste positivo: texto sem código vira um único trecho de markdown"""
+        assert split_segments("Olá **mundo**") == (Segment("markdown", "Olá **mundo**", None),)
+    
+    def test_code_block_between_text(self):
+        """Teste positivo: bloco de código separado do texto ao redor"""
+        # Arrange
+        text = "Antes:\n\n```python\ndef soma(a, b):\n    return a + b\n```\n\nDepois."
+        
+        # Act
+        segments = split_segments(text)
+        
+        # Assert
+        assert segments == (
+            Segment("markdown", "Antes:", None),
+            Segment("code", "def soma(a, b):\n    return a + b", "python"),
+            Segment("markdown", "Depois.", None),
+        )
+    
+    def test_code_block_without_language(self):
+        """Teste de partição por equivalência: bloco sem linguagem"""
+        assert split_segments("```\nx = 1\n```") == (Segment("code", "x = 1", None),)
+    
+    def test_unclosed_fence_stays_markdown(self):
+        """Teste de limite: bloco não fechado (ex.: resposta truncada) continua como markdown"""
+        # Arrange
+        text = "Veja:\n```python\nx = 1"
+        
+        # Act / Assert
+        assert split_segments(text) == (Segment("markdown", text, None),)
+    
+    def test_empty_and_none_content(self):
+        """Teste de limite: conteúdo vazio ou None"""
+        assert split_segments("") == (Segment("markdown", "", None),)
+        assert split_segments(None) == (Segment("markdown", "", None),)
+
+
+class TestFragmentCache:
+    """Testes para o cache de mensagens preparadas"""
+    
+    def test_same_message_is_prepared_once(self):
+        """Teste positivo: segunda exibição reaproveita os segmentos"""
+        # Arrange
+        cache = FragmentCache()
+        message = {"role": "assistant", "content": "```python\nx = 1\n```"}
+        
+        # Act
+        first = cache.segments(message)
+        second = cache.segments(dict(message))
+        
+        # Assert
+        assert first is second
+        assert (cache.hits, cache.misses) == (1, 1)
+    
+    def test_id_depends_on_role_and_content(self):
+        """Teste de partição por equivalência: papel ou conteúdo diferente, id diferente"""
+        # Arrange
+        base = {"role": "user", "content": "oi"}
+        
+        # Act / Assert
+        assert message_id(base) == message_id({"role": "user", "content": "oi"})
+        assert message_id(base) != message_id({"role": "assistant", "content": "oi"})
+        assert message_id(base) != message_id({"role": "user", "content": "olá"})
+    
+    def test_respects_max_entries(self):
+        """Teste de limite: entradas mais antigas são descartadas"""
+        # Arrange
+        cache = FragmentCache(max_entries=2)
+        
+        # Act
+        for i in range(3):
+            cache.segments({"role": "user", "content": f"mensagem {i}"})
+        
+        # Assert
+        assert len(cache) == 2
+
+
+class TestVisibleStart:
+    """Testes para a janela de mensagens visíveis"""
+    
+    def test_short_history_shows_everything(self):
+        """Teste de limite: histórico menor que a página"""
+        assert visible_start(5, 20) == 0
+    
+    def test_long_history_shows_last_messages(self):
+        """Teste positivo: só as últimas mensagens ficam visíveis"""
+        assert visible_start(100, 20) == 80
+    
+    def test_negative_shown(self):
+        """Teste negativo: quantidade negativa não exibe nada"""
+        assert visible_start(10, -5) == 10
@@ -0,0 +1,148 @@
+from unittest.mock import Mock
+
+from ai_testing_helper.metrics import Metrics
+from ai_testing_helper.routing import (
+    DEFAULT_ROUTES,
+    ModelRouter,
+    analyze_prompt,
+    estimate_cost,
+    extract_code,
+    routes_from_env,
+)
+
+SMALL_CODE = """Crie testes para:
+```python
+def soma(a, b):
+    return a + b
+```"""
+
+HISTORY = [
+    {"role": "user", "content": "Crie testes para soma"},
+    {"role": "assistant", "content": "def test_soma(): ..."},
+]
+
+
+def python_module(functions, body_lines=1):
+    body = "\n".join("    x = 1" for _ in range(body_lines))
+    return "```python\n" + "\n".join(f"def f{i}():\n{body}\n" for i in range(functions)) + "```"
+
+
+class TestAnalyzePrompt:
+    """Testes para as características da pergunta"""
+    
+    def test_conceptual_question_has_no_code(self):
+        """Teste positivo: pergunta em texto não tem código"""
+        # Act
+        features = analyze_prompt("O que é partição por equivalência?")
+        
+        # Assert
+        assert (features.code_lines, features.functions, features.follow_up) == (0, 0, False)
+    
+    def test_counts_functions_in_fenced_code(self):
+        """Teste positivo: funções dentro do bloco cercado"""
+        # Act
+        features = analyze_prompt(python_module(3))
+        
+        # Assert
+        assert features.functions == 3
+        assert features.code_lines == 6
+    
+    def test_counts_functions_in_other_languages(self):
+        """Teste de partição por equivalência: JavaScript, arrow function e Java"""
+        # Arrange
+        code = (
+            "function soma(a, b) {\n  return a + b;\n}\n"
+            "const dobro = (x) => x * 2;\n"
+            "public static int max(int a, int b) {\n  return a > b ? a : b;\n}\n"
+        )
+        
+        # Act / Assert
+        assert analyze_prompt(code).functions == 3
+    
+    def test_single_code_like_line_is_not_code(self):
+        """Teste de limite: uma palavra-chave solta na pergunta não conta como código"""
+        assert extract_code("Quando usar return em um teste?") == ""
+    
+    def test_follow_up_depends_on_history(self):
+        """Teste positivo: pergunta com turno anterior do usuário é continuação"""
+        assert analyze_prompt("E para listas vazias?", HISTORY).follow_up
+        assert not analyze_prompt("E para listas vazias?", HISTORY[1:]).follow_up
+
+
+class TestModelRouter:
+    """Testes para a escolha da rota"""
+    
+    def test_routes(self):
+        """Teste de partição por equivalência: uma pergunta de cada rota"""
+        # Arrange
+        router = ModelRouter()
+        
+        # Act / Assert
+        assert router.classify("O que é mock?").name == "conceptual"
+        assert router.classify("E para números negativos?", HISTORY).name == "follow_up"
+        assert router.classify(SMALL_CODE, HISTORY).name == "small_code"
+        assert router.classify(python_module(10)).name == "large_code"
+    
+    def test_large_code_by_lines(self):
+        """Teste de limite: poucas funções, mas muitas linhas"""
+        # Arrange
+        router = ModelRouter(large_code_lines=50)
+        
+        # Act / Assert
+        assert router.classify(python_module(1, body_lines=48)).name == "small_code"
+        assert router.classify(python_module(1, body_lines=49)).name == "large_code"
+    
+    def test_routes_differ_in_output_budget(self):
+        """Teste positivo: rotas de código grande permitem respostas maiores"""
+        assert (DEFAULT_ROUTES["conceptual"].generation_config["max_output_tokens"]
+                < DEFAULT_ROUTES["large_code"].generation_config["max_output_tokens"])
+    
+    def test_warm_creates_model_per_route(self):
+        """Teste positivo: um modelo por rota e por instrução de sistema"""
+        # Arrange
+        get_model = Mock()
+        
+        # Act
+        ModelRouter().warm(get_model, (None, "instruções"))
+        
+        # Assert
+        assert get_model.call_count == 2 * len(DEFAULT_ROUTES)
+    
+    def test_routes_from_env_overrides_model(self):
+        """Teste positivo: modelo da rota configurável por variável de ambiente"""
+        # Act
+        routes = routes_from_env(environ={"ROUTE_LARGE_CODE_MODEL": "gemini-2.0-pro"})
+        
+        # Assert
+        assert routes["large_code"].model_name == "gemini-2.0-pro"
+        assert routes["small_code"] == DEFAULT_ROUTES["small_code"]
+    
+    def test_report_per_route(self):
+        """Teste de integração: latência, tokens e custo por rota a partir das métricas"""
+        # Arrange
+        metrics = Metrics(enabled=True)
+        with metrics.label_scope(route="conceptual"):
+            metrics.observe("generate_seconds", 0.2)
+            metrics.observe("prompt_tokens", 1000)
+            metrics.observe("response_tokens", 500)
+        
+        # Act
+        rows = ModelRouter().report(metrics)
+        
+        # Assert
+        assert [row["rota"] for row in rows] == ["conceptual"]
+        assert rows[0]["tokens"] == 1500
+        assert rows[0]["custo (USD)"] == estimate_cost("gemini-1.5-flash-8b", 1000, 500)
+        assert rows[0]["economia (USD)"] > 0
+
+
+class TestEstimateCost:
+    """Testes para o custo estimado"""
+    
+    def test_known_model(self):
+        """Teste positivo: preço por milhão de tokens"""
+        assert estimate_cost("gemini-1.5-flash", 1_000_000, 0) == 0.075
+    
+    def test_unknown_model(self):
+        """Teste negativo: modelo sem preço conhecido custa zero"""
+        assert estimate_cost("modelo-desconhecido", 1000, 1000) == 0.0
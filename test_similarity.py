@@ -0,0 +1,239 @@
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ai_testing_helper.similarity import (
+    SimilarityIndex,
+    build_adapt_prompt,
+    canonical_python,
+    estimate_similarity,
+    fingerprint,
+    split_question,
+    tokenize,
+)
+
+MEDIA = '''Crie testes para:
+```python
+def media(valores, peso=1):
+    """Calcula a média."""
+    total = 0  # acumulador
+    for valor in valores:
+        total += valor
+    return total / len(valores) * peso
+```'''
+
+MEDIA_RENAMED = '''crie testes para
+```python
+def media(valores, peso = 1):
+    soma = 0
+    for n in valores:
+        soma += n
+
+    return soma/len(valores)*peso
+```'''
+
+MEDIA_OTHER_PARAMETERS = MEDIA_RENAMED.replace("valores", "numeros")
+
+MEDIA_CHANGED = MEDIA_RENAMED.replace("*peso", "*peso + 1")
+
+
+class TestCanonicalForm:
+    """Testes para a normalização do código"""
+
+    def test_python_locals_are_renamed(self):
+        """Teste positivo: locais renomeados, sem comentários e docstrings; parâmetros mantidos"""
+        # Arrange
+        _, code = split_question(MEDIA)
+
+        # Act / Assert
+        assert canonical_python(code) == (
+            "def media(valores, peso=1):\n    _v0 = 0\n    for _v1 in valores:\n        _v0 += _v1\n"
+            "    return _v0 / len(valores) * peso"
+        )
+
+    def test_globals_and_nested_scopes(self):
+        """Teste de limite: globais, parâmetros e funções internas mantêm o nome"""
+        # Arrange
+        code = (
+            "LIMITE = 10\n\ndef conta(itens):\n    global LIMITE\n    LIMITE = len(itens)\n"
+            "    def dobro(x):\n        return x * len(itens)\n    return [dobro(i) for i in itens]"
+        )
+
+        # Act
+        canonical = canonical_python(code)
+
+        # Assert
+        assert "LIMITE = len(itens)" in canonical
+        assert "def dobro(x):" in canonical and "return x * len(itens)" in canonical
+        assert "[dobro(_v0) for _v0 in itens]" in canonical
+
+    def test_invalid_python_raises(self):
+        """Teste negativo: código que não é Python cai na tokenização genérica"""
+        with pytest.raises(SyntaxError):
+            canonical_python("function soma(a, b) { return a + b; }")
+
+    def test_tokenize_drops_comments_but_not_strings(self):
+        """Teste de partição por equivalência: comentários saem, strings com // ficam"""
+        # Arrange
+        code = 'const url = "http://x"; // endereço\n/* bloco */ let a = 1;'
+
+        # Act / Assert
+        assert tokenize(code) == ["const", "url", "=", '"http://x"', ";", "let", "a", "=", "1", ";"]
+
+
+class TestFingerprint:
+    """Testes para a impressão digital da pergunta"""
+
+    def test_equivalent_python_has_same_key(self):
+        """Teste positivo: outros nomes locais, comentários e formatação dão a mesma chave"""
+        assert fingerprint(MEDIA).key == fingerprint(MEDIA_RENAMED).key
+
+    def test_parameter_names_change_the_key(self):
+        """Teste negativo: a resposta usa os nomes dos parâmetros (ex.: argumentos nomeados)"""
+        # Act
+        original = fingerprint("```python\ndef area(largura, altura):\n    return largura * altura\n```")
+        renamed = fingerprint("```python\ndef area(base, h):\n    return base * h\n```")
+
+        # Assert
+        assert original.key != renamed.key
+        assert fingerprint(MEDIA).key != fingerprint(MEDIA_OTHER_PARAMETERS).key
+
+    def test_other_languages(self):
+        """Teste de partição por equivalência: JavaScript sem comentários e formatação"""
+        # Act
+        first = fingerprint("```javascript\nfunction soma(a, b) {\n  // soma\n  return a + b;\n}\n```")
+        second = fingerprint("```javascript\nfunction soma(a,b){ return a+b; /* x */ }\n```")
+
+        # Assert
+        assert first.key == second.key
+        assert first.language == ""
+
+    def test_small_change_is_similar(self):
+        """Teste de limite: uma mudança pequena mantém a similaridade alta, mas muda a chave"""
+        # Act
+        original, changed = fingerprint(MEDIA), fingerprint(MEDIA_CHANGED)
+
+        # Assert
+        assert original.key != changed.key
+        assert estimate_similarity(original.signature, changed.signature) >= 0.75
+
+    def test_question_text_and_scope_separate_entries(self):
+        """Teste negativo: outro pedido sobre o mesmo código não é equivalente"""
+        # Arrange
+        explain = MEDIA.replace("Crie testes para:", "Explique o código:")
+
+        # Act / Assert
+        assert fingerprint(explain).scope != fingerprint(MEDIA).scope
+        assert fingerprint(MEDIA, ("validated",)).key != fingerprint(MEDIA).key
+        assert fingerprint("O que é um mock?") is None
+
+
+class TestSimilarityIndex:
+    """Testes para o índice de respostas anteriores"""
+
+    def test_exact_similar_and_miss(self):
+        """Teste positivo: equivalente reaproveita, parecido adapta, diferente não encontra"""
+        # Arrange
+        index = SimilarityIndex()
+        index.add(fingerprint(MEDIA), "Testes da média")
+
+        # Act
+        exact = index.find(fingerprint(MEDIA_RENAMED))
+        similar = index.find(fingerprint(MEDIA_CHANGED))
+        other = index.find(fingerprint("```python\ndef raiz(x):\n    import math\n    return math.sqrt(x)\n```"))
+
+        # Assert
+        assert exact.kind == "exact" and exact.answer == "Testes da média"
+        assert similar.kind == "similar" and similar.similarity >= 0.75
+        assert "total = 0" in similar.code
+        assert other is None
+        assert index.stats() == {"entries": 1, "exact": 1, "similar": 1, "misses": 1}
+
+    def test_oldest_entry_is_evicted(self):
+        """Teste de limite: acima de max_entries a entrada menos usada sai do índice e dos buckets"""
+        # Act
+        index = SimilarityIndex(max_entries=1)
+        index.add(fingerprint(MEDIA), "primeira")
+        index.add(fingerprint("```python\ndef raiz(x):\n    return x ** 0.5\n```"), "segunda")
+
+        # Assert
+        assert len(index) == 1
+        assert index.find(fingerprint(MEDIA_CHANGED)) is None
+
+    def test_adapt_prompt_carries_previous_answer(self):
+        """Teste positivo: o pedido de adaptação leva o código e a resposta anteriores"""
+        # Arrange
+        index = SimilarityIndex()
+        index.add(fingerprint(MEDIA), "Testes da média")
+
+        # Act
+        prompt = build_adapt_prompt(index.find(fingerprint(MEDIA_CHANGED)), MEDIA_CHANGED)
+
+        # Assert
+        assert "```python\ndef media(valores" in prompt
+        assert "Testes da média" in prompt
+        assert prompt.endswith(MEDIA_CHANGED)
+
+
+def ask_in_new_session(app_path, prompt, history=()):
+    """Abre uma sessão nova da página (sem chat nem streaming) e envia as perguntas"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(app_path, default_timeout=30).run()
+    app.toggle(key="streaming").set_value(False)
+    app.toggle(key="chat_mode").set_value(False)
+    app.run()
+    for question in (*history, prompt):
+        app.chat_input[0].set_value(question).run()
+    return app
+
+
+@pytest.mark.integration
+def test_page_reuses_and_adapts_answers(mock_environment):
+    """Teste de integração: código equivalente não chama o modelo; parecido pede uma adaptação"""
+    from ai_testing_helper.cache import LRUCache, ResponseCache
+
+    # Arrange
+    model = Mock()
+    model.generate_content.side_effect = [Mock(text="Testes da média"), Mock(text="Testes adaptados")]
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    with patch('google.generativeai.configure'), \
+         patch('ai_testing_helper.resources.get_gemini_model', return_value=model), \
+         patch('ai_testing_helper.resources.get_similarity_index', return_value=SimilarityIndex()), \
+         patch('ai_testing_helper.resources.get_response_cache', return_value=ResponseCache(LRUCache(10))):
+        # Act
+        apps = [ask_in_new_session(app_path, prompt) for prompt in (MEDIA, MEDIA_RENAMED, MEDIA_CHANGED)]
+
+    # Assert
+    assert not any(app.exception for app in apps)
+    replies = [app.session_state.messages[-1]["content"] for app in apps]
+    assert replies == ["Testes da média", "Testes da média", "Testes adaptados"]
+    assert model.generate_content.call_count == 2
+    adapt_prompt = model.generate_content.call_args[0][0]
+    assert "Resposta anterior:\nTestes da média" in adapt_prompt
+
+
+@pytest.mark.integration
+def test_page_does_not_reuse_answers_from_another_conversation(mock_environment):
+    """Teste de integração: o mesmo código depois de outra conversa gera uma resposta nova"""
+    from ai_testing_helper.cache import LRUCache, ResponseCache
+
+    # Arrange
+    model = Mock()
+    model.generate_content.side_effect = [
+        Mock(text="Testes da média"), Mock(text="Use unittest"), Mock(text="Testes com unittest"),
+    ]
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    with patch('google.generativeai.configure'), \
+         patch('ai_testing_helper.resources.get_gemini_model', return_value=model), \
+         patch('ai_testing_helper.resources.get_similarity_index', return_value=SimilarityIndex()), \
+         patch('ai_testing_helper.resources.get_response_cache', return_value=ResponseCache(LRUCache(10))):
+        # Act
+        first = ask_in_new_session(app_path, MEDIA)
+        second = ask_in_new_session(app_path, MEDIA_RENAMED, history=("Prefiro unittest ao pytest",))
+
+    # Assert
+    assert not first.exception and not second.exception
+    assert second.session_state.messages[-1]["content"] == "Testes com unittest"
+    assert model.generate_content.call_count == 3
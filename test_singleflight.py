@@ -0,0 +1,277 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from ai_testing_helper.concurrency import GenerationPool
+from ai_testing_helper.generation import generate_response, stream_response
+from ai_testing_helper.similarity import SimilarityIndex
+from ai_testing_helper.singleflight import SingleFlight
+from fakes import SlowModel
+
+
+@pytest.fixture
+def pool():
+    pool = GenerationPool(4)
+    yield pool
+    pool.shutdown()
+
+
+class TestSingleFlight:
+    """Testes para o agrupamento de pedidos iguais em andamento"""
+
+    def test_one_upstream_call_serves_all_waiters(self, pool):
+        """Teste positivo: 8 sessões com a mesma pergunta, uma só chamada ao modelo"""
+        # Arrange
+        model = SlowModel(delay=0.3)
+        flight = SingleFlight(pool)
+        start = threading.Barrier(8)
+
+        def session():
+            start.wait()
+            call, joined = flight.submit("chave", generate_response, model, [], "def soma(a, b): ...")
+            return call.result(timeout=5), joined
+
+        # Act
+        with ThreadPoolExecutor(8) as sessions:
+            results = list(sessions.map(lambda _: session(), range(8)))
+
+        # Assert
+        assert model.calls == 1
+        assert {text for text, _ in results} == {"".join(model.chunks)}
+        assert sum(joined for _, joined in results) == 7
+        assert flight.stats() == {"calls": 1, "joined": 7, "in_flight": 0}
+
+    def test_late_joiner_receives_the_whole_stream(self, pool):
+        """Teste positivo: quem entra no meio do streaming recebe os pedaços já gerados e os seguintes"""
+        # Arrange
+        flight = SingleFlight(pool)
+        first_sent = threading.Event()
+        resume = threading.Event()
+
+        def chunks():
+            yield "a"
+            first_sent.set()
+            resume.wait(5)
+            yield "b"
+            yield "c"
+
+        # Act
+        leader, _ = flight.submit("chave", chunks)
+        first_sent.wait(5)
+        follower, joined = flight.submit("chave", chunks)
+        resume.set()
+
+        # Assert
+        assert joined is True and follower is leader
+        assert list(follower.chunks()) == ["a", "b", "c"]
+        assert list(leader.chunks()) == ["a", "b", "c"]
+
+    def test_streaming_with_slow_model(self, pool):
+        """Teste positivo: streams iguais simultâneos também usam uma só chamada"""
+        # Arrange
+        model = SlowModel(delay=0.2)
+        flight = SingleFlight(pool)
+
+        # Act
+        calls = [flight.submit("chave", stream_response, model, [], "Pergunta")[0] for _ in range(5)]
+
+        # Assert
+        assert ["".join(call.chunks()) for call in calls] == ["".join(model.chunks)] * 5
+        assert model.calls == 1
+
+    def test_async_consumer(self, pool):
+        """Teste positivo: consumo no event loop (API) recebe os mesmos pedaços"""
+        # Arrange
+        flight = SingleFlight(pool)
+
+        def chunks():
+            for piece in ("x", "y"):
+                time.sleep(0.05)
+                yield piece
+
+        async def consume():
+            call, _ = flight.submit("chave", chunks)
+            return [piece async for piece in call.achunks()]
+
+        # Act
+        received = asyncio.run(consume())
+
+        # Assert
+        assert received == ["x", "y"]
+
+    def test_error_reaches_every_waiter(self, pool):
+        """Teste negativo: a falha da chamada chega a todos e libera a chave"""
+        # Arrange
+        flight = SingleFlight(pool)
+        release = threading.Event()
+
+        def failing():
+            release.wait(5)
+            raise ConnectionError("sem conexão")
+
+        # Act
+        leader, _ = flight.submit("chave", failing)
+        follower, joined = flight.submit("chave", failing)
+        release.set()
+
+        # Assert
+        assert joined is True
+        for call in (leader, follower):
+            with pytest.raises(ConnectionError):
+                call.result(timeout=5)
+        assert flight.in_flight() == 0
+
+    def test_finished_call_is_not_reused(self, pool):
+        """Teste de limite: terminada a chamada, o próximo pedido igual faz uma chamada nova"""
+        # Arrange
+        flight = SingleFlight(pool)
+        stored = []
+
+        # Act
+        first, _ = flight.submit("chave", lambda: "resposta", on_result=stored.append)
+        first.result(timeout=5)
+        second, joined = flight.submit("chave", lambda: "resposta")
+        second.result(timeout=5)
+
+        # Assert
+        assert joined is False and second is not first
+        assert stored == ["resposta"]
+        assert flight.stats()["calls"] == 2
+
+    def test_different_keys_do_not_wait_for_each_other(self, pool):
+        """Teste de partição por equivalência: chaves diferentes, chamadas diferentes"""
+        # Arrange
+        model = SlowModel(delay=0.1)
+        flight = SingleFlight(pool)
+
+        # Act
+        calls = [flight.submit(key, generate_response, model, [], key)[0] for key in ("a", "b", "a")]
+
+        # Assert
+        assert [call.result(timeout=5) for call in calls] == ["".join(model.chunks)] * 3
+        assert calls[0] is calls[2] and calls[0] is not calls[1]
+        assert model.calls == 2
+
+
+def release_when_joined(flight, gate, joined=1, timeout=30):
+    """Libera o modelo (``gate``) quando ``joined`` pedidos já esperam a chamada em andamento."""
+    def watch():
+        deadline = time.monotonic() + timeout
+        while flight.stats()["joined"] < joined and time.monotonic() < deadline:
+            time.sleep(0.01)
+        gate.set()
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    return watcher
+
+
+def wait_until(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.mark.integration
+def test_sessions_share_one_call(mock_environment):
+    """Teste de integração: duas sessões da página com a mesma pergunta, uma só chamada ao modelo"""
+    from streamlit.testing.v1 import AppTest
+
+    from ai_testing_helper.cache import LRUCache, ResponseCache
+
+    # Arrange
+    model = SlowModel(gate=threading.Event())
+    pool = GenerationPool(4)
+    flight = SingleFlight(pool)
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    with patch('google.generativeai.configure'), \
+         patch('ai_testing_helper.resources.get_gemini_model', return_value=model), \
+         patch('ai_testing_helper.resources.get_response_cache', return_value=ResponseCache(LRUCache(10))), \
+         patch('ai_testing_helper.resources.get_similarity_index', return_value=SimilarityIndex()), \
+         patch('ai_testing_helper.resources.get_single_flight', return_value=flight):
+        sessions = []
+        for _ in range(2):
+            app = AppTest.from_file(app_path, default_timeout=30).run()
+            app.toggle(key="streaming").set_value(False)
+            app.toggle(key="chat_mode").set_value(False)
+            sessions.append(app.run())
+
+        # Act
+        # A segunda sessão só começa com a chamada da primeira em andamento (o AppTest não
+        # aceita duas execuções começando ao mesmo tempo); o modelo só responde depois que ela entra
+        with ThreadPoolExecutor(1) as executor:
+            first = executor.submit(lambda: sessions[0].chat_input[0].set_value("Como testar a soma?").run())
+            wait_until(lambda: flight.stats()["in_flight"] == 1)
+            watcher = release_when_joined(flight, model.gate)
+            sessions[1].chat_input[0].set_value("Como testar a soma?").run()
+            first.result()
+    watcher.join()
+    pool.shutdown()
+
+    # Assert
+    assert model.calls == 1
+    assert flight.stats()["joined"] == 1
+    for app in sessions:
+        assert not app.exception
+        assert app.session_state.messages[-1]["content"] == "".join(model.chunks)
+
+
+@pytest.mark.integration
+def test_page_and_mounted_api_share_one_call(mock_environment):
+    """Teste de integração: a página e a API montada no servidor da página, uma só chamada ao modelo"""
+    from starlette.applications import Starlette
+    from streamlit.testing.v1 import AppTest
+
+    from ai_testing_helper import resources
+    from ai_testing_helper.cache import LRUCache, ResponseCache
+    from ai_testing_helper.server import routes
+    from main import WELCOME_MESSAGE
+    from test_api import call
+
+    # Arrange
+    model = SlowModel(gate=threading.Event())
+    prompt = "Como testar a soma?"
+    # A mesma pergunta com o mesmo histórico da página (sem modo chat): a mesma chave do cache
+    history = [{"role": "assistant", "content": WELCOME_MESSAGE}, {"role": "user", "content": prompt}]
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    resources.get_generation_pool.clear()
+    resources.get_single_flight.clear()
+    answers = []
+    with patch.dict(os.environ, {"MODEL_ROUTING": "0"}), \
+         patch('google.generativeai.configure'), \
+         patch('ai_testing_helper.resources.get_gemini_model', return_value=model), \
+         patch('ai_testing_helper.resources.get_response_cache', return_value=ResponseCache(LRUCache(10))), \
+         patch('ai_testing_helper.resources.get_similarity_index', return_value=SimilarityIndex()):
+        api = Starlette(routes=routes())
+        flight = resources.get_single_flight()
+        page = AppTest.from_file(app_path, default_timeout=30).run()
+        page.toggle(key="streaming").set_value(False)
+        page.toggle(key="chat_mode").set_value(False)
+        page.toggle(key="model_routing").set_value(False)
+        page.run()
+
+        # Act
+        request = threading.Thread(target=lambda: answers.append(asyncio.run(
+            call(api, "POST", "/v1/generate", {"prompt": prompt, "history": history}))))
+        request.start()
+        wait_until(lambda: flight.stats()["in_flight"] == 1)
+        watcher = release_when_joined(flight, model.gate)
+        page.chat_input[0].set_value(prompt).run()
+        request.join(timeout=30)
+        watcher.join()
+    resources.get_generation_pool().shutdown()
+    resources.get_generation_pool.clear()
+    resources.get_single_flight.clear()
+
+    # Assert
+    assert model.calls == 1
+    assert flight.stats()["joined"] == 1
+    assert not page.exception
+    assert page.session_state.messages[-1]["content"] == model.text
+    assert answers[0][0] == 200 and json.loads(answers[0][2])["answer"] == model.text
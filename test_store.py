@@ -0,0 +1,282 @@
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ai_testing_helper.cache import LRUCache, ResponseCache
+from ai_testing_helper.messages import MessageStore
+from ai_testing_helper.store import (
+    ConversationLog,
+    MemoryStore,
+    RedisStore,
+    SQLiteStore,
+    StoreCache,
+    open_store,
+)
+
+
+CONVERSATION_ID = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return MemoryStore(clock=clock)
+    return SQLiteStore(str(tmp_path / "shared.db"), clock=clock)
+
+
+class TestSharedStore:
+    """Testes do contrato comum dos backends (memória e SQLite)"""
+
+    def test_strings_with_ttl(self, store, clock):
+        """Teste de limite: a chave vale até o fim do TTL"""
+        # Arrange
+        store.set("a", "1", ttl=10)
+        store.set("b", "2")
+
+        # Act
+        clock.now += 10
+
+        # Assert
+        assert store.get("a") is None
+        assert store.get("b") == "2"
+        assert store.get("inexistente") is None
+
+    def test_lists_like_redis(self, store):
+        """Teste positivo: RPUSH/LRANGE/LLEN com os índices do Redis"""
+        # Act / Assert
+        assert store.rpush("lista", "a", "b") == 2
+        assert store.rpush("lista", "c") == 3
+        assert store.lrange("lista", 0, -1) == ["a", "b", "c"]
+        assert store.lrange("lista", 1, 1) == ["b"]
+        assert store.lrange("lista", -2, -1) == ["b", "c"]
+        assert store.llen("lista") == 3
+
+    def test_expire_and_delete(self, store, clock):
+        """Teste negativo: listas vencidas ou apagadas ficam vazias"""
+        # Arrange
+        store.rpush("lista", "a")
+        store.set("chave", "valor")
+
+        # Act
+        store.expire("lista", 5)
+        clock.now += 6
+        store.delete("chave")
+
+        # Assert
+        assert store.lrange("lista", 0, -1) == []
+        assert store.llen("lista") == 0
+        assert store.get("chave") is None
+
+    def test_counters_and_queue_like_redis(self, store):
+        """Teste positivo: INCRBY e LPOP com o comportamento do Redis"""
+        # Act / Assert
+        assert store.incrby("total", 5) == 5
+        assert store.incrby("total", -2) == 3
+        assert store.get("total") == "3"
+
+        # Arrange
+        store.rpush("fila", "a", "b")
+
+        # Act / Assert
+        assert store.lpop("fila") == "a"
+        assert store.lpop("fila") == "b"
+        assert store.lpop("fila") is None
+        assert store.llen("fila") == 0
+
+    def test_count_by_prefix(self, store):
+        """Teste de partição por equivalência: só as chaves do prefixo contam"""
+        # Arrange
+        store.set("response:1", "a")
+        store.set("response:2", "b")
+        store.set("outra:1", "c")
+
+        # Act / Assert
+        assert store.count("response:") == 2
+
+    def test_sqlite_is_shared_between_instances(self, tmp_path):
+        """Teste positivo: dois processos (instâncias) veem o mesmo arquivo"""
+        # Arrange
+        path = str(tmp_path / "shared.db")
+
+        # Act
+        SQLiteStore(path).rpush("conversa", "oi")
+
+        # Assert
+        assert SQLiteStore(path).lrange("conversa", 0, -1) == ["oi"]
+
+
+class TestBackends:
+    """Testes para a escolha do backend e o adaptador do Redis"""
+
+    def test_open_store_by_url(self, tmp_path):
+        """Teste de partição por equivalência: esquema da URL escolhe o backend"""
+        # Act
+        memory_store = open_store("memory://")
+        sqlite_store = open_store(f"sqlite:///{tmp_path}/shared.db")
+
+        # Assert
+        assert isinstance(memory_store, MemoryStore)
+        assert isinstance(sqlite_store, SQLiteStore)
+        assert sqlite_store.path == f"{tmp_path}/shared.db"
+        with pytest.raises(ValueError):
+            open_store("ftp://servidor")
+
+    def test_redis_store_uses_redis_commands(self):
+        """Teste positivo: o adaptador traduz para os comandos do Redis"""
+        # Arrange
+        client = Mock()
+        store = RedisStore("redis://localhost:6379/0", client=client)
+
+        # Act
+        store.set("chave", "valor", ttl=30)
+        store.rpush("lista", "a", "b")
+        store.lrange("lista", 0, -1)
+        store.lpop("lista")
+        store.incrby("total", 3)
+
+        # Assert
+        client.set.assert_called_once_with("chave", "valor", ex=30)
+        client.rpush.assert_called_once_with("lista", "a", "b")
+        client.lrange.assert_called_once_with("lista", 0, -1)
+        client.lpop.assert_called_once_with("lista")
+        client.incrby.assert_called_once_with("total", 3)
+
+
+class TestSharedState:
+    """Testes para o cache e o histórico compartilhados entre workers"""
+
+    def test_response_cache_shared_between_workers(self):
+        """Teste positivo: resposta gerada em um worker é acerto no outro"""
+        # Arrange
+        store = MemoryStore()
+        worker_a = ResponseCache(LRUCache(10), StoreCache(store, ttl_seconds=60))
+        worker_b = ResponseCache(LRUCache(10), StoreCache(store, ttl_seconds=60))
+
+        # Act
+        worker_a.set("chave", "resposta")
+
+        # Assert
+        assert worker_b.get("chave") == "resposta"
+        assert len(worker_b.disk) == 1
+
+    def test_store_cache_is_limited_by_size(self, store):
+        """Teste de limite: passando de max_bytes, as respostas mais antigas saem primeiro"""
+        # Arrange
+        cache = StoreCache(store, ttl_seconds=60, max_bytes=25)
+
+        # Act
+        for key in ("a", "b", "c"):
+            cache.set(key, "x" * 10)
+        cache.set("b", "x" * 10)
+
+        # Assert
+        assert cache.get("a") is None
+        assert cache.get("b") == cache.get("c") == "x" * 10
+        assert len(cache) == 2
+        assert store.get(cache.bytes_key) == "20"
+
+    def test_store_cache_limit_is_shared_between_workers(self):
+        """Teste positivo: o limite vale para a soma das respostas de todos os workers"""
+        # Arrange
+        store = MemoryStore()
+        worker_a = StoreCache(store, max_bytes=15)
+        worker_b = StoreCache(store, max_bytes=15)
+
+        # Act
+        worker_a.set("a", "x" * 10)
+        worker_b.set("b", "x" * 10)
+
+        # Assert
+        assert worker_a.get("a") is None
+        assert worker_a.get("b") == "x" * 10
+
+    def test_invalid_conversation_id_gets_a_new_one(self):
+        """Teste negativo: id da URL fora do formato (ou tentando outra chave) vira uma conversa nova"""
+        # Arrange
+        store = MemoryStore()
+        store.rpush("conversation:abc", "{}")
+
+        # Act
+        logs = [ConversationLog(store, value) for value in
+                ("abc", "response:x", CONVERSATION_ID.upper(), CONVERSATION_ID + "0", None)]
+
+        # Assert
+        for log in logs:
+            assert len(log.conversation_id) == 32 and log.conversation_id != CONVERSATION_ID
+            assert log.key == f"conversation:{log.conversation_id}"
+            assert log.load() == []
+        assert ConversationLog(store, CONVERSATION_ID).conversation_id == CONVERSATION_ID
+
+    def test_conversation_is_restored_in_another_worker(self, tmp_path):
+        """Teste positivo: o histórico volta a partir do log da conversa"""
+        # Arrange
+        store = MemoryStore()
+        log = ConversationLog(store, CONVERSATION_ID)
+        messages = MessageStore([{"role": "assistant", "content": "Boas-vindas"}],
+                                max_resident=2, path=str(tmp_path / "m.db"), log=log)
+        messages.append({"role": "user", "content": "Oi"})
+        messages.append({"role": "assistant", "content": "Olá"})
+
+        # Act
+        restored = MessageStore(ConversationLog(store, CONVERSATION_ID).load(), path=str(tmp_path / "m.db"))
+        messages.clear()
+
+        # Assert
+        assert list(restored) == [{"role": "user", "content": "Oi"}, {"role": "assistant", "content": "Olá"}]
+        assert ConversationLog(store, CONVERSATION_ID).load() == []
+
+
+@pytest.mark.integration
+def test_page_restores_conversation_from_url(mock_environment):
+    """Teste de integração: ?conversa=... restaura o histórico do armazenamento compartilhado"""
+    from streamlit.testing.v1 import AppTest
+
+    # Arrange
+    store = MemoryStore()
+    log = ConversationLog(store, CONVERSATION_ID)
+    log.append({"role": "assistant", "content": "Boas-vindas"})
+    log.append({"role": "user", "content": "Como testar?"})
+    log.append({"role": "assistant", "content": "Com pytest"})
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+    # Act
+    with patch('google.generativeai.configure'), \
+         patch('ai_testing_helper.resources.get_gemini_model', return_value=Mock()), \
+         patch('ai_testing_helper.resources.get_shared_store', return_value=store):
+        app = AppTest.from_file(app_path, default_timeout=30)
+        app.query_params["conversa"] = CONVERSATION_ID
+        app.run()
+        new_session = AppTest.from_file(app_path, default_timeout=30).run()
+
+    # Assert
+    assert not app.exception
+    assert [msg["content"] for msg in app.session_state.messages] == ["Boas-vindas", "Como testar?", "Com pytest"]
+    # Sem conversa na URL: uma nova, com id na URL e a mensagem de boas-vindas no log
+    conversation_id = new_session.query_params["conversa"]
+    assert conversation_id != CONVERSATION_ID
+    assert len(ConversationLog(store, conversation_id).load()) == 1
+
+
+@pytest.mark.integration
+def test_page_replaces_invalid_conversation_id(mock_environment):
+    """Teste de integração: ?conversa= com valor inválido não vira chave do armazenamento"""
+    from streamlit.testing.v1 import AppTest
+
+    # Arrange
+    store = MemoryStore()
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+    # Act
+    with patch('google.generativeai.configure'), \
+         patch('ai_testing_helper.resources.get_gemini_model', return_value=Mock()), \
+         patch('ai_testing_helper.resources.get_shared_store', return_value=store):
+        app = AppTest.from_file(app_path, default_timeout=30)
+        app.query_params["conversa"] = "x" * 10_000
+        app.run()
+
+    # Assert
+    assert not app.exception
+    conversation_id = app.query_params["conversa"]
+    assert len(conversation_id) == 32 and int(conversation_id, 16) >= 0
+    assert store.llen("conversation:" + "x" * 10_000) == 0
@@ -0,0 +1,374 @@
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ai_testing_helper import sandbox
+from ai_testing_helper.validation import (
+    TEST_FILE,
+    ShardResult,
+    ValidationPool,
+    ValidationReport,
+    build_files,
+    extract_tests,
+    find_source,
+    split_tests,
+    validate_answer,
+)
+
+SOURCE = "def soma(a, b):\n    return a + b\n"
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+needs_sandbox = pytest.mark.skipif(
+    sandbox.unavailable_reason() is not None, reason=f"sandbox indisponível: {sandbox.unavailable_reason()}"
+)
+
+
+def answer(code):
+    return f"Aqui estão os testes:\n```python\n{code}\n```"
+
+
+def many_tests(count, expected=lambda i: i + 1):
+    tests = "\n\n".join(f"def test_{i}():\n    assert soma({i}, 1) == {expected(i)}" for i in range(count))
+    return f"from calculadora import soma\n\n{tests}"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ValidationPool(workers=2, timeout=3)
+    yield pool
+    pool.close()
+
+
+class TestPreparation:
+    """Testes para a preparação dos arquivos executados"""
+
+    def test_extract_tests_only_python(self):
+        """Teste de partição por equivalência: só blocos Python com testes são executados"""
+        assert extract_tests("Sem código") is None
+        assert extract_tests("```javascript\ntest('a', () => {});\n```") is None
+        assert extract_tests(answer(SOURCE)) is None
+        assert extract_tests(answer("def test_a():\n    pass")) == "def test_a():\n    pass"
+        assert extract_tests("```\ndef test_a():\n    pass\n```") == "def test_a():\n    pass"
+
+    def test_source_is_written_as_the_imported_module(self):
+        """Teste positivo: o código testado vira o módulo que os testes importam"""
+        # Act
+        files = build_files("from app.calculadora import soma\n\ndef test_a():\n    assert soma(1, 1) == 2", SOURCE)
+
+        # Assert
+        assert files[os.path.join("app", "calculadora.py")] == SOURCE
+        assert files[os.path.join("app", "__init__.py")] == ""
+        assert files[TEST_FILE].startswith("from app.calculadora")
+
+    def test_source_is_prepended_without_import(self):
+        """Teste de limite: testes sem import do código recebem o código no mesmo arquivo"""
+        # Act
+        files = build_files("import pytest\n\ndef test_a():\n    assert soma(1, 1) == 2", SOURCE)
+
+        # Assert
+        assert list(files) == [TEST_FILE]
+        assert files[TEST_FILE].startswith(SOURCE)
+
+    def test_split_tests_keeps_header_in_every_shard(self):
+        """Teste positivo: imports e fixtures vão para todas as partes"""
+        # Arrange
+        code = "import pytest\n\n@pytest.fixture\ndef valor():\n    return 1\n\n" + many_tests(10)
+
+        # Act
+        shards = split_tests(code, 4)
+
+        # Assert
+        assert len(shards) == 2
+        assert all("import pytest" in shard and "def valor" in shard for shard in shards)
+        assert sum(shard.count("def test_") for shard in shards) == 10
+
+    def test_split_tests_small_or_invalid_code(self):
+        """Teste de limite: poucos testes ou código inválido ficam em uma parte só"""
+        assert split_tests(many_tests(9), 4) == [many_tests(9)]
+        assert split_tests("def test_a(:\n", 4) == ["def test_a(:\n"]
+
+    def test_find_source_uses_previous_question(self):
+        """Teste positivo: pergunta sem código usa o código da última pergunta"""
+        # Arrange
+        messages = [
+            {"role": "user", "content": f"```python\n{SOURCE}```"},
+            {"role": "assistant", "content": "Testes..."},
+        ]
+
+        # Act / Assert
+        assert find_source("E para números negativos?", messages).strip() == SOURCE.strip()
+        assert find_source("O que é um mock?") == ""
+
+    def test_report_summary(self):
+        """Teste de partição por equivalência: o pior estado das partes define o resultado"""
+        # Act
+        report = ValidationReport([
+            ShardResult("passed", 5, 0, 0, "", 0.1),
+            ShardResult("failed", 4, 1, 0, "FALHOU test_3", 0.2),
+        ])
+
+        # Assert
+        assert report.status == "failed"
+        assert report.summary() == "Validação: 1 de 10 testes falharam"
+        assert report.output == "FALHOU test_3"
+        assert report.seconds == 0.2
+
+
+@needs_sandbox
+class TestValidationPool:
+    """Testes executando o pytest na sandbox"""
+
+    def test_passing_tests_run_in_parallel_shards(self, pool):
+        """Teste positivo: testes que passam, divididos entre os workers"""
+        # Act
+        report = pool.validate(many_tests(12), SOURCE)
+
+        # Assert
+        assert report.ok
+        assert report.passed == 12
+        assert len(report.shards) == 2
+
+    def test_failures_and_import_errors(self, pool):
+        """Teste negativo: falhas e erros de importação aparecem no relatório"""
+        # Act
+        failed = pool.validate(many_tests(3, expected=lambda i: 0), SOURCE)
+        broken = pool.validate("import modulo_inexistente\n\ndef test_a():\n    pass", SOURCE)
+
+        # Assert
+        assert failed.status == "failed" and failed.failed == 3
+        assert "assert" in failed.output
+        assert broken.status == "error" and broken.errors == 1
+        assert "modulo_inexistente" in broken.output
+
+    def test_time_limit(self, pool):
+        """Teste de limite: teste que não termina é interrompido e o pool continua disponível"""
+        # Act
+        report = pool.validate("import time\n\ndef test_lento():\n    time.sleep(60)", SOURCE)
+
+        # Assert
+        assert report.status == "timeout"
+        assert pool.validate(many_tests(1), SOURCE).ok
+
+    def test_worker_has_no_secrets(self, pool):
+        """Teste negativo: o código gerado não vê a API Key"""
+        # Arrange
+        code = "import os\n\ndef test_sem_segredos():\n    assert 'GEMINI_API_KEY' not in os.environ"
+
+        # Act / Assert
+        with patch.dict(os.environ, {"GEMINI_API_KEY": "segredo"}):
+            assert pool.validate(code).ok
+
+
+@needs_sandbox
+class TestSandbox:
+    """Testes do isolamento do código gerado"""
+
+    def test_cannot_read_app_env(self, pool, tmp_path):
+        """Teste negativo: o código gerado não lê o .env da aplicação"""
+        # Arrange
+        env_file = tmp_path / ".env"
+        env_file.write_text("GEMINI_API_KEY=segredo\n")
+        code = (
+            "import os\n\n"
+            "def test_le_env():\n"
+            f"    for path in ({str(env_file)!r}, {os.path.join(APP_DIR, '.env')!r}):\n"
+            "        assert not os.path.exists(path)\n"
+            f"    assert not os.path.exists({APP_DIR!r})\n"
+        )
+
+        # Act
+        report = pool.validate(code)
+
+        # Assert
+        assert env_file.read_text() == "GEMINI_API_KEY=segredo\n"
+        assert report.ok, report.output
+
+    def test_no_network(self, pool):
+        """Teste negativo: o código gerado não abre conexões de rede"""
+        # Arrange
+        code = (
+            "import socket\nimport pytest\n\n"
+            "def test_rede():\n"
+            "    with pytest.raises(OSError):\n"
+            "        socket.create_connection(('1.1.1.1', 53), timeout=1)\n"
+        )
+
+        # Act
+        report = pool.validate(code)
+
+        # Assert
+        assert report.ok, report.output
+
+    def test_runs_as_unprivileged_user(self, pool):
+        """Teste negativo: o código gerado não roda como root nem escreve fora do diretório da execução"""
+        # Arrange
+        code = (
+            "import os\nimport pytest\n\n"
+            "def test_usuario():\n"
+            f"    assert os.getuid() == {sandbox.NOBODY}\n"
+            "    with pytest.raises(OSError):\n"
+            "        open('/usr/lib/invasor', 'w')\n"
+        )
+
+        # Act
+        report = pool.validate(code)
+
+        # Assert
+        assert report.ok, report.output
+
+    def test_each_run_is_a_new_process(self, pool):
+        """Teste de limite: nada do que uma execução deixa no processo chega à seguinte"""
+        # Arrange
+        code = (
+            "import builtins\n\n"
+            "def test_estado():\n"
+            "    assert not hasattr(builtins, 'vazou')\n"
+            "    builtins.vazou = True\n"
+        )
+
+        # Act
+        reports = [pool.validate(code) for _ in range(2)]
+
+        # Assert
+        assert all(report.ok for report in reports)
+
+    def test_unavailable_sandbox_runs_nothing(self, pool):
+        """Teste negativo: sem sandbox o código não é executado e a validação falha"""
+        # Arrange
+        with patch.object(sandbox, "unavailable_reason", return_value="sem unshare"), \
+             patch.object(sandbox, "run") as run:
+            # Act
+            report = pool.validate(many_tests(1), SOURCE)
+
+        # Assert
+        run.assert_not_called()
+        assert report.status == "error"
+        assert "Sandbox indisponível: sem unshare" in report.output
+
+
+    def test_transient_failure_is_checked_again(self):
+        """Teste de limite: uma falha ao criar a sandbox não fica guardada; o sucesso fica"""
+        # Arrange
+        probe = Mock(side_effect=["falha ao criar a sandbox: sem memória", None])
+        with patch.dict(sandbox._probe, {"ok": False, "failure": None}), \
+             patch.object(sandbox, "_probe_sandbox", probe), \
+             patch.object(sandbox, "PROBE_RETRY_SECONDS", 0):
+            # Act
+            reasons = [sandbox.unavailable_reason() for _ in range(3)]
+
+        # Assert
+        assert reasons == ["falha ao criar a sandbox: sem memória", None, None]
+        assert probe.call_count == 2
+
+    def test_failure_is_not_probed_again_before_the_interval(self):
+        """Teste de limite: dentro do intervalo, a falha é devolvida sem criar outra sandbox"""
+        # Arrange
+        probe = Mock(return_value="comando unshare (util-linux) não encontrado")
+        with patch.dict(sandbox._probe, {"ok": False, "failure": None}), \
+             patch.object(sandbox, "_probe_sandbox", probe):
+            # Act
+            reasons = [sandbox.unavailable_reason() for _ in range(2)]
+
+        # Assert
+        assert reasons == ["comando unshare (util-linux) não encontrado"] * 2
+        probe.assert_called_once()
+
+
+class TestValidateAnswer:
+    """Testes para a rodada de correção"""
+
+    def test_failed_tests_are_repaired_once(self, pool):
+        """Teste positivo: a saída do pytest volta ao modelo e a correção é usada"""
+        # Arrange
+        generate = Mock(return_value=answer(many_tests(2)))
+
+        # Act
+        outcome = validate_answer(pool, "modelo", answer(many_tests(2, expected=lambda i: 0)), SOURCE,
+                                  generate=generate)
+
+        # Assert
+        assert outcome.repaired
+        assert outcome.report.ok
+        assert outcome.first_report.failed == 2
+        generate.assert_called_once()
+        model, history, prompt = generate.call_args[0]
+        assert model == "modelo" and history == []
+        assert "soma(0, 1) == 0" in prompt and "Saída do pytest" in prompt
+
+    def test_worse_repair_is_discarded(self, pool):
+        """Teste negativo: correção que não melhora mantém a resposta original"""
+        # Arrange
+        original = answer(many_tests(2, expected=lambda i: 0 if i else i + 1))
+        generate = Mock(return_value="Erro ao gerar resposta: cota")
+
+        # Act
+        outcome = validate_answer(pool, None, original, SOURCE, generate=generate)
+
+        # Assert
+        assert not outcome.repaired
+        assert outcome.answer == original
+        assert outcome.report.failed == 1
+
+    def test_answer_without_tests_is_not_executed(self):
+        """Teste de limite: resposta sem testes em Python não usa o pool"""
+        # Arrange
+        pool = Mock()
+
+        # Act
+        outcome = validate_answer(pool, None, "Um mock substitui uma dependência.", SOURCE)
+
+        # Assert
+        assert outcome.report is None
+        pool.validate.assert_not_called()
+
+
+@needs_sandbox
+@pytest.mark.integration
+def test_page_validates_and_repairs(pool, mock_environment):
+    """Teste de integração: a página executa os testes e guarda a versão corrigida"""
+    from streamlit.testing.v1 import AppTest
+    from ai_testing_helper.cache import LRUCache, ResponseCache
+
+    # Arrange
+    model = Mock()
+    model.generate_content.side_effect = [
+        Mock(text=answer(many_tests(2, expected=lambda i: 0))),
+        Mock(text=answer(many_tests(2))),
+    ]
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    with patch('google.generativeai.configure'), \
+         patch('ai_testing_helper.resources.get_gemini_model', return_value=model), \
+         patch('ai_testing_helper.resources.get_validation_pool', return_value=pool), \
+         patch('ai_testing_helper.resources.get_response_cache', return_value=ResponseCache(LRUCache(10))), \
+         patch.dict(os.environ, {"VALIDATE_TESTS": "1"}):
+        app = AppTest.from_file(app_path, default_timeout=30).run()
+        app.toggle(key="streaming").set_value(False)
+        app.toggle(key="chat_mode").set_value(False)
+        app.run()
+
+        # Act
+        app.chat_input[0].set_value(f"Crie testes:\n```python\n{SOURCE}```").run()
+
+    # Assert
+    assert not app.exception
+    reply = app.session_state.messages[-1]["content"]
+    assert "== 1" in reply and "== 0" not in reply
+    assert reply.endswith("_🧪 Validação: 2 testes passaram_")
+
+
+@pytest.mark.integration
+def test_page_has_no_validation_toggle(mock_environment):
+    """Teste negativo: quem usa a página não consegue ligar a execução de código"""
+    from streamlit.testing.v1 import AppTest
+
+    # Arrange
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+    # Act
+    with patch('google.generativeai.configure'), patch.dict(os.environ, {"VALIDATE_TESTS": "0"}):
+        app = AppTest.from_file(app_path, default_timeout=30).run()
+
+    # Assert
+    assert not app.exception
+    assert "validate_tests" not in [toggle.key for toggle in app.toggle]